@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks decoding search_stream results into columns.
+
+Compares ColumnarSink against converting every GoogleAdsRow to a dict with
+json_format.MessageToDict, the usual way of turning results into a table.
+Each decoder is run several times and its fastest run is reported.
+"""
+
+
+import argparse
+from importlib import import_module
+import timeit
+
+from google.protobuf import json_format
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.reporting import columnar
+
+_QUERY = ('SELECT campaign.id, campaign.name, campaign.status, '
+          'segments.date, metrics.clicks, metrics.impressions, '
+          'metrics.cost_micros, metrics.ctr FROM campaign')
+
+
+def _create_responses(version, batch_count, batch_size):
+    service_protos = import_module(
+        f'google.ads.google_ads.{version}.proto.services.'
+        'google_ads_service_pb2')
+    responses = []
+    for batch in range(batch_count):
+        response = service_protos.SearchGoogleAdsStreamResponse()
+        for index in range(batch_size):
+            row = response.results.add()
+            row.campaign.id.value = batch * batch_size + index
+            row.campaign.name.value = f'Campaign {index}'
+            row.campaign.status = 2
+            row.segments.date.value = '2020-01-01'
+            row.metrics.clicks.value = index
+            row.metrics.impressions.value = index * 10
+            row.metrics.cost_micros.value = index * 1000
+            # Leave every other CTR unset, as for rows without impressions.
+            if index % 2:
+                row.metrics.ctr.value = 0.1
+        responses.append(response)
+    return responses
+
+
+def _to_dicts(responses):
+    return [json_format.MessageToDict(row)
+            for response in responses for row in response.results]
+
+
+def _to_numpy(responses, version):
+    return columnar.ColumnarSink(_QUERY, version).consume(
+        responses).to_numpy()
+
+
+def _to_arrow(responses, version):
+    return columnar.ColumnarSink(_QUERY, version).consume(
+        responses).to_arrow()
+
+
+def main(version, batch_count, batch_size, repeat):
+    responses = _create_responses(version, batch_count, batch_size)
+    row_count = batch_count * batch_size
+    print(f'{row_count:,} rows of 8 columns in {batch_count} batches')
+
+    for name, decode in (('MessageToDict', lambda: _to_dicts(responses)),
+                         ('ColumnarSink.to_numpy',
+                          lambda: _to_numpy(responses, version)),
+                         ('ColumnarSink.to_arrow',
+                          lambda: _to_arrow(responses, version))):
+        elapsed = min(timeit.repeat(decode, number=1, repeat=repeat))
+        print(f'{name:<24}{elapsed:8.3f}s {row_count / elapsed:12,.0f} '
+              'rows/s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks decoding search results into columns.')
+    parser.add_argument('-v', '--version', type=str, default=_DEFAULT_VERSION,
+                        help='The Google Ads API version.')
+    parser.add_argument('-b', '--batch_count', type=int, default=10,
+                        help='The number of batches in the stream.')
+    parser.add_argument('-s', '--batch_size', type=int, default=10000,
+                        help='The number of rows in each batch.')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='The number of runs; the fastest is reported.')
+    args = parser.parse_args()
+
+    main(args.version, args.batch_count, args.batch_size, args.repeat)
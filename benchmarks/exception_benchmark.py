@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks the exception path of the interceptors under a high error rate.
+
+Simulates a bulk job that receives a stream of failed responses, each carrying
+a GoogleAdsFailure with several errors, and measures how long it takes to turn
+them into GoogleAdsExceptions with eager parsing, as the interceptors used to
+do, with the deferred parsing the interceptors do now, and with deferred
+parsing followed by error code decoding.
+"""
+
+
+import argparse
+from importlib import import_module
+import time
+
+import grpc
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.errors import GoogleAdsException
+from google.ads.google_ads.interceptors.interceptor import Interceptor
+
+
+def _build_serialized_failure(version, errors_per_failure):
+    error_protos = import_module(
+        f'google.ads.google_ads.{version}.proto.errors.errors_pb2')
+    failure = error_protos.GoogleAdsFailure()
+    for index in range(errors_per_failure):
+        error = failure.errors.add()
+        error.error_code.request_error = 16
+        error.message = f"Invalid customer ID '{index}'."
+        element = error.location.field_path_elements.add()
+        element.field_name = 'operations'
+        element.index.value = index
+    return failure.SerializeToString()
+
+
+def _build_response(interceptor, serialized_failure):
+    class MockRpcErrorResponse(grpc.RpcError):
+        def code(self):
+            return grpc.StatusCode.INVALID_ARGUMENT
+
+        def trailing_metadata(self):
+            return (('request-id', 'benchmark'),
+                    (interceptor._failure_key, serialized_failure))
+
+        def exception(self):
+            return self
+
+    return MockRpcErrorResponse()
+
+
+def _time(label, count, fn):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {elapsed:8.3f}s {count / elapsed:12,.0f} errors/s')
+
+
+def main(version, count, errors_per_failure):
+    interceptor = Interceptor(version)
+    response = _build_response(
+        interceptor, _build_serialized_failure(version, errors_per_failure))
+
+    def eager():
+        trailing_metadata = response.trailing_metadata()
+        return GoogleAdsException(
+            response, response,
+            interceptor._get_google_ads_failure(trailing_metadata),
+            interceptor.get_request_id_from_metadata(trailing_metadata))
+
+    def deferred():
+        return interceptor._get_error_from_response(response)
+
+    def deferred_and_decoded():
+        return deferred().get_error_codes()
+
+    print(f'{count:,} failed responses with {errors_per_failure} errors each')
+    _time('eager parsing', count, eager)
+    _time('deferred parsing', count, deferred)
+    _time('deferred parsing + error code decoding', count,
+          deferred_and_decoded)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks GoogleAdsException creation.')
+    parser.add_argument('-v', '--version', type=str, default=_DEFAULT_VERSION,
+                        help='The Google Ads API version.')
+    parser.add_argument('-n', '--count', type=int, default=100000,
+                        help='The number of failed responses to simulate.')
+    parser.add_argument('-e', '--errors_per_failure', type=int, default=5,
+                        help='The number of errors in each failure.')
+    args = parser.parse_args()
+
+    main(args.version, args.count, args.errors_per_failure)
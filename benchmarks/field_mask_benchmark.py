@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks computing the update_mask of keyword bid updates.
+
+Builds pairs of AdGroupCriterion keywords whose modified copy has a new
+cpc_bid_micros, then compares google.api_core.protobuf_helpers.field_mask with
+the field_masks batch method of a compiled field mask.
+"""
+
+
+import argparse
+from importlib import import_module
+import timeit
+
+from google.api_core import protobuf_helpers
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.mutate import update_masks
+
+
+def _create_pairs(version, pair_count):
+    criterion_class = import_module(
+        f'google.ads.google_ads.{version}.proto.resources.'
+        'ad_group_criterion_pb2').AdGroupCriterion
+    pairs = []
+    for index in range(pair_count):
+        original = criterion_class()
+        original.resource_name = f'customers/1/adGroupCriteria/1~{index}'
+        original.status = 2
+        original.keyword.text.value = f'keyword {index}'
+        original.keyword.match_type = 2
+        original.cpc_bid_micros.value = 1000000
+        modified = criterion_class()
+        modified.CopyFrom(original)
+        modified.cpc_bid_micros.value = 1000000 + 10000 * (index % 100 + 1)
+        pairs.append((original, modified))
+    return criterion_class, pairs
+
+
+def main(version, pair_count, repeat):
+    criterion_class, pairs = _create_pairs(version, pair_count)
+    compiled = update_masks.compile_field_mask(criterion_class)
+    if compiled.field_masks(pairs) != [
+            protobuf_helpers.field_mask(*pair) for pair in pairs]:
+        raise AssertionError('The field masks differ.')
+    print(f'{pair_count:,} keyword bid updates')
+
+    benchmarks = [
+        ('protobuf_helpers.field_mask', lambda: [
+            protobuf_helpers.field_mask(original, modified)
+            for original, modified in pairs]),
+        ('CompiledFieldMask.field_masks', lambda: compiled.field_masks(pairs)),
+    ]
+    baseline = None
+    for name, compute in benchmarks:
+        elapsed = min(timeit.repeat(compute, number=1, repeat=repeat))
+        baseline = baseline or elapsed
+        print(f'{name:<32}{elapsed:8.3f}s {pair_count / elapsed:12,.0f} '
+              f'masks/s {baseline / elapsed:6.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks computing field masks of updates.')
+    parser.add_argument('-v', '--version', type=str, default=_DEFAULT_VERSION,
+                        help='The Google Ads API version.')
+    parser.add_argument('-n', '--pair_count', type=int, default=10000,
+                        help='The number of (original, modified) pairs.')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='The number of runs; the fastest is reported.')
+    args = parser.parse_args()
+
+    main(args.version, args.pair_count, args.repeat)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks GoogleAdsService.search pagination with and without prefetching.
+
+Starts a local gRPC server that implements GoogleAdsService.Search with an
+injected per-page latency, then pages through a result set with a
+GoogleAdsServiceClient while simulating per-page processing time on the
+caller's side. With prefetching the two overlap.
+"""
+
+
+import argparse
+from concurrent import futures
+from importlib import import_module
+import time
+
+import grpc
+
+from google.ads.google_ads import pagination
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+
+def _create_servicer(version, page_count, page_size, latency):
+    service_protos = import_module(
+        f'google.ads.google_ads.{version}.proto.services.'
+        'google_ads_service_pb2')
+    service_grpc = import_module(
+        f'google.ads.google_ads.{version}.proto.services.'
+        'google_ads_service_pb2_grpc')
+
+    class LatencyInjectingServicer(service_grpc.GoogleAdsServiceServicer):
+        def Search(self, request, context):
+            time.sleep(latency)
+            page = int(request.page_token or 0)
+            response = service_protos.SearchGoogleAdsResponse()
+            for index in range(page_size):
+                response.results.add().campaign.id.value = (
+                    page * page_size + index)
+            if page + 1 < page_count:
+                response.next_page_token = str(page + 1)
+            return response
+
+    return service_grpc, LatencyInjectingServicer()
+
+
+def _busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def main(version, page_count, page_size, latency, processing_time):
+    service_grpc, servicer = _create_servicer(version, page_count, page_size,
+                                              latency)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    service_grpc.add_GoogleAdsServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+
+    api_module = import_module(f'google.ads.google_ads.{version}')
+    channel = grpc.insecure_channel(f'localhost:{port}')
+    transport = api_module.GoogleAdsServiceGrpcTransport(channel=channel)
+    service = api_module.GoogleAdsServiceClient(transport=transport)
+    pagination.install(service)
+
+    print(f'{page_count} pages of {page_size} rows, {latency * 1000:.0f}ms '
+          f'latency and {processing_time * 1000:.0f}ms processing per page')
+    try:
+        for prefetch_pages in (0, 1, 2, 4):
+            pagination.set_prefetch_defaults(prefetch_pages=prefetch_pages)
+            start = time.perf_counter()
+            for page in service.search('1234567890', 'query').pages:
+                _busy_wait(processing_time)
+            elapsed = time.perf_counter() - start
+            print(f'prefetch_pages={prefetch_pages:<3} {elapsed:8.3f}s '
+                  f'{page_count * page_size / elapsed:12,.0f} rows/s')
+    finally:
+        channel.close()
+        server.stop(None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks prefetching of search result pages.')
+    parser.add_argument('-v', '--version', type=str, default=_DEFAULT_VERSION,
+                        help='The Google Ads API version.')
+    parser.add_argument('-p', '--page_count', type=int, default=20,
+                        help='The number of pages in the result set.')
+    parser.add_argument('-s', '--page_size', type=int, default=1000,
+                        help='The number of rows on each page.')
+    parser.add_argument('-l', '--latency', type=float, default=0.1,
+                        help='The server latency per page, in seconds.')
+    parser.add_argument('-t', '--processing_time', type=float, default=0.1,
+                        help='The client processing time per page, in '
+                             'seconds.')
+    args = parser.parse_args()
+
+    main(args.version, args.page_count, args.page_size, args.latency,
+         args.processing_time)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks flattening GoogleAdsRows with compiled queries.
+
+Builds a report of singular wrapper and enum fields selected from campaign,
+ad_group, metrics and segments, then compares json_format.MessageToDict with
+the tuple, record and dict rows of a compiled query.
+"""
+
+
+import argparse
+from importlib import import_module
+import timeit
+
+from google.protobuf import json_format
+from google.protobuf.descriptor import FieldDescriptor
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.reporting import fields, rows
+
+# The resources fields are selected from, and the maximum number of fields
+# selected from each.
+_RESOURCES = (('campaign', 15), ('ad_group', 10), ('metrics', 20),
+              ('segments', 10))
+
+# Values for each kind of field.
+_VALUES = {
+    fields.INT64: 12345,
+    fields.UINT64: 12345,
+    fields.DOUBLE: 0.5,
+    fields.BOOL: True,
+    fields.ENUM: 2,
+    fields.STRING: 'value',
+    fields.BYTES: b'value',
+}
+
+
+def _select_fields(row_descriptor, column_count):
+    names = []
+    for resource, limit in _RESOURCES:
+        selected = 0
+        for field_descriptor in (
+                row_descriptor.fields_by_name[resource].message_type.fields):
+            name = f'{resource}.{field_descriptor.name}'
+            field = fields.resolve_field(name, row_descriptor)
+            if (field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+                    or not (field.unwrap or field.kind == fields.ENUM)):
+                continue
+            names.append(name)
+            selected += 1
+            if selected == limit or len(names) == column_count:
+                break
+    return names
+
+
+def _create_rows(version, names, row_count):
+    row_class = import_module(
+        f'google.ads.google_ads.{version}.proto.services.'
+        'google_ads_service_pb2').GoogleAdsRow
+    row_descriptor = row_class.DESCRIPTOR
+    row = row_class()
+    for name in names:
+        field = fields.resolve_field(name, row_descriptor)
+        message = row
+        for field_name in field.parent_path:
+            message = getattr(message, field_name)
+        if field.unwrap:
+            getattr(message, field.field_name).value = _VALUES[field.kind]
+        else:
+            setattr(message, field.field_name, _VALUES[field.kind])
+    serialized_row = row.SerializeToString()
+    return [row_class.FromString(serialized_row) for _ in range(row_count)]
+
+
+def main(version, column_count, row_count, repeat):
+    names = _select_fields(fields.get_row_descriptor(version), column_count)
+    query = f'SELECT {", ".join(names)} FROM ad_group'
+    google_ads_rows = _create_rows(version, names, row_count)
+    print(f'{row_count:,} rows of {len(names)} columns')
+
+    benchmarks = [('MessageToDict', lambda: [
+        json_format.MessageToDict(row) for row in google_ads_rows])]
+    for row_type in (rows.TUPLE, rows.RECORD, rows.DICT):
+        compiled_query = rows.compile_query(query, row_type=row_type,
+                                            version=version)
+        benchmarks.append((
+            f'CompiledQuery ({row_type})',
+            lambda compiled_query=compiled_query: compiled_query.flatten_rows(
+                google_ads_rows)))
+
+    baseline = None
+    for name, flatten in benchmarks:
+        elapsed = min(timeit.repeat(flatten, number=1, repeat=repeat))
+        baseline = baseline or elapsed
+        print(f'{name:<26}{elapsed:8.3f}s {row_count / elapsed:12,.0f} '
+              f'rows/s {baseline / elapsed:6.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks flattening rows with compiled queries.')
+    parser.add_argument('-v', '--version', type=str, default=_DEFAULT_VERSION,
+                        help='The Google Ads API version.')
+    parser.add_argument('-c', '--column_count', type=int, default=50,
+                        help='The number of selected fields.')
+    parser.add_argument('-n', '--row_count', type=int, default=10000,
+                        help='The number of rows.')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='The number of runs; the fastest is reported.')
+    args = parser.parse_args()
+
+    main(args.version, args.column_count, args.row_count, args.repeat)
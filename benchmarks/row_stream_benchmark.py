@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks the peak memory of consuming a large search_stream.
+
+Replays one serialized batch of rows with every singular Metrics wrapper set
+until the stream has the requested number of rows, and consumes it by:
+
+    collect: keeping every batch in a list, then iterating the rows.
+    stream: iterating a RowStream, which holds one batch at a time.
+    reuse: iterating a RowStream that decodes every batch into one message.
+
+Each method runs in its own process so that its peak RSS is measured alone.
+"""
+
+
+import argparse
+from importlib import import_module
+import subprocess
+import sys
+import time
+
+from google.protobuf.descriptor import FieldDescriptor
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.reporting import streaming
+
+_METHODS = ('collect', 'stream', 'reuse')
+
+# A value for the wrapper of each type of metric.
+_VALUES = {
+    FieldDescriptor.CPPTYPE_DOUBLE: 0.5,
+    FieldDescriptor.CPPTYPE_INT64: 12345,
+    FieldDescriptor.CPPTYPE_STRING: 'value',
+}
+
+
+def _create_batch(service_protos, batch_size):
+    response = service_protos.SearchGoogleAdsStreamResponse()
+    row = response.results.add()
+    row.campaign.id.value = 1234567890
+    row.campaign.name.value = 'Campaign'
+    row.segments.date.value = '2020-01-01'
+    for field_descriptor in row.metrics.DESCRIPTOR.fields:
+        if (field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+                or field_descriptor.message_type is None):
+            continue
+        getattr(row.metrics, field_descriptor.name).value = _VALUES[
+            field_descriptor.message_type.fields_by_name['value'].cpp_type]
+    serialized_row = row.SerializeToString()
+    for _ in range(batch_size - 1):
+        response.results.add().MergeFromString(serialized_row)
+    return response.SerializeToString()
+
+
+def _run(method, version, row_count, batch_size):
+    """Consumes a synthetic stream and prints the peak RSS."""
+    service_protos = import_module(
+        f'google.ads.google_ads.{version}.proto.services.'
+        'google_ads_service_pb2')
+    batch = _create_batch(service_protos, batch_size)
+    baseline_rss = streaming.get_peak_rss()
+    decoder = streaming._BatchDecoder(
+        service_protos.SearchGoogleAdsStreamResponse,
+        reuse_messages=method == 'reuse')
+    responses = (decoder(batch) for _ in range(row_count // batch_size))
+
+    start = time.perf_counter()
+    if method == 'collect':
+        batches = list(responses)
+        rows = (row for response in batches for row in response.results)
+    else:
+        rows = streaming.RowStream(responses, decoder=decoder)
+    consumed = sum(1 for _ in rows)
+    elapsed = time.perf_counter() - start
+
+    peak_rss = streaming.get_peak_rss()
+    print(f'{method:<10}{consumed:12,} rows {elapsed:8.1f}s '
+          f'{consumed / elapsed:10,.0f} rows/s peak RSS '
+          f'{peak_rss / 2 ** 20:9,.1f} MiB '
+          f'(+{(peak_rss - baseline_rss) / 2 ** 20:,.1f} MiB)')
+
+
+def main(version, row_count, batch_size, methods):
+    print(f'{row_count:,} rows in batches of {batch_size:,}')
+    for method in methods:
+        subprocess.run([sys.executable, __file__, '--version', version,
+                        '--row_count', str(row_count), '--batch_size',
+                        str(batch_size), '--run', method], check=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the peak memory of consuming a stream.')
+    parser.add_argument('-v', '--version', type=str, default=_DEFAULT_VERSION,
+                        help='The Google Ads API version.')
+    parser.add_argument('-n', '--row_count', type=int, default=5000000,
+                        help='The number of rows in the stream.')
+    parser.add_argument('-b', '--batch_size', type=int, default=10000,
+                        help='The number of rows per batch.')
+    parser.add_argument('-m', '--methods', nargs='+', choices=_METHODS,
+                        default=_METHODS, help='The methods to benchmark.')
+    parser.add_argument('--run', choices=_METHODS,
+                        help='Runs a single method in this process.')
+    args = parser.parse_args()
+
+    if args.run:
+        _run(args.run, args.version, args.row_count, args.batch_size)
+    else:
+        main(args.version, args.row_count, args.batch_size, args.methods)
@@ -0,0 +1,436 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Builds and queries the tree of accounts beneath manager accounts.
+
+An AccountHierarchy is built by querying the customer_client resource of
+every manager account for its direct clients. Managers are queried
+concurrently as soon as they are discovered, rather than one level at a time.
+The result is indexed by customer ID, currency and time zone, and can be
+saved to disk so that later runs load it instead of walking the hierarchy
+again.
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+_SERVICE_NAME = 'GoogleAdsService'
+_CUSTOMER_SERVICE_NAME = 'CustomerService'
+# Selects a manager, at level 0, and its direct clients, at level 1.
+_CLIENTS_QUERY = (
+    'SELECT customer_client.id, customer_client.level, '
+    'customer_client.manager, customer_client.descriptive_name, '
+    'customer_client.currency_code, customer_client.time_zone, '
+    'customer_client.test_account, customer_client.hidden '
+    'FROM customer_client WHERE customer_client.level <= 1')
+_HIERARCHY_FILE_NAME = 'account_hierarchy_{}_{}.json'
+_LOGIN_CUSTOMER_ID_KEY = 'login-customer-id'
+_DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60
+
+
+class CustomerNode(namedtuple('CustomerNode', (
+        'customer_id', 'descriptive_name', 'currency_code', 'time_zone',
+        'manager', 'test_account', 'hidden', 'parent_id', 'child_ids'))):
+    """An account in an AccountHierarchy.
+
+    Attributes:
+        customer_id: the str customer ID.
+        descriptive_name: the str descriptive name of the account.
+        currency_code: the str currency code of the account, e.g. "USD".
+        time_zone: the str time zone of the account, e.g. "America/New_York".
+        manager: whether the account is a manager account.
+        test_account: whether the account is a test account.
+        hidden: whether the account is hidden.
+        parent_id: the str customer ID of the manager the account is reached
+            through, or None if the account is a root. An account linked to
+            several managers is attached to the one closest to a root.
+        child_ids: a tuple of the str customer IDs of the account's direct
+            clients.
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        """Returns a JSON-serializable dict of the node."""
+        node = self._asdict()
+        node['child_ids'] = list(self.child_ids)
+        return node
+
+    @classmethod
+    def from_dict(cls, node):
+        """Creates a CustomerNode from a dict returned by to_dict."""
+        node = dict(node)
+        node['child_ids'] = tuple(node['child_ids'])
+        return cls(**node)
+
+
+def _get_attributes(customer_client):
+    """Returns the CustomerNode attributes of a CustomerClient message."""
+    return (customer_client.descriptive_name.value,
+            customer_client.currency_code.value,
+            customer_client.time_zone.value, customer_client.manager.value,
+            customer_client.test_account.value, customer_client.hidden.value)
+
+
+def _build_nodes(attributes, client_ids, root_ids):
+    """Arranges the accounts found by a traversal into a tree.
+
+    Accounts are attached to the first manager that reaches them in a
+    breadth-first walk from the roots, in customer ID order, so the tree is
+    the same however the traversal was scheduled.
+
+    Args:
+        attributes: a dict of CustomerNode attribute tuples keyed by customer
+            ID.
+        client_ids: a dict of the lists of direct client IDs of every manager
+            keyed by customer ID.
+        root_ids: a list of the str customer IDs the traversal started from.
+
+    Returns:
+        A list of CustomerNode instances, and a list of the root IDs that
+        aren't clients of another root.
+    """
+    linked_ids = {client_id for ids in client_ids.values()
+                  for client_id in ids}
+    # Roots that returned nothing, e.g. because they aren't accessible, are
+    # left out.
+    root_ids = sorted(set(root_ids).intersection(attributes) - linked_ids)
+    parent_ids = dict.fromkeys(root_ids)
+    tree_client_ids = {}
+    queue = deque(root_ids)
+    while queue:
+        customer_id = queue.popleft()
+        tree_client_ids[customer_id] = []
+        for client_id in sorted(set(client_ids.get(customer_id, ()))):
+            if client_id not in parent_ids:
+                parent_ids[client_id] = customer_id
+                tree_client_ids[customer_id].append(client_id)
+                queue.append(client_id)
+
+    return [CustomerNode(customer_id, *attributes[customer_id],
+                         parent_ids[customer_id],
+                         tuple(tree_client_ids[customer_id]))
+            for customer_id in parent_ids], root_ids
+
+
+class AccountHierarchy(object):
+    """A tree of accounts indexed by customer ID, currency and time zone.
+
+    Attributes:
+        version: the str Google Ads API version the hierarchy was read with.
+        root_ids: a list of the str customer IDs of the roots.
+        nodes: a dict of CustomerNode instances keyed by customer ID.
+    """
+
+    def __init__(self, nodes, root_ids, version=_DEFAULT_VERSION):
+        """Initializer for the AccountHierarchy.
+
+        Args:
+            nodes: an iterable of CustomerNode instances.
+            root_ids: an iterable of the str customer IDs of the roots.
+            version: the str Google Ads API version the hierarchy was read
+                with.
+        """
+        self.version = version
+        self.root_ids = list(root_ids)
+        self.nodes = {node.customer_id: node for node in nodes}
+        self._ids_by_currency_code = {}
+        self._ids_by_time_zone = {}
+        for node in self.nodes.values():
+            self._ids_by_currency_code.setdefault(
+                node.currency_code, set()).add(node.customer_id)
+            self._ids_by_time_zone.setdefault(
+                node.time_zone, set()).add(node.customer_id)
+
+    @classmethod
+    def from_service(cls, client, root_ids=None, max_concurrency=10,
+                     version=None):
+        """Walks the hierarchy beneath one or more accounts.
+
+        Every manager is queried for its direct clients as soon as it is
+        discovered, with up to max_concurrency queries in flight.
+
+        Args:
+            client: a GoogleAdsClient instance.
+            root_ids: an optional iterable of the str customer IDs to start
+                from. Defaults to the client's login customer ID if it has
+                one, otherwise to every account accessible with its
+                credentials.
+            max_concurrency: an int maximum number of concurrent queries.
+            version: an optional str Google Ads API version; defaults to the
+                client's default version.
+
+        Returns:
+            An AccountHierarchy instance.
+
+        Raises:
+            ValueError: If max_concurrency is less than one.
+            GoogleAdsException: If a manager couldn't be queried.
+        """
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least one.')
+
+        version = version or _DEFAULT_VERSION
+        root_ids = list(root_ids or _get_default_root_ids(client, version))
+        service = client.get_service(_SERVICE_NAME, version=version)
+
+        def search(customer_id, login_customer_id):
+            # Accounts are queried through the root they were reached from,
+            # unless the client always logs in as the same manager.
+            metadata = (None if client.login_customer_id
+                        else [(_LOGIN_CUSTOMER_ID_KEY, login_customer_id)])
+            return list(service.search(customer_id, _CLIENTS_QUERY,
+                                       metadata=metadata))
+
+        attributes = {}
+        client_ids = {}
+        executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                      thread_name_prefix='account_hierarchy')
+        try:
+            futures = {executor.submit(search, root_id, root_id):
+                       (root_id, root_id) for root_id in root_ids}
+            queried_ids = set(root_ids)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    manager_id, login_customer_id = futures.pop(future)
+                    client_ids[manager_id] = []
+                    for row in future.result():
+                        customer_client = row.customer_client
+                        customer_id = str(customer_client.id.value)
+                        attributes.setdefault(
+                            customer_id, _get_attributes(customer_client))
+                        if customer_client.level.value == 0:
+                            continue
+                        client_ids[manager_id].append(customer_id)
+                        if (customer_client.manager.value
+                                and customer_id not in queried_ids):
+                            queried_ids.add(customer_id)
+                            futures[executor.submit(
+                                search, customer_id, login_customer_id)] = (
+                                    customer_id, login_customer_id)
+        finally:
+            # Queries that haven't started are abandoned if one failed.
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        nodes, root_ids = _build_nodes(attributes, client_ids, root_ids)
+        return cls(nodes, root_ids, version=version)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a hierarchy saved with save.
+
+        Args:
+            path: the str or path-like path of the file.
+
+        Returns:
+            An AccountHierarchy instance.
+        """
+        with open(path, encoding='utf-8') as hierarchy_file:
+            snapshot = json.load(hierarchy_file)
+        return cls(map(CustomerNode.from_dict, snapshot['nodes']),
+                   snapshot['root_ids'], version=snapshot['version'])
+
+    def save(self, path):
+        """Saves the hierarchy to a JSON file.
+
+        The file is replaced atomically, so concurrent readers never see a
+        partial hierarchy.
+
+        Args:
+            path: the str or path-like path of the file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(file_descriptor, 'w',
+                           encoding='utf-8') as hierarchy_file:
+                json.dump({'version': self.version,
+                           'root_ids': self.root_ids,
+                           'nodes': [node.to_dict()
+                                     for node in self.nodes.values()]},
+                          hierarchy_file)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, customer_id):
+        return customer_id in self.nodes
+
+    def __iter__(self):
+        return iter(self.nodes.values())
+
+    def get(self, customer_id):
+        """Returns the CustomerNode of an account.
+
+        Raises:
+            KeyError: If the account isn't in the hierarchy.
+        """
+        return self.nodes[customer_id]
+
+    def get_descendants(self, customer_id):
+        """Returns every account beneath an account, breadth first.
+
+        Args:
+            customer_id: a str customer ID.
+
+        Returns:
+            A list of CustomerNode instances, not including the account.
+
+        Raises:
+            KeyError: If the account isn't in the hierarchy.
+        """
+        descendants = []
+        queue = deque(self.nodes[customer_id].child_ids)
+        while queue:
+            node = self.nodes[queue.popleft()]
+            descendants.append(node)
+            queue.extend(node.child_ids)
+        return descendants
+
+    def get_leaves(self, customer_id=None):
+        """Returns the client accounts, which can't have clients of their own.
+
+        Managers without clients aren't included.
+
+        Args:
+            customer_id: an optional str customer ID of an account to return
+                the leaves beneath, or of a client account to return itself.
+                Defaults to every leaf of the hierarchy.
+
+        Returns:
+            A list of CustomerNode instances.
+
+        Raises:
+            KeyError: If the account isn't in the hierarchy.
+        """
+        if customer_id is None:
+            nodes = self.nodes.values()
+        else:
+            nodes = [self.nodes[customer_id]]
+            nodes.extend(self.get_descendants(customer_id))
+        return [node for node in nodes if not node.manager]
+
+    def get_path_to_root(self, customer_id):
+        """Returns the accounts from an account up to its root.
+
+        Args:
+            customer_id: a str customer ID.
+
+        Returns:
+            A list of CustomerNode instances that starts with the account and
+            ends with its root.
+
+        Raises:
+            KeyError: If the account isn't in the hierarchy.
+        """
+        path = [self.nodes[customer_id]]
+        while path[-1].parent_id is not None:
+            path.append(self.nodes[path[-1].parent_id])
+        return path
+
+    def filter(self, currency_code=None, time_zone=None, manager=None):
+        """Returns the accounts that match every given criterion.
+
+        Args:
+            currency_code: an optional str currency code, e.g. "USD".
+            time_zone: an optional str time zone, e.g. "Europe/London".
+            manager: an optional bool; True returns only manager accounts and
+                False only client accounts.
+
+        Returns:
+            A list of CustomerNode instances in customer ID order.
+        """
+        customer_ids = None
+        for index, value in ((self._ids_by_currency_code, currency_code),
+                             (self._ids_by_time_zone, time_zone)):
+            if value is not None:
+                ids = index.get(value, set())
+                customer_ids = (ids if customer_ids is None
+                                else customer_ids & ids)
+        if customer_ids is None:
+            customer_ids = self.nodes
+        nodes = [self.nodes[customer_id] for customer_id in sorted(
+            customer_ids, key=lambda customer_id: int(customer_id))]
+        if manager is not None:
+            nodes = [node for node in nodes if node.manager == manager]
+        return nodes
+
+
+def _get_default_root_ids(client, version):
+    """Returns the customer IDs a traversal starts from by default."""
+    if client.login_customer_id:
+        return [str(client.login_customer_id)]
+    customer_service = client.get_service(_CUSTOMER_SERVICE_NAME,
+                                          version=version)
+    return [resource_name.rpartition('/')[2] for resource_name
+            in customer_service.list_accessible_customers().resource_names]
+
+
+def load_account_hierarchy(client, root_ids=None, directory=None,
+                           max_age=_DEFAULT_MAX_AGE_SECONDS,
+                           max_concurrency=10, version=None):
+    """Loads an account hierarchy from disk, walking it again if needed.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        root_ids: an optional iterable of the str customer IDs to start from;
+            see AccountHierarchy.from_service.
+        directory: an optional str or path-like directory where hierarchies
+            are saved, one file per API version, login customer ID and set of
+            roots. If None, the hierarchy is always walked and not saved.
+        max_age: an optional number of seconds after which a saved hierarchy
+            is walked again. If None, saved hierarchies never expire.
+        max_concurrency: an int maximum number of concurrent queries.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+
+    Returns:
+        An AccountHierarchy instance.
+    """
+    version = version or _DEFAULT_VERSION
+    if directory is None:
+        return AccountHierarchy.from_service(
+            client, root_ids=root_ids, max_concurrency=max_concurrency,
+            version=version)
+
+    root_ids = sorted(root_ids) if root_ids else None
+    digest = hashlib.sha256(json.dumps(
+        [client.login_customer_id, root_ids]).encode()).hexdigest()[:16]
+    path = os.path.join(directory,
+                        _HIERARCHY_FILE_NAME.format(version, digest))
+    try:
+        if max_age is None or time.time() - os.path.getmtime(path) < max_age:
+            return AccountHierarchy.load(path)
+    except (OSError, ValueError, KeyError, TypeError):
+        # A missing or unreadable snapshot is walked again.
+        pass
+
+    hierarchy = AccountHierarchy.from_service(
+        client, root_ids=root_ids, max_concurrency=max_concurrency,
+        version=version)
+    os.makedirs(directory, exist_ok=True)
+    hierarchy.save(path)
+    return hierarchy
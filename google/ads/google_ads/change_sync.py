@@ -0,0 +1,375 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Keeps a local snapshot of entities in sync using change_status.
+
+The change_status resource lists the resources of an account that changed
+recently. A ChangeSync reads the changes made since the watermark stored in
+an EntitySnapshot, fetches only the changed entities, in batches of
+resource_name IN (...) queries, and applies them to the snapshot, so a sync
+costs in proportion to the number of changes rather than to the size of the
+account. change_status queries return at most 10,000 rows, so time windows
+with more changes than that are split in half until every window fits.
+
+The first sync of a customer, and any sync whose watermark is older than
+change_status keeps changes for, fetches every entity instead.
+"""
+
+import abc
+from collections import namedtuple
+import datetime
+
+from google.ads.google_ads import gaql
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+_SERVICE_NAME = 'GoogleAdsService'
+# The maximum number of rows a change_status query returns.
+_CHANGE_STATUS_LIMIT = 10000
+# How far back changes are read; change_status keeps them for 90 days.
+_MAX_LOOKBACK = datetime.timedelta(days=89)
+# change_status times are in the account's time zone, which is at most this
+# far from UTC.
+_TIME_ZONE_MARGIN = datetime.timedelta(hours=14)
+_DATE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+_DEFAULT_BATCH_SIZE = 1000
+# Resources whose changes are reported by change_status, named after their
+# ChangeStatusResourceType.
+_CHANGE_STATUS_RESOURCES = (
+    'ad_group', 'ad_group_ad', 'ad_group_criterion', 'campaign',
+    'campaign_criterion', 'feed', 'feed_item', 'ad_group_feed',
+    'campaign_feed', 'ad_group_bid_modifier')
+
+
+class SyncResult(namedtuple('SyncResult', (
+        'customer_id', 'watermark', 'full', 'updated', 'removed',
+        'change_queries'))):
+    """A summary of the sync of one customer.
+
+    Attributes:
+        customer_id: the str customer ID.
+        watermark: the str time, in the account's time zone, up to which
+            changes have been applied.
+        full: whether every entity was fetched rather than only changes.
+        updated: the number of entities added to or updated in the snapshot.
+        removed: the number of entities removed from the snapshot.
+        change_queries: the number of change_status queries made.
+    """
+    __slots__ = ()
+
+
+class EntitySnapshot(abc.ABC):
+    """A local copy of entities and the watermark they are current up to.
+
+    Entities are GoogleAdsRow instances of the queries made by a ChangeSync,
+    identified by the resource name of their resource. Subclasses must
+    implement every method.
+    """
+
+    @abc.abstractmethod
+    def get_watermark(self, customer_id):
+        """Returns the str watermark of a customer, or None if never synced.
+
+        Args:
+            customer_id: a str customer ID.
+        """
+
+    @abc.abstractmethod
+    def set_watermark(self, customer_id, watermark):
+        """Sets the watermark of a customer.
+
+        Args:
+            customer_id: a str customer ID.
+            watermark: a str time in the account's time zone.
+        """
+
+    @abc.abstractmethod
+    def upsert(self, customer_id, resource, rows):
+        """Adds or replaces entities.
+
+        Args:
+            customer_id: a str customer ID.
+            resource: the str name of the resource, e.g. "campaign".
+            rows: a list of GoogleAdsRow instances.
+        """
+
+    @abc.abstractmethod
+    def remove(self, customer_id, resource, resource_names):
+        """Removes entities, if they exist.
+
+        Args:
+            customer_id: a str customer ID.
+            resource: the str name of the resource, e.g. "campaign".
+            resource_names: a list of the str resource names of the entities.
+        """
+
+    @abc.abstractmethod
+    def replace(self, customer_id, resource, rows):
+        """Replaces every entity of a resource.
+
+        Args:
+            customer_id: a str customer ID.
+            resource: the str name of the resource, e.g. "campaign".
+            rows: a list of GoogleAdsRow instances.
+        """
+
+
+def get_entity_resource_name(resource, row):
+    """Returns the resource name of the entity of a row.
+
+    Args:
+        resource: the str name of the resource, e.g. "campaign".
+        row: a GoogleAdsRow instance.
+
+    Returns:
+        A str resource name.
+    """
+    return getattr(row, resource).resource_name
+
+
+class InMemorySnapshot(EntitySnapshot):
+    """An EntitySnapshot held in dicts.
+
+    Attributes:
+        entities: a dict keyed by customer ID of dicts keyed by resource of
+            dicts of GoogleAdsRow instances keyed by resource name.
+        watermarks: a dict of str watermarks keyed by customer ID.
+    """
+
+    def __init__(self):
+        """Initializer for the InMemorySnapshot."""
+        self.entities = {}
+        self.watermarks = {}
+
+    def get_watermark(self, customer_id):
+        return self.watermarks.get(customer_id)
+
+    def set_watermark(self, customer_id, watermark):
+        self.watermarks[customer_id] = watermark
+
+    def get_entities(self, customer_id, resource):
+        """Returns a dict of GoogleAdsRow instances keyed by resource name."""
+        return self.entities.setdefault(customer_id, {}).setdefault(
+            resource, {})
+
+    def upsert(self, customer_id, resource, rows):
+        entities = self.get_entities(customer_id, resource)
+        for row in rows:
+            entities[get_entity_resource_name(resource, row)] = row
+
+    def remove(self, customer_id, resource, resource_names):
+        entities = self.get_entities(customer_id, resource)
+        for resource_name in resource_names:
+            entities.pop(resource_name, None)
+
+    def replace(self, customer_id, resource, rows):
+        self.entities.setdefault(customer_id, {})[resource] = {
+            get_entity_resource_name(resource, row): row for row in rows}
+
+
+def _format_date_time(date_time):
+    return date_time.strftime(_DATE_TIME_FORMAT)
+
+
+def _parse_date_time(text):
+    # Later API versions add fractions of a second.
+    return datetime.datetime.strptime(text[:19], _DATE_TIME_FORMAT)
+
+
+class ChangeSync(object):
+    """Syncs entities of selected resources into an EntitySnapshot."""
+
+    def __init__(self, client, snapshot, fields,
+                 batch_size=_DEFAULT_BATCH_SIZE, version=None):
+        """Initializer for the ChangeSync.
+
+        Args:
+            client: a GoogleAdsClient instance.
+            snapshot: an EntitySnapshot instance.
+            fields: a dict keyed by the str resources to sync, e.g.
+                "campaign", of iterables of the str field paths to select for
+                them, e.g. ["campaign.name", "campaign.status"]. The resource
+                name of each entity is always selected.
+            batch_size: an int maximum number of resource names per query of
+                changed entities.
+            version: an optional str Google Ads API version; defaults to the
+                client's default version.
+
+        Raises:
+            ValueError: If a resource isn't reported by change_status or
+                batch_size is less than one.
+        """
+        unknown = set(fields).difference(_CHANGE_STATUS_RESOURCES)
+        if unknown:
+            raise ValueError(
+                f'Changes to {", ".join(sorted(unknown))} aren\'t reported by '
+                f'change_status. Valid resources are: '
+                f'{", ".join(_CHANGE_STATUS_RESOURCES)}')
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least one.')
+
+        self.snapshot = snapshot
+        self.batch_size = batch_size
+        self._service = client.get_service(
+            _SERVICE_NAME, version=version or _DEFAULT_VERSION)
+        self._queries = {
+            resource: 'SELECT {} FROM {}'.format(', '.join(
+                [f'{resource}.resource_name']
+                + [field for field in resource_fields
+                   if field != f'{resource}.resource_name']), resource)
+            for resource, resource_fields in fields.items()}
+        self._change_query = (
+            'SELECT change_status.resource_type, '
+            'change_status.last_change_date_time, '
+            'change_status.resource_status, {} FROM change_status '
+            'WHERE change_status.resource_type IN ({}) '
+            'AND change_status.last_change_date_time >= \'{{}}\' '
+            'AND change_status.last_change_date_time <= \'{{}}\' '
+            'ORDER BY change_status.last_change_date_time '
+            'LIMIT {}').format(
+                ', '.join(f'change_status.{resource}'
+                          for resource in self._queries),
+                ', '.join(resource.upper() for resource in self._queries),
+                _CHANGE_STATUS_LIMIT)
+
+    def _search(self, customer_id, query):
+        return [row for response in self._service.search_stream(
+            customer_id, query) for row in response.results]
+
+    def _list_changes(self, customer_id, start, end):
+        """Lists the change_status rows of a time window.
+
+        Windows with more rows than a query returns are split in half.
+
+        Args:
+            customer_id: a str customer ID.
+            start: the datetime of the start of the window, inclusive.
+            end: the datetime of the end of the window, inclusive.
+
+        Returns:
+            A list of GoogleAdsRow instances and the int number of queries
+            made, or None and the number of queries if a single second has
+            too many changes.
+        """
+        rows = self._search(customer_id, self._change_query.format(
+            _format_date_time(start), _format_date_time(end)))
+        if len(rows) < _CHANGE_STATUS_LIMIT:
+            return rows, 1
+        if end <= start:
+            return None, 1
+
+        middle = start + datetime.timedelta(
+            seconds=(end - start).total_seconds() // 2)
+        first_rows, first_queries = self._list_changes(customer_id, start,
+                                                       middle)
+        if first_rows is None:
+            return None, first_queries + 1
+        second_rows, second_queries = self._list_changes(
+            customer_id, middle + datetime.timedelta(seconds=1), end)
+        if second_rows is None:
+            return None, first_queries + second_queries + 1
+        return first_rows + second_rows, first_queries + second_queries + 1
+
+    def _fetch(self, customer_id, resource, resource_names):
+        """Fetches changed entities and applies them to the snapshot.
+
+        Entities that no longer exist are removed.
+
+        Returns:
+            The int numbers of entities updated and removed.
+        """
+        updated = removed = 0
+        for index in range(0, len(resource_names), self.batch_size):
+            batch = resource_names[index:index + self.batch_size]
+            rows = self._search(customer_id, gaql.add_predicate(
+                self._queries[resource],
+                '{}.resource_name IN ({})'.format(
+                    resource, ', '.join(map(gaql.format_literal, batch)))))
+            self.snapshot.upsert(customer_id, resource, rows)
+            found = {get_entity_resource_name(resource, row) for row in rows}
+            missing = [resource_name for resource_name in batch
+                       if resource_name not in found]
+            self.snapshot.remove(customer_id, resource, missing)
+            updated += len(rows)
+            removed += len(missing)
+        return updated, removed
+
+    def full_sync(self, customer_id, now=None):
+        """Fetches every entity of the synced resources.
+
+        Args:
+            customer_id: a str customer ID.
+            now: an optional UTC datetime of the current time, for testing.
+
+        Returns:
+            A SyncResult instance.
+        """
+        now = now or datetime.datetime.utcnow()
+        # Changes made while entities are fetched are read again by the next
+        # sync, whatever the account's time zone.
+        watermark = _format_date_time(now - _TIME_ZONE_MARGIN)
+        updated = 0
+        for resource, query in self._queries.items():
+            rows = self._search(customer_id, query)
+            self.snapshot.replace(customer_id, resource, rows)
+            updated += len(rows)
+        self.snapshot.set_watermark(customer_id, watermark)
+        return SyncResult(customer_id, watermark, True, updated, 0, 0)
+
+    def sync(self, customer_id, now=None):
+        """Applies the changes made since the customer's watermark.
+
+        Args:
+            customer_id: a str customer ID.
+            now: an optional UTC datetime of the current time, for testing.
+
+        Returns:
+            A SyncResult instance.
+        """
+        now = now or datetime.datetime.utcnow()
+        watermark = self.snapshot.get_watermark(customer_id)
+        if watermark is None:
+            return self.full_sync(customer_id, now=now)
+        start = _parse_date_time(watermark)
+        if now - _TIME_ZONE_MARGIN - start > _MAX_LOOKBACK:
+            return self.full_sync(customer_id, now=now)
+
+        # The watermark's second is read again, since changes made later in
+        # it may not have been read.
+        rows, change_queries = self._list_changes(
+            customer_id, start, now + _TIME_ZONE_MARGIN)
+        if rows is None:
+            result = self.full_sync(customer_id, now=now)
+            return result._replace(change_queries=change_queries)
+
+        resource_names = {resource: set() for resource in self._queries}
+        for row in rows:
+            change_status = row.change_status
+            resource = (change_status.DESCRIPTOR
+                        .fields_by_name['resource_type'].enum_type
+                        .values_by_number[change_status.resource_type]
+                        .name.lower())
+            resource_name = getattr(change_status, resource).value
+            if resource in resource_names and resource_name:
+                resource_names[resource].add(resource_name)
+            watermark = max(watermark,
+                            change_status.last_change_date_time.value[:19])
+
+        updated = removed = 0
+        for resource, names in resource_names.items():
+            resource_updated, resource_removed = self._fetch(
+                customer_id, resource, sorted(names))
+            updated += resource_updated
+            removed += resource_removed
+        self.snapshot.set_watermark(customer_id, watermark)
+        return SyncResult(customer_id, watermark, False, updated, removed,
+                          change_queries)
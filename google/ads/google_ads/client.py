@@ -15,13 +15,17 @@
 
 
 from importlib import import_module
+import itertools
 import logging.config
+import threading
 
 import grpc
 
-from google.ads.google_ads import config, oauth2, util
+from google.ads.google_ads import config, oauth2, pagination, \
+    search_stream, util
 from google.ads.google_ads.interceptors import MetadataInterceptor, \
-    ExceptionInterceptor, LoggingInterceptor
+    ExceptionInterceptor, LoggingInterceptor, CachingInterceptor, \
+    ValidationInterceptor, CoalescingInterceptor, MirrorInterceptor
 
 
 _logger = logging.getLogger(__name__)
@@ -37,11 +41,19 @@ _GRPC_CHANNEL_OPTIONS = [
     ('grpc.max_receive_message_length', 64 * 1024 * 1024)]
 
 
+# Channels in a service pool each get their own subchannel, and therefore their
+# own connection, rather than sharing the process-wide subchannel pool.
+_POOLED_GRPC_CHANNEL_OPTIONS = _GRPC_CHANNEL_OPTIONS + [
+    ('grpc.use_local_subchannel_pool', 1)]
+
+
 if unary_stream_single_threading_option := util.get_nested_attr(
     grpc, 'experimental.ChannelOptions.SingleThreadedUnaryStream', None
 ):
     _GRPC_CHANNEL_OPTIONS.append(
         (unary_stream_single_threading_option, 1))
+    _POOLED_GRPC_CHANNEL_OPTIONS.append(
+        (unary_stream_single_threading_option, 1))
 
 
 class GoogleAdsClient(object):
@@ -189,7 +201,9 @@ class GoogleAdsClient(object):
         return message_class()
 
     def __init__(self, credentials, developer_token, endpoint=None,
-                 login_customer_id=None, logging_config=None):
+                 login_customer_id=None, logging_config=None,
+                 result_cache=None, field_catalog=None, single_flight=None,
+                 entity_mirror=None):
         """Initializer for the GoogleAdsClient.
 
         Args:
@@ -198,6 +212,20 @@ class GoogleAdsClient(object):
             endpoint: a str specifying an optional alternative API endpoint.
             login_customer_id: a str specifying a login customer ID.
             logging_config: a dict specifying logging config options.
+            result_cache: an optional result_cache.ResultCache that services
+                created by this client serve GoogleAdsService search results
+                from. It can also be assigned to the result_cache attribute
+                later; services that already exist aren't affected.
+            field_catalog: an optional field_catalog.FieldCatalog that
+                services of the same API version created by this client
+                validate GoogleAdsService queries with before sending them.
+            single_flight: an optional single_flight.SingleFlight that
+                services created by this client coalesce identical concurrent
+                GoogleAdsService searches with. Share one instance between
+                clients to coalesce their searches too.
+            entity_mirror: an optional entity_mirror.EntityMirror that
+                mutates made by services of the same API version created by
+                this client are written through to.
         """
         if logging_config:
             logging.config.dictConfig(logging_config)
@@ -206,6 +234,10 @@ class GoogleAdsClient(object):
         self.developer_token = developer_token
         self.endpoint = endpoint
         self.login_customer_id = login_customer_id
+        self.result_cache = result_cache
+        self.field_catalog = field_catalog
+        self.single_flight = single_flight
+        self.entity_mirror = entity_mirror
 
     def get_service(self, name, version=_DEFAULT_VERSION, interceptors=None):
         """Returns a service client instance for the specified service_name.
@@ -226,6 +258,62 @@ class GoogleAdsClient(object):
         Raises:
             AttributeError: If the specified name doesn't exist.
         """
+        return self._create_service(name, version, interceptors,
+                                    _GRPC_CHANNEL_OPTIONS)
+
+    def get_service_pool(self, name, size, version=_DEFAULT_VERSION,
+                         interceptors=None):
+        """Returns a pool of service clients that each use their own channel.
+
+        A single gRPC channel multiplexes every concurrent call over one
+        connection, which limits throughput when many long-running calls, such
+        as search_stream calls for many customers, are made at once. Service
+        clients in the pool don't share connections with each other or with
+        clients returned by get_service.
+
+        Args:
+            name: a str indicating the name of the service, e.g.
+                "GoogleAdsService".
+            size: an int number of service clients, and therefore channels,
+                in the pool.
+            version: a str indicating the version of the Google Ads API to be
+                used.
+            interceptors: an optional list of interceptors to include in
+                requests. NOTE: this parameter is not intended for non-Google
+                use and is not officially supported.
+
+        Returns:
+            A ServicePool instance.
+
+        Raises:
+            ValueError: If the specified name doesn't exist or if size is
+                less than one.
+        """
+        if size < 1:
+            raise ValueError('A service pool must contain at least one '
+                             'service client.')
+
+        return ServicePool([
+            self._create_service(name, version, interceptors,
+                                 _POOLED_GRPC_CHANNEL_OPTIONS)
+            for _ in range(size)])
+
+    def _create_service(self, name, version, interceptors, channel_options):
+        """Creates a service client over a new channel.
+
+        Args:
+            name: a str indicating the name of the service.
+            version: a str indicating the version of the Google Ads API.
+            interceptors: an optional list of interceptors to include in
+                requests.
+            channel_options: a list of gRPC channel option tuples.
+
+        Returns:
+            A service client instance associated with the given name.
+
+        Raises:
+            ValueError: If the specified name doesn't exist.
+        """
         api_module = self._get_api_services_by_version(version)
         interceptors = interceptors or []
 
@@ -250,7 +338,28 @@ class GoogleAdsClient(object):
         channel = service_transport_class.create_channel(
             address=endpoint,
             credentials=self.credentials,
-            options=_GRPC_CHANNEL_OPTIONS)
+            options=channel_options)
+
+        if (self.field_catalog is not None
+                and self.field_catalog.version == version):
+            # Invalid queries are rejected before anything else is done.
+            interceptors = interceptors + [
+                ValidationInterceptor(self.field_catalog, version)]
+
+        if self.result_cache is not None:
+            # Cache hits bypass every other interceptor.
+            interceptors = interceptors + [CachingInterceptor(
+                self.result_cache, version, self.login_customer_id)]
+
+        if self.single_flight is not None:
+            # Only searches that miss the cache are coalesced.
+            interceptors = interceptors + [CoalescingInterceptor(
+                self.single_flight, version, self.login_customer_id)]
+
+        if (self.entity_mirror is not None
+                and self.entity_mirror.version == version):
+            interceptors = interceptors + [
+                MirrorInterceptor(self.entity_mirror, version)]
 
         interceptors = interceptors + [
             MetadataInterceptor(self.developer_token, self.login_customer_id),
@@ -263,4 +372,52 @@ class GoogleAdsClient(object):
 
         service_transport = service_transport_class(channel=channel)
 
-        return service_client(transport=service_transport)
+        service = service_client(transport=service_transport)
+        if hasattr(service, search_stream._METHOD_NAME):
+            search_stream.install(service)
+        pagination.install(service)
+        return service
+
+
+class ServicePool(object):
+    """A fixed set of service clients that are handed out round-robin.
+
+    Instances are created with GoogleAdsClient.get_service_pool and are safe
+    to share between threads. Closing the pool, or leaving it when it is used
+    as a context manager, closes the channel of every service client.
+    """
+
+    def __init__(self, services):
+        """Initializer for the ServicePool.
+
+        Args:
+            services: a list of service client instances.
+        """
+        self._services = services
+        self._cycle = itertools.cycle(services)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._services)
+
+    def __iter__(self):
+        return iter(self._services)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self):
+        """Returns the next service client in the pool."""
+        with self._lock:
+            return next(self._cycle)
+
+    def close(self):
+        """Closes the channels of the service clients in the pool.
+
+        Calls in progress on the channels are cancelled.
+        """
+        for service in self._services:
+            service.transport.channel.close()
@@ -0,0 +1,440 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Mirrors entities into a local SQLite database.
+
+An EntityMirror keeps one table per resource, e.g. campaign or
+ad_group_criterion, with a typed column per selected field and indexes on the
+resource name, the parent resource and the status, so that IDs and names can
+be resolved and joined locally instead of by querying the API again. Tables
+are bulk loaded from search_stream and refreshed incrementally with a
+ChangeSync. Mutates made by a client that has the mirror are written through
+to it, so the mirror stays consistent without reading the entities again.
+
+Columns are named after their field path without the resource, with dots
+replaced by underscores; e.g. ad_group_criterion.keyword.text is stored in
+the keyword_text column of the ad_group_criterion table. Enum values are
+stored as their names.
+"""
+
+from importlib import import_module
+import json
+import re
+import sqlite3
+import threading
+
+from google.ads.google_ads import change_sync
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.reporting import fields as fields_module
+from google.ads.google_ads.reporting.columnar import ColumnarSink
+
+_SQL_TYPES = {
+    fields_module.INT64: 'INTEGER',
+    fields_module.UINT64: 'INTEGER',
+    fields_module.BOOL: 'INTEGER',
+    fields_module.DOUBLE: 'REAL',
+    fields_module.ENUM: 'TEXT',
+    fields_module.STRING: 'TEXT',
+    fields_module.BYTES: 'BLOB',
+    fields_module.MESSAGE: 'BLOB',
+}
+# The field of each resource that holds the resource name of its parent.
+_PARENT_FIELDS = {
+    'ad_group': 'campaign',
+    'ad_group_ad': 'ad_group',
+    'ad_group_bid_modifier': 'ad_group',
+    'ad_group_criterion': 'ad_group',
+    'ad_group_feed': 'ad_group',
+    'campaign_criterion': 'campaign',
+    'campaign_feed': 'campaign',
+    'feed_item': 'feed',
+}
+_STATUS_FIELD = 'status'
+_WATERMARKS_TABLE = '_watermarks'
+# The maximum number of parameters of a DELETE ... IN statement.
+_MAX_PARAMETERS = 500
+# Matches the positions where a CamelCase name gets an underscore.
+_RE_CAMEL_CASE_BOUNDARY = re.compile(r'(?<!^)(?=[A-Z])')
+
+
+def get_column_name(resource, field_path):
+    """Returns the column of a field in the table of its resource.
+
+    Args:
+        resource: the str name of the resource, e.g. "campaign".
+        field_path: the str field path, e.g. "campaign.network_settings".
+
+    Returns:
+        A str column name, e.g. "network_settings".
+
+    Raises:
+        ValueError: If the field doesn't belong to the resource.
+    """
+    prefix = f'{resource}.'
+    if not field_path.startswith(prefix):
+        raise ValueError(f'Field "{field_path}" is not a field of resource '
+                         f'"{resource}".')
+    return field_path[len(prefix):].replace('.', '_')
+
+
+def _quote(identifier):
+    return '"{}"'.format(identifier.replace('"', '""'))
+
+
+def _to_sql_value(value, kind):
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return json.dumps([_to_sql_value(item, kind) for item in value])
+    if kind == fields_module.MESSAGE:
+        return value.SerializeToString()
+    return value
+
+
+class _Table(object):
+    """The schema of the table of one resource."""
+
+    def __init__(self, resource, field_paths, version):
+        row_descriptor = fields_module.get_row_descriptor(version)
+        field_paths = [f'{resource}.resource_name'] + list(field_paths)
+        self.parent_column = self.status_column = None
+        for column, attribute in ((_PARENT_FIELDS.get(resource),
+                                   'parent_column'),
+                                  (_STATUS_FIELD, 'status_column')):
+            if column is None:
+                continue
+            try:
+                fields_module.resolve_field(f'{resource}.{column}',
+                                            row_descriptor)
+            except ValueError:
+                continue
+            setattr(self, attribute, column)
+            field_paths.append(f'{resource}.{column}')
+
+        self.resource = resource
+        # Duplicates are dropped, keeping the selection order.
+        self.field_paths = list(dict.fromkeys(field_paths))
+        self.columns = [get_column_name(resource, field_path)
+                        for field_path in self.field_paths]
+        self.query = 'SELECT {} FROM {}'.format(', '.join(self.field_paths),
+                                                resource)
+        self._sink = ColumnarSink(self.query, version=version)
+        self.definitions = [
+            (name, 'TEXT' if column.repeated else _SQL_TYPES[column.kind])
+            for name, column in zip(self.columns, self._sink.columns)]
+
+    def create(self, connection):
+        """Creates the table and its indexes, replacing a different schema.
+
+        Returns:
+            Whether an existing table with a different schema was replaced.
+        """
+        table = _quote(self.resource)
+        existing = [(column[1], column[2]) for column in connection.execute(
+            f'PRAGMA table_info({table})')]
+        expected = ([('customer_id', 'TEXT')] + self.definitions
+                    + [('row', 'BLOB')])
+        if existing == expected:
+            return False
+
+        connection.execute(f'DROP TABLE IF EXISTS {table}')
+        connection.execute('CREATE TABLE {} ({})'.format(table, ', '.join(
+            ['customer_id TEXT NOT NULL']
+            + [f'{_quote(name)} {sql_type}'
+               + (' PRIMARY KEY' if name == 'resource_name' else '')
+               for name, sql_type in self.definitions]
+            + ['row BLOB NOT NULL'])))
+        for column in ('customer_id', self.parent_column, self.status_column):
+            if column is not None:
+                connection.execute('CREATE INDEX {} ON {} ({})'.format(
+                    _quote(f'{self.resource}_{column}'), table,
+                    _quote(column)))
+        return bool(existing)
+
+    def to_records(self, customer_id, rows):
+        """Returns the column values of rows, in the table's column order."""
+        self._sink.clear()
+        self._sink.append_rows(rows)
+        columns = [[_to_sql_value(value, column.kind)
+                    for value in column.to_list(enum_names=True)]
+                   for column in self._sink.columns]
+        self._sink.clear()
+        return [(customer_id, *values, row.SerializeToString())
+                for values, row in zip(zip(*columns), rows)]
+
+
+class EntityMirror(change_sync.EntitySnapshot):
+    """A SQLite mirror of the entities of selected resources.
+
+    Instances are safe to share between threads.
+
+    Attributes:
+        connection: the sqlite3.Connection of the database. Its rows are
+            sqlite3.Row instances.
+        version: the str Google Ads API version of the mirrored entities.
+    """
+
+    def __init__(self, fields, path=':memory:', version=_DEFAULT_VERSION):
+        """Initializer for the EntityMirror.
+
+        Tables whose schema changed since the database was last opened are
+        recreated empty, and every watermark is reset so that the next
+        refresh loads them again.
+
+        Args:
+            fields: a dict keyed by the str resources to mirror, e.g.
+                "campaign", of iterables of the str field paths to store for
+                them, e.g. ["campaign.name"]. The resource name is always
+                stored, as are the parent resource and the status of
+                resources that have them.
+            path: the str or path-like path of the database file. Defaults to
+                a database in memory.
+            version: the str Google Ads API version of the entities.
+
+        Raises:
+            ValueError: If a field doesn't exist or doesn't belong to its
+                resource.
+        """
+        self.version = version
+        self._fields = {resource: list(field_paths)
+                        for resource, field_paths in fields.items()}
+        self._tables = {resource: _Table(resource, field_paths, version)
+                        for resource, field_paths in self._fields.items()}
+        self._row_class = import_module(
+            f'google.ads.google_ads.{version}.proto.services.'
+            'google_ads_service_pb2').GoogleAdsRow
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self._lock, self.connection:
+            self.connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {_WATERMARKS_TABLE} '
+                '(customer_id TEXT PRIMARY KEY, watermark TEXT NOT NULL)')
+            replaced = [table.create(self.connection)
+                        for table in self._tables.values()]
+            if any(replaced):
+                self.connection.execute(f'DELETE FROM {_WATERMARKS_TABLE}')
+
+    @property
+    def resources(self):
+        """A list of the str names of the mirrored resources."""
+        return list(self._tables)
+
+    def close(self):
+        """Closes the database."""
+        with self._lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_table(self, resource):
+        try:
+            return self._tables[resource]
+        except KeyError:
+            raise ValueError(f'Resource "{resource}" is not mirrored.')
+
+    def get_watermark(self, customer_id):
+        with self._lock:
+            row = self.connection.execute(
+                f'SELECT watermark FROM {_WATERMARKS_TABLE} '
+                'WHERE customer_id = ?', (customer_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, customer_id, watermark):
+        with self._lock, self.connection:
+            self.connection.execute(
+                f'INSERT OR REPLACE INTO {_WATERMARKS_TABLE} VALUES (?, ?)',
+                (customer_id, watermark))
+
+    def _insert(self, table, customer_id, rows):
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO {} VALUES ({})'.format(
+                _quote(table.resource),
+                ', '.join('?' * (len(table.columns) + 2))),
+            table.to_records(customer_id, rows))
+
+    def upsert(self, customer_id, resource, rows):
+        table = self._get_table(resource)
+        with self._lock, self.connection:
+            self._insert(table, customer_id, rows)
+
+    def remove(self, customer_id, resource, resource_names):
+        table = self._get_table(resource)
+        with self._lock, self.connection:
+            for index in range(0, len(resource_names), _MAX_PARAMETERS):
+                batch = resource_names[index:index + _MAX_PARAMETERS]
+                self.connection.execute(
+                    'DELETE FROM {} WHERE resource_name IN ({})'.format(
+                        _quote(table.resource), ', '.join('?' * len(batch))),
+                    batch)
+
+    def replace(self, customer_id, resource, rows):
+        table = self._get_table(resource)
+        with self._lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM {} WHERE customer_id = ?'.format(
+                    _quote(table.resource)), (customer_id,))
+            self._insert(table, customer_id, rows)
+
+    def load(self, client, customer_id):
+        """Loads every entity of a customer with search_stream.
+
+        Args:
+            client: a GoogleAdsClient instance.
+            customer_id: a str customer ID.
+
+        Returns:
+            A change_sync.SyncResult instance.
+        """
+        return self._create_change_sync(client).full_sync(customer_id)
+
+    def refresh(self, client, customer_id):
+        """Applies the changes made to a customer since it was last synced.
+
+        Customers that were never loaded are loaded in full.
+
+        Args:
+            client: a GoogleAdsClient instance.
+            customer_id: a str customer ID.
+
+        Returns:
+            A change_sync.SyncResult instance.
+
+        Raises:
+            ValueError: If a mirrored resource isn't reported by
+                change_status.
+        """
+        return self._create_change_sync(client).sync(customer_id)
+
+    def _create_change_sync(self, client):
+        return change_sync.ChangeSync(client, self, self._fields,
+                                      version=self.version)
+
+    def execute(self, sql, parameters=()):
+        """Runs an SQL statement against the mirror, e.g. a join.
+
+        Args:
+            sql: a str SQL statement.
+            parameters: an optional sequence or dict of parameters.
+
+        Returns:
+            A list of sqlite3.Row instances.
+        """
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def get(self, resource, resource_name):
+        """Returns the mirrored row of an entity.
+
+        Args:
+            resource: the str name of the resource, e.g. "campaign".
+            resource_name: the str resource name of the entity.
+
+        Returns:
+            A GoogleAdsRow instance, or None if the entity isn't mirrored.
+
+        Raises:
+            ValueError: If the resource isn't mirrored.
+        """
+        rows = self.find(resource, resource_name=resource_name)
+        return rows[0] if rows else None
+
+    def find(self, resource, **columns):
+        """Returns the mirrored rows whose columns have the given values.
+
+        Example:
+            mirror.find('ad_group', campaign=campaign_resource_name,
+                        status='ENABLED')
+
+        Args:
+            resource: the str name of the resource, e.g. "campaign".
+            **columns: the values of columns, e.g. name="Campaign #1".
+
+        Returns:
+            A list of GoogleAdsRow instances.
+
+        Raises:
+            ValueError: If the resource isn't mirrored or a column doesn't
+                exist.
+        """
+        table = self._get_table(resource)
+        unknown = set(columns).difference(table.columns, ('customer_id',))
+        if unknown:
+            raise ValueError(f'Unknown columns of "{resource}": '
+                             f'{", ".join(sorted(unknown))}')
+        sql = 'SELECT row FROM {}'.format(_quote(resource))
+        if columns:
+            sql += ' WHERE ' + ' AND '.join(f'{_quote(column)} = ?'
+                                            for column in columns)
+        return [self._row_class.FromString(row[0])
+                for row in self.execute(sql, list(columns.values()))]
+
+    def apply_mutate(self, customer_id, operations, results):
+        """Writes the successful operations of a mutate through to the mirror.
+
+        Created entities are stored as they were sent, updated entities have
+        the fields of their update mask merged into their mirrored row, and
+        removed entities are deleted. Operations on resources that aren't
+        mirrored, failed operations and updates of entities that aren't
+        mirrored are ignored.
+
+        Args:
+            customer_id: a str customer ID.
+            operations: a sequence of operation messages, e.g.
+                CampaignOperation instances.
+            results: a sequence of the corresponding result messages, which
+                have an empty resource name if their operation failed.
+        """
+        upserts = {}
+        removals = {}
+        for operation, result in zip(operations, results):
+            resource_name = result.resource_name
+            kind = operation.WhichOneof('operation')
+            resource = _get_resource(operation.DESCRIPTOR)
+            if (not resource_name or kind is None
+                    or resource not in self._tables):
+                continue
+            if kind == 'remove':
+                removals.setdefault(resource, []).append(resource_name)
+                continue
+
+            entity = getattr(operation, kind)
+            if kind == 'create':
+                row = self._row_class()
+                getattr(row, resource).CopyFrom(entity)
+            else:
+                row = self.get(resource, resource_name)
+                if row is None:
+                    continue
+                operation.update_mask.MergeMessage(
+                    entity, getattr(row, resource),
+                    replace_message_field=True, replace_repeated_field=True)
+            getattr(row, resource).resource_name = resource_name
+            upserts.setdefault(resource, []).append(row)
+
+        for resource, rows in upserts.items():
+            self.upsert(customer_id, resource, rows)
+        for resource, resource_names in removals.items():
+            self.remove(customer_id, resource, resource_names)
+
+
+def _get_resource(operation_descriptor):
+    """Returns the resource of an operation from its create field."""
+    create = operation_descriptor.fields_by_name.get('create')
+    if create is None or create.message_type is None:
+        return None
+    return _RE_CAMEL_CASE_BOUNDARY.sub('_', create.message_type.name).lower()
@@ -13,21 +13,236 @@
 # limitations under the License.
 """Errors used by the Google Ads API library."""
 
+import threading
+
+from google.protobuf.message import DecodeError
+from grpc import StatusCode
+
+_ERROR_CODE_ONEOF = 'error_code'
+# Status codes of transient failures that can be resolved by reissuing the
+# same request.
+_RETRYABLE_STATUS_CODES = frozenset((StatusCode.UNAVAILABLE,
+                                     StatusCode.DEADLINE_EXCEEDED,
+                                     StatusCode.INTERNAL))
+
+# Index instances keyed by the full name of the ErrorCode message they
+# describe, i.e. one per API version.
+_error_code_indexes = {}
+_error_code_indexes_lock = threading.Lock()
+
+
+class ErrorCodeIndex:
+    """An index over every error enum referenced by an ErrorCode message.
+
+    Decoding an ErrorCode with protobuf reflection requires a oneof lookup,
+    a field descriptor lookup and an enum descriptor lookup per error. This
+    index flattens all of the error enums in an API version's proto/errors
+    package into a single dict so that a (category, value) pair resolves to an
+    enum name with one hash lookup.
+    """
+
+    def __init__(self, error_code_descriptor):
+        """Initializer.
+
+        Args:
+            error_code_descriptor: the google.protobuf Descriptor of an
+                ErrorCode message, e.g. errors_pb2.ErrorCode.DESCRIPTOR.
+        """
+        self._names = {}
+        self._categories_by_number = {}
+
+        for field in error_code_descriptor.oneofs_by_name[
+                _ERROR_CODE_ONEOF].fields:
+            self._categories_by_number[field.number] = field.name
+            for enum_value in field.enum_type.values:
+                self._names[(field.name, enum_value.number)] = enum_value.name
+
+    @property
+    def categories(self):
+        """A tuple of all error categories, e.g. "request_error"."""
+        return tuple(self._categories_by_number.values())
+
+    def get_name(self, category, value):
+        """Retrieves the enum name for an error value in the given category.
+
+        Args:
+            category: a str error category, e.g. "request_error".
+            value: an int error enum value.
+
+        Returns:
+            A str enum name, e.g. "INVALID_CUSTOMER_ID", or None if the value
+            is unknown to this version of the library.
+        """
+        return self._names.get((category, value))
+
+    def get_category_by_field_number(self, field_number):
+        """Retrieves an error category by its ErrorCode field number.
+
+        Args:
+            field_number: an int field number of the ErrorCode oneof.
+
+        Returns:
+            A str error category or None if the field number is unknown.
+        """
+        return self._categories_by_number.get(field_number)
+
+    def decode(self, error_code):
+        """Decodes an ErrorCode message to its category and enum name.
+
+        Args:
+            error_code: an ErrorCode message instance.
+
+        Returns:
+            A (category, name) tuple of strs, e.g.
+            ("request_error", "INVALID_CUSTOMER_ID"), or (None, None) if no
+            error code is set.
+        """
+        category = error_code.WhichOneof(_ERROR_CODE_ONEOF)
+
+        if category is None:
+            return None, None
+
+        return category, self._names.get(
+            (category, getattr(error_code, category)))
+
+
+def get_error_code_index(error_code_descriptor):
+    """Returns the shared ErrorCodeIndex for an ErrorCode descriptor.
+
+    Indexes are built once per API version and reused for the lifetime of the
+    process.
+
+    Args:
+        error_code_descriptor: the google.protobuf Descriptor of an
+            ErrorCode message.
+
+    Returns:
+        An ErrorCodeIndex instance.
+    """
+    key = error_code_descriptor.full_name
+
+    try:
+        return _error_code_indexes[key]
+    except KeyError:
+        with _error_code_indexes_lock:
+            if key not in _error_code_indexes:
+                _error_code_indexes[key] = ErrorCodeIndex(
+                    error_code_descriptor)
+            return _error_code_indexes[key]
+
 
 class GoogleAdsException(Exception):
     """Exception thrown in response to an API error from GoogleAds servers."""
 
-    def __init__(self, error, call, failure, request_id):
+    def __init__(self, error, call, failure, request_id, failure_type=None):
         """Initializer.
 
         Args:
             error: the grpc.RpcError raised by an rpc call.
             call: the grpc.Call object containing the details of the rpc call.
             failure: the GoogleAdsFailure instance describing how the
-                GoogleAds API call failed.
+                GoogleAds API call failed, or its serialized bytes. If bytes
+                are given they are not parsed until the failure attribute is
+                first accessed.
             request_id: a str request ID associated with the GoogleAds API call.
+            failure_type: the GoogleAdsFailure message class used to parse
+                failure when it is given as bytes.
+
+        Raises:
+            ValueError: If failure is given as bytes without a failure_type.
         """
+        if isinstance(failure, bytes) and failure_type is None:
+            raise ValueError('A failure_type is required to parse a '
+                             'serialized failure.')
+
         self.error = error
         self.call = call
-        self.failure = failure
         self.request_id = request_id
+        self._failure = failure
+        self._failure_type = failure_type
+
+    @property
+    def failure(self):
+        """The GoogleAdsFailure describing how the API call failed.
+
+        A serialized failure is parsed on first access and the result is
+        retained, so repeated access does not parse again. None is returned if
+        the serialized failure cannot be decoded.
+        """
+        if isinstance(self._failure, bytes):
+            failure = self._failure_type()
+            try:
+                failure.ParseFromString(self._failure)
+            except DecodeError:
+                failure = None
+            self._failure = failure
+
+        return self._failure
+
+    @failure.setter
+    def failure(self, failure):
+        self._failure = failure
+
+    @property
+    def serialized_failure(self):
+        """The serialized GoogleAdsFailure bytes, if they have not been parsed.
+
+        Returns None once the failure has been parsed or if the exception was
+        created from a GoogleAdsFailure instance.
+        """
+        return self._failure if isinstance(self._failure, bytes) else None
+
+    def get_error_codes(self):
+        """Decodes the error code of every error in the failure.
+
+        Returns:
+            A list of (category, name) str tuples, one per GoogleAdsError,
+            e.g. [("request_error", "INVALID_CUSTOMER_ID")].
+        """
+        failure = self.failure
+
+        if failure is None:
+            return []
+
+        index = get_error_code_index(
+            failure.DESCRIPTOR.fields_by_name['errors'].message_type
+            .fields_by_name[_ERROR_CODE_ONEOF].message_type)
+
+        return [index.decode(error.error_code) for error in failure.errors]
+
+
+def get_status_code(exception):
+    """Retrieves the gRPC status code associated with an exception.
+
+    Args:
+        exception: an exception raised by a service call, e.g. a
+            GoogleAdsException, a grpc.RpcError or a
+            google.api_core.exceptions.GoogleAPICallError.
+
+    Returns:
+        A grpc.StatusCode, or None if the exception doesn't have one.
+    """
+    if isinstance(exception, GoogleAdsException):
+        exception = exception.error
+
+    # Errors translated by google.api_core expose the code as an attribute.
+    if status_code := getattr(exception, 'grpc_status_code', None):
+        return status_code
+
+    try:
+        return exception.code()
+    except (AttributeError, TypeError):
+        return None
+
+
+def is_retryable_error(exception):
+    """Determines whether a failed request can be retried as-is.
+
+    Args:
+        exception: an exception raised by a service call.
+
+    Returns:
+        True if the exception indicates a transient failure, i.e. its status
+        code is UNAVAILABLE, DEADLINE_EXCEEDED or INTERNAL.
+    """
+    return get_status_code(exception) in _RETRYABLE_STATUS_CODES
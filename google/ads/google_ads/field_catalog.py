@@ -0,0 +1,480 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Validates GAQL queries locally against a snapshot of the field catalog.
+
+GoogleAdsFieldService describes every field that queries can use: whether it
+can be selected, filtered and sorted, its data type, and what it can be
+selected with. A FieldCatalog holds a snapshot of these descriptions for one
+API version, which can be saved to disk, and checks queries against it
+without sending them, so that typos and incompatible fields don't cost a
+round trip. Validated queries are remembered, so checking the same query
+again is a dictionary lookup.
+"""
+
+from collections import namedtuple
+import functools
+import json
+import os
+import re
+import tempfile
+import time
+
+from google.ads.google_ads import gaql
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.util import import_optional
+
+_SERVICE_NAME = 'GoogleAdsFieldService'
+_CATALOG_QUERY = (
+    'SELECT name, category, data_type, selectable, filterable, sortable, '
+    'selectable_with, attribute_resources, metrics, segments, enum_values, '
+    'type_url, is_repeated')
+_CATALOG_FILE_NAME = 'google_ads_fields_{}.json'
+# The number of distinct queries whose validation results are remembered.
+_VALIDATED_QUERY_CACHE_SIZE = 1024
+
+# Field categories.
+RESOURCE = 'RESOURCE'
+ATTRIBUTE = 'ATTRIBUTE'
+SEGMENT = 'SEGMENT'
+METRIC = 'METRIC'
+
+# Matches a condition of a WHERE clause up to the end of its operator.
+_RE_CONDITION = re.compile(
+    r'(?<![\w.])(?P<field>[a-z]\w*(?:\.\w+)+)\s+(?P<operator>NOT\s+IN|IN|'
+    r'NOT\s+LIKE|LIKE|CONTAINS\s+(?:ANY|ALL|NONE)|IS\s+NOT\s+NULL|IS\s+NULL|'
+    r'DURING|BETWEEN|NOT\s+REGEXP_MATCH|REGEXP_MATCH|!=|>=|<=|=|>|<)',
+    re.IGNORECASE)
+# Matches the value of a condition, or the list of values of IN operators.
+_RE_VALUE = re.compile(r"""\s*(?:\((?P<values>[^)]*)\)|(?P<value>'[^']*'|"""
+                       r'''"[^"]*"|[\w.-]+))''')
+_RE_ORDERING = re.compile(r'^(?P<field>\S+)(?:\s+(?:ASC|DESC))?$',
+                          re.IGNORECASE)
+
+_CONTAINS_OPERATORS = ('CONTAINS ANY', 'CONTAINS ALL', 'CONTAINS NONE')
+_TEXT_OPERATORS = ('LIKE', 'NOT LIKE', 'REGEXP_MATCH', 'NOT REGEXP_MATCH')
+_RANGE_OPERATORS = ('<', '>', '<=', '>=', 'BETWEEN')
+_ENUM_VALUE_OPERATORS = ('=', '!=', 'IN', 'NOT IN')
+_NON_TEXT_DATA_TYPES = ('BOOLEAN', 'DOUBLE', 'FLOAT', 'INT32', 'INT64',
+                        'UINT64', 'ENUM', 'MESSAGE')
+_UNORDERED_DATA_TYPES = ('BOOLEAN', 'ENUM', 'MESSAGE')
+
+# The pyarrow type factory of each data type's values, matching the types
+# ColumnarSink.to_arrow returns.
+_ARROW_TYPES = {
+    'BOOLEAN': 'bool_',
+    'DATE': 'string',
+    'DOUBLE': 'float64',
+    'FLOAT': 'float64',
+    'INT32': 'int64',
+    'INT64': 'int64',
+    'UINT64': 'uint64',
+    'ENUM': 'int32',
+    'MESSAGE': 'binary',
+    'RESOURCE_NAME': 'string',
+    'STRING': 'string',
+}
+
+
+class FieldInfo(namedtuple('FieldInfo', (
+        'name', 'category', 'data_type', 'selectable', 'filterable',
+        'sortable', 'is_repeated', 'selectable_with', 'attribute_resources',
+        'metrics', 'segments', 'enum_values', 'type_url'))):
+    """The description of a field from GoogleAdsFieldService.
+
+    Attributes:
+        name: the str field path, e.g. "campaign.id", or resource name.
+        category: one of "RESOURCE", "ATTRIBUTE", "SEGMENT" or "METRIC".
+        data_type: the str name of a GoogleAdsFieldDataType, e.g. "INT64".
+        selectable: whether the field can be selected.
+        filterable: whether the field can be used in WHERE clauses.
+        sortable: whether the field can be used in ORDER BY clauses.
+        is_repeated: whether the field's values are lists.
+        selectable_with: a frozenset of the str names of the resources,
+            segments and metrics that can be selected with the field.
+        attribute_resources: a frozenset of the str names of the resources
+            whose fields can be selected with a resource.
+        metrics: a frozenset of the str names of the metrics that can be
+            selected with a resource.
+        segments: a frozenset of the str names of the segments that can be
+            selected with a resource.
+        enum_values: a tuple of the str values of an enum field.
+        type_url: the str URL of the field's message or enum type.
+    """
+    __slots__ = ()
+
+    _SET_FIELDS = ('selectable_with', 'attribute_resources', 'metrics',
+                   'segments')
+
+    def to_dict(self):
+        """Returns a JSON serializable dict of the field's description."""
+        values = self._asdict()
+        for name in self._SET_FIELDS:
+            values[name] = sorted(values[name])
+        values['enum_values'] = list(self.enum_values)
+        return values
+
+    @classmethod
+    def from_dict(cls, values):
+        """Creates a FieldInfo from a dict returned by to_dict."""
+        values = dict(values)
+        for name in cls._SET_FIELDS:
+            values[name] = frozenset(values[name])
+        values['enum_values'] = tuple(values['enum_values'])
+        return cls(**values)
+
+    @classmethod
+    def from_message(cls, field):
+        """Creates a FieldInfo from a GoogleAdsField message."""
+        def get_enum_name(name):
+            enum_type = field.DESCRIPTOR.fields_by_name[name].enum_type
+            return enum_type.values_by_number[getattr(field, name)].name
+
+        return cls(
+            name=field.name.value,
+            category=get_enum_name('category'),
+            data_type=get_enum_name('data_type'),
+            selectable=field.selectable.value,
+            filterable=field.filterable.value,
+            sortable=field.sortable.value,
+            is_repeated=field.is_repeated.value,
+            selectable_with=frozenset(
+                value.value for value in field.selectable_with),
+            attribute_resources=frozenset(
+                value.value for value in field.attribute_resources),
+            metrics=frozenset(value.value for value in field.metrics),
+            segments=frozenset(value.value for value in field.segments),
+            enum_values=tuple(value.value for value in field.enum_values),
+            type_url=field.type_url.value)
+
+
+class QueryValidationError(ValueError):
+    """Raised when a query is found to be invalid without sending it.
+
+    Attributes:
+        query: the str invalid query.
+        errors: a list of str descriptions of each problem found.
+    """
+
+    def __init__(self, query, errors):
+        super().__init__(f'Query "{query}" is invalid: {"; ".join(errors)}')
+        self.query = query
+        self.errors = errors
+
+
+def _parse_values(match, query):
+    """Parses the literal values that follow a condition's operator."""
+    value_match = _RE_VALUE.match(query, match.end())
+    if value_match is None:
+        return []
+    if value_match.group('values') is not None:
+        values = value_match.group('values').split(',')
+    else:
+        values = [value_match.group('value')]
+    return [value.strip().strip('\'"') for value in values]
+
+
+class FieldCatalog(object):
+    """A snapshot of the GoogleAdsFieldService catalog of one API version.
+
+    Attributes:
+        version: the str Google Ads API version of the catalog.
+        fields: a dict of FieldInfo instances keyed by field name.
+    """
+
+    def __init__(self, fields, version=_DEFAULT_VERSION):
+        """Initializer for the FieldCatalog.
+
+        Args:
+            fields: an iterable of FieldInfo instances.
+            version: the str Google Ads API version the fields belong to.
+        """
+        self.version = version
+        self.fields = {field.name: field for field in fields}
+        self._check = functools.lru_cache(
+            maxsize=_VALIDATED_QUERY_CACHE_SIZE)(self._check_query)
+
+    @classmethod
+    def from_service(cls, client, version=None):
+        """Downloads the catalog from GoogleAdsFieldService.
+
+        Args:
+            client: a GoogleAdsClient instance.
+            version: an optional str Google Ads API version; defaults to the
+                client's default version.
+
+        Returns:
+            A FieldCatalog instance.
+        """
+        version = version or _DEFAULT_VERSION
+        service = client.get_service(_SERVICE_NAME, version=version)
+        return cls(map(FieldInfo.from_message,
+                       service.search_google_ads_fields(_CATALOG_QUERY)),
+                   version=version)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a catalog saved with save.
+
+        Args:
+            path: the str or path-like path of the file.
+
+        Returns:
+            A FieldCatalog instance.
+        """
+        with open(path, encoding='utf-8') as catalog_file:
+            snapshot = json.load(catalog_file)
+        return cls(map(FieldInfo.from_dict, snapshot['fields']),
+                   version=snapshot['version'])
+
+    def save(self, path):
+        """Saves the catalog to a JSON file.
+
+        The file is replaced atomically, so concurrent readers never see a
+        partial catalog.
+
+        Args:
+            path: the str or path-like path of the file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(file_descriptor, 'w',
+                           encoding='utf-8') as catalog_file:
+                json.dump({'version': self.version,
+                           'fields': [field.to_dict()
+                                      for field in self.fields.values()]},
+                          catalog_file)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    def _check_field(self, name, resource, clause, errors):
+        """Checks that a field exists and can be used with the resource.
+
+        Returns:
+            The field's FieldInfo, or None if it doesn't exist.
+        """
+        field = self.fields.get(name)
+        if field is None or field.category == RESOURCE:
+            errors.append(f'{clause} field "{name}" does not exist.')
+            return None
+        if resource is None:
+            return field
+
+        if field.category == METRIC:
+            compatible = name in resource.metrics
+        elif field.category == SEGMENT:
+            compatible = name in resource.segments
+        else:
+            prefix = name.split('.', 1)[0]
+            compatible = (prefix == resource.name
+                          or prefix in resource.attribute_resources)
+        if not compatible:
+            errors.append(f'{clause} field "{name}" can not be used with '
+                          f'resource "{resource.name}".')
+        return field
+
+    def _check_condition(self, match, query, resource, errors):
+        field = self._check_field(match.group('field'), resource, 'WHERE',
+                                  errors)
+        if field is None:
+            return
+
+        name = field.name
+        operator = ' '.join(match.group('operator').upper().split())
+        if not field.filterable:
+            errors.append(f'Field "{name}" can not be filtered.')
+        elif field.is_repeated != (operator in _CONTAINS_OPERATORS):
+            errors.append(
+                f'Operator {operator} can not be used with '
+                f'{"repeated" if field.is_repeated else "singular"} field '
+                f'"{name}".')
+        elif operator == 'DURING' and field.data_type != 'DATE':
+            errors.append(f'Operator DURING can only be used with date '
+                          f'fields, not "{name}".')
+        elif (operator in _TEXT_OPERATORS
+              and field.data_type in _NON_TEXT_DATA_TYPES):
+            errors.append(f'Operator {operator} can not be used with '
+                          f'{field.data_type} field "{name}".')
+        elif (operator in _RANGE_OPERATORS
+              and field.data_type in _UNORDERED_DATA_TYPES):
+            errors.append(f'Operator {operator} can not be used with '
+                          f'{field.data_type} field "{name}".')
+        elif (field.data_type == 'ENUM' and field.enum_values
+              and operator in _ENUM_VALUE_OPERATORS):
+            for value in _parse_values(match, query):
+                if value not in field.enum_values:
+                    errors.append(f'"{value}" is not a value of enum field '
+                                  f'"{name}".')
+
+    def _check_query(self, query):
+        """Checks a query against the catalog.
+
+        Returns:
+            A (schema, errors) pair: a tuple of the FieldInfo of each selected
+            field that exists, and a list of str descriptions of problems.
+        """
+        errors = []
+        try:
+            names = gaql.parse_select_fields(query)
+            resource_name = gaql.get_resource_name(query)
+        except ValueError as ex:
+            return (), [str(ex)]
+
+        resource = self.fields.get(resource_name)
+        if resource is None or resource.category != RESOURCE:
+            errors.append(f'Resource "{resource_name}" does not exist.')
+            resource = None
+
+        schema = []
+        for name in names:
+            field = self._check_field(name, resource, 'SELECT', errors)
+            if field is None:
+                continue
+            if not field.selectable:
+                errors.append(f'Field "{name}" can not be selected.')
+            schema.append(field)
+        for name in {name for name in names if names.count(name) > 1}:
+            errors.append(f'Field "{name}" is selected more than once.')
+
+        # Metrics list the segments they can be segmented by.
+        metrics = [field for field in schema if field.category == METRIC
+                   and field.selectable_with]
+        for segment in schema:
+            if segment.category != SEGMENT:
+                continue
+            for metric in metrics:
+                if segment.name not in metric.selectable_with:
+                    errors.append(f'Segment "{segment.name}" can not be '
+                                  f'selected with metric "{metric.name}".')
+
+        if (where := gaql.get_clause(query, gaql.WHERE)) is not None:
+            masked = gaql.mask_string_literals(where)
+            conditions = list(_RE_CONDITION.finditer(masked))
+            if not conditions:
+                errors.append(f'WHERE clause "{where}" has no conditions.')
+            for match in conditions:
+                self._check_condition(match, where, resource, errors)
+
+        if (order_by := gaql.get_clause(query, gaql.ORDER_BY)) is not None:
+            for ordering in order_by.split(','):
+                match = _RE_ORDERING.match(ordering.strip())
+                if match is None:
+                    errors.append(f'Invalid ordering "{ordering.strip()}".')
+                    continue
+                field = self._check_field(match.group('field'), resource,
+                                          'ORDER BY', errors)
+                if field is not None and not field.sortable:
+                    errors.append(f'Field "{field.name}" can not be sorted.')
+
+        if (limit := gaql.get_clause(query, gaql.LIMIT)) is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                errors.append(f'LIMIT must be a positive integer, not '
+                              f'"{limit}".')
+
+        return tuple(schema), errors
+
+    def find_errors(self, query):
+        """Checks a query against the catalog.
+
+        Args:
+            query: a str GAQL query.
+
+        Returns:
+            A list of str descriptions of the problems found; the list is
+            empty if the query is valid.
+        """
+        return list(self._check(gaql.normalize_query(query))[1])
+
+    def validate(self, query):
+        """Validates a query and returns the schema of its results.
+
+        Args:
+            query: a str GAQL query.
+
+        Returns:
+            A tuple of the FieldInfo of each selected field, in selection
+            order.
+
+        Raises:
+            QueryValidationError: If the query is invalid.
+        """
+        schema, errors = self._check(gaql.normalize_query(query))
+        if errors:
+            raise QueryValidationError(query, list(errors))
+        return schema
+
+    def to_arrow_schema(self, query, enum_names=False):
+        """Returns the pyarrow.Schema of a query's columnar results.
+
+        The types match the columns returned by ColumnarSink.to_arrow.
+
+        Args:
+            query: a str GAQL query.
+            enum_names: whether enum columns hold their str names rather
+                than their numbers.
+
+        Returns:
+            A pyarrow.Schema with one field per selected field path.
+
+        Raises:
+            QueryValidationError: If the query is invalid.
+            ImportError: If pyarrow isn't installed.
+        """
+        pyarrow = import_optional('pyarrow')
+
+        arrow_fields = []
+        for field in self.validate(query):
+            type_name = ('string' if enum_names and field.data_type == 'ENUM'
+                         else _ARROW_TYPES.get(field.data_type, 'binary'))
+            value_type = getattr(pyarrow, type_name)()
+            arrow_fields.append(pyarrow.field(
+                field.name, pyarrow.list_(value_type) if field.is_repeated
+                else value_type))
+        return pyarrow.schema(arrow_fields)
+
+
+def load_field_catalog(client, version=None, directory=None, max_age=None):
+    """Loads a field catalog from disk, downloading it if needed.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        directory: an optional str or path-like directory where catalogs are
+            saved, one file per API version. If None, the catalog is always
+            downloaded and not saved.
+        max_age: an optional number of seconds after which a saved catalog
+            is downloaded again. If None, saved catalogs never expire.
+
+    Returns:
+        A FieldCatalog instance.
+    """
+    version = version or _DEFAULT_VERSION
+    if directory is None:
+        return FieldCatalog.from_service(client, version=version)
+
+    path = os.path.join(directory, _CATALOG_FILE_NAME.format(version))
+    try:
+        if max_age is None or time.time() - os.path.getmtime(path) < max_age:
+            return FieldCatalog.load(path)
+    except (OSError, ValueError, KeyError):
+        # A missing or unreadable snapshot is downloaded again.
+        pass
+
+    catalog = FieldCatalog.from_service(client, version=version)
+    os.makedirs(directory, exist_ok=True)
+    catalog.save(path)
+    return catalog
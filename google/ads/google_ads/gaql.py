@@ -0,0 +1,416 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Utilities for inspecting and rewriting Google Ads Query Language queries.
+
+These helpers operate on query strings and only understand the parts of the
+grammar they need; they are not a full GAQL parser and don't validate queries.
+"""
+
+from collections import namedtuple
+import datetime
+import re
+
+_DATE_FORMAT = '%Y-%m-%d'
+
+# Matches the SELECT and FROM clauses of a query.
+_RE_SELECT = re.compile(
+    r'^\s*SELECT\s+(?P<fields>.+?)\s+FROM\s+(?P<resource>[a-z_]+)\b',
+    re.IGNORECASE | re.DOTALL)
+
+# Matches a single or double quoted string literal.
+_RE_STRING_LITERAL = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")""")
+_RE_WHITESPACE = re.compile(r'\s+')
+
+WHERE = 'WHERE'
+ORDER_BY = 'ORDER BY'
+LIMIT = 'LIMIT'
+PARAMETERS = 'PARAMETERS'
+# Matches the keyword that starts each clause after FROM. Field paths can
+# contain words such as "limit", so keywords can't follow a dot.
+_RE_CLAUSES = {
+    clause: re.compile(r'(?<![\w.])' + clause.replace(' ', r'\s+') + r'\b',
+                       re.IGNORECASE)
+    for clause in (WHERE, ORDER_BY, LIMIT, PARAMETERS)}
+
+# Matches a "segments.date DURING <literal>" predicate.
+_RE_DURING = re.compile(
+    r'\bsegments\.date\s+DURING\s+([A-Z_0-9]+)\b', re.IGNORECASE)
+# Matches a "segments.date BETWEEN '<date>' AND '<date>'" predicate.
+_RE_BETWEEN = re.compile(
+    r'\bsegments\.date\s+BETWEEN\s+([\'"])(\d{4}-\d{2}-\d{2})\1\s+'
+    r'AND\s+([\'"])(\d{4}-\d{2}-\d{2})\3', re.IGNORECASE)
+
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+_SHARD_GRANULARITIES = (DAY, WEEK, MONTH)
+
+
+class DateRange(namedtuple('DateRange', ('start', 'end'))):
+    """An inclusive range of datetime.date instances."""
+
+    def to_predicate(self):
+        """Returns a GAQL predicate that selects this range of dates."""
+        return (f"segments.date BETWEEN '{self.start.strftime(_DATE_FORMAT)}'"
+                f" AND '{self.end.strftime(_DATE_FORMAT)}'")
+
+
+# A date predicate found in a query. The span is the (start, end) index of the
+# predicate in the query and date_range is the DateRange it selects.
+DatePredicate = namedtuple('DatePredicate', ('span', 'date_range'))
+
+
+def _match_select(query):
+    if match := _RE_SELECT.match(query):
+        return match
+    raise ValueError(f'Query "{query}" does not have SELECT and FROM clauses.')
+
+
+def parse_select_fields(query):
+    """Parses the field paths selected by a query.
+
+    Args:
+        query: a str GAQL query.
+
+    Returns:
+        A list of str field paths in the order they are selected, e.g.
+        ["campaign.id", "metrics.clicks"].
+
+    Raises:
+        ValueError: If the query doesn't have SELECT and FROM clauses.
+    """
+    return [field.strip()
+            for field in _match_select(query).group('fields').split(',')
+            if field.strip()]
+
+
+def get_resource_name(query):
+    """Parses the name of the resource a query selects from.
+
+    Args:
+        query: a str GAQL query.
+
+    Returns:
+        A str resource name, e.g. "campaign".
+
+    Raises:
+        ValueError: If the query doesn't have SELECT and FROM clauses.
+    """
+    return _match_select(query).group('resource')
+
+
+def normalize_query(query):
+    """Normalizes the whitespace of a query.
+
+    Runs of whitespace outside string literals are replaced with a single
+    space, so queries that only differ in formatting are equal once
+    normalized.
+
+    Args:
+        query: a str GAQL query.
+
+    Returns:
+        A str GAQL query.
+    """
+    # Splitting on a pattern with a group alternates unquoted text and
+    # string literals.
+    parts = _RE_STRING_LITERAL.split(query)
+    parts[::2] = [_RE_WHITESPACE.sub(' ', part) for part in parts[::2]]
+    return ''.join(parts).strip()
+
+
+def find_clause(query, clause):
+    """Finds where a clause starts in a query.
+
+    Args:
+        query: a str GAQL query.
+        clause: one of "WHERE", "ORDER BY", "LIMIT" or "PARAMETERS".
+
+    Returns:
+        The int index of the clause's keyword in the query, or None if the
+        query doesn't have the clause.
+    """
+    match = _search_clause(query, clause)
+    return match.start() if match else None
+
+
+def get_clause(query, clause):
+    """Returns the text of a clause of a query, without its keyword.
+
+    Args:
+        query: a str GAQL query.
+        clause: one of "WHERE", "ORDER BY", "LIMIT" or "PARAMETERS".
+
+    Returns:
+        A str, e.g. "campaign.id > 1" for the WHERE clause of
+        "SELECT campaign.id FROM campaign WHERE campaign.id > 1", or None if
+        the query doesn't have the clause.
+    """
+    match = _search_clause(query, clause)
+    if match is None:
+        return None
+    # Clauses appear in the order they're listed in _RE_CLAUSES.
+    following = list(_RE_CLAUSES)[list(_RE_CLAUSES).index(clause) + 1:]
+    return query[match.end():_find_clause_end(query, following)].strip()
+
+
+def mask_string_literals(query):
+    """Replaces the string literals of a query with spaces.
+
+    The masked query has the same length as the query, so the positions of
+    matches found in it can be used to slice the query.
+
+    Args:
+        query: a str GAQL query.
+
+    Returns:
+        A str.
+    """
+    return _RE_STRING_LITERAL.sub(lambda match: ' ' * len(match.group()),
+                                  query)
+
+
+def _search_clause(query, clause):
+    # Masks string literals so keywords inside them aren't matched.
+    return _RE_CLAUSES[clause].search(mask_string_literals(query))
+
+
+def _find_clause_end(query, clauses):
+    """Returns the index where the first of the given clauses starts."""
+    indexes = [index for clause in clauses
+               if (index := find_clause(query, clause)) is not None]
+    return min(indexes, default=len(query))
+
+
+def _insert_before_clauses(query, text, clauses):
+    """Inserts text before the first of the given clauses in a query."""
+    end = _find_clause_end(query, clauses)
+    return ' '.join(part for part in (query[:end].strip(), text,
+                                      query[end:].strip()) if part)
+
+
+def format_literal(value):
+    """Formats a value as a GAQL literal.
+
+    Args:
+        value: an int, float or str.
+
+    Returns:
+        A str GAQL literal; strings are double quoted.
+    """
+    if isinstance(value, str):
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{escaped}"'
+    return repr(value)
+
+
+def add_predicate(query, predicate):
+    """Adds a predicate to the WHERE clause of a query.
+
+    The predicate is combined with any existing conditions with AND.
+
+    Args:
+        query: a str GAQL query.
+        predicate: a str GAQL condition, e.g. "campaign.id > 10".
+
+    Returns:
+        A str GAQL query.
+    """
+    connective = 'AND' if find_clause(query, WHERE) is not None else 'WHERE'
+    return _insert_before_clauses(query, f'{connective} {predicate}',
+                                  (ORDER_BY, LIMIT, PARAMETERS))
+
+
+def add_order_by(query, field_paths):
+    """Adds an ORDER BY clause to a query.
+
+    Args:
+        query: a str GAQL query without an ORDER BY clause.
+        field_paths: a sequence of str field paths to sort by, in ascending
+            order.
+
+    Returns:
+        A str GAQL query.
+
+    Raises:
+        ValueError: If the query already has an ORDER BY clause.
+    """
+    if find_clause(query, ORDER_BY) is not None:
+        raise ValueError(f'Query "{query}" already has an ORDER BY clause.')
+    return _insert_before_clauses(
+        query, f'ORDER BY {", ".join(field_paths)}', (LIMIT, PARAMETERS))
+
+
+def _last_days(today, days):
+    return DateRange(today - datetime.timedelta(days=days),
+                     today - datetime.timedelta(days=1))
+
+
+def _first_of_month(day):
+    return day.replace(day=1)
+
+
+def _week_start(day, first_weekday):
+    """Returns the most recent day, on or before day, with first_weekday.
+
+    first_weekday follows datetime.date.weekday(), i.e. Monday is 0.
+    """
+    return day - datetime.timedelta(days=(day.weekday() - first_weekday) % 7)
+
+
+def _last_week(today, first_weekday):
+    start = _week_start(today, first_weekday) - datetime.timedelta(days=7)
+    return DateRange(start, start + datetime.timedelta(days=6))
+
+
+def _last_business_week(today):
+    start = _week_start(today, 0) - datetime.timedelta(days=7)
+    return DateRange(start, start + datetime.timedelta(days=4))
+
+
+def _last_month(today):
+    end = _first_of_month(today) - datetime.timedelta(days=1)
+    return DateRange(_first_of_month(end), end)
+
+
+_DURING_RESOLVERS = {
+    'TODAY': lambda today: DateRange(today, today),
+    'YESTERDAY': lambda today: _last_days(today, 1),
+    'LAST_7_DAYS': lambda today: _last_days(today, 7),
+    'LAST_14_DAYS': lambda today: _last_days(today, 14),
+    'LAST_30_DAYS': lambda today: _last_days(today, 30),
+    'LAST_BUSINESS_WEEK': _last_business_week,
+    'THIS_MONTH': lambda today: DateRange(_first_of_month(today), today),
+    'LAST_MONTH': _last_month,
+    'THIS_WEEK_SUN_TODAY': lambda today: DateRange(_week_start(today, 6),
+                                                   today),
+    'THIS_WEEK_MON_TODAY': lambda today: DateRange(_week_start(today, 0),
+                                                   today),
+    'LAST_WEEK_SUN_SAT': lambda today: _last_week(today, 6),
+    'LAST_WEEK_MON_SUN': lambda today: _last_week(today, 0),
+}
+
+
+def resolve_date_literal(literal, today=None):
+    """Resolves a DURING date range literal to the dates it selects.
+
+    Args:
+        literal: a str date range literal, e.g. "LAST_30_DAYS".
+        today: an optional datetime.date to resolve the literal relative to;
+            defaults to the local date. The API resolves literals in the
+            customer's time zone, so callers near midnight should pass the
+            customer's current date.
+
+    Returns:
+        A DateRange instance.
+
+    Raises:
+        ValueError: If the literal is unknown.
+    """
+    try:
+        resolver = _DURING_RESOLVERS[literal.upper()]
+    except KeyError:
+        raise ValueError(f'Unknown date range literal "{literal}".')
+
+    return resolver(today or datetime.date.today())
+
+
+def find_date_predicate(query, today=None):
+    """Finds the segments.date predicate of a query.
+
+    Args:
+        query: a str GAQL query.
+        today: an optional datetime.date used to resolve DURING literals.
+
+    Returns:
+        A DatePredicate, or None if the query doesn't filter segments.date with
+        DURING or BETWEEN.
+
+    Raises:
+        ValueError: If the predicate uses an unknown DURING literal or an
+            invalid date.
+    """
+    if match := _RE_BETWEEN.search(query):
+        try:
+            date_range = DateRange(
+                datetime.datetime.strptime(match.group(2),
+                                           _DATE_FORMAT).date(),
+                datetime.datetime.strptime(match.group(4),
+                                           _DATE_FORMAT).date())
+        except ValueError:
+            raise ValueError(f'Invalid date in predicate "{match.group(0)}".')
+        return DatePredicate(match.span(), date_range)
+
+    if match := _RE_DURING.search(query):
+        return DatePredicate(match.span(),
+                             resolve_date_literal(match.group(1), today))
+
+    return None
+
+
+def replace_date_predicate(query, predicate, date_range):
+    """Replaces a query's segments.date predicate with a new date range.
+
+    Args:
+        query: a str GAQL query.
+        predicate: the DatePredicate found in the query.
+        date_range: the DateRange the new query should select.
+
+    Returns:
+        A str GAQL query.
+    """
+    start, end = predicate.span
+    return f'{query[:start]}{date_range.to_predicate()}{query[end:]}'
+
+
+def _next_shard_start(day, granularity):
+    if granularity == DAY:
+        return day + datetime.timedelta(days=1)
+    elif granularity == WEEK:
+        return _week_start(day, 0) + datetime.timedelta(days=7)
+    else:
+        return (_first_of_month(day) + datetime.timedelta(days=32)).replace(
+            day=1)
+
+
+def split_date_range(date_range, granularity):
+    """Splits a date range into consecutive calendar-aligned shards.
+
+    Weeks start on Monday. The first and last shards are truncated to the
+    bounds of the given range.
+
+    Args:
+        date_range: a DateRange instance.
+        granularity: one of "day", "week" or "month".
+
+    Returns:
+        A list of DateRange instances in ascending date order.
+
+    Raises:
+        ValueError: If the granularity is unknown.
+    """
+    if granularity not in _SHARD_GRANULARITIES:
+        raise ValueError(f'Unknown shard granularity "{granularity}". '
+                         f'Valid granularities are: '
+                         f'{", ".join(_SHARD_GRANULARITIES)}')
+
+    shards = []
+    start = date_range.start
+    while start <= date_range.end:
+        next_start = _next_shard_start(start, granularity)
+        shards.append(DateRange(
+            start,
+            min(next_start - datetime.timedelta(days=1), date_range.end)))
+        start = next_start
+    return shards
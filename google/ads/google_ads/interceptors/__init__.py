@@ -14,4 +14,8 @@
 
 from .metadata_interceptor import MetadataInterceptor
 from .exception_interceptor import ExceptionInterceptor
-from .logging_interceptor import LoggingInterceptor
\ No newline at end of file
+from .logging_interceptor import LoggingInterceptor
+from .caching_interceptor import CachingInterceptor
+from .validation_interceptor import ValidationInterceptor
+from .coalescing_interceptor import CoalescingInterceptor
+from .mirror_interceptor import MirrorInterceptor
@@ -0,0 +1,298 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A gRPC Interceptor that serves search results from a ResultCache.
+
+This class is initialized in the GoogleAdsClient and passed into a grpc
+intercept_channel when the client has a result cache. GoogleAdsService Search
+and SearchStream calls are answered from the cache when possible, and their
+results are cached once they complete successfully. Calls to methods that may
+change data, such as mutates, invalidate the cached results of the customer
+they are made for.
+"""
+
+from importlib import import_module
+import re
+
+import grpc
+from grpc import UnaryUnaryClientInterceptor, UnaryStreamClientInterceptor
+
+from google.ads.google_ads import result_cache
+
+from .interceptor import Interceptor
+
+_LOGIN_CUSTOMER_ID_KEY = 'login-customer-id'
+# Methods whose names start with these prefixes don't change data.
+_READ_METHOD_PREFIXES = ('Get', 'Search', 'List', 'Generate', 'Suggest')
+# Matches the customer ID in a resource name.
+_RE_RESOURCE_NAME_CUSTOMER_ID = re.compile(r'customers/([^/]+)')
+
+
+def create_search_key(client_call_details, request, api_version,
+                      login_customer_id=None):
+    """Creates the key that identifies the results of a search request.
+
+    A login customer ID set in the call's metadata takes precedence over the
+    client's.
+
+    Args:
+        client_call_details: a grpc._interceptor._ClientCallDetails instance
+            containing request metadata.
+        request: a SearchGoogleAdsRequest or SearchGoogleAdsStreamRequest.
+        api_version: a str of the API version of the request.
+        login_customer_id: the str login customer ID of the client, if any.
+
+    Returns:
+        A result_cache.CacheKey instance.
+    """
+    login_customer_id = next(
+        (value for key, value in client_call_details.metadata or ()
+         if key == _LOGIN_CUSTOMER_ID_KEY), login_customer_id)
+    return result_cache.create_key(request, client_call_details.method,
+                                   api_version, login_customer_id)
+
+
+class _CachedCall(grpc.Call, grpc.Future):
+    """A completed call whose response was served from the cache."""
+
+    def __init__(self, response):
+        super().__init__()
+        self._response = response
+
+    def initial_metadata(self):
+        return ()
+
+    def trailing_metadata(self):
+        return ()
+
+    def code(self):
+        return grpc.StatusCode.OK
+
+    def details(self):
+        return None
+
+    def cancel(self):
+        return False
+
+    def cancelled(self):
+        return False
+
+    def running(self):
+        return False
+
+    def done(self):
+        return True
+
+    def result(self, timeout=None):
+        return self._response
+
+    def exception(self, timeout=None):
+        return None
+
+    def traceback(self, timeout=None):
+        return None
+
+    def add_done_callback(self, fn):
+        fn(self)
+
+    def add_callback(self, callback):
+        return False
+
+    def is_active(self):
+        return False
+
+    def time_remaining(self):
+        return None
+
+
+class _CachedStream(_CachedCall):
+    """A completed stream whose responses were served from the cache."""
+
+    def __init__(self, responses):
+        super().__init__(None)
+        self._responses = iter(responses)
+
+    def __iter__(self):
+        return self._responses
+
+    def __next__(self):
+        return next(self._responses)
+
+
+class _RecordingStream(object):
+    """Wraps a stream and caches its responses once it completes.
+
+    Every other attribute is delegated to the wrapped stream. Nothing is
+    cached if the stream fails, is cancelled, or outgrows the cache, or if
+    the customer's results are invalidated before it completes.
+    """
+
+    def __init__(self, underlay_call, cache, key, generation):
+        self._underlay_call = underlay_call
+        self._cache = cache
+        self._key = key
+        self._generation = generation
+        self._batches = []
+        self._size = 0
+        self._iterator = None
+
+    def __getattr__(self, name):
+        return getattr(self._underlay_call, name)
+
+    def _iterate(self):
+        for response in self._underlay_call:
+            if self._batches is not None:
+                batch = response.SerializeToString()
+                self._size += len(batch)
+                if self._size > self._cache.max_bytes:
+                    self._batches = None
+                else:
+                    self._batches.append(batch)
+            yield response
+
+        if self._batches is not None:
+            self._cache.put(self._key, self._batches, self._generation)
+            self._batches = None
+
+    def __iter__(self):
+        if self._iterator is None:
+            self._iterator = self._iterate()
+        return self._iterator
+
+    def __next__(self):
+        return next(iter(self))
+
+    def cancel(self):
+        self._batches = None
+        return self._underlay_call.cancel()
+
+
+class CachingInterceptor(Interceptor, UnaryUnaryClientInterceptor,
+                         UnaryStreamClientInterceptor):
+    """An interceptor that caches search results."""
+
+    def __init__(self, cache, api_version, login_customer_id=None):
+        """Initializes the CachingInterceptor.
+
+        Args:
+            cache: a ResultCache instance.
+            api_version: a str of the API version of the request.
+            login_customer_id: the str login customer ID of the client, if
+                any.
+        """
+        super().__init__(api_version)
+        self._cache = cache
+        self._login_customer_id = login_customer_id
+        service = (f'/google.ads.googleads.{api_version}.services.'
+                   'GoogleAdsService')
+        self._search_method = f'{service}/Search'
+        self._search_stream_method = f'{service}/SearchStream'
+        self._service_protos = None
+
+    def _get_service_protos(self):
+        if self._service_protos is None:
+            self._service_protos = import_module(
+                f'google.ads.google_ads.{self._api_version}.proto.services.'
+                'google_ads_service_pb2')
+        return self._service_protos
+
+    def _create_key(self, client_call_details, request):
+        """Returns the CacheKey of a search request."""
+        return create_search_key(client_call_details, request,
+                                 self._api_version, self._login_customer_id)
+
+    def _invalidate(self, request):
+        """Invalidates the results of the customer a request is made for."""
+        customer_id = getattr(request, 'customer_id', None)
+        if not customer_id:
+            match = _RE_RESOURCE_NAME_CUSTOMER_ID.match(
+                getattr(request, 'resource_name', ''))
+            customer_id = match.group(1) if match else None
+        if customer_id:
+            self._cache.invalidate(customer_id)
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        """Serves searches from the cache and invalidates it on mutates.
+
+        Overrides abstract method defined in grpc.UnaryUnaryClientInterceptor.
+
+        Args:
+            continuation: a function to continue the request process.
+            client_call_details: a grpc._interceptor._ClientCallDetails
+                instance containing request metadata.
+            request: a protobuf message class instance for the request.
+
+        Returns:
+            A grpc.Call/grpc.Future instance representing a service response.
+        """
+        method = client_call_details.method
+
+        if method == self._search_method and not request.validate_only:
+            key = self._create_key(client_call_details, request)
+            batches = self._cache.get(key)
+            if batches is not None:
+                return _CachedCall(self._get_service_protos()
+                                   .SearchGoogleAdsResponse
+                                   .FromString(batches[0]))
+
+            # A mutate that completes while the search is in flight
+            # invalidates the customer's results, and the search's result
+            # may not include its changes.
+            generation = self._cache.get_generation(key.customer_id)
+            response = continuation(client_call_details, request)
+            if response.exception() is None:
+                self._cache.put(key,
+                                [response.result().SerializeToString()],
+                                generation)
+            return response
+
+        if method.rpartition('/')[2].startswith(_READ_METHOD_PREFIXES):
+            return continuation(client_call_details, request)
+
+        # Results cached while the call is in flight may or may not include
+        # its changes, so they are invalidated again once it completes.
+        self._invalidate(request)
+        try:
+            return continuation(client_call_details, request)
+        finally:
+            self._invalidate(request)
+
+    def intercept_unary_stream(self, continuation, client_call_details,
+                               request):
+        """Serves search streams from the cache.
+
+        Overrides abstract method defined in grpc.UnaryStreamClientInterceptor.
+
+        Args:
+            continuation: a function to continue the request process.
+            client_call_details: a grpc._interceptor._ClientCallDetails
+                instance containing request metadata.
+            request: a protobuf message class instance for the request.
+
+        Returns:
+            A grpc.Call instance representing a service response.
+        """
+        if client_call_details.method != self._search_stream_method:
+            return continuation(client_call_details, request)
+
+        key = self._create_key(client_call_details, request)
+        batches = self._cache.get(key)
+        if batches is not None:
+            response_class = (self._get_service_protos()
+                              .SearchGoogleAdsStreamResponse)
+            return _CachedStream(response_class.FromString(batch)
+                                 for batch in batches)
+
+        generation = self._cache.get_generation(key.customer_id)
+        return _RecordingStream(continuation(client_call_details, request),
+                                self._cache, key, generation)
@@ -0,0 +1,118 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A gRPC Interceptor that coalesces identical concurrent searches.
+
+This class is initialized in the GoogleAdsClient and passed into a grpc
+intercept_channel when the client has a SingleFlight. A GoogleAdsService
+Search call that is identical to one already in flight, i.e. that has the same
+customer, normalized query, login customer ID and other request fields, waits
+for it instead of making another request. Every waiter receives its own copy
+of the response, or the same exception. A waiter whose deadline passes before
+the search completes fails with DEADLINE_EXCEEDED. SearchStream calls aren't
+coalesced, since their responses can only be consumed once.
+"""
+
+from importlib import import_module
+
+import grpc
+from grpc import UnaryUnaryClientInterceptor
+
+from .caching_interceptor import _CachedCall, create_search_key
+from .interceptor import Interceptor
+
+
+class _DeadlineExceededCall(_CachedCall, grpc.RpcError):
+    """A call whose deadline passed while it waited for a coalesced search."""
+
+    def __init__(self):
+        super().__init__(None)
+
+    def code(self):
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+
+    def details(self):
+        return 'Deadline Exceeded'
+
+    def result(self, timeout=None):
+        raise self
+
+    def exception(self, timeout=None):
+        return self
+
+
+class CoalescingInterceptor(Interceptor, UnaryUnaryClientInterceptor):
+    """An interceptor that coalesces identical concurrent searches."""
+
+    def __init__(self, single_flight, api_version, login_customer_id=None):
+        """Initializes the CoalescingInterceptor.
+
+        Args:
+            single_flight: a SingleFlight instance.
+            api_version: a str of the API version of the request.
+            login_customer_id: the str login customer ID of the client, if
+                any.
+        """
+        super().__init__(api_version)
+        self._single_flight = single_flight
+        self._login_customer_id = login_customer_id
+        self._search_method = (f'/google.ads.googleads.{api_version}.'
+                               'services.GoogleAdsService/Search')
+        self._service_protos = None
+
+    def _get_service_protos(self):
+        if self._service_protos is None:
+            self._service_protos = import_module(
+                f'google.ads.google_ads.{self._api_version}.proto.services.'
+                'google_ads_service_pb2')
+        return self._service_protos
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        """Coalesces a search with an identical one that is in flight.
+
+        Overrides abstract method defined in grpc.UnaryUnaryClientInterceptor.
+
+        Args:
+            continuation: a function to continue the request process.
+            client_call_details: a grpc._interceptor._ClientCallDetails
+                instance containing request metadata.
+            request: a protobuf message class instance for the request.
+
+        Returns:
+            A grpc.Call/grpc.Future instance representing a service response.
+        """
+        if client_call_details.method != self._search_method:
+            return continuation(client_call_details, request)
+
+        key = create_search_key(client_call_details, request,
+                                self._api_version, self._login_customer_id)
+        leader_responses = []
+
+        def search():
+            response = continuation(client_call_details, request)
+            leader_responses.append(response)
+            # Waiters decode their own copy of a successful response, so
+            # changes the caller makes to theirs aren't shared.
+            if response.exception() is None:
+                return response, response.result().SerializeToString()
+            return response, None
+
+        try:
+            response, serialized_response = self._single_flight.call(
+                key, search, timeout=client_call_details.timeout)
+        except TimeoutError:
+            return _DeadlineExceededCall()
+        if leader_responses or serialized_response is None:
+            return response
+        return _CachedCall(self._get_service_protos().SearchGoogleAdsResponse
+                           .FromString(serialized_response))
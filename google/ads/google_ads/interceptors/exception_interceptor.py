@@ -27,6 +27,15 @@ from .interceptor import Interceptor
 
 
 class _UnaryStreamWrapper(grpc.Call, grpc.Future):
+    """Wraps a streaming response so that its errors are translated.
+
+    Iterating the wrapper with a for loop (or anything else that calls iter()
+    on it) sets up a single exception handler for the whole stream and then
+    delegates to the underlying call, so the success path doesn't pay for a
+    Python-level __next__ call and try/except per response. Calling next()
+    on the wrapper directly is also supported for compatibility.
+    """
+
     def __init__(self, underlay_call, failure_handler):
         super().__init__()
         self._underlay_call = underlay_call
@@ -37,7 +46,7 @@ class _UnaryStreamWrapper(grpc.Call, grpc.Future):
         return self._underlay_call.initial_metadata()
 
     def trailing_metadata(self):
-        return self._underlay_call.initial_metadata()
+        return self._underlay_call.trailing_metadata()
 
     def code(self):
         return self._underlay_call.code()
@@ -81,8 +90,32 @@ class _UnaryStreamWrapper(grpc.Call, grpc.Future):
     def cancel(self):
         return self._underlay_call.cancel()
 
+    def _handle_failure(self):
+        """Passes the failed underlying call to the failure handler.
+
+        Raises:
+            Exception: the exception raised by the failure handler, which is
+                also retained so that it is returned by exception().
+        """
+        try:
+            self._failure_handler(self._underlay_call)
+        except Exception as e:
+            self._exception = e
+            raise e
+
+    def _iterate(self):
+        """Yields every response of the underlying call.
+
+        Responses are delegated with "yield from" inside a single try block,
+        so no per-response exception handling is set up.
+        """
+        try:
+            yield from self._underlay_call
+        except Exception:
+            self._handle_failure()
+
     def __iter__(self):
-        return self
+        return self._iterate()
 
     def __next__(self):
         try:
@@ -90,11 +123,7 @@ class _UnaryStreamWrapper(grpc.Call, grpc.Future):
         except StopIteration:
             raise
         except Exception:
-            try:
-                self._failure_handler(self._underlay_call)
-            except Exception as e:
-                self._exception = e
-                raise e
+            self._handle_failure()
 
 
 class ExceptionInterceptor(Interceptor, UnaryUnaryClientInterceptor,
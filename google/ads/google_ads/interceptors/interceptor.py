@@ -168,7 +168,9 @@ class Interceptor:
 
         Returns:
             GoogleAdsException: If the exception's trailing metadata
-                indicates that it is a GoogleAdsException.
+                indicates that it is a GoogleAdsException. Its failure is
+                parsed when it is first read, and is None if it can't be
+                decoded.
             RpcError: If the exception's is a gRPC exception but the trailing
                 metadata is empty or is not indicative of a GoogleAdsException,
                 or if the exception has a status code of INTERNAL or
@@ -184,23 +186,54 @@ class Interceptor:
             # INTERNAL or RESOURCE_EXHAUSTED, meaning that
             return response_exception
         trailing_metadata = response.trailing_metadata()
-        if google_ads_failure := self._get_google_ads_failure(trailing_metadata):
+        if serialized_failure := self._get_serialized_google_ads_failure(
+                trailing_metadata):
             request_id = self.get_request_id_from_metadata(
                 trailing_metadata)
 
             # If exception is a GoogleAdsFailure then it gets wrapped in a
             # library-specific Error type for easy handling. These errors
             # originate from the Google Ads API and are often caused by
-            # invalid requests.
+            # invalid requests. The failure is only parsed once the
+            # exception's failure attribute is read.
             return GoogleAdsException(
-                response_exception, response, google_ads_failure,
-                request_id)
+                response_exception, response, serialized_failure,
+                request_id,
+                failure_type=self._get_error_protos().GoogleAdsFailure)
         else:
             # Raise the original exception if not a GoogleAdsFailure. This
             # type of error is generally caused by problems at the request
             # level, such as when an invalid endpoint is given.
             return response_exception
 
+    def _get_error_protos(self):
+        """Returns the errors_pb2 module for this interceptor's API version.
+
+        The module is imported on first use so that the error protos are only
+        loaded once a failed response is encountered.
+        """
+        if not self._error_protos:
+            self._error_protos = import_module(
+                f'google.ads.google_ads.{self._api_version}.proto.'
+                'errors.errors_pb2')
+        return self._error_protos
+
+    def _get_serialized_google_ads_failure(self, trailing_metadata):
+        """Gets the serialized Google Ads failure details if they exist.
+
+        Args:
+            trailing_metadata: a tuple of metadatum from the service response.
+
+        Returns:
+            The bytes of a serialized GoogleAdsFailure, or None if the
+            trailing metadata of the request did not return failure details.
+        """
+        if trailing_metadata is not None:
+            for key, value in trailing_metadata:
+                if key == self._failure_key:
+                    return value
+
+        return None
 
     def _get_google_ads_failure(self, trailing_metadata):
         """Gets the Google Ads failure details if they exist.
@@ -214,18 +247,13 @@ class Interceptor:
             return the failure details, or if the GoogleAdsFailure fails to
             parse.
         """
-        if trailing_metadata is not None:
-            for kv in trailing_metadata:
-                if kv[0] == self._failure_key:
-                    try:
-                        if not self._error_protos:
-                          self._error_protos = import_module(
-                            f'google.ads.google_ads.{self._api_version}.proto.'
-                            'errors.errors_pb2')
-                        ga_failure = self._error_protos.GoogleAdsFailure()
-                        ga_failure.ParseFromString(kv[1])
-                        return ga_failure
-                    except DecodeError:
-                        return None
+        if serialized_failure := self._get_serialized_google_ads_failure(
+                trailing_metadata):
+            try:
+                ga_failure = self._get_error_protos().GoogleAdsFailure()
+                ga_failure.ParseFromString(serialized_failure)
+                return ga_failure
+            except DecodeError:
+                return None
 
         return None
@@ -212,13 +212,18 @@ class LoggingInterceptor(Interceptor, UnaryUnaryClientInterceptor,
             response: A JSON str of the the response message.
         """
         exception = self._get_error_from_response(response)
-        exception_str = self._parse_exception_to_str(exception)
+        # The failure is parsed once, when its message is read, and the
+        # parsed failure is reused by the full fault log line.
         fault_message = self._get_fault_message(exception)
 
-        self.logger.info(
-            self._FULL_FAULT_LOG_LINE.format(
-                method, self.endpoint, metadata_json, request,
-                trailing_metadata_json, exception_str))
+        # Rendering the full failure is comparatively expensive, so it's
+        # skipped unless the full fault log line will be emitted.
+        if self.logger.isEnabledFor(logging.INFO):
+            exception_str = self._parse_exception_to_str(exception)
+            self.logger.info(
+                self._FULL_FAULT_LOG_LINE.format(
+                    method, self.endpoint, metadata_json, request,
+                    trailing_metadata_json, exception_str))
 
         self.logger.warning(
             self._SUMMARY_LOG_LINE.format(
@@ -0,0 +1,76 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A gRPC Interceptor that writes mutates through to an EntityMirror.
+
+This class is initialized in the GoogleAdsClient and passed into a grpc
+intercept_channel when the client has an entity mirror. The operations of
+every successful Mutate call that has an operations field, such as
+CampaignService.MutateCampaigns, are applied to the mirror using the resource
+names in the response. The mutate has already been applied by the server, so
+an error writing to the mirror is logged rather than raised.
+"""
+
+import logging
+
+from grpc import UnaryUnaryClientInterceptor
+
+from .interceptor import Interceptor
+
+_logger = logging.getLogger(__name__)
+
+_MUTATE_METHOD_PREFIX = 'Mutate'
+
+
+class MirrorInterceptor(Interceptor, UnaryUnaryClientInterceptor):
+    """An interceptor that writes mutates through to an EntityMirror."""
+
+    def __init__(self, mirror, api_version):
+        """Initializes the MirrorInterceptor.
+
+        Args:
+            mirror: an EntityMirror instance.
+            api_version: a str of the API version of the request.
+        """
+        super().__init__(api_version)
+        self._mirror = mirror
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        """Applies successful mutates to the mirror.
+
+        Overrides abstract method defined in grpc.UnaryUnaryClientInterceptor.
+
+        Args:
+            continuation: a function to continue the request process.
+            client_call_details: a grpc._interceptor._ClientCallDetails
+                instance containing request metadata.
+            request: a protobuf message class instance for the request.
+
+        Returns:
+            A grpc.Call/grpc.Future instance representing a service response.
+        """
+        response = continuation(client_call_details, request)
+        method_name = client_call_details.method.rpartition('/')[2]
+        if (method_name.startswith(_MUTATE_METHOD_PREFIX)
+                and 'operations' in request.DESCRIPTOR.fields_by_name
+                and not getattr(request, 'validate_only', False)
+                and response.exception() is None):
+            try:
+                self._mirror.apply_mutate(request.customer_id,
+                                          request.operations,
+                                          response.result().results)
+            except Exception:
+                _logger.exception(
+                    'Failed to apply a %s call for customer %s to the entity '
+                    'mirror.', method_name, request.customer_id)
+        return response
@@ -0,0 +1,88 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A gRPC Interceptor that validates queries before they are sent.
+
+This class is initialized in the GoogleAdsClient and passed into a grpc
+intercept_channel when the client has a field catalog of the service's API
+version. GoogleAdsService Search and SearchStream queries are checked against
+the catalog, and invalid queries raise a QueryValidationError without being
+sent.
+"""
+
+from grpc import UnaryUnaryClientInterceptor, UnaryStreamClientInterceptor
+
+from .interceptor import Interceptor
+
+
+class ValidationInterceptor(Interceptor, UnaryUnaryClientInterceptor,
+                            UnaryStreamClientInterceptor):
+    """An interceptor that validates search queries."""
+
+    def __init__(self, field_catalog, api_version):
+        """Initializes the ValidationInterceptor.
+
+        Args:
+            field_catalog: a field_catalog.FieldCatalog instance.
+            api_version: a str of the API version of the request.
+        """
+        super().__init__(api_version)
+        self._field_catalog = field_catalog
+        service = (f'/google.ads.googleads.{api_version}.services.'
+                   'GoogleAdsService')
+        self._search_methods = (f'{service}/Search', f'{service}/SearchStream')
+
+    def _validate(self, client_call_details, request):
+        if client_call_details.method in self._search_methods:
+            self._field_catalog.validate(request.query)
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        """Validates search queries before they are sent.
+
+        Overrides abstract method defined in grpc.UnaryUnaryClientInterceptor.
+
+        Args:
+            continuation: a function to continue the request process.
+            client_call_details: a grpc._interceptor._ClientCallDetails
+                instance containing request metadata.
+            request: a protobuf message class instance for the request.
+
+        Returns:
+            A grpc.Call/grpc.Future instance representing a service response.
+
+        Raises:
+            QueryValidationError: If the query is invalid.
+        """
+        self._validate(client_call_details, request)
+        return continuation(client_call_details, request)
+
+    def intercept_unary_stream(self, continuation, client_call_details,
+                               request):
+        """Validates search stream queries before they are sent.
+
+        Overrides abstract method defined in grpc.UnaryStreamClientInterceptor.
+
+        Args:
+            continuation: a function to continue the request process.
+            client_call_details: a grpc._interceptor._ClientCallDetails
+                instance containing request metadata.
+            request: a protobuf message class instance for the request.
+
+        Returns:
+            A grpc.Call instance representing a service response.
+
+        Raises:
+            QueryValidationError: If the query is invalid.
+        """
+        self._validate(client_call_details, request)
+        return continuation(client_call_details, request)
@@ -0,0 +1,28 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Utilities for sending mutate operations in bulk."""
+
+from .batcher import create_batcher, MutateBatcher, OperationFuture, \
+    BatcherStats
+from .grouping import group_by_resource_type, count_resource_type_runs, \
+    OperationOrder
+from .temporary_ids import TemporaryIdAllocator, MutatePlan, PlanResult
+from .scheduler import create_scheduler, MutateScheduler, LaneStats
+from .partial_failure import PartialFailureMap, OperationSplit, \
+    mutate_with_retries, RetryResult
+from .preflight import create_preflight_pipeline, PreflightPipeline, \
+    PreflightResult
+from .coalescing import UpdateCoalescer, CoalescerStats
+from .update_masks import compile_field_mask, CompiledFieldMask, field_mask, \
+    field_masks
@@ -0,0 +1,27 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The limits that mutate requests are split to stay under."""
+
+# The most operations the API accepts in one mutate request.
+DEFAULT_MAX_OPERATIONS = 5000
+# Leaves headroom for the rest of the request under gRPC's 64 MiB limit.
+DEFAULT_MAX_BYTES = 48 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+def get_encoded_size(operation):
+    """Returns the size of an operation in a request's repeated field."""
+    size = operation.ByteSize()
+    # The field's tag and the operation's length prefix.
+    return 1 + max(1, (size.bit_length() + 6) // 7) + size
@@ -0,0 +1,395 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Batches a stream of mutate operations into requests.
+
+The generated mutate methods, such as CampaignService.mutate_campaigns, send
+every operation they are given in one request. A MutateBatcher accepts any
+number of operations per customer and sends them in requests that stay under
+a maximum number of operations and serialized size, or that have waited long
+enough. Requests are sent concurrently, up to a limit, and each operation's
+future resolves to its own result in the response.
+"""
+
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+from ._limits import DEFAULT_MAX_BYTES, DEFAULT_MAX_CONCURRENCY, \
+    DEFAULT_MAX_OPERATIONS, get_encoded_size
+
+_MUTATE_METHOD_PREFIX = 'mutate'
+# The repeated field of the results of GoogleAdsService.Mutate responses;
+# every other mutate response calls it results.
+_MUTATE_OPERATION_RESPONSES = 'mutate_operation_responses'
+
+
+class BatcherStats(namedtuple('BatcherStats', (
+        'operations', 'requests', 'failed_requests', 'bytes'))):
+    """A snapshot of the metrics of a MutateBatcher.
+
+    Attributes:
+        operations: the number of operations sent.
+        requests: the number of requests sent.
+        failed_requests: the number of requests that raised an exception.
+        bytes: the total serialized size of the operations sent.
+    """
+    __slots__ = ()
+
+
+class OperationFuture(Future):
+    """The future result of one operation added to a MutateBatcher.
+
+    The result is the operation's result message from the response, e.g. a
+    MutateCampaignResult. If the request fails, every operation in it fails
+    with its exception.
+
+    Attributes:
+        customer_id: the str customer ID the operation is sent for.
+        position: the int position of the operation among the operations
+            added for its customer, starting at zero.
+        operation: the operation message.
+        response: the whole response of the request the operation was sent
+            in, once it succeeded; e.g. to read its partial_failure_error.
+    """
+
+    def __init__(self, customer_id, position, operation):
+        super().__init__()
+        self.customer_id = customer_id
+        self.position = position
+        self.operation = operation
+        self.response = None
+
+
+def get_results(response):
+    """Returns the repeated results field of a mutate response."""
+    if _MUTATE_OPERATION_RESPONSES in response.DESCRIPTOR.fields_by_name:
+        return getattr(response, _MUTATE_OPERATION_RESPONSES)
+    return response.results
+
+
+class _Batch(object):
+    """The operations of one request."""
+    __slots__ = ('customer_id', 'futures', 'size', 'created_at')
+
+    def __init__(self, customer_id):
+        self.customer_id = customer_id
+        self.futures = []
+        self.size = 0
+        self.created_at = time.monotonic()
+
+
+class MutateBatcher(object):
+    """Sends operations added per customer in size-bounded requests.
+
+    A customer's pending operations are sent once they reach max_operations
+    or max_bytes, once the oldest has waited max_delay seconds, or when the
+    batcher is flushed or closed. Adding blocks while max_concurrency requests
+    are in flight and another is ready, so operations never pile up faster
+    than they are sent. Instances are safe to share between threads and are
+    context managers that close on exit.
+    """
+
+    def __init__(self, mutate_method, max_operations=DEFAULT_MAX_OPERATIONS,
+                 max_bytes=DEFAULT_MAX_BYTES, max_delay=None,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, **request_kwargs):
+        """Initializer for the MutateBatcher.
+
+        Args:
+            mutate_method: a generated mutate method that takes a customer ID
+                and a list of operations, e.g.
+                CampaignServiceClient.mutate_campaigns.
+            max_operations: an int maximum number of operations per request.
+            max_bytes: an int maximum total serialized size of the operations
+                of a request. An operation larger than this is sent alone.
+            max_delay: an optional float number of seconds after which pending
+                operations are sent even if the request isn't full. If None,
+                they wait until the request is full or flushed.
+            max_concurrency: an int maximum number of requests in flight.
+            **request_kwargs: additional keyword arguments passed to every
+                call of mutate_method, e.g. partial_failure=True.
+
+        Raises:
+            ValueError: If max_operations, max_bytes or max_concurrency is
+                less than one.
+        """
+        if min(max_operations, max_bytes, max_concurrency) < 1:
+            raise ValueError('max_operations, max_bytes and max_concurrency '
+                             'must be at least one.')
+
+        self.max_operations = max_operations
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self._mutate_method = mutate_method
+        self._request_kwargs = request_kwargs
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._positions = {}
+        self._closed = False
+        # The number of batches taken from pending that haven't been
+        # submitted to the executor yet.
+        self._sending = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix='mutate_batcher')
+        self._operations = 0
+        self._requests = 0
+        self._failed_requests = 0
+        self._bytes = 0
+        self._timer = None
+        if max_delay is not None:
+            self._timer = threading.Thread(target=self._run_timer,
+                                           name='mutate_batcher_timer',
+                                           daemon=True)
+            self._timer.start()
+
+    @property
+    def stats(self):
+        """A BatcherStats snapshot of the metrics."""
+        with self._condition:
+            return BatcherStats(self._operations, self._requests,
+                                self._failed_requests, self._bytes)
+
+    def add(self, customer_id, operation):
+        """Adds an operation.
+
+        Args:
+            customer_id: a str customer ID.
+            operation: an operation message, e.g. a CampaignOperation.
+
+        Returns:
+            An OperationFuture of the operation's result.
+
+        Raises:
+            RuntimeError: If the batcher is closed.
+        """
+        size = get_encoded_size(operation)
+        ready = []
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Operations cannot be added to a closed '
+                                   'MutateBatcher.')
+            batch = self._pending.get(customer_id)
+            if batch is not None and batch.size + size > self.max_bytes:
+                ready.append(self._pending.pop(customer_id))
+                batch = None
+            if batch is None:
+                batch = self._pending[customer_id] = _Batch(customer_id)
+                # Wakes the timer to schedule the new batch.
+                self._condition.notify_all()
+
+            position = self._positions.get(customer_id, 0)
+            self._positions[customer_id] = position + 1
+            future = OperationFuture(customer_id, position, operation)
+            batch.futures.append(future)
+            batch.size += size
+            if len(batch.futures) >= self.max_operations:
+                ready.append(self._pending.pop(customer_id))
+            self._sending += len(ready)
+
+        self._send_all(ready)
+        return future
+
+    def add_all(self, customer_id, operations):
+        """Adds operations in order.
+
+        Args:
+            customer_id: a str customer ID.
+            operations: an iterable of operation messages.
+
+        Returns:
+            A list of OperationFuture instances in the order of the
+            operations.
+        """
+        return [self.add(customer_id, operation) for operation in operations]
+
+    def flush(self, customer_id=None):
+        """Sends pending operations without waiting for their results.
+
+        Args:
+            customer_id: an optional str customer ID whose operations are
+                sent. Defaults to every customer.
+        """
+        with self._condition:
+            if customer_id is None:
+                ready = list(self._pending.values())
+                self._pending.clear()
+            else:
+                batch = self._pending.pop(customer_id, None)
+                ready = [batch] if batch is not None else []
+            self._sending += len(ready)
+        self._send_all(ready)
+
+    def close(self):
+        """Sends pending operations and waits for every request to finish."""
+        # No batch can be created once the batcher is closed, so the flush
+        # sends every pending operation.
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.flush()
+        # Batches taken by add or the timer before the batcher was closed
+        # are submitted before the executor shuts down.
+        with self._condition:
+            self._condition.wait_for(lambda: not self._sending)
+        self._executor.shutdown(wait=True)
+        if self._timer is not None:
+            self._timer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _send_all(self, batches):
+        """Sends batches counted in _sending, then uncounts them."""
+        try:
+            for batch in batches:
+                self._send(batch)
+        finally:
+            if batches:
+                with self._condition:
+                    self._sending -= len(batches)
+                    self._condition.notify_all()
+
+    def _send(self, batch):
+        """Sends a batch once fewer than max_concurrency are in flight."""
+        self._slots.acquire()
+        try:
+            self._executor.submit(self._mutate, batch)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _mutate(self, batch):
+        futures = batch.futures
+        try:
+            response = self._mutate_method(
+                batch.customer_id, [future.operation for future in futures],
+                **self._request_kwargs)
+            results = get_results(response)
+            if len(results) != len(futures):
+                raise ValueError(
+                    f'The response has {len(results)} results for '
+                    f'{len(futures)} operations.')
+        except Exception as ex:
+            exception = ex
+        else:
+            exception = None
+        finally:
+            # The slot is released before futures are resolved, so their
+            # callbacks can add operations.
+            self._slots.release()
+
+        with self._condition:
+            self._requests += 1
+            if exception is None:
+                self._operations += len(futures)
+                self._bytes += batch.size
+            else:
+                self._failed_requests += 1
+        if exception is not None:
+            for future in futures:
+                future.set_exception(exception)
+            return
+        for future, result in zip(futures, results):
+            future.response = response
+            future.set_result(result)
+
+    def _run_timer(self):
+        """Sends batches whose oldest operation has waited max_delay."""
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    deadline = min((batch.created_at + self.max_delay
+                                    for batch in self._pending.values()),
+                                   default=None)
+                    if deadline is not None and deadline <= now:
+                        break
+                    self._condition.wait(
+                        None if deadline is None else deadline - now)
+                ready = [batch for batch in self._pending.values()
+                         if batch.created_at + self.max_delay <= now]
+                for batch in ready:
+                    del self._pending[batch.customer_id]
+                self._sending += len(ready)
+            self._send_all(ready)
+
+
+def get_mutate_method(client, service_name, method_name=None, version=None):
+    """Returns the mutate method of a service.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        service_name: the str name of the service, e.g. "CampaignService".
+        method_name: the str name of the mutate method, e.g.
+            "mutate_campaigns". Defaults to the service's only method that
+            takes a list of operations.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+
+    Returns:
+        The bound mutate method of the service client.
+
+    Raises:
+        ValueError: If method_name is None and the service doesn't have
+            exactly one mutate method.
+    """
+    service = client.get_service(service_name,
+                                 version=version or _DEFAULT_VERSION)
+    if method_name is None:
+        method_names = [name for name in dir(service)
+                        if name.startswith(_MUTATE_METHOD_PREFIX)]
+        if len(method_names) != 1:
+            raise ValueError(f'{service_name} has mutate methods '
+                             f'{method_names}; specify method_name.')
+        method_name = method_names[0]
+    return getattr(service, method_name)
+
+
+def create_batcher(client, service_name, method_name=None, version=None,
+                   **kwargs):
+    """Creates a MutateBatcher for the mutate method of a service.
+
+    Example:
+        with create_batcher(client, 'CampaignService',
+                            partial_failure=True) as batcher:
+            futures = batcher.add_all(customer_id, operations)
+        results = [future.result() for future in futures]
+
+    Args:
+        client: a GoogleAdsClient instance.
+        service_name: the str name of the service, e.g. "CampaignService".
+        method_name: the str name of the mutate method; see
+            get_mutate_method.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to the MutateBatcher,
+            and through it to every mutate call.
+
+    Returns:
+        A MutateBatcher instance.
+
+    Raises:
+        ValueError: If method_name is None and the service doesn't have
+            exactly one mutate method.
+    """
+    return MutateBatcher(get_mutate_method(client, service_name, method_name,
+                                           version), **kwargs)
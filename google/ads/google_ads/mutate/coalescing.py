@@ -0,0 +1,196 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Coalesces pending updates to the same resource before they are sent.
+
+Code that reacts to many small changes, such as a rule engine, tends to emit
+several updates to the same resource in one run, e.g. its status, then its
+bid, then its URL. An UpdateCoalescer buffers operations and merges each
+update into the pending update of the same resource, with the union of their
+field masks, and drops the pending update of a resource that is then
+removed. Operations are only merged or dropped when no operation between them
+refers to the resource, so the operations sent have the same effect as those
+added, in the same order.
+"""
+
+from collections import namedtuple
+
+from . import operations as operations_module
+
+
+class CoalescerStats(namedtuple('CoalescerStats', (
+        'added', 'merged', 'dropped'))):
+    """A snapshot of the metrics of an UpdateCoalescer.
+
+    Attributes:
+        added: the number of operations added.
+        merged: the number of updates merged into an earlier update.
+        dropped: the number of updates dropped because their resource was
+            removed.
+    """
+    __slots__ = ()
+
+    @property
+    def saved(self):
+        """The number of operations that won't be sent."""
+        return self.merged + self.dropped
+
+
+def _unwrap(operation):
+    """Returns the operation in a MutateOperation, or the operation itself."""
+    if operations_module.UPDATE in operation.DESCRIPTOR.fields_by_name:
+        return operation
+    return operations_module.unwrap(operation)[1]
+
+
+class UpdateCoalescer(object):
+    """Buffers operations and coalesces the updates of each resource.
+
+    Operations can be per-service operations, e.g. CampaignOperation, or
+    MutateOperation messages of any resource type. An update is merged into
+    the pending update of the same resource if no operation since then refers
+    to the resource and none changes a resource the update refers to. The
+    merged update has the fields of both updates, the later values winning,
+    and the union of their field masks. A remove drops the pending update of
+    its resource unless another operation refers to the resource after it.
+    Added operations aren't changed.
+    """
+
+    def __init__(self):
+        """Initializer for the UpdateCoalescer."""
+        self._operations = []
+        # The index of the latest pending update of each resource, and the
+        # indices of the merged updates, which are copies owned by the
+        # coalescer.
+        self._updates = {}
+        self._copies = set()
+        # The index of the last operation that changes, or that refers to,
+        # each resource.
+        self._last_writers = {}
+        self._last_readers = {}
+        self._pending = 0
+        self._added = 0
+        self._merged = 0
+        self._dropped = 0
+
+    def __len__(self):
+        """Returns the number of operations pending."""
+        return self._pending
+
+    @property
+    def stats(self):
+        """A CoalescerStats snapshot of the metrics."""
+        return CoalescerStats(self._added, self._merged, self._dropped)
+
+    def add(self, operation):
+        """Adds an operation, merging it into a pending update if possible.
+
+        Args:
+            operation: an operation message, e.g. a CampaignOperation, or a
+                MutateOperation.
+
+        Raises:
+            ValueError: If the operation has no create, update or remove set.
+        """
+        inner = _unwrap(operation)
+        kind = None if inner is None else operations_module.get_kind(inner)
+        if kind is None:
+            raise ValueError('The operation has no operation set.')
+        self._added += 1
+        target = operations_module.get_target_resource_name(inner)
+        references = operations_module.list_resource_names(inner) - {target}
+
+        if kind == operations_module.UPDATE:
+            index = self._updates.get(target)
+            if index is not None and self._can_merge(index, target,
+                                                     references):
+                self._merge(index, inner)
+                self._merged += 1
+                return
+        elif kind == operations_module.REMOVE:
+            self._drop_update(target)
+
+        index = len(self._operations)
+        self._operations.append(operation)
+        self._pending += 1
+        if kind == operations_module.UPDATE:
+            self._updates[target] = index
+        else:
+            self._updates.pop(target, None)
+        if target:
+            self._last_writers[target] = index
+        for resource_name in references:
+            self._last_readers[resource_name] = index
+
+    def add_all(self, operations):
+        """Adds operations in order."""
+        for operation in operations:
+            self.add(operation)
+
+    def flush(self):
+        """Returns the pending operations, in order, and empties the buffer.
+
+        Returns:
+            A list of operation messages. Merged updates are new messages;
+            every other operation is the message that was added.
+        """
+        pending = [operation for operation in self._operations
+                   if operation is not None]
+        self._operations = []
+        self._updates = {}
+        self._copies = set()
+        self._last_writers = {}
+        self._last_readers = {}
+        self._pending = 0
+        return pending
+
+    def _can_merge(self, index, target, references):
+        """Returns whether an update can be merged into the one at index."""
+        if (self._last_writers.get(target) != index
+                or self._last_readers.get(target, -1) > index):
+            return False
+        return all(self._last_writers.get(resource_name, -1) < index
+                   for resource_name in references)
+
+    def _merge(self, index, update):
+        """Merges an update operation into the pending update at index."""
+        if index not in self._copies:
+            operation = self._operations[index]
+            copy = type(operation)()
+            copy.CopyFrom(operation)
+            self._operations[index] = copy
+            self._copies.add(index)
+        pending = _unwrap(self._operations[index])
+        update.update_mask.MergeMessage(update.update, pending.update,
+                                        replace_message_field=True,
+                                        replace_repeated_field=True)
+        update_mask = type(pending.update_mask)()
+        update_mask.Union(pending.update_mask, update.update_mask)
+        pending.update_mask.CopyFrom(update_mask)
+        for resource_name in (operations_module.list_resource_names(update)
+                              - {pending.update.resource_name}):
+            self._last_readers[resource_name] = max(
+                self._last_readers.get(resource_name, -1), index)
+
+    def _drop_update(self, target):
+        """Drops the pending update of a resource that is being removed.
+
+        Earlier updates of the resource weren't merged into the pending one
+        because of an operation in between, so they are kept.
+        """
+        index = self._updates.pop(target, None)
+        if index is not None and self._last_readers.get(target, -1) < index:
+            self._operations[index] = None
+            self._copies.discard(index)
+            self._pending -= 1
+            self._dropped += 1
@@ -0,0 +1,195 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Reorders GoogleAdsService.mutate operations to group resource types.
+
+The latency of GoogleAdsService.mutate is roughly that of one call per run of
+operations of the same resource type, so operations built per entity, e.g.
+campaign, ad group, campaign, ad group, are the slowest order. Reordering
+them into as few runs as possible must still create every temporarily named
+resource before it is referred to, and keep the operations that change a
+resource in order with the operations that refer to it. Responses and errors
+of the reordered operations are mapped back to their original positions with
+an OperationOrder.
+"""
+
+import heapq
+
+from . import operations as operations_module
+
+
+def count_resource_type_runs(mutate_operations):
+    """Returns the number of runs of operations of the same resource type.
+
+    Args:
+        mutate_operations: a sequence of MutateOperation messages.
+    """
+    runs = 0
+    previous = None
+    for mutate_operation in mutate_operations:
+        field_name = mutate_operation.WhichOneof('operation')
+        if field_name != previous:
+            runs += 1
+            previous = field_name
+    return runs
+
+
+class OperationOrder(object):
+    """A reordering of operations and the way back to the original order.
+
+    Attributes:
+        operations: a list of the operations in the new order.
+        indices: a list of the original index of each operation in the new
+            order.
+        original_runs: the number of resource type runs of the original
+            order.
+        runs: the number of resource type runs of the new order.
+    """
+
+    def __init__(self, operations, indices, original_runs, runs):
+        """Initializer for the OperationOrder.
+
+        Args:
+            operations: a list of the operations in the new order.
+            indices: a list of the original index of each operation.
+            original_runs: an int number of runs of the original order.
+            runs: an int number of runs of the new order.
+        """
+        self.operations = operations
+        self.indices = indices
+        self.original_runs = original_runs
+        self.runs = runs
+
+    def to_original_index(self, index):
+        """Returns the original index of the operation at an index."""
+        return self.indices[index]
+
+    def restore(self, items):
+        """Puts items that follow the new order back in the original order.
+
+        Example:
+            response = service.mutate(customer_id, order.operations)
+            responses = order.restore(response.mutate_operation_responses)
+
+        Args:
+            items: a sequence with one item per operation in the new order,
+                e.g. the mutate_operation_responses of the response.
+
+        Returns:
+            A list of the items in the original order.
+        """
+        restored = [None] * len(self.indices)
+        for index, item in zip(self.indices, items):
+            restored[index] = item
+        return restored
+
+
+def _get_predecessors(mutate_operations):
+    """Returns the indices of the operations each operation must follow."""
+    inner_operations = [operations_module.unwrap(mutate_operation)[1]
+                        for mutate_operation in mutate_operations]
+    creators = {}
+    for index, operation in enumerate(inner_operations):
+        if (operation is not None and operations_module.get_kind(operation)
+                == operations_module.CREATE):
+            resource_name = operations_module.get_target_resource_name(
+                operation)
+            if operations_module.is_temporary_resource_name(resource_name):
+                creators[resource_name] = index
+
+    predecessors = [set() for _ in mutate_operations]
+    last_writers = {}
+    readers = {}
+    for index, operation in enumerate(inner_operations):
+        if operation is None:
+            continue
+        target = operations_module.get_target_resource_name(operation)
+        for resource_name in (operations_module.list_resource_names(operation)
+                              - {target}):
+            # Temporarily named resources are created before any use, even
+            # a use that comes first in the original order.
+            creator = creators.get(resource_name)
+            if creator is not None and creator != index:
+                predecessors[index].add(creator)
+            if resource_name in last_writers:
+                predecessors[index].add(last_writers[resource_name])
+            readers.setdefault(resource_name, []).append(index)
+
+        # Operations that change a resource stay in order with each other and
+        # with the operations that refer to it.
+        if target:
+            if target in last_writers:
+                predecessors[index].add(last_writers[target])
+            if creators.get(target) != index:
+                predecessors[index].update(readers.get(target, ()))
+            last_writers[target] = index
+            readers[target] = []
+    return predecessors
+
+
+def group_by_resource_type(mutate_operations):
+    """Reorders operations into few runs of the same resource type.
+
+    Operations are ordered topologically by their dependencies. The current
+    resource type is kept while any of its operations can go next; otherwise
+    the type with the most operations ready goes next. Operations of the same
+    type keep their relative order unless a dependency requires otherwise.
+
+    Args:
+        mutate_operations: a sequence of MutateOperation messages.
+
+    Returns:
+        An OperationOrder instance.
+
+    Raises:
+        ValueError: If the dependencies between the operations form a cycle.
+    """
+    mutate_operations = list(mutate_operations)
+    field_names = [mutate_operation.WhichOneof('operation')
+                   for mutate_operation in mutate_operations]
+    predecessors = _get_predecessors(mutate_operations)
+    successors = [[] for _ in mutate_operations]
+    pending_counts = []
+    for index, index_predecessors in enumerate(predecessors):
+        pending_counts.append(len(index_predecessors))
+        for predecessor in index_predecessors:
+            successors[predecessor].append(index)
+
+    ready = {}
+    for index, count in enumerate(pending_counts):
+        if not count:
+            ready.setdefault(field_names[index], []).append(index)
+
+    indices = []
+    current = None
+    while len(indices) < len(mutate_operations):
+        if not ready.get(current):
+            if not ready:
+                raise ValueError('The operations have circular '
+                                 'dependencies.')
+            current = max(ready, key=lambda field_name: (
+                len(ready[field_name]), -ready[field_name][0]))
+        index = heapq.heappop(ready[current])
+        if not ready[current]:
+            del ready[current]
+        indices.append(index)
+        for successor in successors[index]:
+            pending_counts[successor] -= 1
+            if not pending_counts[successor]:
+                heapq.heappush(ready.setdefault(field_names[successor], []),
+                               successor)
+
+    reordered = [mutate_operations[index] for index in indices]
+    return OperationOrder(reordered, indices,
+                          count_resource_type_runs(mutate_operations),
+                          count_resource_type_runs(reordered))
@@ -0,0 +1,158 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Inspects mutate operations and the resource names they refer to.
+
+Operations are the per-resource messages taken by the mutate methods, such as
+CampaignOperation, which create, update or remove one resource. A
+MutateOperation, taken by GoogleAdsService.mutate, wraps one of them.
+
+Resources created in the same GoogleAdsService.mutate request can be referred
+to before they exist with a temporary resource name, which has a negative ID,
+e.g. customers/123/campaigns/-1.
+"""
+
+import re
+
+from google.protobuf.descriptor import FieldDescriptor
+
+CREATE = 'create'
+UPDATE = 'update'
+REMOVE = 'remove'
+_OPERATION_ONEOF = 'operation'
+# Matches resource names whose ID, or a component of a composite ID, is
+# negative.
+_RE_TEMPORARY_RESOURCE_NAME = re.compile(
+    r'^customers/\d+/\w+/(?:[^/]*~)?-\d+(?:~[^/]*)?$')
+_RESOURCE_NAME_PREFIX = 'customers/'
+
+
+def is_temporary_resource_name(resource_name):
+    """Returns whether a resource name has a temporary, negative, ID."""
+    return bool(_RE_TEMPORARY_RESOURCE_NAME.match(resource_name))
+
+
+def unwrap(mutate_operation):
+    """Returns the operation wrapped by a MutateOperation.
+
+    Args:
+        mutate_operation: a MutateOperation message.
+
+    Returns:
+        The str name of the field that is set, e.g. "campaign_operation", and
+        the operation message, e.g. a CampaignOperation; or None and None if
+        no field is set.
+    """
+    field_name = mutate_operation.WhichOneof(_OPERATION_ONEOF)
+    if field_name is None:
+        return None, None
+    return field_name, getattr(mutate_operation, field_name)
+
+
+def get_kind(operation):
+    """Returns CREATE, UPDATE or REMOVE, or None if the operation is empty.
+
+    Args:
+        operation: an operation message, e.g. a CampaignOperation.
+    """
+    return operation.WhichOneof(_OPERATION_ONEOF)
+
+
+def get_target_resource_name(operation):
+    """Returns the resource name of the resource an operation changes.
+
+    Args:
+        operation: an operation message, e.g. a CampaignOperation.
+
+    Returns:
+        A str resource name, which is empty for creates that don't set one.
+    """
+    kind = get_kind(operation)
+    if kind is None:
+        return ''
+    if kind == REMOVE:
+        return operation.remove
+    return getattr(operation, kind).resource_name
+
+
+def list_resource_names(message):
+    """Returns every resource name in a message and its nested messages.
+
+    Args:
+        message: a protobuf message, e.g. an operation.
+
+    Returns:
+        A set of str resource names.
+    """
+    resource_names = set()
+    messages = [message]
+    while messages:
+        for field, value in messages.pop().ListFields():
+            values = (value if field.label == FieldDescriptor.LABEL_REPEATED
+                      else (value,))
+            if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+                messages.extend(values)
+            elif field.cpp_type == FieldDescriptor.CPPTYPE_STRING:
+                resource_names.update(
+                    item for item in values if isinstance(item, str)
+                    and item.startswith(_RESOURCE_NAME_PREFIX))
+    return resource_names
+
+
+def list_temporary_resource_names(message):
+    """Returns every temporary resource name in a message.
+
+    Args:
+        message: a protobuf message, e.g. an operation.
+
+    Returns:
+        A set of str temporary resource names.
+    """
+    return {resource_name for resource_name in list_resource_names(message)
+            if is_temporary_resource_name(resource_name)}
+
+
+def replace_resource_names(message, replacements):
+    """Replaces resource names in a message and its nested messages.
+
+    Only fields whose whole value is a resource name being replaced are
+    changed.
+
+    Args:
+        message: a protobuf message, e.g. an operation. It is changed in
+            place.
+        replacements: a dict of the str resource names that replace each str
+            resource name.
+
+    Returns:
+        The int number of values replaced.
+    """
+    replaced = 0
+    messages = [message]
+    while messages:
+        parent = messages.pop()
+        for field, value in parent.ListFields():
+            repeated = field.label == FieldDescriptor.LABEL_REPEATED
+            if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+                messages.extend(value if repeated else (value,))
+            elif field.cpp_type != FieldDescriptor.CPPTYPE_STRING:
+                continue
+            elif repeated:
+                for index, item in enumerate(value):
+                    if item in replacements:
+                        value[index] = replacements[item]
+                        replaced += 1
+            elif value in replacements:
+                setattr(parent, field.name, replacements[value])
+                replaced += 1
+    return replaced
@@ -0,0 +1,270 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Maps the partial failure errors of a mutate response to its operations.
+
+With partial_failure=True, the errors of a mutate request are returned in the
+partial_failure_error of the response as serialized GoogleAdsFailure details,
+and each error locates its operation with the index of the first field path
+element. A PartialFailureMap parses the details once and indexes the errors by
+operation, so callers can find the operations that succeeded, those that may
+succeed if sent again, and those that never will. mutate_with_retries sends
+the retryable operations again until they succeed or run out of retries.
+"""
+
+from collections import Counter, namedtuple
+from importlib import import_module
+import time
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.errors import get_error_code_index
+from .batcher import get_results
+
+_ERROR_CODE_FIELD = 'error_code'
+_FAILURE_TYPE_NAME = 'GoogleAdsFailure'
+# Error codes of transient failures that can be resolved by sending the same
+# operation again.
+_RETRYABLE_ERROR_CODES = frozenset((
+    ('internal_error', 'INTERNAL_ERROR'),
+    ('internal_error', 'TRANSIENT_ERROR'),
+    ('internal_error', 'DEADLINE_EXCEEDED'),
+    ('quota_error', 'RESOURCE_TEMPORARILY_EXHAUSTED'),
+    ('database_error', 'CONCURRENT_MODIFICATION'),
+))
+
+
+class OperationSplit(namedtuple('OperationSplit', (
+        'succeeded', 'retryable', 'permanent'))):
+    """The operations of a request, split by outcome.
+
+    Attributes:
+        succeeded: a list of the operations without errors.
+        retryable: a list of the failed operations whose errors are all
+            transient.
+        permanent: a list of the failed operations with an error that isn't
+            transient.
+    """
+    __slots__ = ()
+
+
+class PartialFailureMap(object):
+    """The partial failure errors of a mutate response, by operation.
+
+    Attributes:
+        operation_count: the number of operations in the request.
+        errors_by_index: a dict of the list of GoogleAdsError messages of each
+            failed operation, keyed by the operation's index.
+        request_errors: a list of the GoogleAdsError messages that aren't
+            located at an operation.
+        error_code_counts: a collections.Counter of the number of errors per
+            (category, name) error code, e.g.
+            ("range_error", "TOO_LOW").
+        succeeded_indices: a list of the indices of the operations without
+            errors, which is empty if the request has errors that aren't
+            located at an operation, since then none of them were applied.
+        retryable_indices: a list of the indices of the failed operations
+            whose errors are all transient.
+        permanent_indices: a list of the indices of the failed operations
+            with an error that isn't transient.
+    """
+
+    def __init__(self, failures, operation_count,
+                 retryable_error_codes=_RETRYABLE_ERROR_CODES):
+        """Initializer for the PartialFailureMap.
+
+        Args:
+            failures: an iterable of GoogleAdsFailure messages.
+            operation_count: the int number of operations in the request.
+            retryable_error_codes: a collection of the (category, name) error
+                codes of transient errors.
+        """
+        self.operation_count = operation_count
+        self.errors_by_index = {}
+        self.request_errors = []
+        self.error_code_counts = Counter()
+        error_codes_by_index = {}
+        index = None
+        for failure in failures:
+            if index is None:
+                index = get_error_code_index(
+                    failure.DESCRIPTOR.fields_by_name['errors'].message_type
+                    .fields_by_name[_ERROR_CODE_FIELD].message_type)
+            for error in failure.errors:
+                error_code = index.decode(error.error_code)
+                self.error_code_counts[error_code] += 1
+                elements = error.location.field_path_elements
+                if not elements or not elements[0].HasField('index'):
+                    self.request_errors.append(error)
+                    continue
+                operation_index = elements[0].index.value
+                self.errors_by_index.setdefault(operation_index,
+                                                []).append(error)
+                error_codes_by_index.setdefault(operation_index,
+                                                set()).add(error_code)
+
+        self.succeeded_indices = [] if self.request_errors else [
+            operation_index for operation_index in range(operation_count)
+            if operation_index not in self.errors_by_index]
+        self.retryable_indices = []
+        self.permanent_indices = []
+        for operation_index in sorted(error_codes_by_index):
+            if error_codes_by_index[operation_index] <= retryable_error_codes:
+                self.retryable_indices.append(operation_index)
+            else:
+                self.permanent_indices.append(operation_index)
+
+    @classmethod
+    def from_response(cls, response, operation_count=None, version=None,
+                      **kwargs):
+        """Creates a PartialFailureMap from a mutate response.
+
+        Args:
+            response: a mutate response message sent with
+                partial_failure=True, e.g. a MutateAdGroupsResponse.
+            operation_count: the int number of operations in the request;
+                defaults to the number of results in the response.
+            version: an optional str Google Ads API version of the response;
+                defaults to the client's default version.
+            **kwargs: additional keyword arguments passed to the initializer.
+
+        Returns:
+            A PartialFailureMap instance.
+        """
+        if operation_count is None:
+            operation_count = len(get_results(response))
+        failures = []
+        # The code of a response without partial failures is OK, zero.
+        if response.partial_failure_error.code:
+            failure_type = import_module(
+                f'google.ads.google_ads.{version or _DEFAULT_VERSION}.proto.'
+                'errors.errors_pb2').GoogleAdsFailure
+            for detail in response.partial_failure_error.details:
+                if detail.type_url.rpartition('.')[2] == _FAILURE_TYPE_NAME:
+                    failures.append(failure_type.FromString(detail.value))
+        return cls(failures, operation_count, **kwargs)
+
+    @property
+    def failed(self):
+        """Whether any operation or the request has an error."""
+        return bool(self.errors_by_index or self.request_errors)
+
+    def get_errors(self, index):
+        """Returns the list of GoogleAdsError messages of an operation."""
+        return self.errors_by_index.get(index, [])
+
+    def split(self, operations):
+        """Splits the operations of the request by outcome.
+
+        Args:
+            operations: the sequence of operations sent in the request.
+
+        Returns:
+            An OperationSplit instance.
+        """
+        return OperationSplit(
+            [operations[index] for index in self.succeeded_indices],
+            [operations[index] for index in self.retryable_indices],
+            [operations[index] for index in self.permanent_indices])
+
+
+class RetryResult(namedtuple('RetryResult', (
+        'results', 'errors_by_index', 'request_errors', 'error_code_counts',
+        'requests', 'retried'))):
+    """The outcome of mutate_with_retries.
+
+    Attributes:
+        results: a list of the result message of each operation, e.g. a
+            MutateAdGroupResult, or None if the operation failed.
+        errors_by_index: a dict of the list of GoogleAdsError messages of the
+            last attempt of each failed operation, keyed by its index.
+        request_errors: a list of the GoogleAdsError messages of the last
+            request that aren't located at an operation. None of the
+            operations of that request succeeded, and they aren't retried.
+        error_code_counts: a collections.Counter of the number of errors per
+            (category, name) error code, over every attempt.
+        requests: the number of requests sent.
+        retried: the number of operations sent again.
+    """
+    __slots__ = ()
+
+
+def mutate_with_retries(mutate_method, customer_id, operations,
+                        max_retries=3, retry_delay=1.0, version=None,
+                        retryable_error_codes=_RETRYABLE_ERROR_CODES,
+                        **kwargs):
+    """Sends operations with partial failure and retries transient failures.
+
+    Operations whose errors are all transient are sent again, in their
+    original order, after a delay that doubles on every retry. A request
+    with errors that aren't located at an operation fails as a whole, so its
+    operations are neither marked as succeeded nor retried. Operations of
+    GoogleAdsService.mutate that refer to temporary resource names created by
+    other operations of the request shouldn't be retried separately.
+
+    Args:
+        mutate_method: a generated mutate method that takes a customer ID, a
+            list of operations and partial_failure, e.g.
+            AdGroupServiceClient.mutate_ad_groups.
+        customer_id: a str customer ID.
+        operations: a sequence of operation messages.
+        max_retries: the int maximum number of times an operation is sent
+            again.
+        retry_delay: the float number of seconds before the first retry.
+        version: an optional str Google Ads API version of the responses;
+            defaults to the client's default version.
+        retryable_error_codes: a collection of the (category, name) error
+            codes of transient errors.
+        **kwargs: additional keyword arguments passed to every call of
+            mutate_method.
+
+    Returns:
+        A RetryResult instance.
+    """
+    operations = list(operations)
+    results = [None] * len(operations)
+    errors_by_index = {}
+    request_errors = []
+    error_code_counts = Counter()
+    pending = list(range(len(operations)))
+    requests = 0
+    retried = 0
+    attempt = 0
+    while pending:
+        if attempt:
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+            retried += len(pending)
+        response = mutate_method(
+            customer_id, [operations[index] for index in pending],
+            partial_failure=True, **kwargs)
+        requests += 1
+        failure_map = PartialFailureMap.from_response(
+            response, len(pending), version=version,
+            retryable_error_codes=retryable_error_codes)
+        error_code_counts.update(failure_map.error_code_counts)
+
+        response_results = get_results(response)
+        for position in failure_map.succeeded_indices:
+            index = pending[position]
+            results[index] = response_results[position]
+            errors_by_index.pop(index, None)
+        for position, errors in failure_map.errors_by_index.items():
+            errors_by_index[pending[position]] = errors
+
+        request_errors = failure_map.request_errors
+        if request_errors or attempt == max_retries:
+            break
+        pending = [pending[position]
+                   for position in failure_map.retryable_indices]
+        attempt += 1
+    return RetryResult(results, errors_by_index, request_errors,
+                       error_code_counts, requests, retried)
@@ -0,0 +1,307 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Validates batches of mutate operations before they are sent.
+
+Sending every batch with validate_only=True before sending it for real
+catches errors before anything is changed, at the cost of an extra round
+trip per batch. A PreflightPipeline validates batches concurrently, across
+customers and ahead of the batches being sent, so a batch is usually
+validated while the one before it is still being applied. Batches are
+released to a MutateScheduler, which sends them in order per customer, only
+once they pass validation.
+"""
+
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+
+from ._limits import DEFAULT_MAX_BYTES, DEFAULT_MAX_CONCURRENCY, \
+    DEFAULT_MAX_OPERATIONS
+from .batcher import get_mutate_method
+from .partial_failure import PartialFailureMap
+from .scheduler import MutateScheduler, split_operations
+
+
+class PreflightResult(namedtuple('PreflightResult', (
+        'customer_id', 'validations', 'operations', 'responses'))):
+    """The outcome of one batch submitted to a PreflightPipeline.
+
+    Attributes:
+        customer_id: the str customer ID of the batch.
+        validations: a list of the PartialFailureMap of each validation
+            request, whose indices are relative to the request.
+        operations: a list of the operations released to be sent, which is
+            empty if the batch was held back.
+        responses: a list of the responses of the requests that sent the
+            released operations.
+    """
+    __slots__ = ()
+
+    @property
+    def valid(self):
+        """Whether every operation of the batch passed validation."""
+        return not any(validation.failed for validation in self.validations)
+
+    @property
+    def released(self):
+        """Whether any operation of the batch was sent."""
+        return bool(self.operations)
+
+
+class _Batch(object):
+    """A submitted batch and the state of its validation."""
+    __slots__ = ('customer_id', 'operations', 'future', 'validations',
+                 'exception')
+
+    def __init__(self, customer_id, operations):
+        self.customer_id = customer_id
+        self.operations = operations
+        self.future = Future()
+        self.validations = None
+        self.exception = None
+
+
+class _Lane(object):
+    """The batches of one customer, released in the order submitted."""
+    __slots__ = ('batches', 'submitted', 'next_sequence')
+
+    def __init__(self):
+        self.batches = {}
+        self.submitted = 0
+        self.next_sequence = 0
+
+
+class PreflightPipeline(object):
+    """Validates batches concurrently and sends the valid ones in order.
+
+    Each batch is validated with validate_only=True and partial_failure=True
+    as soon as it is submitted, up to max_concurrency validation requests at
+    once. Validated batches are released to a MutateScheduler in the order
+    they were submitted for their customer. A batch with a validation error
+    is held back, and so are all of its operations unless drop_invalid is
+    set; later batches of the customer are still released. Instances are
+    safe to share between threads and are context managers that close on
+    exit.
+    """
+
+    def __init__(self, mutate_method, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_operations=DEFAULT_MAX_OPERATIONS,
+                 max_bytes=DEFAULT_MAX_BYTES, drop_invalid=False,
+                 version=None, **request_kwargs):
+        """Initializer for the PreflightPipeline.
+
+        Args:
+            mutate_method: a generated mutate method that takes a customer ID,
+                a list of operations, partial_failure and validate_only, e.g.
+                CampaignServiceClient.mutate_campaigns.
+            max_concurrency: an int maximum number of validation requests,
+                and separately of customers being sent, at once.
+            max_operations: an int maximum number of operations per request.
+            max_bytes: an int maximum total serialized size of the operations
+                of a request.
+            drop_invalid: whether the operations of a batch that passed
+                validation are released when others didn't. Operations that
+                depend on an invalid one should not be released this way.
+            version: an optional str Google Ads API version of the responses;
+                defaults to the client's default version.
+            **request_kwargs: additional keyword arguments passed to every
+                call of mutate_method that sends operations, e.g.
+                partial_failure=True.
+
+        Raises:
+            ValueError: If max_concurrency, max_operations or max_bytes is
+                less than one.
+        """
+        self._scheduler = MutateScheduler(
+            mutate_method, max_concurrency=max_concurrency,
+            max_operations=max_operations, max_bytes=max_bytes,
+            **request_kwargs)
+        self.max_operations = max_operations
+        self.max_bytes = max_bytes
+        self.drop_invalid = drop_invalid
+        self._mutate_method = mutate_method
+        self._version = version
+        self._validation_kwargs = dict(request_kwargs, validate_only=True,
+                                       partial_failure=True)
+        self._lock = threading.Lock()
+        self._lanes = {}
+        self._closed = False
+        self._validator = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix='mutate_preflight')
+
+    def submit(self, customer_id, operations):
+        """Adds a batch of operations of a customer.
+
+        Args:
+            customer_id: a str customer ID.
+            operations: an iterable of operation messages.
+
+        Returns:
+            A concurrent.futures.Future of the PreflightResult of the batch.
+            It fails with the exception of a request that raised one.
+
+        Raises:
+            RuntimeError: If the pipeline is closed.
+        """
+        batch = _Batch(customer_id, list(operations))
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Batches cannot be submitted to a closed '
+                                   'PreflightPipeline.')
+            lane = self._lanes.setdefault(customer_id, _Lane())
+            lane.batches[lane.submitted] = batch
+            lane.submitted += 1
+            self._validator.submit(self._validate, lane, batch)
+        return batch.future
+
+    def submit_all(self, batches):
+        """Adds batches in order.
+
+        Args:
+            batches: an iterable of (customer_id, operations) tuples.
+
+        Returns:
+            A list of the futures of the batches, in their order.
+        """
+        return [self.submit(customer_id, operations)
+                for customer_id, operations in batches]
+
+    def get_lane_stats(self, customer_id=None):
+        """Returns the LaneStats of the requests that send operations.
+
+        See MutateScheduler.get_lane_stats.
+        """
+        return self._scheduler.get_lane_stats(customer_id)
+
+    def close(self):
+        """Waits for every submitted batch and rejects new ones."""
+        with self._lock:
+            self._closed = True
+        # Every batch is released, or resolved, once its validation is done.
+        self._validator.shutdown(wait=True)
+        self._scheduler.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _validate(self, lane, batch):
+        try:
+            batch.validations = [
+                PartialFailureMap.from_response(
+                    self._mutate_method(batch.customer_id, operations,
+                                        **self._validation_kwargs),
+                    len(operations), version=self._version)
+                for operations in split_operations(
+                    batch.operations, self.max_operations, self.max_bytes)]
+        except Exception as ex:
+            batch.exception = ex
+
+        held = []
+        released = []
+        with self._lock:
+            # Validated batches wait for the earlier batches of their
+            # customer, so they are released in the order submitted.
+            while lane.next_sequence in lane.batches:
+                next_batch = lane.batches[lane.next_sequence]
+                if (next_batch.validations is None
+                        and next_batch.exception is None):
+                    break
+                del lane.batches[lane.next_sequence]
+                lane.next_sequence += 1
+                operations = self._get_released_operations(next_batch)
+                if operations:
+                    released.append((next_batch, operations,
+                                     self._scheduler.submit(
+                                         next_batch.customer_id, operations)))
+                else:
+                    held.append(next_batch)
+
+        # Futures are resolved without the lock, so their callbacks can
+        # submit batches.
+        for held_batch in held:
+            if held_batch.exception is not None:
+                held_batch.future.set_exception(held_batch.exception)
+            else:
+                held_batch.future.set_result(PreflightResult(
+                    held_batch.customer_id, held_batch.validations, [], []))
+        for released_batch, operations, future in released:
+            future.add_done_callback(
+                self._create_callback(released_batch, operations))
+
+    def _get_released_operations(self, batch):
+        """Returns the operations of a validated batch that are sent."""
+        if batch.exception is not None:
+            return []
+        if not self.drop_invalid:
+            if any(validation.failed for validation in batch.validations):
+                return []
+            return batch.operations
+
+        operations = []
+        offset = 0
+        for validation in batch.validations:
+            if not validation.request_errors:
+                operations.extend(
+                    batch.operations[offset + index]
+                    for index in validation.succeeded_indices)
+            offset += validation.operation_count
+        return operations
+
+    @staticmethod
+    def _create_callback(batch, operations):
+        """Returns a callback that resolves a batch with its responses."""
+        def callback(future):
+            exception = future.exception()
+            if exception is not None:
+                batch.future.set_exception(exception)
+            else:
+                batch.future.set_result(PreflightResult(
+                    batch.customer_id, batch.validations, operations,
+                    future.result()))
+        return callback
+
+
+def create_preflight_pipeline(client, service_name, method_name=None,
+                              version=None, **kwargs):
+    """Creates a PreflightPipeline for the mutate method of a service.
+
+    Example:
+        with create_preflight_pipeline(client, 'CampaignService') as pipeline:
+            futures = pipeline.submit_all(batches)
+        invalid = [future.result() for future in futures
+                   if not future.result().valid]
+
+    Args:
+        client: a GoogleAdsClient instance.
+        service_name: the str name of the service, e.g. "CampaignService".
+        method_name: the str name of the mutate method; see
+            get_mutate_method.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to the
+            PreflightPipeline, and through it to every mutate call.
+
+    Returns:
+        A PreflightPipeline instance.
+
+    Raises:
+        ValueError: If method_name is None and the service doesn't have
+            exactly one mutate method.
+    """
+    return PreflightPipeline(
+        get_mutate_method(client, service_name, method_name, version),
+        version=version, **kwargs)
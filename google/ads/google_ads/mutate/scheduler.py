@@ -0,0 +1,336 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Schedules mutates in order per customer and in parallel across customers.
+
+The operations sent for one customer often depend on each other, e.g. a
+campaign on its budget, so they must be applied in the order they were
+submitted, while the operations of different customers are independent. A
+MutateScheduler keeps a first-in, first-out lane of work per customer and runs
+one item of a lane at a time, with up to max_concurrency lanes running at
+once over the same service client, and therefore the same channel.
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+
+from ._limits import DEFAULT_MAX_BYTES, DEFAULT_MAX_CONCURRENCY, \
+    DEFAULT_MAX_OPERATIONS, get_encoded_size
+from .batcher import get_mutate_method
+
+
+def split_operations(operations, max_operations, max_bytes):
+    """Splits operations, in order, into as few requests as possible.
+
+    Args:
+        operations: an iterable of operation messages.
+        max_operations: an int maximum number of operations per request.
+        max_bytes: an int maximum total serialized size of the operations of
+            a request. An operation larger than this is sent alone.
+
+    Yields:
+        Lists of the operations of each request.
+    """
+    request = []
+    size = 0
+    for operation in operations:
+        operation_size = get_encoded_size(operation)
+        if request and (len(request) >= max_operations
+                        or size + operation_size > max_bytes):
+            yield request
+            request = []
+            size = 0
+        request.append(operation)
+        size += operation_size
+    if request:
+        yield request
+
+
+class LaneStats(namedtuple('LaneStats', (
+        'customer_id', 'queue_depth', 'max_queue_depth', 'running',
+        'completed', 'failed', 'requests', 'latency', 'max_latency',
+        'wait'))):
+    """A snapshot of the metrics of one customer's lane.
+
+    Attributes:
+        customer_id: the str customer ID of the lane.
+        queue_depth: the number of work items waiting in the lane.
+        max_queue_depth: the largest number of work items that have waited
+            in the lane at once.
+        running: whether a work item of the lane is being sent.
+        completed: the number of work items whose requests succeeded.
+        failed: the number of work items with a request that raised an
+            exception.
+        requests: the number of requests sent.
+        latency: the total float seconds spent sending work items.
+        max_latency: the longest float seconds spent sending a work item.
+        wait: the total float seconds work items waited in the lane.
+    """
+    __slots__ = ()
+
+    @property
+    def mean_latency(self):
+        """The mean float seconds spent sending a finished work item."""
+        finished = self.completed + self.failed
+        return self.latency / finished if finished else 0.0
+
+    @property
+    def mean_wait(self):
+        """The mean float seconds a finished work item waited in the lane."""
+        finished = self.completed + self.failed
+        return self.wait / finished if finished else 0.0
+
+
+class _WorkItem(object):
+    """Operations submitted together and the future of their responses."""
+    __slots__ = ('operations', 'future', 'submitted_at')
+
+    def __init__(self, operations):
+        self.operations = operations
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+
+
+class _Lane(object):
+    """The queue and metrics of one customer."""
+
+    def __init__(self, customer_id):
+        self.customer_id = customer_id
+        self.items = deque()
+        self.running = False
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.requests = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self.wait = 0.0
+
+    def get_stats(self):
+        return LaneStats(self.customer_id, len(self.items),
+                         self.max_queue_depth, self.running, self.completed,
+                         self.failed, self.requests, self.latency,
+                         self.max_latency, self.wait)
+
+
+class MutateScheduler(object):
+    """Runs work items in order per customer and in parallel across them.
+
+    Every work item is the list of operations submitted in one call. Its
+    operations are sent in order, in as few requests under max_operations and
+    max_bytes as possible, and the next work item of the customer starts once
+    they all finished. A work item whose request fails doesn't stop the
+    later ones of its customer; operations that depend on each other should
+    be submitted together. Lanes take turns, one work item at a time, so a
+    busy customer doesn't hold back the others. Instances are safe to share
+    between threads and are context managers that close on exit.
+    """
+
+    def __init__(self, mutate_method, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_operations=DEFAULT_MAX_OPERATIONS,
+                 max_bytes=DEFAULT_MAX_BYTES, **request_kwargs):
+        """Initializer for the MutateScheduler.
+
+        Args:
+            mutate_method: a generated mutate method that takes a customer ID
+                and a list of operations, e.g.
+                CampaignServiceClient.mutate_campaigns.
+            max_concurrency: an int maximum number of lanes running at once.
+            max_operations: an int maximum number of operations per request.
+            max_bytes: an int maximum total serialized size of the operations
+                of a request. An operation larger than this is sent alone.
+            **request_kwargs: additional keyword arguments passed to every
+                call of mutate_method, e.g. partial_failure=True.
+
+        Raises:
+            ValueError: If max_concurrency, max_operations or max_bytes is
+                less than one.
+        """
+        if min(max_concurrency, max_operations, max_bytes) < 1:
+            raise ValueError('max_concurrency, max_operations and max_bytes '
+                             'must be at least one.')
+
+        self.max_operations = max_operations
+        self.max_bytes = max_bytes
+        self._mutate_method = mutate_method
+        self._request_kwargs = request_kwargs
+        self._condition = threading.Condition()
+        self._lanes = {}
+        self._running = 0
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix='mutate_scheduler')
+
+    def submit(self, customer_id, operations):
+        """Adds a work item to the lane of a customer.
+
+        Args:
+            customer_id: a str customer ID.
+            operations: an iterable of operation messages, e.g.
+                CampaignOperation messages.
+
+        Returns:
+            A concurrent.futures.Future of the list of responses of the work
+            item's requests, in the order they were sent.
+
+        Raises:
+            RuntimeError: If the scheduler is closed.
+        """
+        item = _WorkItem(list(operations))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Work cannot be submitted to a closed '
+                                   'MutateScheduler.')
+            lane = self._lanes.get(customer_id)
+            if lane is None:
+                lane = self._lanes[customer_id] = _Lane(customer_id)
+            lane.items.append(item)
+            lane.max_queue_depth = max(lane.max_queue_depth, len(lane.items))
+            if not lane.running:
+                self._start(lane)
+        return item.future
+
+    def submit_all(self, work_items):
+        """Adds work items in order.
+
+        Args:
+            work_items: an iterable of (customer_id, operations) tuples.
+
+        Returns:
+            A list of the futures of the work items, in their order.
+        """
+        return [self.submit(customer_id, operations)
+                for customer_id, operations in work_items]
+
+    def get_lane_stats(self, customer_id=None):
+        """Returns a snapshot of the metrics of the lanes.
+
+        Args:
+            customer_id: an optional str customer ID of the lane.
+
+        Returns:
+            The LaneStats of the customer, or None if nothing was submitted
+            for it; or, if customer_id is None, a dict of the LaneStats of
+            every lane keyed by customer ID.
+        """
+        with self._condition:
+            if customer_id is not None:
+                lane = self._lanes.get(customer_id)
+                return None if lane is None else lane.get_stats()
+            return {lane_customer_id: lane.get_stats()
+                    for lane_customer_id, lane in self._lanes.items()}
+
+    def join(self, timeout=None):
+        """Waits for every submitted work item to finish.
+
+        Args:
+            timeout: an optional float maximum number of seconds to wait.
+
+        Returns:
+            True if every work item finished, False if the timeout expired.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._running,
+                                            timeout)
+
+    def close(self):
+        """Waits for every submitted work item and rejects new ones."""
+        with self._condition:
+            self._closed = True
+        self.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start(self, lane):
+        """Queues the next work item of a lane; the condition must be held."""
+        lane.running = True
+        self._running += 1
+        self._executor.submit(self._run, lane)
+
+    def _run(self, lane):
+        with self._condition:
+            item = lane.items.popleft()
+        started_at = time.monotonic()
+        responses = []
+        requests = 0
+        exception = None
+        try:
+            for operations in split_operations(
+                    item.operations, self.max_operations, self.max_bytes):
+                requests += 1
+                responses.append(self._mutate_method(
+                    lane.customer_id, operations, **self._request_kwargs))
+        except Exception as ex:
+            exception = ex
+        finished_at = time.monotonic()
+        # The future is resolved before the lane's next work item starts, so
+        # callbacks see the results in order.
+        if exception is None:
+            item.future.set_result(responses)
+        else:
+            item.future.set_exception(exception)
+
+        with self._condition:
+            latency = finished_at - started_at
+            lane.requests += requests
+            lane.latency += latency
+            lane.max_latency = max(lane.max_latency, latency)
+            lane.wait += started_at - item.submitted_at
+            if exception is None:
+                lane.completed += 1
+            else:
+                lane.failed += 1
+            self._running -= 1
+            # Goes to the back of the executor's queue, behind other lanes.
+            if lane.items:
+                self._start(lane)
+            else:
+                lane.running = False
+            self._condition.notify_all()
+
+
+def create_scheduler(client, service_name, method_name=None, version=None,
+                     **kwargs):
+    """Creates a MutateScheduler for the mutate method of a service.
+
+    Example:
+        with create_scheduler(client, 'GoogleAdsService') as scheduler:
+            futures = scheduler.submit_all(work_items)
+        responses = [future.result() for future in futures]
+
+    Args:
+        client: a GoogleAdsClient instance.
+        service_name: the str name of the service, e.g. "CampaignService".
+        method_name: the str name of the mutate method; see
+            get_mutate_method.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to the MutateScheduler,
+            and through it to every mutate call.
+
+    Returns:
+        A MutateScheduler instance.
+
+    Raises:
+        ValueError: If method_name is None and the service doesn't have
+            exactly one mutate method.
+    """
+    return MutateScheduler(get_mutate_method(client, service_name,
+                                             method_name, version), **kwargs)
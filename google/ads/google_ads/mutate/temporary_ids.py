@@ -0,0 +1,329 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Splits GoogleAdsService.mutate operations with temporary IDs into requests.
+
+Temporary resource names, which have negative IDs, are only resolved within
+the request that creates them, so a list of operations that is too large for
+one request can't simply be cut into chunks. A MutatePlan tracks which
+operations create and use each temporary name, and partitions the operations
+into requests that keep every group of connected operations together when it
+fits. Groups too large for one request are split in dependency order, and
+temporary names used after the request that created them are replaced with
+the real resource names from its response before the next request is sent.
+"""
+
+from collections import namedtuple
+import heapq
+import threading
+
+from ._limits import DEFAULT_MAX_BYTES, DEFAULT_MAX_OPERATIONS, \
+    get_encoded_size
+from .grouping import _get_predecessors, group_by_resource_type
+from . import operations as operations_module
+
+_RESPONSE_ONEOF = 'response'
+
+
+class TemporaryIdAllocator(object):
+    """Hands out unique negative IDs for temporary resource names.
+
+    Instances are safe to share between threads.
+    """
+
+    def __init__(self):
+        """Initializer for the TemporaryIdAllocator."""
+        self._lock = threading.Lock()
+        self._last_id = 0
+
+    def next_id(self):
+        """Returns the next unused int temporary ID, e.g. -1."""
+        with self._lock:
+            self._last_id -= 1
+            return self._last_id
+
+    def next_resource_name(self, customer_id, collection):
+        """Returns a new temporary resource name.
+
+        Args:
+            customer_id: a str customer ID.
+            collection: the str collection of the resource name, e.g.
+                "campaigns" or "adGroups".
+
+        Returns:
+            A str resource name, e.g. "customers/123/campaigns/-1".
+        """
+        return f'customers/{customer_id}/{collection}/{self.next_id()}'
+
+
+class PlanResult(namedtuple('PlanResult', (
+        'responses', 'resource_names', 'batch_responses'))):
+    """The outcome of executing a MutatePlan.
+
+    Attributes:
+        responses: a list of the MutateOperationResponse of each operation, in
+            the order the operations were added. The response of a failed
+            operation has no result set.
+        resource_names: a dict of the real resource names of the resources
+            created with temporary names, keyed by temporary name.
+        batch_responses: a list of the MutateGoogleAdsResponse of each
+            request, in the order they were sent.
+    """
+    __slots__ = ()
+
+
+def get_result_resource_name(mutate_operation_response):
+    """Returns the resource name in a MutateOperationResponse, or ''."""
+    field_name = mutate_operation_response.WhichOneof(_RESPONSE_ONEOF)
+    if field_name is None:
+        return ''
+    return getattr(mutate_operation_response, field_name).resource_name
+
+
+def _topological_order(indices, predecessors):
+    """Orders indices after their predecessors, otherwise by index."""
+    members = set(indices)
+    pending_counts = {index: len(predecessors[index] & members)
+                      for index in indices}
+    successors = {index: [] for index in indices}
+    for index in indices:
+        for predecessor in predecessors[index] & members:
+            successors[predecessor].append(index)
+
+    ready = [index for index in indices if not pending_counts[index]]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        index = heapq.heappop(ready)
+        order.append(index)
+        for successor in successors[index]:
+            pending_counts[successor] -= 1
+            if not pending_counts[successor]:
+                heapq.heappush(ready, successor)
+    if len(order) < len(indices):
+        raise ValueError('The operations have circular dependencies.')
+    return order
+
+
+class MutatePlan(object):
+    """GoogleAdsService.mutate operations of one customer, sent in requests.
+
+    Attributes:
+        customer_id: the str customer ID the operations are sent for.
+        operations: a list of the MutateOperation messages added.
+        allocator: the TemporaryIdAllocator of the plan's temporary names.
+        creators: a dict of the index of the operation that creates each
+            temporary name, keyed by temporary name.
+        references: a dict of the set of the indices of the operations that
+            refer to each temporary name, keyed by temporary name.
+    """
+
+    def __init__(self, customer_id, allocator=None):
+        """Initializer for the MutatePlan.
+
+        Args:
+            customer_id: a str customer ID.
+            allocator: an optional TemporaryIdAllocator; defaults to a new
+                one.
+        """
+        self.customer_id = customer_id
+        self.operations = []
+        self.allocator = allocator or TemporaryIdAllocator()
+        self.creators = {}
+        self.references = {}
+
+    def next_resource_name(self, collection):
+        """Returns a new temporary resource name of the plan's customer.
+
+        Args:
+            collection: the str collection of the resource name, e.g.
+                "campaigns".
+        """
+        return self.allocator.next_resource_name(self.customer_id,
+                                                 collection)
+
+    def add(self, mutate_operation):
+        """Adds an operation.
+
+        Args:
+            mutate_operation: a MutateOperation message.
+
+        Returns:
+            The int index of the operation.
+
+        Raises:
+            ValueError: If the operation creates a temporary name that
+                another operation already creates.
+        """
+        index = len(self.operations)
+        _, operation = operations_module.unwrap(mutate_operation)
+        if operation is None:
+            raise ValueError('The MutateOperation has no operation set.')
+
+        target = operations_module.get_target_resource_name(operation)
+        created = (target if operations_module.get_kind(operation)
+                   == operations_module.CREATE
+                   and operations_module.is_temporary_resource_name(target)
+                   else None)
+        if created is not None:
+            if created in self.creators:
+                raise ValueError(f'Temporary resource name "{created}" is '
+                                 'already created by another operation.')
+            self.creators[created] = index
+        for resource_name in (operations_module
+                              .list_temporary_resource_names(operation)):
+            if resource_name != created:
+                self.references.setdefault(resource_name, set()).add(index)
+        self.operations.append(mutate_operation)
+        return index
+
+    def add_all(self, mutate_operations):
+        """Adds operations in order and returns a list of their indices."""
+        return [self.add(mutate_operation)
+                for mutate_operation in mutate_operations]
+
+    def partition(self, max_operations=DEFAULT_MAX_OPERATIONS,
+                  max_bytes=DEFAULT_MAX_BYTES, group=True):
+        """Partitions the operations into requests.
+
+        Operations connected by temporary names or by changes to the same
+        resource form a group. Groups are packed into requests in the order of
+        their first operation, and a group that doesn't fit in a request of
+        its own is split in dependency order.
+
+        Args:
+            max_operations: an int maximum number of operations per request.
+            max_bytes: an int maximum total serialized size of the operations
+                of a request.
+            group: whether the operations of each request are reordered to
+                group resource types; see group_by_resource_type.
+
+        Returns:
+            A list of lists of operation indices, one list per request in the
+            order they must be sent.
+
+        Raises:
+            ValueError: If the dependencies between the operations form a
+                cycle.
+        """
+        predecessors = _get_predecessors(self.operations)
+        # Finds the connected groups with a union-find.
+        roots = list(range(len(self.operations)))
+
+        def find(index):
+            while roots[index] != index:
+                roots[index] = roots[roots[index]]
+                index = roots[index]
+            return index
+
+        for index, index_predecessors in enumerate(predecessors):
+            for predecessor in index_predecessors:
+                roots[find(index)] = find(predecessor)
+        groups = {}
+        for index in range(len(self.operations)):
+            groups.setdefault(find(index), []).append(index)
+
+        sizes = [get_encoded_size(mutate_operation)
+                 for mutate_operation in self.operations]
+        batches = []
+        batch = []
+        batch_size = 0
+        for members in sorted(groups.values()):
+            group_size = sum(sizes[index] for index in members)
+            if batch and (len(batch) + len(members) > max_operations
+                          or batch_size + group_size > max_bytes):
+                batches.append(batch)
+                batch = []
+                batch_size = 0
+            if len(members) <= max_operations and group_size <= max_bytes:
+                batch.extend(members)
+                batch_size += group_size
+                continue
+
+            for index in _topological_order(members, predecessors):
+                if batch and (len(batch) >= max_operations
+                              or batch_size + sizes[index] > max_bytes):
+                    batches.append(batch)
+                    batch = []
+                    batch_size = 0
+                batch.append(index)
+                batch_size += sizes[index]
+        if batch:
+            batches.append(batch)
+
+        ordered_batches = []
+        for batch in batches:
+            batch = _topological_order(batch, predecessors)
+            if group:
+                order = group_by_resource_type(
+                    [self.operations[index] for index in batch])
+                batch = [batch[index] for index in order.indices]
+            ordered_batches.append(batch)
+        return ordered_batches
+
+    def execute(self, service, max_operations=DEFAULT_MAX_OPERATIONS,
+                max_bytes=DEFAULT_MAX_BYTES, group=True, **kwargs):
+        """Sends the operations in the requests of partition, one by one.
+
+        Temporary names created by an earlier request are replaced with their
+        real resource names in the operations of later requests; the added
+        operations aren't changed.
+
+        Args:
+            service: a GoogleAdsServiceClient instance.
+            max_operations: an int maximum number of operations per request.
+            max_bytes: an int maximum total serialized size of the operations
+                of a request.
+            group: whether the operations of each request are reordered to
+                group resource types.
+            **kwargs: additional keyword arguments passed to every
+                service.mutate call, e.g. partial_failure=True.
+
+        Returns:
+            A PlanResult instance.
+
+        Raises:
+            ValueError: If the dependencies between the operations form a
+                cycle.
+            GoogleAdsException: If a request fails; later requests aren't
+                sent.
+        """
+        created_names = {index: name for name, index in self.creators.items()}
+        resource_names = {}
+        responses = [None] * len(self.operations)
+        batch_responses = []
+        for batch in self.partition(max_operations=max_operations,
+                                    max_bytes=max_bytes, group=group):
+            operations = []
+            for index in batch:
+                mutate_operation = self.operations[index]
+                if resource_names and (operations_module
+                                       .list_temporary_resource_names(
+                                           mutate_operation)
+                                       & resource_names.keys()):
+                    copy = type(mutate_operation)()
+                    copy.CopyFrom(mutate_operation)
+                    operations_module.replace_resource_names(copy,
+                                                             resource_names)
+                    mutate_operation = copy
+                operations.append(mutate_operation)
+
+            response = service.mutate(self.customer_id, operations, **kwargs)
+            batch_responses.append(response)
+            for index, operation_response in zip(
+                    batch, response.mutate_operation_responses):
+                responses[index] = operation_response
+                resource_name = get_result_resource_name(operation_response)
+                if index in created_names and resource_name:
+                    resource_names[created_names[index]] = resource_name
+        return PlanResult(responses, resource_names, batch_responses)
@@ -0,0 +1,307 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A page iterator that fetches upcoming pages in the background.
+
+google.api_core.page_iterator.GRPCIterator only requests page N+1 once the
+caller has consumed page N, so network time and processing time never overlap.
+PrefetchingGRPCIterator is a drop-in replacement that requests pages on a
+background thread while the caller works through the current one. The service
+clients created by GoogleAdsClient return it from their paged methods, but
+prefetching is opt-in: enable it with set_prefetch_defaults or per iterator.
+"""
+
+import collections
+import functools
+import threading
+
+from google.api_core import page_iterator
+
+# The names of the methods of the generated service clients that return a
+# GRPCIterator.
+_PAGED_METHOD_NAMES = frozenset((
+    'list_campaign_draft_async_errors',
+    'list_campaign_experiment_async_errors',
+    'list_mutate_job_results',
+    'search',
+    'search_google_ads_fields',
+))
+
+# The number of pages fetched ahead of the page being consumed. Zero disables
+# prefetching.
+_prefetch_pages = 0
+# The maximum total serialized size of pages fetched ahead of the page being
+# consumed. At least one page is always prefetched if prefetching is enabled.
+_max_prefetch_bytes = 64 * 1024 * 1024
+
+
+def set_prefetch_defaults(prefetch_pages=None, max_prefetch_bytes=None):
+    """Sets the prefetch settings used by service clients' page iterators.
+
+    Args:
+        prefetch_pages: an optional int number of pages to fetch ahead of the
+            page being consumed; zero disables prefetching.
+        max_prefetch_bytes: an optional int maximum total serialized size of
+            prefetched pages.
+
+    Raises:
+        ValueError: If either value is negative.
+    """
+    global _prefetch_pages, _max_prefetch_bytes
+
+    if prefetch_pages is not None:
+        if prefetch_pages < 0:
+            raise ValueError('prefetch_pages must not be negative.')
+        _prefetch_pages = prefetch_pages
+
+    if max_prefetch_bytes is not None:
+        if max_prefetch_bytes < 0:
+            raise ValueError('max_prefetch_bytes must not be negative.')
+        _max_prefetch_bytes = max_prefetch_bytes
+
+
+class _PageFetcher(object):
+    """Fetches consecutive pages on a background thread.
+
+    The fetcher deliberately holds no reference to the iterator that owns it,
+    so an iterator that is dropped before it's exhausted can be garbage
+    collected, which closes the fetcher and ends its thread.
+    """
+
+    def __init__(self, method, request, request_token_field,
+                 response_token_field, prefetch_pages, max_prefetch_bytes):
+        self._method = method
+        self._request = request
+        self._request_token_field = request_token_field
+        self._response_token_field = response_token_field
+        self._prefetch_pages = prefetch_pages
+        self._max_prefetch_bytes = max_prefetch_bytes
+        self._responses = collections.deque()
+        self._buffered_bytes = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._done = False
+        self._exception = None
+
+    def start(self):
+        threading.Thread(target=self._run, name='PrefetchingGRPCIterator',
+                         daemon=True).start()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._responses.clear()
+            self._condition.notify_all()
+
+    def _is_full(self):
+        return (len(self._responses) >= self._prefetch_pages
+                or (self._responses
+                    and self._buffered_bytes >= self._max_prefetch_bytes))
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    while not self._closed and self._is_full():
+                        self._condition.wait()
+                    if self._closed:
+                        return
+
+                response = self._method(self._request)
+                size = response.ByteSize()
+
+                with self._condition:
+                    if self._closed:
+                        return
+                    self._responses.append((response, size))
+                    self._buffered_bytes += size
+                    self._condition.notify_all()
+
+                next_page_token = getattr(response,
+                                          self._response_token_field)
+                if not next_page_token:
+                    return
+                setattr(self._request, self._request_token_field,
+                        next_page_token)
+        except Exception as ex:
+            with self._condition:
+                self._exception = ex
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+    def get(self):
+        """Returns the next response, blocking until it has been fetched.
+
+        Returns:
+            A response message, or None once every page has been returned.
+
+        Raises:
+            Exception: the exception raised while fetching the next page, once
+                the pages fetched before it have been returned.
+        """
+        with self._condition:
+            while not self._responses and not self._done:
+                self._condition.wait()
+
+            if self._responses:
+                response, size = self._responses.popleft()
+                self._buffered_bytes -= size
+                self._condition.notify_all()
+                return response
+
+            if self._exception is not None:
+                exception, self._exception = self._exception, None
+                raise exception
+
+            return None
+
+
+class PrefetchingGRPCIterator(page_iterator.GRPCIterator):
+    """A GRPCIterator that fetches upcoming pages in the background.
+
+    Pages are returned in order and errors are raised at the point in the
+    iteration where the failed page would have been returned, exactly as
+    with GRPCIterator. The background thread is only started once iteration
+    begins and it stops once the last page is fetched, an error occurs, or
+    the iterator is closed or garbage collected.
+    """
+
+    def __init__(self, client, method, request, items_field,
+                 item_to_value=page_iterator._item_to_value_identity,
+                 request_token_field=(
+                     page_iterator.GRPCIterator._DEFAULT_REQUEST_TOKEN_FIELD),
+                 response_token_field=(
+                     page_iterator.GRPCIterator._DEFAULT_RESPONSE_TOKEN_FIELD),
+                 max_results=None, prefetch_pages=None,
+                 max_prefetch_bytes=None):
+        """Initializer for the PrefetchingGRPCIterator.
+
+        Args:
+            client: unused; see GRPCIterator.
+            method: a callable that takes a request message and returns a
+                response message.
+            request: the request message.
+            items_field: a str field name of the items in a response.
+            item_to_value: a callable that converts an item to a value.
+            request_token_field: a str field name of the page token in the
+                request.
+            response_token_field: a str field name of the next page token in
+                the response.
+            max_results: an optional int maximum number of results to fetch.
+            prefetch_pages: an optional int number of pages to fetch ahead of
+                the page being consumed; defaults to the value set with
+                set_prefetch_defaults. Zero disables prefetching.
+            max_prefetch_bytes: an optional int maximum total serialized size
+                of prefetched pages; defaults to the value set with
+                set_prefetch_defaults.
+        """
+        super().__init__(client, method, request, items_field,
+                         item_to_value=item_to_value,
+                         request_token_field=request_token_field,
+                         response_token_field=response_token_field,
+                         max_results=max_results)
+        self._prefetch_pages = (_prefetch_pages if prefetch_pages is None
+                                else prefetch_pages)
+        self._max_prefetch_bytes = (_max_prefetch_bytes
+                                    if max_prefetch_bytes is None
+                                    else max_prefetch_bytes)
+        self._fetcher = None
+
+    def _next_page(self):
+        """Gets the next page in the iterator.
+
+        Returns:
+            A Page, or None if there are no pages left.
+        """
+        if self._prefetch_pages < 1:
+            return super()._next_page()
+
+        if (self.max_results is not None
+                and self.num_results >= self.max_results):
+            self.close()
+            return None
+
+        if self._fetcher is None:
+            if self.next_page_token is not None:
+                setattr(self._request, self._request_token_field,
+                        self.next_page_token)
+            self._fetcher = _PageFetcher(
+                self._method, self._request, self._request_token_field,
+                self._response_token_field, self._prefetch_pages,
+                self._max_prefetch_bytes)
+            self._fetcher.start()
+
+        response = self._fetcher.get()
+
+        if response is None:
+            return None
+
+        self.next_page_token = getattr(response, self._response_token_field)
+        return page_iterator.Page(self, getattr(response, self._items_field),
+                                  self.item_to_value, raw_page=response)
+
+    def close(self):
+        """Stops fetching pages and releases any prefetched pages."""
+        # The fetcher may be missing if initialization failed.
+        if getattr(self, '_fetcher', None) is not None:
+            self._fetcher.close()
+
+    def __del__(self):
+        self.close()
+
+    @classmethod
+    def from_iterator(cls, iterator, **kwargs):
+        """Creates a PrefetchingGRPCIterator from an unstarted GRPCIterator.
+
+        Args:
+            iterator: a google.api_core.page_iterator.GRPCIterator instance
+                that hasn't been iterated.
+            **kwargs: additional keyword arguments passed to the initializer,
+                i.e. prefetch_pages and max_prefetch_bytes.
+
+        Returns:
+            A PrefetchingGRPCIterator of the same pages.
+        """
+        return cls(iterator.client, iterator._method, iterator._request,
+                   iterator._items_field, item_to_value=iterator.item_to_value,
+                   request_token_field=iterator._request_token_field,
+                   response_token_field=iterator._response_token_field,
+                   max_results=iterator.max_results, **kwargs)
+
+
+def install(service_client):
+    """Makes the paged methods of a client return PrefetchingGRPCIterators.
+
+    The generated paged methods are wrapped on the instance, so the generated
+    sources are left as they are. Iterators only prefetch if prefetching is
+    enabled.
+
+    Args:
+        service_client: a generated service client instance.
+    """
+    for name in _PAGED_METHOD_NAMES:
+        method = getattr(service_client, name, None)
+        if method is not None:
+            setattr(service_client, name, _wrap_paged_method(method))
+
+
+def _wrap_paged_method(method):
+    @functools.wraps(method)
+    def paged_method(*args, **kwargs):
+        iterator = method(*args, **kwargs)
+        if type(iterator) is page_iterator.GRPCIterator:
+            return PrefetchingGRPCIterator.from_iterator(iterator)
+        return iterator
+    return paged_method
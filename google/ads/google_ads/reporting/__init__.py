@@ -0,0 +1,28 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Utilities for retrieving reports with GoogleAdsService."""
+
+from .concurrent_search import search_stream_many, MultiCustomerSearchStream, \
+    SearchProgress
+from .sharding import search_stream_sharded, shard_query, \
+    ShardedSearchStream
+from .columnar import search_stream_columnar, ColumnarSink
+from .export import export_search_stream, export_search, export_batches, \
+    create_writer, CsvReportWriter, JsonlReportWriter, ParquetReportWriter
+from .rows import compile_query, CompiledQuery, Record
+from .resumable import search_stream_resumable, ResumableSearchStream, \
+    Checkpoint
+from .aggregation import aggregate_search_stream, StreamingAggregator, \
+    Sum, Min, Max, Count, Mean, Ratio, WeightedAverage
+from .streaming import stream_rows, RowStream, get_peak_rss
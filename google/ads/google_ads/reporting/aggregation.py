@@ -0,0 +1,460 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Aggregates search_stream results by group as they are received.
+
+Each batch is decoded into columns, its rows are mapped to group indexes, and
+every aggregate is updated for the whole batch with NumPy ufuncs. Only one
+value per group and accumulator is kept, so memory depends on the number of
+groups rather than the number of rows. Aggregates that need the same inputs,
+e.g. the sum of clicks and the click-through rate, share accumulators.
+Null values are ignored, as in SQL. Requires NumPy.
+"""
+
+from collections import namedtuple
+
+from google.ads.google_ads import gaql
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.util import import_optional
+
+from .columnar import ColumnarSink
+from ._constants import SERVICE_NAME
+from .fields import BOOL, BYTES, DOUBLE, ENUM, INT64, STRING, UINT64, \
+    get_row_descriptor, resolve_field
+
+# The NumPy dtypes of the values of the kinds of fields that can be
+# aggregated.
+_NUMERIC_DTYPES = {
+    INT64: 'int64',
+    UINT64: 'uint64',
+    DOUBLE: 'float64',
+}
+# The kinds of fields that can be grouped by. Messages and repeated fields
+# have no hashable value to group by.
+_GROUPABLE_KINDS = frozenset((INT64, UINT64, DOUBLE, BOOL, ENUM, STRING,
+                              BYTES))
+
+# Accumulator kinds.
+_SUM = 'sum'
+_MIN = 'min'
+_MAX = 'max'
+_COUNT = 'count'
+_WEIGHTED_SUM = 'weighted_sum'
+
+
+def _divide(numerators, denominators):
+    return [None if not denominator else numerator / denominator
+            for numerator, denominator in zip(numerators.tolist(),
+                                              denominators.tolist())]
+
+
+class Sum(namedtuple('Sum', ('field',))):
+    """The sum of the values of a field; 0 if every value is null."""
+    __slots__ = ()
+
+    def _get_inputs(self):
+        return (_SUM, self.field),
+
+    def _compute(self, sums):
+        return sums.values.tolist()
+
+
+class Min(namedtuple('Min', ('field',))):
+    """The smallest value of a field; None if every value is null."""
+    __slots__ = ()
+
+    def _get_inputs(self):
+        return (_MIN, self.field), (_COUNT, self.field)
+
+    def _compute(self, minimums, counts):
+        return [value if count else None for value, count
+                in zip(minimums.values.tolist(), counts.values.tolist())]
+
+
+class Max(namedtuple('Max', ('field',))):
+    """The largest value of a field; None if every value is null."""
+    __slots__ = ()
+
+    def _get_inputs(self):
+        return (_MAX, self.field), (_COUNT, self.field)
+
+    def _compute(self, maximums, counts):
+        return [value if count else None for value, count
+                in zip(maximums.values.tolist(), counts.values.tolist())]
+
+
+class Count(namedtuple('Count', ('field',), defaults=(None,))):
+    """The number of rows, or of non-null values of a field if it is set."""
+    __slots__ = ()
+
+    def _get_inputs(self):
+        return (_COUNT, self.field),
+
+    def _compute(self, counts):
+        return counts.values.tolist()
+
+
+class Mean(namedtuple('Mean', ('field',))):
+    """The mean of the values of a field; None if every value is null."""
+    __slots__ = ()
+
+    def _get_inputs(self):
+        return (_SUM, self.field), (_COUNT, self.field)
+
+    def _compute(self, sums, counts):
+        return _divide(sums.values, counts.values)
+
+
+class Ratio(namedtuple('Ratio', ('numerator', 'denominator'))):
+    """The ratio of the sums of two fields, e.g. clicks over impressions.
+
+    The ratio is None when the sum of the denominator is 0.
+    """
+    __slots__ = ()
+
+    def _get_inputs(self):
+        return (_SUM, self.numerator), (_SUM, self.denominator)
+
+    def _compute(self, numerators, denominators):
+        return _divide(numerators.values, denominators.values)
+
+
+class WeightedAverage(namedtuple('WeightedAverage', ('field', 'weight'))):
+    """The average of a field weighted by another, e.g. CPC by clicks.
+
+    Rows where either field is null are ignored. The average is None when
+    the sum of the weights is 0.
+    """
+    __slots__ = ()
+
+    def _get_inputs(self):
+        return (_WEIGHTED_SUM, self.field, self.weight),
+
+    def _compute(self, weighted_sums):
+        return _divide(weighted_sums.values, weighted_sums.weights)
+
+
+class _Accumulator(object):
+    """One value per group, grown as groups are added."""
+
+    def __init__(self, numpy, dtype, fill):
+        self._numpy = numpy
+        self._fill = fill
+        self.values = numpy.full(0, fill, dtype=dtype)
+
+    def _grow(self, array, size):
+        if size <= len(array):
+            return array
+        grown = self._numpy.full(max(size, 2 * len(array)), self._fill,
+                                 dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def grow(self, size):
+        """Makes room for at least size groups."""
+        self.values = self._grow(self.values, size)
+
+    def truncate(self, size):
+        """Drops the room reserved for groups that don't exist yet."""
+        self.values = self.values[:size]
+
+
+class _UfuncAccumulator(_Accumulator):
+    """Accumulates the non-null values of a field with an unbuffered ufunc."""
+
+    def __init__(self, numpy, field, dtype, ufunc, fill):
+        super().__init__(numpy, dtype, fill)
+        self._field = field
+        self._ufunc = ufunc
+
+    def update(self, group_ids, columns):
+        values, valid = columns[self._field]
+        if valid is not None:
+            group_ids, values = group_ids[valid], values[valid]
+        self._ufunc.at(self.values, group_ids, values)
+
+
+class _CountAccumulator(_Accumulator):
+    """Counts rows, or the non-null values of a field."""
+
+    def __init__(self, numpy, field):
+        super().__init__(numpy, 'int64', 0)
+        self._field = field
+
+    def update(self, group_ids, columns):
+        if self._field is not None:
+            valid = columns[self._field][1]
+            if valid is not None:
+                group_ids = group_ids[valid]
+        self.values += self._numpy.bincount(group_ids,
+                                            minlength=len(self.values))
+
+
+class _WeightedSumAccumulator(_Accumulator):
+    """Sums a field times a weight, and the weights, where both are set."""
+
+    def __init__(self, numpy, field, weight):
+        super().__init__(numpy, 'float64', 0)
+        self.weights = numpy.zeros(0)
+        self._field = field
+        self._weight = weight
+
+    def grow(self, size):
+        super().grow(size)
+        self.weights = self._grow(self.weights, size)
+
+    def truncate(self, size):
+        super().truncate(size)
+        self.weights = self.weights[:size]
+
+    def update(self, group_ids, columns):
+        values, values_valid = columns[self._field]
+        weights, weights_valid = columns[self._weight]
+        if values_valid is not None or weights_valid is not None:
+            valid = self._numpy.ones(len(group_ids), dtype=bool)
+            for field_valid in (values_valid, weights_valid):
+                if field_valid is not None:
+                    valid &= field_valid
+            group_ids, values, weights = (group_ids[valid], values[valid],
+                                          weights[valid])
+        weights = weights.astype('float64')
+        self._numpy.add.at(self.values, group_ids, values * weights)
+        self._numpy.add.at(self.weights, group_ids, weights)
+
+
+class StreamingAggregator(object):
+    """Groups search_stream results and aggregates them batch by batch.
+
+    Attributes:
+        group_by: a tuple of the str field paths rows are grouped by.
+        aggregates: a dict of the aggregates computed for each group, keyed
+            by the str names of the result columns.
+    """
+
+    def __init__(self, group_by, aggregates, query=None,
+                 version=_DEFAULT_VERSION):
+        """Initializer for the StreamingAggregator.
+
+        Args:
+            group_by: a sequence of str field paths to group rows by. Rows
+                are aggregated into a single group if it is empty.
+            aggregates: a dict of aggregates, such as Sum("metrics.clicks")
+                or Ratio("metrics.clicks", "metrics.impressions"), keyed by
+                the str names of the result columns.
+            query: an optional str GAQL query the results are from. If it is
+                set, every field that is grouped by or aggregated must be
+                selected by it.
+            version: a str Google Ads API version.
+
+        Raises:
+            ValueError: If a field doesn't exist, isn't selected by the
+                query, is grouped by but isn't a scalar or enum, or is
+                aggregated but isn't numeric.
+            ImportError: If NumPy isn't installed.
+        """
+        self._numpy = import_optional('numpy')
+        self.group_by = tuple(group_by)
+        self.aggregates = dict(aggregates)
+
+        inputs = {}
+        for aggregate in self.aggregates.values():
+            for accumulator_input in aggregate._get_inputs():
+                inputs.setdefault(accumulator_input, None)
+        aggregated_fields = {field for accumulator_input in inputs
+                             for field in accumulator_input[1:]
+                             if field is not None}
+
+        names = list(dict.fromkeys(self.group_by + tuple(aggregated_fields)))
+        if query is not None:
+            selected = set(gaql.parse_select_fields(query))
+            for name in names:
+                if name not in selected:
+                    raise ValueError(f'Field "{name}" is not selected by the '
+                                     'query.')
+
+        row_descriptor = get_row_descriptor(version)
+        for name in self.group_by:
+            field = resolve_field(name, row_descriptor)
+            if field.repeated or field.kind not in _GROUPABLE_KINDS:
+                raise ValueError(f'Field "{name}" can not be grouped by; only '
+                                 'scalar and enum fields can.')
+
+        dtypes = {}
+        for name in aggregated_fields:
+            field = resolve_field(name, row_descriptor)
+            if field.repeated or field.kind not in _NUMERIC_DTYPES:
+                raise ValueError(f'Field "{name}" can not be aggregated; only '
+                                 'numeric fields can.')
+            dtypes[name] = _NUMERIC_DTYPES[field.kind]
+
+        self._aggregated_fields = aggregated_fields
+        self._accumulators = {
+            accumulator_input: self._create_accumulator(accumulator_input,
+                                                        dtypes)
+            for accumulator_input in inputs}
+        # Only the grouped and aggregated fields are decoded. ColumnarSink
+        # only reads the SELECT clause, so the resource doesn't matter.
+        self._sink = (ColumnarSink(f'SELECT {", ".join(names)} FROM '
+                                   'customer', version=version)
+                      if names else None)
+        self._group_indexes = {}
+        self._row_count = 0
+
+    def _create_accumulator(self, accumulator_input, dtypes):
+        numpy = self._numpy
+        kind, field = accumulator_input[:2]
+        if kind == _COUNT:
+            return _CountAccumulator(numpy, field)
+        if kind == _WEIGHTED_SUM:
+            return _WeightedSumAccumulator(numpy, field, accumulator_input[2])
+
+        dtype = numpy.dtype(dtypes[field])
+        if kind == _SUM:
+            return _UfuncAccumulator(numpy, field, dtype, numpy.add, 0)
+        limits = (numpy.finfo(dtype) if dtype.kind == 'f'
+                  else numpy.iinfo(dtype))
+        if kind == _MIN:
+            return _UfuncAccumulator(numpy, field, dtype, numpy.minimum,
+                                     limits.max)
+        return _UfuncAccumulator(numpy, field, dtype, numpy.maximum,
+                                 limits.min)
+
+    @property
+    def num_groups(self):
+        """The number of groups aggregated so far."""
+        return len(self._group_indexes)
+
+    @property
+    def num_rows(self):
+        """The number of rows aggregated so far."""
+        return self._row_count
+
+    def append(self, response):
+        """Aggregates a batch of results.
+
+        Args:
+            response: a SearchGoogleAdsStreamResponse message, or any message
+                with a repeated GoogleAdsRow results field.
+        """
+        self.append_rows(response.results)
+
+    def append_rows(self, rows):
+        """Aggregates a sequence of GoogleAdsRow messages.
+
+        Args:
+            rows: a sequence of GoogleAdsRow messages.
+        """
+        numpy = self._numpy
+        row_count = len(rows)
+        if not row_count:
+            return
+        self._row_count += row_count
+
+        columns = {}
+        if self._sink is not None:
+            self._sink.append_rows(rows)
+            for column in self._sink.columns:
+                columns[column.name] = column
+        group_indexes = self._group_indexes
+        add_group = group_indexes.setdefault
+        keys = zip(*[columns[name].to_list(enum_names=True)
+                     for name in self.group_by]) if self.group_by else None
+        group_ids = (
+            numpy.fromiter((add_group(key, len(group_indexes))
+                            for key in keys), dtype='intp', count=row_count)
+            if keys is not None
+            else numpy.full(row_count, add_group((), 0), dtype='intp'))
+
+        # The values of each aggregated field, and a mask of the rows where
+        # they are set, or None if they are all set.
+        values = {}
+        for name in self._aggregated_fields:
+            column = columns[name]
+            array = column.to_numpy()
+            values[name] = (
+                (numpy.ma.getdata(array), ~numpy.ma.getmaskarray(array))
+                if column.null_count else (array, None))
+
+        for accumulator in self._accumulators.values():
+            accumulator.grow(len(group_indexes))
+            accumulator.update(group_ids, values)
+
+        if self._sink is not None:
+            self._sink.clear()
+
+    def consume(self, responses):
+        """Aggregates every batch of a stream.
+
+        Args:
+            responses: an iterable of SearchGoogleAdsStreamResponse messages.
+
+        Returns:
+            This StreamingAggregator.
+        """
+        for response in responses:
+            self.append(response)
+        return self
+
+    def results(self):
+        """Returns the aggregated groups.
+
+        Returns:
+            A list with one dict per group, in the order the groups were
+            first seen, keyed by the grouped field paths and the names of
+            the aggregates. Enums are grouped by their names.
+        """
+        group_count = len(self._group_indexes)
+        for accumulator in self._accumulators.values():
+            accumulator.grow(group_count)
+            accumulator.truncate(group_count)
+
+        columns = [list(column) for column in zip(*self._group_indexes)]
+        names = list(self.group_by)
+        for name, aggregate in self.aggregates.items():
+            names.append(name)
+            columns.append(aggregate._compute(
+                *[self._accumulators[accumulator_input]
+                  for accumulator_input in aggregate._get_inputs()]))
+
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def aggregate_search_stream(client, customer_id, query, group_by, aggregates,
+                            version=None, **kwargs):
+    """Streams a query and aggregates its results by group.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        customer_id: a str customer ID.
+        query: a str GAQL query that selects every grouped and aggregated
+            field.
+        group_by: a sequence of str field paths to group rows by.
+        aggregates: a dict of aggregates keyed by result column name; see
+            StreamingAggregator.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to search_stream.
+
+    Returns:
+        A list of dicts, one per group; see StreamingAggregator.results.
+
+    Raises:
+        ValueError: If a field can't be grouped by or aggregated.
+        ImportError: If NumPy isn't installed.
+    """
+    version = version or _DEFAULT_VERSION
+    aggregator = StreamingAggregator(group_by, aggregates, query=query,
+                                     version=version)
+    service = client.get_service(SERVICE_NAME, version=version)
+    return aggregator.consume(
+        service.search_stream(customer_id, query, **kwargs)).results()
@@ -0,0 +1,396 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Decodes search_stream results into typed columns.
+
+The fields selected by a query are resolved against the GoogleAdsRow message
+once. Each SearchGoogleAdsStreamResponse batch is then decoded column by column
+into compact typed buffers, listing the set fields of each message on the
+selected paths only once per row. Wrapper messages such as Int64Value are
+unboxed, and a field is null when its wrapper, or any message on its path, is
+unset. The columns can be returned as NumPy arrays or as a pyarrow
+RecordBatch; neither library is required until the columns are requested.
+"""
+
+import array
+import math
+
+from google.ads.google_ads import gaql
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.util import import_optional
+
+from ._constants import SERVICE_NAME
+from .fields import BOOL, BYTES, DOUBLE, ENUM, INT64, MESSAGE, STRING, \
+    UINT64, get_row_descriptor, list_fields, resolve_field
+
+# The array typecode, null fill value and NumPy dtype of each fixed-width
+# column kind.
+_FIXED_WIDTH_KINDS = {
+    INT64: ('q', 0, 'int64'),
+    UINT64: ('Q', 0, 'uint64'),
+    DOUBLE: ('d', math.nan, 'float64'),
+    BOOL: ('b', 0, 'bool'),
+    ENUM: ('i', 0, 'int32'),
+}
+
+
+class Column(object):
+    """The decoded values of one selected field.
+
+    Attributes:
+        name: the str field path, e.g. "metrics.clicks".
+        field: the SelectedField the values are decoded from.
+        kind: the kind of the values; one of the kind constants in the fields
+            module.
+        repeated: whether each value is a list of values.
+        enum_type: the EnumDescriptor of an enum column, otherwise None.
+    """
+
+    def __init__(self, name, row_descriptor):
+        """Initializer for the Column.
+
+        Args:
+            name: the str field path.
+            row_descriptor: the GoogleAdsRow Descriptor.
+
+        Raises:
+            ValueError: If the field path doesn't exist.
+        """
+        self.field = resolve_field(name, row_descriptor)
+        self.name = name
+        # The names of the message fields from the row to the message that
+        # holds the value.
+        self.parent_path = self.field.parent_path
+        self.kind = self.field.kind
+        self.repeated = self.field.repeated
+        self.enum_type = self.field.enum_type
+        self.clear()
+
+    def __len__(self):
+        return len(self._mask)
+
+    def clear(self):
+        """Discards the values decoded so far."""
+        if self._is_fixed_width():
+            typecode, self._null, _ = _FIXED_WIDTH_KINDS[self.kind]
+            self._values = array.array(typecode)
+        else:
+            self._values = []
+            self._null = None
+        # One byte per value, non-zero where the value is null.
+        self._mask = bytearray()
+        self.null_count = 0
+
+    def append_rows(self, rows):
+        """Decodes this column's values from a sequence of GoogleAdsRows.
+
+        Args:
+            rows: a sequence of GoogleAdsRow messages.
+        """
+        self.append_fields(
+            _list_fields_by_path(rows, [self.parent_path])[self.parent_path])
+
+    def append_fields(self, parent_fields):
+        """Decodes this column's values from the fields of parent messages.
+
+        Args:
+            parent_fields: a list with one item per row: a dict of the set
+                fields of the message at parent_path, keyed by field name, or
+                None if that message isn't set.
+        """
+        append_value = self._values.append
+        append_mask = self._mask.append
+        field_name = self.field.field_name
+        nullable = self.field.nullable
+        unwrap = self.field.unwrap
+        repeated = self.repeated
+        unbox = self.field.unbox
+        default = self.field.default
+        null = self._null
+        null_count = 0
+
+        for fields in parent_fields:
+            value = None if fields is None else fields.get(field_name)
+            if value is None:
+                if fields is None or nullable:
+                    append_value(null)
+                    append_mask(1)
+                    null_count += 1
+                    continue
+                # Unset scalars have their default value.
+                value = [] if repeated else default
+            elif unwrap:
+                value = value.value
+            elif repeated:
+                value = ([item.value for item in value] if unbox
+                         else list(value))
+            append_value(value)
+            append_mask(0)
+
+        self.null_count += null_count
+
+    def _is_fixed_width(self):
+        return not self.repeated and self.kind in _FIXED_WIDTH_KINDS
+
+    def _get_fixed_width_values(self, numpy):
+        values = numpy.frombuffer(self._values, dtype=self._values.typecode)
+        # astype copies, so the array stays valid as more rows are appended.
+        return values.astype(_FIXED_WIDTH_KINDS[self.kind][2])
+
+    def _get_null_mask(self, numpy):
+        return numpy.frombuffer(self._mask, dtype=bool).copy()
+
+    def _get_enum_name(self, number):
+        value = self.enum_type.values_by_number.get(number)
+        return str(number) if value is None else value.name
+
+    def to_list(self, enum_names=False):
+        """Returns the values as a list, with None for null values.
+
+        Args:
+            enum_names: whether enum values are returned as their str names
+                rather than their numbers.
+        """
+        values = (self._values.tolist() if self._is_fixed_width()
+                  else list(self._values))
+        if self.null_count and self._is_fixed_width():
+            values = [None if is_null else value
+                      for value, is_null in zip(values, self._mask)]
+        if enum_names and self.kind == ENUM:
+            get_name = self._get_enum_name
+            if self.repeated:
+                values = [None if value is None
+                          else [get_name(item) for item in value]
+                          for value in values]
+            else:
+                values = [None if value is None else get_name(value)
+                          for value in values]
+        return values
+
+    def to_numpy(self):
+        """Returns the values as a NumPy array.
+
+        Fixed-width columns with nulls are returned as numpy.ma.MaskedArrays.
+        Other columns are object arrays with None for null values.
+
+        Raises:
+            ImportError: If NumPy isn't installed.
+        """
+        numpy = import_optional('numpy')
+
+        if not self._is_fixed_width():
+            values = numpy.empty(len(self._values), dtype=object)
+            values[:] = self._values
+            return values
+
+        values = self._get_fixed_width_values(numpy)
+        if not self.null_count:
+            return values
+        return numpy.ma.MaskedArray(values, mask=self._get_null_mask(numpy))
+
+    def to_arrow(self, enum_names=False):
+        """Returns the values as a pyarrow.Array.
+
+        Message values are serialized to binary.
+
+        Args:
+            enum_names: whether enum values are returned as their str names
+                rather than their numbers.
+
+        Raises:
+            ImportError: If pyarrow isn't installed.
+        """
+        pyarrow = import_optional('pyarrow')
+
+        if enum_names and self.kind == ENUM:
+            return pyarrow.array(
+                self.to_list(enum_names=True),
+                type=pyarrow.list_(pyarrow.string()) if self.repeated
+                else pyarrow.string())
+
+        if self._is_fixed_width():
+            numpy = import_optional('numpy')
+            return pyarrow.array(
+                self._get_fixed_width_values(numpy),
+                mask=self._get_null_mask(numpy) if self.null_count else None)
+
+        values = self._values
+        if self.kind == MESSAGE:
+            if self.repeated:
+                values = [[item.SerializeToString() for item in value]
+                          for value in values]
+            else:
+                values = [value if value is None
+                          else value.SerializeToString() for value in values]
+
+        if self.kind == STRING:
+            value_type = pyarrow.string()
+        elif self.kind in (BYTES, MESSAGE):
+            value_type = pyarrow.binary()
+        else:
+            value_type = pyarrow.from_numpy_dtype(
+                _FIXED_WIDTH_KINDS[self.kind][2])
+
+        return pyarrow.array(values, type=pyarrow.list_(value_type)
+                             if self.repeated else value_type)
+
+
+def _list_fields_by_path(rows, paths):
+    """Lists the set fields of the messages at each path of each row.
+
+    Listing the fields of a message once per row, rather than checking each
+    selected field with HasField, lets every column under the same message
+    share the work.
+
+    Args:
+        rows: a sequence of GoogleAdsRow messages.
+        paths: an iterable of tuples of str message field names.
+
+    Returns:
+        A dict keyed by path; see Column.append_fields for the values.
+    """
+    fields_by_path = {}
+
+    def get_fields(path):
+        if path not in fields_by_path:
+            if path:
+                field_name = path[-1]
+                messages = [None if fields is None else fields.get(field_name)
+                            for fields in get_fields(path[:-1])]
+            else:
+                messages = rows
+            fields_by_path[path] = [
+                None if message is None else list_fields(message)
+                for message in messages]
+        return fields_by_path[path]
+
+    for path in paths:
+        get_fields(path)
+    return fields_by_path
+
+
+class ColumnarSink(object):
+    """Decodes search_stream results into one Column per selected field.
+
+    Attributes:
+        columns: a list of Column instances in the order they are selected.
+    """
+
+    def __init__(self, query, version=_DEFAULT_VERSION):
+        """Initializer for the ColumnarSink.
+
+        Args:
+            query: the str GAQL query whose results will be decoded.
+            version: a str Google Ads API version.
+
+        Raises:
+            ValueError: If a selected field doesn't exist.
+        """
+        row_descriptor = get_row_descriptor(version)
+        self.columns = [Column(name, row_descriptor)
+                        for name in gaql.parse_select_fields(query)]
+
+    @property
+    def num_rows(self):
+        """The number of rows decoded so far."""
+        return len(self.columns[0]) if self.columns else 0
+
+    def append(self, response):
+        """Decodes a batch of results.
+
+        Args:
+            response: a SearchGoogleAdsStreamResponse message, or any message
+                with a repeated GoogleAdsRow results field.
+        """
+        self.append_rows(response.results)
+
+    def append_rows(self, rows):
+        """Decodes a sequence of GoogleAdsRow messages.
+
+        Args:
+            rows: a sequence of GoogleAdsRow messages.
+        """
+        fields_by_path = _list_fields_by_path(
+            rows, {column.parent_path for column in self.columns})
+        for column in self.columns:
+            column.append_fields(fields_by_path[column.parent_path])
+
+    def consume(self, responses):
+        """Decodes every batch of a stream.
+
+        Args:
+            responses: an iterable of SearchGoogleAdsStreamResponse messages.
+
+        Returns:
+            This ColumnarSink.
+        """
+        for response in responses:
+            self.append(response)
+        return self
+
+    def clear(self):
+        """Discards the rows decoded so far, keeping the resolved columns."""
+        for column in self.columns:
+            column.clear()
+
+    def to_numpy(self):
+        """Returns the columns as NumPy arrays; see Column.to_numpy.
+
+        Returns:
+            A dict of NumPy arrays keyed by field path, in selection order.
+
+        Raises:
+            ImportError: If NumPy isn't installed.
+        """
+        return {column.name: column.to_numpy() for column in self.columns}
+
+    def to_arrow(self, enum_names=False):
+        """Returns the columns as a pyarrow.RecordBatch; see Column.to_arrow.
+
+        Args:
+            enum_names: whether enum values are returned as their str names
+                rather than their numbers.
+
+        Raises:
+            ImportError: If pyarrow isn't installed.
+        """
+        pyarrow = import_optional('pyarrow')
+        return pyarrow.RecordBatch.from_arrays(
+            [column.to_arrow(enum_names=enum_names)
+             for column in self.columns],
+            names=[column.name for column in self.columns])
+
+
+def search_stream_columnar(client, customer_id, query, version=None,
+                           **kwargs):
+    """Streams a query and decodes its results into columns.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        customer_id: a str customer ID.
+        query: a str GAQL query.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to search_stream.
+
+    Returns:
+        A ColumnarSink holding every row of the results; call to_numpy or
+        to_arrow to retrieve the columns.
+
+    Raises:
+        ValueError: If a selected field doesn't exist.
+    """
+    version = version or _DEFAULT_VERSION
+    sink = ColumnarSink(query, version=version)
+    service = client.get_service(SERVICE_NAME, version=version)
+    return sink.consume(service.search_stream(customer_id, query, **kwargs))
@@ -0,0 +1,258 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Runs the same search_stream query concurrently for many customers.
+
+Streams are started on a bounded pool of worker threads that share a pool of
+GoogleAdsService clients, each with its own channel. Response batches are
+handed to the consuming thread through a bounded queue, so workers block once
+the consumer falls behind rather than buffering whole reports in memory.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import math
+import queue
+import threading
+import time
+
+from ._constants import SERVICE_NAME, STREAMS_PER_CHANNEL
+
+# How long a blocked worker waits before checking whether the search was
+# abandoned by the consumer.
+_QUEUE_POLL_SECONDS = 0.1
+
+_BATCH = 'batch'
+_COMPLETED = 'completed'
+_FAILED = 'failed'
+
+
+class SearchProgress(namedtuple(
+        'SearchProgress',
+        ('customers_total', 'customers_completed', 'customers_failed', 'rows',
+         'elapsed_seconds'))):
+    """A snapshot of the progress of a multi-customer search."""
+
+    @property
+    def customers_pending(self):
+        """The number of customers whose streams haven't finished."""
+        return (self.customers_total - self.customers_completed
+                - self.customers_failed)
+
+    @property
+    def rows_per_second(self):
+        """The average number of rows received per second so far."""
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.rows / self.elapsed_seconds
+
+
+class MultiCustomerSearchStream(object):
+    """An iterator of (customer_id, row) pairs from many concurrent streams.
+
+    Rows are yielded in the order their batches arrive, so rows of different
+    customers are interleaved but the rows of a single customer keep their
+    order. A failed stream doesn't stop the others; its exception is recorded
+    in the errors attribute. Instances can only be iterated once.
+
+    Attributes:
+        errors: a dict mapping the customer IDs of failed streams to the
+            exception that ended them.
+    """
+
+    def __init__(self, service_pool, customer_ids, query, max_concurrency,
+                 max_buffered_batches, progress_callback=None,
+                 error_callback=None, search_kwargs=None,
+                 close_service_pool=False):
+        """Initializer for the MultiCustomerSearchStream.
+
+        Args:
+            service_pool: a ServicePool of GoogleAdsService clients.
+            customer_ids: a list of str customer IDs.
+            query: a str GAQL query issued for every customer.
+            max_concurrency: an int maximum number of concurrent streams.
+            max_buffered_batches: an int maximum number of response batches
+                held in memory before workers are blocked.
+            progress_callback: an optional callable that receives a
+                SearchProgress each time a batch is consumed or a stream ends.
+            error_callback: an optional callable that receives the customer ID
+                and exception of each failed stream.
+            search_kwargs: an optional dict of additional keyword arguments
+                passed to search_stream.
+            close_service_pool: whether the service pool is closed once
+                iteration ends.
+        """
+        self.errors = {}
+        self._service_pool = service_pool
+        self._customer_ids = customer_ids
+        self._query = query
+        self._max_concurrency = max_concurrency
+        self._progress_callback = progress_callback
+        self._error_callback = error_callback
+        self._search_kwargs = search_kwargs or {}
+        self._close_service_pool = close_service_pool
+        self._queue = queue.Queue(maxsize=max_buffered_batches)
+        self._abandoned = threading.Event()
+        self._started = False
+        self._start_time = None
+        self._customers_completed = 0
+        self._rows = 0
+
+    @property
+    def progress(self):
+        """A SearchProgress describing the search so far."""
+        elapsed_seconds = (time.monotonic() - self._start_time
+                           if self._start_time is not None else 0.0)
+        return SearchProgress(len(self._customer_ids),
+                              self._customers_completed, len(self.errors),
+                              self._rows, elapsed_seconds)
+
+    def _put(self, item):
+        """Puts an item on the queue, blocking while the queue is full.
+
+        Returns:
+            False if the consumer abandoned the search before the item could be
+            queued, otherwise True.
+        """
+        while not self._abandoned.is_set():
+            try:
+                self._queue.put(item, timeout=_QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _stream_customer(self, customer_id):
+        """Streams the results of the query for a single customer."""
+        if self._abandoned.is_set():
+            return
+
+        try:
+            service = self._service_pool.get()
+            response = service.search_stream(customer_id, self._query,
+                                             **self._search_kwargs)
+            for batch in response:
+                if not self._put((_BATCH, customer_id, batch)):
+                    response.cancel()
+                    return
+        except Exception as ex:
+            self._put((_FAILED, customer_id, ex))
+        else:
+            self._put((_COMPLETED, customer_id, None))
+
+    def _report_progress(self):
+        if self._progress_callback:
+            self._progress_callback(self.progress)
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError('A MultiCustomerSearchStream can only be '
+                               'iterated once.')
+        self._started = True
+        self._start_time = time.monotonic()
+
+        executor = ThreadPoolExecutor(max_workers=self._max_concurrency,
+                                      thread_name_prefix='search_stream_many')
+        try:
+            for customer_id in self._customer_ids:
+                executor.submit(self._stream_customer, customer_id)
+
+            pending = len(self._customer_ids)
+            while pending:
+                kind, customer_id, payload = self._queue.get()
+
+                if kind is _BATCH:
+                    results = payload.results
+                    self._rows += len(results)
+                    self._report_progress()
+                    for row in results:
+                        yield customer_id, row
+                    continue
+
+                pending -= 1
+                if kind is _FAILED:
+                    self.errors[customer_id] = payload
+                    if self._error_callback:
+                        self._error_callback(customer_id, payload)
+                else:
+                    self._customers_completed += 1
+                self._report_progress()
+        finally:
+            # Stops workers if the consumer stopped iterating early; it has no
+            # effect once every stream has finished.
+            self._abandoned.set()
+            executor.shutdown(wait=False)
+            # Closing the channels cancels the streams that are still running.
+            if self._close_service_pool:
+                self._service_pool.close()
+
+
+def search_stream_many(client, customer_ids, query, max_concurrency=10,
+                       max_buffered_batches=None, channel_count=None,
+                       progress_callback=None, error_callback=None,
+                       version=None, **kwargs):
+    """Runs a search_stream query for many customers concurrently.
+
+    Example:
+        results = search_stream_many(client, customer_ids, query)
+        for customer_id, row in results:
+            ...
+        for customer_id, ex in results.errors.items():
+            ...
+
+    Args:
+        client: a GoogleAdsClient instance.
+        customer_ids: an iterable of str customer IDs.
+        query: a str GAQL query issued for every customer.
+        max_concurrency: an int maximum number of concurrent streams.
+        max_buffered_batches: an optional int maximum number of response
+            batches held in memory; defaults to twice max_concurrency.
+        channel_count: an optional int number of channels to spread streams
+            across; defaults to one per ten concurrent streams.
+        progress_callback: an optional callable that receives a
+            SearchProgress each time a batch is consumed or a stream ends. It
+            is called on the consuming thread.
+        error_callback: an optional callable that receives the customer ID and
+            exception of each failed stream. It is called on the consuming
+            thread.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to search_stream, e.g.
+            summary_row_setting or timeout.
+
+    Returns:
+        A MultiCustomerSearchStream that yields (customer_id, row) tuples. The
+        channels it uses are closed once iteration ends.
+
+    Raises:
+        ValueError: If max_concurrency is less than one.
+    """
+    if max_concurrency < 1:
+        raise ValueError('max_concurrency must be at least one.')
+
+    customer_ids = list(customer_ids)
+
+    if channel_count is None:
+        channel_count = math.ceil(
+            min(max_concurrency, max(len(customer_ids), 1))
+            / STREAMS_PER_CHANNEL)
+
+    service_pool_kwargs = {'version': version} if version else {}
+    service_pool = client.get_service_pool(SERVICE_NAME, channel_count,
+                                           **service_pool_kwargs)
+
+    return MultiCustomerSearchStream(
+        service_pool, customer_ids, query, max_concurrency,
+        max_buffered_batches or 2 * max_concurrency,
+        progress_callback=progress_callback, error_callback=error_callback,
+        search_kwargs=kwargs, close_service_pool=True)
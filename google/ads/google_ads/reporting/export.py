@@ -0,0 +1,379 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Exports search and search_stream results to CSV, JSONL or Parquet files.
+
+Results are written one batch at a time: each search_stream response or
+search page is decoded into columns, written and flushed before the next one
+is, so memory use depends on the batch size rather than the report size.
+Decoding and writing run on a worker thread while the calling thread reads the
+next batches from the network.
+"""
+
+import abc
+import base64
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import queue
+import threading
+
+from google.protobuf import json_format
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.util import import_optional
+
+from . import columnar
+from ._constants import SERVICE_NAME
+
+CSV = 'csv'
+JSONL = 'jsonl'
+PARQUET = 'parquet'
+
+# The functions that open a compressed text file, by compression name.
+_TEXT_COMPRESSION_OPENERS = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+
+# The number of batches read from the network that may wait to be written.
+_DEFAULT_MAX_BUFFERED_BATCHES = 2
+
+# Signals the end of the batches to the worker thread.
+_DONE = object()
+
+
+def _to_json_value(value, kind):
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [_to_json_value(item, kind) for item in value]
+    if kind == columnar.MESSAGE:
+        return json_format.MessageToDict(value)
+    if kind == columnar.BYTES:
+        return base64.b64encode(value).decode('ascii')
+    return value
+
+
+class ReportWriter(abc.ABC):
+    """Writes batches of decoded results to a file.
+
+    Writers are context managers that close the file on exit. The output is
+    flushed after every batch.
+    """
+
+    @abc.abstractmethod
+    def write(self, sink):
+        """Writes a batch of results.
+
+        Args:
+            sink: a ColumnarSink holding the batch.
+        """
+
+    @abc.abstractmethod
+    def close(self):
+        """Closes the file."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _TextReportWriter(ReportWriter):
+    """A ReportWriter for text formats that are written row by row."""
+
+    def __init__(self, path, compression=None):
+        """Initializer for the _TextReportWriter.
+
+        Args:
+            path: the str or path-like path of the file to write.
+            compression: an optional compression; one of "gzip", "bz2" or
+                "xz".
+
+        Raises:
+            ValueError: If the compression is unknown.
+        """
+        if compression is None:
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+        else:
+            try:
+                opener = _TEXT_COMPRESSION_OPENERS[compression]
+            except KeyError:
+                raise ValueError(
+                    f'Unknown compression "{compression}". Valid compressions '
+                    f'are: {", ".join(_TEXT_COMPRESSION_OPENERS)}')
+            self._file = opener(path, 'wt', encoding='utf-8', newline='')
+
+    def write(self, sink):
+        names = [column.name for column in sink.columns]
+        columns = [
+            [_to_json_value(value, column.kind)
+             for value in column.to_list(enum_names=True)]
+            if column.repeated or column.kind in (columnar.MESSAGE,
+                                                  columnar.BYTES)
+            else column.to_list(enum_names=True)
+            for column in sink.columns]
+        self._write_rows(names, zip(*columns))
+        self._file.flush()
+
+    @abc.abstractmethod
+    def _write_rows(self, names, rows):
+        """Writes rows of values in the order of the field paths.
+
+        Args:
+            names: a list of the str field paths of the columns.
+            rows: an iterable of tuples of row values.
+        """
+
+    def close(self):
+        self._file.close()
+
+
+class CsvReportWriter(_TextReportWriter):
+    """Writes results to a CSV file with a header row of field paths.
+
+    Enums are written as their names, null values as empty cells, and
+    repeated and message values as JSON.
+    """
+
+    def __init__(self, path, compression=None):
+        super().__init__(path, compression=compression)
+        self._writer = csv.writer(self._file)
+        self._wrote_header = False
+
+    def _write_rows(self, names, rows):
+        if not self._wrote_header:
+            self._writer.writerow(names)
+            self._wrote_header = True
+        self._writer.writerows(
+            [json.dumps(value) if isinstance(value, (list, dict)) else value
+             for value in row]
+            for row in rows)
+
+
+class JsonlReportWriter(_TextReportWriter):
+    """Writes results to a file with one JSON object per row.
+
+    Objects are keyed by field path. Enums are written as their names and
+    bytes as base64.
+    """
+
+    def _write_rows(self, names, rows):
+        self._file.writelines(f'{json.dumps(dict(zip(names, row)))}\n'
+                              for row in rows)
+
+
+class ParquetReportWriter(ReportWriter):
+    """Writes results to a Parquet file with one row group per batch.
+
+    Enums are written as their names; see ColumnarSink.to_arrow for the
+    other column types. Requires pyarrow.
+    """
+
+    def __init__(self, path, compression=None):
+        """Initializer for the ParquetReportWriter.
+
+        Args:
+            path: the str or path-like path of the file to write.
+            compression: an optional Parquet compression codec supported by
+                pyarrow, e.g. "snappy", "gzip" or "zstd".
+
+        Raises:
+            ImportError: If pyarrow isn't installed.
+        """
+        self._parquet = import_optional('pyarrow.parquet')
+        self._path = path
+        self._compression = compression or 'none'
+        self._writer = None
+
+    def write(self, sink):
+        batch = sink.to_arrow(enum_names=True)
+        if self._writer is None:
+            self._writer = self._parquet.ParquetWriter(
+                self._path, batch.schema, compression=self._compression)
+        self._writer.write_batch(batch)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+_WRITERS = {
+    CSV: CsvReportWriter,
+    JSONL: JsonlReportWriter,
+    PARQUET: ParquetReportWriter,
+}
+
+
+def create_writer(path, output_format, compression=None):
+    """Creates a ReportWriter.
+
+    Args:
+        path: the str or path-like path of the file to write.
+        output_format: one of "csv", "jsonl" or "parquet".
+        compression: an optional compression; see the writer classes.
+
+    Returns:
+        A ReportWriter instance.
+
+    Raises:
+        ValueError: If the output format or compression is unknown.
+    """
+    try:
+        writer_class = _WRITERS[output_format]
+    except KeyError:
+        raise ValueError(f'Unknown output format "{output_format}". Valid '
+                         f'formats are: {", ".join(_WRITERS)}')
+    return writer_class(path, compression=compression)
+
+
+def export_batches(responses, query, writer, version=_DEFAULT_VERSION,
+                   max_buffered_batches=_DEFAULT_MAX_BUFFERED_BATCHES):
+    """Writes batches of results, decoding them on a worker thread.
+
+    The writer is not closed.
+
+    Args:
+        responses: an iterable of messages with a repeated GoogleAdsRow
+            results field, e.g. SearchGoogleAdsStreamResponses.
+        query: the str GAQL query that produced the results.
+        writer: a ReportWriter instance.
+        version: a str Google Ads API version.
+        max_buffered_batches: an int maximum number of batches that may wait
+            to be written.
+
+    Returns:
+        The int number of rows written.
+
+    Raises:
+        ValueError: If a selected field doesn't exist.
+        Exception: the first exception raised while reading the responses or
+            while decoding or writing a batch.
+    """
+    sink = columnar.ColumnarSink(query, version=version)
+    batches = queue.Queue(maxsize=max_buffered_batches)
+    # Holds the exception raised by the worker thread, if any.
+    worker_errors = []
+    row_count = 0
+
+    def write_batches():
+        nonlocal row_count
+        wrote_batch = False
+        while True:
+            response = batches.get()
+            if response is _DONE:
+                break
+            # Once writing fails, remaining batches are discarded so the
+            # calling thread is never blocked on a full queue.
+            if worker_errors:
+                continue
+            try:
+                sink.append(response)
+                writer.write(sink)
+                wrote_batch = True
+                row_count += sink.num_rows
+                sink.clear()
+            except Exception as ex:
+                worker_errors.append(ex)
+
+        if not wrote_batch and not worker_errors:
+            # Writes the header or schema of an empty report.
+            try:
+                writer.write(sink)
+            except Exception as ex:
+                worker_errors.append(ex)
+
+    worker = threading.Thread(target=write_batches, name='ReportExporter',
+                              daemon=True)
+    worker.start()
+    try:
+        for response in responses:
+            if worker_errors:
+                break
+            batches.put(response)
+    finally:
+        batches.put(_DONE)
+        worker.join()
+
+    if worker_errors:
+        raise worker_errors[0]
+    return row_count
+
+
+def export_search_stream(client, customer_id, query, path, output_format,
+                         compression=None, version=None, **kwargs):
+    """Streams a query into a CSV, JSONL or Parquet file.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        customer_id: a str customer ID.
+        query: a str GAQL query.
+        path: the str or path-like path of the file to write.
+        output_format: one of "csv", "jsonl" or "parquet".
+        compression: an optional compression; "gzip", "bz2" or "xz" for CSV
+            and JSONL, or a Parquet codec such as "snappy" or "zstd".
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to search_stream.
+
+    Returns:
+        The int number of rows written.
+
+    Raises:
+        ValueError: If the output format or compression is unknown or a
+            selected field doesn't exist.
+    """
+    version = version or _DEFAULT_VERSION
+    service = client.get_service(SERVICE_NAME, version=version)
+    with create_writer(path, output_format, compression) as writer:
+        return export_batches(
+            service.search_stream(customer_id, query, **kwargs), query,
+            writer, version=version)
+
+
+def export_search(client, customer_id, query, path, output_format,
+                  compression=None, version=None, **kwargs):
+    """Pages through a query's results into a CSV, JSONL or Parquet file.
+
+    Each page is written as a batch.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        customer_id: a str customer ID.
+        query: a str GAQL query.
+        path: the str or path-like path of the file to write.
+        output_format: one of "csv", "jsonl" or "parquet".
+        compression: an optional compression; see export_search_stream.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to search, e.g.
+            page_size.
+
+    Returns:
+        The int number of rows written.
+
+    Raises:
+        ValueError: If the output format or compression is unknown or a
+            selected field doesn't exist.
+    """
+    version = version or _DEFAULT_VERSION
+    service = client.get_service(SERVICE_NAME, version=version)
+    pages = service.search(customer_id, query, **kwargs).pages
+    with create_writer(path, output_format, compression) as writer:
+        return export_batches((page.raw_page for page in pages), query,
+                              writer, version=version)
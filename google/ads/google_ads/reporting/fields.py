@@ -0,0 +1,145 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Resolves the field paths selected by a query against GoogleAdsRow."""
+
+from collections import namedtuple
+from importlib import import_module
+
+from google.protobuf.descriptor import FieldDescriptor
+
+_WRAPPER_PREFIX = 'google.protobuf.'
+_WRAPPER_SUFFIX = 'Value'
+
+# Value kinds.
+INT64 = 'int64'
+UINT64 = 'uint64'
+DOUBLE = 'double'
+BOOL = 'bool'
+ENUM = 'enum'
+STRING = 'string'
+BYTES = 'bytes'
+MESSAGE = 'message'
+
+_KINDS_BY_CPP_TYPE = {
+    FieldDescriptor.CPPTYPE_INT32: INT64,
+    FieldDescriptor.CPPTYPE_INT64: INT64,
+    FieldDescriptor.CPPTYPE_UINT32: INT64,
+    FieldDescriptor.CPPTYPE_UINT64: UINT64,
+    FieldDescriptor.CPPTYPE_DOUBLE: DOUBLE,
+    FieldDescriptor.CPPTYPE_FLOAT: DOUBLE,
+    FieldDescriptor.CPPTYPE_BOOL: BOOL,
+    FieldDescriptor.CPPTYPE_ENUM: ENUM,
+}
+
+
+class SelectedField(namedtuple('SelectedField', (
+        'name', 'parent_path', 'field_name', 'kind', 'repeated', 'nullable',
+        'unwrap', 'unbox', 'default', 'enum_type'))):
+    """A field path selected by a query, resolved against GoogleAdsRow.
+
+    Attributes:
+        name: the str field path, e.g. "metrics.clicks".
+        parent_path: a tuple of the str names of the message fields from the
+            row to the message that holds the value.
+        field_name: the str name of the field in that message.
+        kind: the kind of the values; one of the kind constants in this
+            module.
+        repeated: whether each value is a list of values.
+        nullable: whether the value is null when the field is unset. Singular
+            messages, including wrappers, are nullable; unset scalars have
+            their default value.
+        unwrap: whether the field is a wrapper whose value is its value field.
+        unbox: whether the field is a list of wrappers whose values are their
+            value fields.
+        default: the value of an unset scalar field.
+        enum_type: the EnumDescriptor of an enum field, otherwise None.
+    """
+    __slots__ = ()
+
+
+def _is_wrapper(message_descriptor):
+    return (message_descriptor.full_name.startswith(_WRAPPER_PREFIX)
+            and message_descriptor.name.endswith(_WRAPPER_SUFFIX))
+
+
+def _get_kind(field_descriptor):
+    if field_descriptor.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        return MESSAGE
+    if field_descriptor.cpp_type == FieldDescriptor.CPPTYPE_STRING:
+        return (BYTES if field_descriptor.type == FieldDescriptor.TYPE_BYTES
+                else STRING)
+    return _KINDS_BY_CPP_TYPE[field_descriptor.cpp_type]
+
+
+def get_row_descriptor(version):
+    """Returns the GoogleAdsRow Descriptor of a Google Ads API version."""
+    return import_module(
+        f'google.ads.google_ads.{version}.proto.services.'
+        'google_ads_service_pb2').GoogleAdsRow.DESCRIPTOR
+
+
+def resolve_field(name, row_descriptor):
+    """Resolves a selected field path.
+
+    Args:
+        name: the str field path, e.g. "campaign.id".
+        row_descriptor: the GoogleAdsRow Descriptor.
+
+    Returns:
+        A SelectedField instance.
+
+    Raises:
+        ValueError: If the field path doesn't exist.
+    """
+    parent_path = []
+    message_descriptor = row_descriptor
+    field_descriptor = None
+
+    for part in name.split('.'):
+        if field_descriptor is not None:
+            if (field_descriptor.message_type is None
+                    or field_descriptor.label
+                    == FieldDescriptor.LABEL_REPEATED):
+                raise ValueError(f'Field "{name}" does not exist.')
+            parent_path.append(field_descriptor.name)
+            message_descriptor = field_descriptor.message_type
+
+        try:
+            field_descriptor = message_descriptor.fields_by_name[part]
+        except KeyError:
+            raise ValueError(f'Field "{name}" does not exist.')
+
+    repeated = field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+    is_message = field_descriptor.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE
+    is_wrapper = is_message and _is_wrapper(field_descriptor.message_type)
+    value_descriptor = (field_descriptor.message_type.fields_by_name['value']
+                        if is_wrapper else field_descriptor)
+
+    return SelectedField(
+        name=name,
+        parent_path=tuple(parent_path),
+        field_name=field_descriptor.name,
+        kind=_get_kind(value_descriptor),
+        repeated=repeated,
+        nullable=is_message and not repeated,
+        unwrap=is_wrapper and not repeated,
+        unbox=is_wrapper and repeated,
+        default=(None if repeated or is_message
+                 else field_descriptor.default_value),
+        enum_type=value_descriptor.enum_type)
+
+
+def list_fields(message):
+    """Returns a dict of the set fields of a message, keyed by field name."""
+    return {field.name: value for field, value in message.ListFields()}
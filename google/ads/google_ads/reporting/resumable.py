@@ -0,0 +1,283 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Resumes search_stream queries where they broke off.
+
+SearchStream isn't retried by the generated clients, since a stream that
+fails part way through can't be reissued as-is without repeating rows. A
+resumable stream orders the query by a key that identifies each row, records
+the key of the last row it yielded, and after a retryable failure reissues
+the query with a predicate that skips the rows already yielded. The key is
+exposed as a serializable Checkpoint, so another process can resume the
+stream too.
+"""
+
+from collections import namedtuple
+import json
+import time
+
+from google.ads.google_ads import errors, gaql
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+from ._constants import SERVICE_NAME
+from .fields import DOUBLE, INT64, STRING, UINT64, get_row_descriptor, \
+    resolve_field
+from .rows import TUPLE, compile_query
+
+# The kinds of fields that are sorted by the API the same way their values
+# are compared in Python.
+_KEY_KINDS = (INT64, UINT64, DOUBLE, STRING)
+_DATE_FIELD = 'segments.date'
+
+
+class Checkpoint(namedtuple('Checkpoint', ('query', 'key_fields', 'last_key',
+                                           'row_count'))):
+    """The progress of a resumable stream.
+
+    Attributes:
+        query: the str normalized GAQL query being streamed.
+        key_fields: a tuple of the str field paths the rows are ordered by.
+        last_key: a tuple of the key field values of the last row yielded,
+            or None if no row has been yielded yet.
+        row_count: the int number of rows yielded so far.
+    """
+    __slots__ = ()
+
+    def to_json(self):
+        """Serializes the checkpoint to a str of JSON."""
+        return json.dumps(self._asdict())
+
+    @classmethod
+    def from_json(cls, value):
+        """Deserializes a checkpoint serialized with to_json.
+
+        Args:
+            value: a str of JSON.
+
+        Returns:
+            A Checkpoint instance.
+        """
+        fields = json.loads(value)
+        last_key = fields['last_key']
+        return cls(query=fields['query'],
+                   key_fields=tuple(fields['key_fields']),
+                   last_key=None if last_key is None else tuple(last_key),
+                   row_count=fields['row_count'])
+
+
+def _get_default_key_fields(query, version):
+    """Returns the resource's ID and the selected date segment, if any.
+
+    Raises:
+        ValueError: If the resource has no ID field.
+    """
+    resource_name = gaql.get_resource_name(query)
+    id_field = f'{resource_name}.id'
+    try:
+        resolve_field(id_field, get_row_descriptor(version))
+    except ValueError:
+        raise ValueError(f'Resource "{resource_name}" has no id field to '
+                         'order its rows by; pass key_fields that identify '
+                         'each row.')
+    key_fields = [id_field]
+    if _DATE_FIELD in gaql.parse_select_fields(query):
+        key_fields.append(_DATE_FIELD)
+    return key_fields
+
+
+class ResumableSearchStream(object):
+    """An iterator of the rows of a stream that resumes after failures.
+
+    Rows are yielded in ascending key order. Instances can only be iterated
+    once.
+
+    Attributes:
+        retry_count: the number of times the stream has been resumed so far.
+    """
+
+    def __init__(self, service, customer_id, query, key_fields=None,
+                 checkpoint=None, max_retries=3, retry_delay=1.0,
+                 retry_predicate=errors.is_retryable_error,
+                 version=_DEFAULT_VERSION, search_kwargs=None):
+        """Initializer for the ResumableSearchStream.
+
+        Args:
+            service: a GoogleAdsService client.
+            customer_id: a str customer ID.
+            query: a str GAQL query without ORDER BY or LIMIT clauses.
+            key_fields: an optional sequence of str field paths whose values
+                identify each row. Only the first field is used to filter the
+                reissued query, so it should be the most selective. Defaults
+                to the ID of the resource, followed by segments.date if it is
+                selected; required if the resource has no ID.
+            checkpoint: an optional Checkpoint of the same query to resume
+                from.
+            max_retries: an int maximum number of consecutive retries without
+                receiving a new row.
+            retry_delay: a float number of seconds to wait before the first
+                retry; the delay doubles with each consecutive retry.
+            retry_predicate: a callable that receives the exception raised by
+                the stream and returns whether it should be resumed.
+            version: a str Google Ads API version.
+            search_kwargs: an optional dict of additional keyword arguments
+                passed to search_stream.
+
+        Raises:
+            ValueError: If the query has ORDER BY or LIMIT clauses, a key
+                field doesn't exist or can't be used as a key, key_fields
+                isn't given for a resource without an ID, or the checkpoint
+                is for a different query.
+        """
+        query = gaql.normalize_query(query)
+        for clause in (gaql.ORDER_BY, gaql.LIMIT):
+            if gaql.find_clause(query, clause) is not None:
+                raise ValueError(f'Resumable queries can not have {clause} '
+                                 'clauses.')
+
+        if key_fields is None:
+            key_fields = (checkpoint.key_fields if checkpoint
+                          else _get_default_key_fields(query, version))
+        self._key_fields = tuple(key_fields)
+
+        if checkpoint is not None and (
+                checkpoint.query != query
+                or tuple(checkpoint.key_fields) != self._key_fields):
+            raise ValueError('The checkpoint is for a different query or key.')
+
+        key_query = compile_query(
+            f'SELECT {", ".join(self._key_fields)} FROM '
+            f'{gaql.get_resource_name(query)}',
+            row_type=TUPLE, enum_names=False, version=version)
+        for field in key_query.fields:
+            if field.repeated or field.kind not in _KEY_KINDS:
+                raise ValueError(f'Field "{field.name}" can not be used as a '
+                                 'key; only numbers and strings can.')
+        self._get_key = key_query.flatten
+
+        self.retry_count = 0
+        self._service = service
+        self._customer_id = customer_id
+        self._query = query
+        self._ordered_query = gaql.add_order_by(query, self._key_fields)
+        self._last_key = checkpoint.last_key if checkpoint else None
+        self._row_count = checkpoint.row_count if checkpoint else 0
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._retry_predicate = retry_predicate
+        self._search_kwargs = search_kwargs or {}
+        self._started = False
+
+    @property
+    def checkpoint(self):
+        """A Checkpoint of the rows yielded so far."""
+        return Checkpoint(self._query, self._key_fields, self._last_key,
+                          self._row_count)
+
+    def _get_query(self):
+        """Returns the query that streams the rows after the last key."""
+        if self._last_key is None:
+            return self._ordered_query
+        # Rows that share the first key field with the last row may not have
+        # been yielded yet, so they are requested again and skipped here.
+        operator = '>' if len(self._key_fields) == 1 else '>='
+        return gaql.add_predicate(
+            self._ordered_query, f'{self._key_fields[0]} {operator} '
+            f'{gaql.format_literal(self._last_key[0])}')
+
+    def _stream(self):
+        """Yields the rows of one attempt that weren't yielded before."""
+        resume_key = self._last_key
+        response = self._service.search_stream(
+            self._customer_id, self._get_query(), **self._search_kwargs)
+        for batch in response:
+            for row in batch.results:
+                key = self._get_key(row)
+                if None in key:
+                    raise ValueError(f'A row has no value for a key field of '
+                                     f'{self._key_fields}.')
+                if resume_key is not None and key <= resume_key:
+                    continue
+                if self._last_key is not None and key <= self._last_key:
+                    raise ValueError(
+                        f'The key fields {self._key_fields} do not identify '
+                        'rows uniquely.')
+                self._last_key = key
+                self._row_count += 1
+                yield row
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError('A ResumableSearchStream can only be iterated '
+                               'once.')
+        self._started = True
+
+        attempt = 0
+        while True:
+            row_count = self._row_count
+            try:
+                yield from self._stream()
+                return
+            except Exception as ex:
+                if self._row_count > row_count:
+                    attempt = 0
+                if (attempt == self._max_retries
+                        or not self._retry_predicate(ex)):
+                    raise
+
+            self.retry_count += 1
+            time.sleep(self._retry_delay * 2 ** attempt)
+            attempt += 1
+
+
+def search_stream_resumable(client, customer_id, query, key_fields=None,
+                            checkpoint=None, max_retries=3, retry_delay=1.0,
+                            retry_predicate=errors.is_retryable_error,
+                            version=None, **kwargs):
+    """Streams a query, resuming it after the last row if the stream breaks.
+
+    Each row is yielded exactly once, in ascending key order, as long as the
+    key fields identify rows uniquely. The stream's checkpoint attribute can
+    be saved with Checkpoint.to_json and passed back in to resume the query
+    in another process.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        customer_id: a str customer ID.
+        query: a str GAQL query without ORDER BY or LIMIT clauses.
+        key_fields: an optional sequence of str numeric or string field paths
+            whose values identify each row; see ResumableSearchStream.
+        checkpoint: an optional Checkpoint to resume from.
+        max_retries: an int maximum number of consecutive retries without
+            receiving a new row.
+        retry_delay: a float number of seconds to wait before the first
+            retry; the delay doubles with each consecutive retry.
+        retry_predicate: a callable that receives the exception raised by the
+            stream and returns whether it should be resumed. Defaults to
+            resuming after transient errors.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to search_stream.
+
+    Returns:
+        A ResumableSearchStream that yields GoogleAdsRow instances.
+
+    Raises:
+        ValueError: If the query can't be resumed; see ResumableSearchStream.
+    """
+    version = version or _DEFAULT_VERSION
+    service = client.get_service(SERVICE_NAME, version=version)
+    return ResumableSearchStream(
+        service, customer_id, query, key_fields=key_fields,
+        checkpoint=checkpoint, max_retries=max_retries,
+        retry_delay=retry_delay, retry_predicate=retry_predicate,
+        version=version, search_kwargs=kwargs)
@@ -0,0 +1,309 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Flattens GoogleAdsRows into tuples, records or dicts.
+
+A query is compiled once into getter chains: the steps from the row to each
+selected message, and an extractor per message that reads the values of its
+selected fields. Descriptors are only consulted while compiling. Flattening a
+row lists the set fields of each selected message once, then the extractors
+unwrap wrappers, decode enum names and copy repeated fields.
+"""
+
+import functools
+import keyword
+
+from google.ads.google_ads import gaql
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+from .fields import ENUM, get_row_descriptor, list_fields, resolve_field
+
+TUPLE = 'tuple'
+RECORD = 'record'
+DICT = 'dict'
+_ROW_TYPES = (TUPLE, RECORD, DICT)
+
+
+class Record(object):
+    """The base class of the records created by compiled queries.
+
+    Each compiled query has its own subclass, whose __slots__ are the
+    selected field paths with dots replaced by underscores, e.g.
+    "campaign_id" for "campaign.id".
+    """
+    __slots__ = ()
+    # The selected field paths, in the same order as __slots__.
+    _fields = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={value!r}' for name, value
+                           in zip(self.__slots__, self))
+        return f'{type(self).__name__}({values})'
+
+    def _asdict(self):
+        """Returns a dict of the values keyed by field path."""
+        return dict(zip(self._fields, self))
+
+
+def _create_record_class(names):
+    attribute_names = tuple(name.replace('.', '_') for name in names)
+    if len(set(attribute_names)) != len(attribute_names):
+        raise ValueError('The selected fields can not be flattened into '
+                         'records because two of them have the same '
+                         'attribute name; use tuples or dicts instead.')
+    for attribute_name in attribute_names:
+        if keyword.iskeyword(attribute_name):
+            raise ValueError(f'"{attribute_name}" can not be used as a record '
+                             'attribute name; use tuples or dicts instead.')
+    return type('Record', (Record,), {'__slots__': attribute_names,
+                                      '_fields': tuple(names)})
+
+
+def _get_enum_names(field):
+    return {value.number: value.name for value in field.enum_type.values}
+
+
+def _compile_repeated_getter(field, enum_names):
+    field_name = field.field_name
+    if field.unbox:
+        return lambda get: [item.value for item in get(field_name, ())]
+    if enum_names and field.kind == ENUM:
+        names = _get_enum_names(field)
+        return lambda get: [names.get(item, item)
+                            for item in get(field_name, ())]
+    return lambda get: list(get(field_name, ()))
+
+
+def _compile_extractor(indexed_fields, enum_names):
+    """Compiles a function that gets the values of fields of one message.
+
+    Fields are grouped by how their values are read, so each group is read
+    with a single list comprehension rather than a function call per field.
+
+    Args:
+        indexed_fields: a list of (index, SelectedField) pairs whose fields
+            have the same parent_path.
+        enum_names: whether enum values are returned as their str names.
+
+    Returns:
+        A (extract, indexes) pair. extract receives the dict returned by
+        list_fields for the parent message, or None if it isn't set, and
+        returns a list of values. indexes is the list of the indexes of the
+        fields in the order their values are returned.
+    """
+    wrapped = []
+    scalars = []
+    enums = []
+    repeated = []
+    for indexed_field in indexed_fields:
+        field = indexed_field[1]
+        if field.unwrap:
+            wrapped.append(indexed_field)
+        elif field.repeated:
+            repeated.append(indexed_field)
+        elif enum_names and field.kind == ENUM:
+            enums.append(indexed_field)
+        else:
+            # Nullable messages have no default, so they're None when unset.
+            scalars.append(indexed_field)
+
+    wrapped_names = tuple(field.field_name for _, field in wrapped)
+    scalar_items = tuple((field.field_name, field.default)
+                         for _, field in scalars)
+    enum_items = tuple((field.field_name, field.default,
+                        _get_enum_names(field)) for _, field in enums)
+    repeated_getters = tuple(_compile_repeated_getter(field, enum_names)
+                             for _, field in repeated)
+    nulls = (None,) * len(indexed_fields)
+
+    def extract(parent_fields):
+        if parent_fields is None:
+            return nulls
+        get = parent_fields.get
+        values = [None if (value := get(name)) is None else value.value
+                  for name in wrapped_names]
+        if scalar_items:
+            values.extend([get(name, default)
+                           for name, default in scalar_items])
+        if enum_items:
+            values.extend([names[value]
+                           if (value := get(name, default)) in names
+                           else value
+                           for name, default, names in enum_items])
+        if repeated_getters:
+            values.extend([get_value(get) for get_value in repeated_getters])
+        return values
+
+    return extract, [index for index, _ in wrapped + scalars + enums
+                     + repeated]
+
+
+class CompiledQuery(object):
+    """Flattens the GoogleAdsRows returned by a query.
+
+    Attributes:
+        fields: a tuple of the SelectedField instances of the query.
+        names: a tuple of the str selected field paths.
+        row_type: one of "tuple", "record" or "dict".
+        record_class: the Record subclass of the query's records, or None if
+            row_type isn't "record".
+    """
+
+    def __init__(self, query, row_type=TUPLE, enum_names=True,
+                 version=_DEFAULT_VERSION):
+        """Initializer for the CompiledQuery.
+
+        Args:
+            query: a str GAQL query.
+            row_type: one of "tuple", "record" or "dict".
+            enum_names: whether enum values are returned as their str names
+                rather than their numbers.
+            version: a str Google Ads API version.
+
+        Raises:
+            ValueError: If a selected field doesn't exist, row_type is
+                invalid, or the fields can't be used as record attributes.
+        """
+        if row_type not in _ROW_TYPES:
+            raise ValueError(f'Unknown row type "{row_type}". Valid row types '
+                             f'are: {", ".join(_ROW_TYPES)}')
+
+        row_descriptor = get_row_descriptor(version)
+        self.fields = tuple(resolve_field(name, row_descriptor)
+                            for name in gaql.parse_select_fields(query))
+        self.names = tuple(field.name for field in self.fields)
+        self.row_type = row_type
+        self.record_class = (_create_record_class(self.names)
+                             if row_type == RECORD else None)
+
+        # Index 0 is the row itself; every other parent message is listed
+        # after its own parent.
+        parent_indexes = {(): 0}
+        parent_steps = []
+        for field in self.fields:
+            for depth in range(1, len(field.parent_path) + 1):
+                path = field.parent_path[:depth]
+                if path not in parent_indexes:
+                    parent_steps.append((parent_indexes[path[:-1]], path[-1]))
+                    parent_indexes[path] = len(parent_indexes)
+        # (parent index, field name) pairs that locate each parent message.
+        self._parent_steps = tuple(parent_steps)
+
+        fields_by_parent = {}
+        for index, field in enumerate(self.fields):
+            fields_by_parent.setdefault(field.parent_path, []).append(
+                (index, field))
+        # (parent index, extract) pairs, one per parent message.
+        extractors = []
+        extracted_indexes = []
+        for parent_path, indexed_fields in fields_by_parent.items():
+            extract, indexes = _compile_extractor(indexed_fields, enum_names)
+            extractors.append((parent_indexes[parent_path], extract))
+            extracted_indexes.extend(indexes)
+        self._extractors = tuple(extractors)
+        # Restores the selection order of the extracted values.
+        positions = {index: position
+                     for position, index in enumerate(extracted_indexes)}
+        self._order = [positions[index] for index in range(len(self.fields))]
+
+    def _get_values(self, row):
+        parents = [list_fields(row)]
+        add_parent = parents.append
+        for parent_index, field_name in self._parent_steps:
+            fields = parents[parent_index]
+            message = None if fields is None else fields.get(field_name)
+            add_parent(None if message is None else list_fields(message))
+        values = []
+        add_values = values.extend
+        for parent_index, extract in self._extractors:
+            add_values(extract(parents[parent_index]))
+        return [values[position] for position in self._order]
+
+    def flatten(self, row):
+        """Flattens a GoogleAdsRow.
+
+        Unset wrappers and messages, and every field under an unset message,
+        are None. Unset scalars have their default value.
+
+        Args:
+            row: a GoogleAdsRow message.
+
+        Returns:
+            A tuple of the selected values, a record with one attribute per
+            selected field, or a dict keyed by field path, as set by
+            row_type.
+        """
+        values = self._get_values(row)
+        if self.row_type == TUPLE:
+            return tuple(values)
+        if self.row_type == DICT:
+            return dict(zip(self.names, values))
+        return self.record_class(*values)
+
+    def flatten_rows(self, rows):
+        """Flattens a sequence of GoogleAdsRows.
+
+        Args:
+            rows: an iterable of GoogleAdsRow messages.
+
+        Returns:
+            A list of flattened rows; see flatten.
+        """
+        return list(map(self.flatten, rows))
+
+    def flatten_stream(self, responses):
+        """Flattens the rows of a stream.
+
+        Args:
+            responses: an iterable of SearchGoogleAdsStreamResponse messages.
+
+        Yields:
+            Flattened rows; see flatten.
+        """
+        for response in responses:
+            yield from map(self.flatten, response.results)
+
+
+@functools.lru_cache(maxsize=128)
+def compile_query(query, row_type=TUPLE, enum_names=True,
+                  version=_DEFAULT_VERSION):
+    """Compiles a query for flattening its rows; see CompiledQuery.
+
+    Compiled queries are cached, so calling this for every request is cheap.
+
+    Args:
+        query: a str GAQL query.
+        row_type: one of "tuple", "record" or "dict".
+        enum_names: whether enum values are returned as their str names
+            rather than their numbers.
+        version: a str Google Ads API version.
+
+    Returns:
+        A CompiledQuery instance.
+
+    Raises:
+        ValueError: If a selected field doesn't exist, row_type is invalid,
+            or the fields can't be used as record attributes.
+    """
+    return CompiledQuery(query, row_type=row_type, enum_names=enum_names,
+                         version=version)
@@ -0,0 +1,253 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Splits date-segmented search_stream queries into concurrent date shards.
+
+A query that filters segments.date with DURING or BETWEEN is rewritten into
+one query per day, week or month of its date range. Shards are streamed
+concurrently and a failed shard is retried on its own, without restarting the
+rest of the report. The rows of a shard are only released once the shard has
+been fully received, so retries never produce duplicate rows.
+"""
+
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import math
+import threading
+
+from google.ads.google_ads import errors, gaql
+
+from ._constants import SERVICE_NAME, STREAMS_PER_CHANNEL
+
+# The number of shards that may be running or waiting to be consumed, per
+# concurrent stream, before no more shards are started.
+_SHARDS_BUFFERED_PER_STREAM = 2
+
+# A single shard of a sharded query.
+Shard = namedtuple('Shard', ('date_range', 'query'))
+
+
+class ShardedSearchStream(object):
+    """An iterator of the rows of a query that is streamed in date shards.
+
+    Instances can only be iterated once.
+
+    Attributes:
+        shards: a list of Shard instances in ascending date order.
+        retry_count: the number of times a shard has been retried so far.
+    """
+
+    def __init__(self, service_pool, customer_id, shards, max_concurrency,
+                 ordered, max_retries, retry_delay, retry_predicate,
+                 search_kwargs=None, close_service_pool=False):
+        """Initializer for the ShardedSearchStream.
+
+        Args:
+            service_pool: a ServicePool of GoogleAdsService clients.
+            customer_id: a str customer ID.
+            shards: a list of Shard instances in ascending date order.
+            max_concurrency: an int maximum number of concurrent streams.
+            ordered: a bool indicating whether rows are yielded in shard
+                order rather than in the order shards complete.
+            max_retries: an int maximum number of retries per shard.
+            retry_delay: a float number of seconds to wait before the first
+                retry of a shard; the delay doubles with each retry.
+            retry_predicate: a callable that receives the exception raised by
+                a shard and returns whether the shard should be retried.
+            search_kwargs: an optional dict of additional keyword arguments
+                passed to search_stream.
+            close_service_pool: whether the service pool is closed once
+                iteration ends.
+        """
+        self.shards = shards
+        self.retry_count = 0
+        self._service_pool = service_pool
+        self._customer_id = customer_id
+        self._max_concurrency = max_concurrency
+        self._ordered = ordered
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._retry_predicate = retry_predicate
+        self._search_kwargs = search_kwargs or {}
+        self._close_service_pool = close_service_pool
+        self._abandoned = threading.Event()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _stream_shard(self, shard):
+        """Streams a shard until it succeeds or can't be retried.
+
+        Returns:
+            A list of the shard's GoogleAdsRow instances.
+
+        Raises:
+            Exception: the last exception raised by the shard if it isn't
+                retryable or if it has been retried max_retries times.
+        """
+        for attempt in range(self._max_retries + 1):
+            if self._abandoned.is_set():
+                return []
+
+            rows = []
+            try:
+                service = self._service_pool.get()
+                response = service.search_stream(
+                    self._customer_id, shard.query, **self._search_kwargs)
+                for batch in response:
+                    if self._abandoned.is_set():
+                        response.cancel()
+                        return []
+                    rows.extend(batch.results)
+                return rows
+            except Exception as ex:
+                if (attempt == self._max_retries
+                        or not self._retry_predicate(ex)):
+                    raise
+
+            with self._lock:
+                self.retry_count += 1
+            # Waiting on the event lets an abandoned search exit immediately.
+            if self._abandoned.wait(self._retry_delay * 2 ** attempt):
+                return []
+
+    def _iterate_ordered(self, executor, window):
+        futures = {}
+        next_index = 0
+        for index in range(len(self.shards)):
+            while next_index < min(index + window, len(self.shards)):
+                futures[next_index] = executor.submit(
+                    self._stream_shard, self.shards[next_index])
+                next_index += 1
+            yield from futures.pop(index).result()
+
+    def _iterate_unordered(self, executor, window):
+        shards = iter(self.shards)
+        pending = set()
+        while True:
+            for shard in shards:
+                pending.add(executor.submit(self._stream_shard, shard))
+                if len(pending) >= window:
+                    break
+
+            if not pending:
+                return
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError('A ShardedSearchStream can only be iterated '
+                               'once.')
+        self._started = True
+
+        executor = ThreadPoolExecutor(
+            max_workers=self._max_concurrency,
+            thread_name_prefix='search_stream_sharded')
+        window = self._max_concurrency * _SHARDS_BUFFERED_PER_STREAM
+        try:
+            if self._ordered:
+                yield from self._iterate_ordered(executor, window)
+            else:
+                yield from self._iterate_unordered(executor, window)
+        finally:
+            self._abandoned.set()
+            executor.shutdown(wait=False)
+            # Closing the channels cancels the streams that are still running.
+            if self._close_service_pool:
+                self._service_pool.close()
+
+
+def shard_query(query, shard_by=gaql.MONTH, today=None):
+    """Splits a query into one query per date shard.
+
+    Args:
+        query: a str GAQL query that filters segments.date with DURING or
+            BETWEEN.
+        shard_by: one of "day", "week" or "month".
+        today: an optional datetime.date used to resolve DURING literals;
+            see gaql.resolve_date_literal.
+
+    Returns:
+        A list of Shard instances in ascending date order.
+
+    Raises:
+        ValueError: If the query doesn't have a segments.date predicate or if
+            shard_by is invalid.
+    """
+    predicate = gaql.find_date_predicate(query, today=today)
+
+    if predicate is None:
+        raise ValueError('Only queries that filter segments.date with DURING '
+                         'or BETWEEN can be sharded.')
+
+    return [Shard(date_range,
+                  gaql.replace_date_predicate(query, predicate, date_range))
+            for date_range in gaql.split_date_range(predicate.date_range,
+                                                    shard_by)]
+
+
+def search_stream_sharded(client, customer_id, query, shard_by=gaql.MONTH,
+                          max_concurrency=4, ordered=True, max_retries=3,
+                          retry_delay=1.0,
+                          retry_predicate=errors.is_retryable_error,
+                          today=None, version=None, **kwargs):
+    """Streams a date-segmented query as concurrent date shards.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        customer_id: a str customer ID.
+        query: a str GAQL query that filters segments.date with DURING or
+            BETWEEN.
+        shard_by: one of "day", "week" or "month".
+        max_concurrency: an int maximum number of concurrent streams.
+        ordered: if True, rows are yielded shard by shard in date order;
+            within a shard they keep the order the API returned them in. If
+            False, each shard is yielded as soon as it completes, which keeps
+            the streams busier.
+        max_retries: an int maximum number of retries per shard.
+        retry_delay: a float number of seconds to wait before the first retry
+            of a shard; the delay doubles with each retry.
+        retry_predicate: a callable that receives the exception raised by a
+            shard and returns whether the shard should be retried. Defaults to
+            retrying transient errors.
+        today: an optional datetime.date used to resolve DURING literals;
+            see gaql.resolve_date_literal.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        **kwargs: additional keyword arguments passed to search_stream.
+
+    Returns:
+        A ShardedSearchStream that yields GoogleAdsRow instances. The
+        channels it uses are closed once iteration ends.
+
+    Raises:
+        ValueError: If the query can't be sharded or max_concurrency is less
+            than one.
+    """
+    if max_concurrency < 1:
+        raise ValueError('max_concurrency must be at least one.')
+
+    shards = shard_query(query, shard_by=shard_by, today=today)
+
+    channel_count = math.ceil(max(min(max_concurrency, len(shards)), 1)
+                              / STREAMS_PER_CHANNEL)
+    service_pool_kwargs = {'version': version} if version else {}
+    service_pool = client.get_service_pool(SERVICE_NAME, channel_count,
+                                           **service_pool_kwargs)
+
+    return ShardedSearchStream(
+        service_pool, customer_id, shards, max_concurrency, ordered,
+        max_retries, retry_delay, retry_predicate, search_kwargs=kwargs,
+        close_service_pool=True)
@@ -0,0 +1,214 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Streams the rows of search_stream results while holding one batch at once.
+
+A search_stream batch holds up to 10,000 rows, and a stream whose batches are
+kept, e.g. by collecting them in a list, uses memory in proportion to the
+whole report. A RowStream yields rows one at a time and drops its reference to
+each batch before the next one is received, so memory stays at about one
+batch. Streams can also decode every batch into the same response message,
+which is cleared and merged into rather than allocated anew.
+"""
+
+from importlib import import_module
+import sys
+
+from google.api_core.gapic_v1 import method as gapic_method
+from google.api_core.gapic_v1 import routing_header
+
+from google.ads.google_ads import search_stream
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+from ._constants import SERVICE_NAME
+
+try:
+    import resource
+except ImportError:
+    # The resource module is only available on Unix.
+    resource = None
+
+_SEARCH_STREAM_METHOD = ('/google.ads.googleads.{}.services.GoogleAdsService/'
+                         'SearchStream')
+
+
+def get_peak_rss():
+    """Returns the peak resident set size of this process so far.
+
+    Returns:
+        An int number of bytes, or None if it can't be measured on this
+        platform.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS reports bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _BatchDecoder(object):
+    """Decodes serialized response batches and records their sizes.
+
+    Attributes:
+        batch_count: the number of batches decoded so far.
+        byte_count: the total serialized size of the batches decoded so far.
+        last_batch_bytes: the serialized size of the last batch decoded.
+        peak_batch_bytes: the serialized size of the largest batch so far.
+    """
+
+    def __init__(self, response_class, reuse_messages=False):
+        """Initializer for the _BatchDecoder.
+
+        Args:
+            response_class: the message class of the batches.
+            reuse_messages: whether every batch is decoded into the same
+                message instance.
+        """
+        self._response_class = response_class
+        self._message = response_class() if reuse_messages else None
+        self.batch_count = 0
+        self.byte_count = 0
+        self.last_batch_bytes = 0
+        self.peak_batch_bytes = 0
+
+    def __call__(self, data):
+        self.batch_count += 1
+        self.byte_count += len(data)
+        self.last_batch_bytes = len(data)
+        self.peak_batch_bytes = max(self.peak_batch_bytes, len(data))
+        if self._message is None:
+            return self._response_class.FromString(data)
+        self._message.Clear()
+        self._message.MergeFromString(data)
+        return self._message
+
+
+class RowStream(object):
+    """An iterator of the rows of a stream that holds one batch at a time.
+
+    Instances can only be iterated once.
+
+    Attributes:
+        row_count: the number of rows yielded so far.
+        batch_count: the number of batches received so far.
+        peak_batch_bytes: the serialized size of the largest batch received
+            so far, which bounds the memory the stream holds at once.
+    """
+
+    def __init__(self, responses, decoder=None):
+        """Initializer for the RowStream.
+
+        Args:
+            responses: an iterable of SearchGoogleAdsStreamResponse messages,
+                e.g. a search_stream call.
+            decoder: the _BatchDecoder that decodes the responses, if any.
+                Batch sizes are then taken from the decoder rather than
+                computed from each message.
+        """
+        self.row_count = 0
+        self.batch_count = 0
+        self.peak_batch_bytes = 0
+        self._responses = responses
+        self._decoder = decoder
+        self._started = False
+
+    def _get_batch_bytes(self, response):
+        if self._decoder is not None:
+            return self._decoder.last_batch_bytes
+        return response.ByteSize()
+
+    def cancel(self):
+        """Cancels the underlying stream, if it can be cancelled."""
+        cancel = getattr(self._responses, 'cancel', None)
+        return cancel() if cancel else False
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError('A RowStream can only be iterated once.')
+        self._started = True
+
+        responses = iter(self._responses)
+        while True:
+            # The previous batch is released before the next is received.
+            response = next(responses, None)
+            if response is None:
+                return
+            self.batch_count += 1
+            self.peak_batch_bytes = max(self.peak_batch_bytes,
+                                        self._get_batch_bytes(response))
+            rows = response.results
+            response = None
+            self.row_count += len(rows)
+            yield from rows
+            rows = None
+
+
+def stream_rows(client, customer_id, query, reuse_messages=False,
+                version=None, retry=gapic_method.DEFAULT,
+                timeout=gapic_method.DEFAULT, metadata=None,
+                **request_fields):
+    """Streams the rows of a query while holding one batch at a time.
+
+    The call goes through the same channel and interceptors as
+    GoogleAdsService.search_stream, with the same routing metadata, retry,
+    timeout and error mapping, but decodes the batches itself so that their
+    sizes can be recorded and, optionally, one message reused.
+
+    Args:
+        client: a GoogleAdsClient instance.
+        customer_id: a str customer ID.
+        query: a str GAQL query.
+        reuse_messages: if True, every batch is decoded into the same
+            message, which saves allocating one per batch. A row is then only
+            valid until the rows of the next batch are requested; copy rows
+            that must be kept, e.g. with CopyFrom.
+        version: an optional str Google Ads API version; defaults to the
+            client's default version.
+        retry: an optional google.api_core.retry.Retry for the call;
+            defaults to the service's SearchStream retry settings.
+        timeout: an optional float number of seconds after which the stream
+            is cancelled; defaults to the service's SearchStream timeout.
+        metadata: an optional sequence of (key, value) metadata pairs.
+        **request_fields: additional fields of the
+            SearchGoogleAdsStreamRequest, e.g. summary_row_setting.
+
+    Returns:
+        A RowStream that yields GoogleAdsRow instances.
+
+    Raises:
+        google.api_core.exceptions.GoogleAPICallError: If the call fails, or
+            while iterating if the stream fails.
+    """
+    version = version or _DEFAULT_VERSION
+    service = client.get_service(SERVICE_NAME, version=version)
+    service_protos = import_module(
+        f'google.ads.google_ads.{version}.proto.services.'
+        'google_ads_service_pb2')
+    request = service_protos.SearchGoogleAdsStreamRequest(
+        customer_id=customer_id, query=query, **request_fields)
+
+    decoder = _BatchDecoder(service_protos.SearchGoogleAdsStreamResponse,
+                            reuse_messages=reuse_messages)
+    stream = service.transport.channel.unary_stream(
+        _SEARCH_STREAM_METHOD.format(version),
+        request_serializer=(
+            service_protos.SearchGoogleAdsStreamRequest.SerializeToString),
+        response_deserializer=decoder)
+    search = search_stream.wrap_stream_method(service, stream)
+
+    metadata = list(metadata or [])
+    metadata.append(routing_header.to_grpc_metadata(
+        [('customer_id', customer_id)]))
+    return RowStream(search(request, retry=retry, timeout=timeout,
+                            metadata=metadata),
+                     decoder=decoder)
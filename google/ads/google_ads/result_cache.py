@@ -0,0 +1,547 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A cache of GoogleAdsService search and search_stream results.
+
+The cache is opt-in: assign a ResultCache to GoogleAdsClient.result_cache and
+the services created by the client afterwards serve repeated queries from it.
+Results are stored as serialized response batches, keyed by customer ID,
+normalized query, login customer ID and API version, and expire after a TTL
+that can be set per resource. Both the in-memory tier and the optional
+on-disk tier, which keeps entries across processes, evict the least recently
+used entries once they exceed their size limits. Mutating calls made through
+the same client invalidate the cached results of the customers they affect,
+and results of searches that were in flight when a customer's results were
+invalidated aren't cached.
+"""
+
+from collections import namedtuple, OrderedDict
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import time
+
+from google.ads.google_ads import gaql
+
+_DEFAULT_TTL_SECONDS = 300
+_DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+# The length prefix of each batch in a disk entry.
+_BATCH_LENGTH = struct.Struct('>I')
+_DISK_ENTRY_SUFFIX = '.entry'
+# Matches characters that aren't safe in a customer's directory name.
+_RE_UNSAFE_PATH_CHARACTERS = re.compile(r'[^\w-]')
+
+
+class CacheKey(namedtuple('CacheKey', (
+        'customer_id', 'query', 'login_customer_id', 'version', 'method',
+        'request'))):
+    """Identifies a cached result.
+
+    Attributes:
+        customer_id: the str customer ID of the request.
+        query: the str normalized query.
+        login_customer_id: the str login customer ID of the request, or None.
+        version: the str Google Ads API version.
+        method: the str full name of the gRPC method.
+        request: the bytes deterministically serialized request, with its
+            query normalized, which distinguishes requests for different
+            pages or page sizes of the same query.
+    """
+    __slots__ = ()
+
+    def digest(self):
+        """Returns a str digest of the key that is stable across processes."""
+        return hashlib.sha256(repr(tuple(self)).encode('utf-8')).hexdigest()
+
+
+def create_key(request, method, version, login_customer_id=None):
+    """Creates the cache key of a search request.
+
+    Args:
+        request: a SearchGoogleAdsRequest or SearchGoogleAdsStreamRequest.
+        method: the str full name of the gRPC method.
+        version: the str Google Ads API version.
+        login_customer_id: an optional str login customer ID.
+
+    Returns:
+        A CacheKey instance.
+    """
+    normalized_request = type(request)()
+    normalized_request.CopyFrom(request)
+    normalized_request.query = gaql.normalize_query(request.query)
+    return CacheKey(
+        request.customer_id, normalized_request.query,
+        login_customer_id or None, version, method,
+        normalized_request.SerializeToString(deterministic=True))
+
+
+class CacheStats(namedtuple('CacheStats', (
+        'hits', 'misses', 'disk_hits', 'evictions', 'expirations',
+        'invalidations', 'entries', 'size_bytes'))):
+    """A snapshot of the metrics of a ResultCache.
+
+    Attributes:
+        hits: the number of lookups served from the cache, including disk_hits.
+        misses: the number of lookups that weren't served from the cache.
+        disk_hits: the number of hits served from the on-disk tier.
+        evictions: the number of entries evicted from memory to make room.
+        expirations: the number of entries dropped because they expired.
+        invalidations: the number of entries dropped by invalidation.
+        entries: the number of entries in memory.
+        size_bytes: the total size of the entries in memory.
+    """
+    __slots__ = ()
+
+    @property
+    def hit_rate(self):
+        """The fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class _Entry(object):
+    """A cached result in memory."""
+    __slots__ = ('resource', 'expires_at', 'batches', 'size')
+
+    def __init__(self, resource, expires_at, batches):
+        self.resource = resource
+        self.expires_at = expires_at
+        self.batches = batches
+        self.size = sum(len(batch) for batch in batches)
+
+
+def _get_resource_name(query):
+    try:
+        return gaql.get_resource_name(query)
+    except ValueError:
+        return None
+
+
+class ResultCache(object):
+    """A TTL and size-bounded LRU cache of serialized search results.
+
+    Instances are safe to share between threads and between clients.
+    """
+
+    def __init__(self, ttl=_DEFAULT_TTL_SECONDS, resource_ttls=None,
+                 max_bytes=_DEFAULT_MAX_BYTES, directory=None,
+                 max_disk_bytes=_DEFAULT_MAX_DISK_BYTES):
+        """Initializer for the ResultCache.
+
+        Args:
+            ttl: a float number of seconds results are cached for.
+            resource_ttls: an optional dict of float TTLs keyed by the str
+                resource a query selects from, e.g. {"change_status": 0}, that
+                override ttl. Results with a TTL of zero aren't cached.
+            max_bytes: an int maximum total size of the results held in
+                memory. Results larger than this aren't cached.
+            directory: an optional str path of a directory for the on-disk
+                tier. Every cached result is also written there and results
+                missing from memory are looked up there.
+            max_disk_bytes: an int maximum total size of the results held in
+                the on-disk tier. Results larger than this aren't written to
+                disk.
+        """
+        self.ttl = ttl
+        self.resource_ttls = dict(resource_ttls or {})
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._keys_by_customer = {}
+        self._size = 0
+        # The size of the on-disk tier, which is measured on the first write
+        # and again whenever the writes since then may have exceeded the
+        # limit, since other processes may share the directory.
+        self._disk_size = None
+        # Incremented whenever results are invalidated, every customer's or
+        # one customer's, so results computed before can be told apart.
+        self._generation = 0
+        self._customer_generations = {}
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._disk_hits = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get_generation(self, customer_id):
+        """Returns the current invalidation generation of a customer.
+
+        A search captures the generation before it's sent and passes it to
+        put, which drops the result if the customer's results were
+        invalidated in the meantime.
+
+        Args:
+            customer_id: a str customer ID.
+
+        Returns:
+            An opaque value that compares equal until the results of the
+            customer are next invalidated.
+        """
+        with self._lock:
+            return (self._generation,
+                    self._customer_generations.get(customer_id, 0))
+
+    def get_ttl(self, resource):
+        """Returns the float TTL of the results of a resource."""
+        return self.resource_ttls.get(resource, self.ttl)
+
+    @property
+    def stats(self):
+        """A CacheStats snapshot of the cache's metrics."""
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._disk_hits,
+                              self._evictions, self._expirations,
+                              self._invalidations, len(self._entries),
+                              self._size)
+
+    def get(self, key):
+        """Looks up a result.
+
+        Args:
+            key: a CacheKey instance.
+
+        Returns:
+            A list of the bytes serialized response batches of the result, or
+            None if it isn't cached.
+        """
+        now = time.time()
+        with self._lock:
+            generation = self.get_generation(key.customer_id)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                self._expirations += 1
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry.batches
+
+        entry = self._read_disk_entry(key, now) if self.directory else None
+
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._disk_hits += 1
+            # An entry read while the customer's results were invalidated is
+            # returned, like a search in flight, but isn't kept.
+            if generation == self.get_generation(key.customer_id):
+                self._add(key, entry)
+            return entry.batches
+
+    def put(self, key, batches, generation=None):
+        """Caches a result.
+
+        Args:
+            key: a CacheKey instance.
+            batches: a list of the bytes serialized response batches of the
+                result.
+            generation: the optional value get_generation returned for the
+                key's customer before the result was requested. The result
+                isn't cached if the customer's results were invalidated
+                since.
+        """
+        resource = _get_resource_name(key.query)
+        ttl = self.get_ttl(resource)
+        if ttl <= 0:
+            return
+
+        entry = _Entry(resource, time.time() + ttl, list(batches))
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            current_generation = self.get_generation(key.customer_id)
+            if generation is not None and generation != current_generation:
+                return
+            self._add(key, entry)
+
+        if self.directory and entry.size <= self.max_disk_bytes:
+            path, disk_size = self._write_disk_entry(key, entry)
+            with self._lock:
+                # The customer's disk entries may have been invalidated
+                # while the entry was being written.
+                stale = (current_generation
+                         != self.get_generation(key.customer_id))
+            if stale:
+                _remove_file(path)
+            else:
+                self._add_disk_size(disk_size)
+
+    def invalidate(self, customer_id=None, resource=None):
+        """Drops cached results, in memory and on disk.
+
+        Args:
+            customer_id: an optional str customer ID whose results are
+                dropped; if None, results of every customer are dropped.
+            resource: an optional str resource, e.g. "campaign"; if set, only
+                results of queries that select from it are dropped.
+
+        Returns:
+            The int number of results dropped from memory.
+        """
+        with self._lock:
+            if customer_id is None:
+                self._generation += 1
+                keys = list(self._entries)
+            else:
+                self._customer_generations[customer_id] = (
+                    self._customer_generations.get(customer_id, 0) + 1)
+                keys = list(self._keys_by_customer.get(customer_id, ()))
+            if resource is not None:
+                keys = [key for key in keys
+                        if self._entries[key].resource == resource]
+            for key in keys:
+                self._remove(key)
+            self._invalidations += len(keys)
+
+        if self.directory:
+            self._invalidate_disk_entries(customer_id, resource)
+
+        return len(keys)
+
+    def clear(self):
+        """Drops every cached result, in memory and on disk."""
+        self.invalidate()
+
+    def _add(self, key, entry):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._keys_by_customer.setdefault(key.customer_id, set()).add(key)
+        self._size += entry.size
+
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+        customer_keys = self._keys_by_customer[key.customer_id]
+        customer_keys.discard(key)
+        if not customer_keys:
+            del self._keys_by_customer[key.customer_id]
+
+    def _get_customer_directory(self, customer_id):
+        return os.path.join(
+            self.directory,
+            _RE_UNSAFE_PATH_CHARACTERS.sub('_', customer_id) or '_')
+
+    def _get_disk_entry_path(self, key):
+        return os.path.join(self._get_customer_directory(key.customer_id),
+                            key.digest() + _DISK_ENTRY_SUFFIX)
+
+    def _write_disk_entry(self, key, entry):
+        """Writes an entry to disk; the write is atomic.
+
+        Returns:
+            A tuple of the str path of the entry and its int size on disk.
+        """
+        directory = self._get_customer_directory(key.customer_id)
+        os.makedirs(directory, exist_ok=True)
+        header = json.dumps({'resource': entry.resource,
+                             'expires_at': entry.expires_at}).encode('utf-8')
+        size = (len(header) + 1 + _BATCH_LENGTH.size * len(entry.batches)
+                + entry.size)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(file_descriptor, 'wb') as disk_entry:
+                disk_entry.write(header + b'\n')
+                for batch in entry.batches:
+                    disk_entry.write(_BATCH_LENGTH.pack(len(batch)))
+                    disk_entry.write(batch)
+            path = self._get_disk_entry_path(key)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        return path, size
+
+    def _add_disk_size(self, size):
+        """Accounts for a written entry and evicts entries over the limit."""
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += size
+                if self._disk_size <= self.max_disk_bytes:
+                    return
+        self._evict_disk_entries()
+
+    def _evict_disk_entries(self):
+        """Removes the least recently used disk entries over the limit."""
+        disk_entries = []
+        for name in _list_directory(self.directory):
+            for path in _list_disk_entries(os.path.join(self.directory,
+                                                        name)):
+                try:
+                    status = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                disk_entries.append((status.st_mtime, status.st_size, path))
+
+        size = sum(entry_size for _, entry_size, _ in disk_entries)
+        # Disk hits update the modification time of their entry.
+        for _, entry_size, path in sorted(disk_entries):
+            if size <= self.max_disk_bytes:
+                break
+            _remove_file(path)
+            size -= entry_size
+
+        with self._lock:
+            self._disk_size = size
+
+    @staticmethod
+    def _read_disk_entry_header(disk_entry):
+        """Reads the header of a disk entry.
+
+        Raises:
+            ValueError: If the header is corrupt.
+        """
+        header = json.loads(disk_entry.readline().decode('utf-8'))
+        if (not isinstance(header, dict)
+                or not isinstance(header.get('expires_at'), (int, float))):
+            raise ValueError('The disk entry header is corrupt.')
+        return header
+
+    def _load_disk_entry_header(self, path):
+        """Reads the header of a disk entry, removing the entry if corrupt.
+
+        Returns:
+            The dict header, or None if the entry is missing or corrupt.
+        """
+        try:
+            with open(path, 'rb') as disk_entry:
+                return self._read_disk_entry_header(disk_entry)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            _remove_file(path)
+            return None
+
+    def _read_disk_entry(self, key, now):
+        """Reads an unexpired entry from disk, removing it if it expired.
+
+        Returns:
+            An _Entry, or None if there's no unexpired entry for the key.
+        """
+        path = self._get_disk_entry_path(key)
+        try:
+            with open(path, 'rb') as disk_entry:
+                header = self._read_disk_entry_header(disk_entry)
+                if header['expires_at'] <= now:
+                    expired = True
+                else:
+                    expired = False
+                    batches = []
+                    while length_bytes := disk_entry.read(_BATCH_LENGTH.size):
+                        length, = _BATCH_LENGTH.unpack(length_bytes)
+                        batch = disk_entry.read(length)
+                        if len(batch) != length:
+                            raise ValueError('The disk entry is truncated.')
+                        batches.append(batch)
+        except FileNotFoundError:
+            return None
+        except (ValueError, struct.error):
+            # A corrupt entry, e.g. one truncated by a full disk, is a miss.
+            _remove_file(path)
+            return None
+
+        if expired:
+            with self._lock:
+                self._expirations += 1
+            _remove_file(path)
+            return None
+
+        _touch_file(path)
+        return _Entry(header.get('resource'), header['expires_at'], batches)
+
+    def _invalidate_disk_entries(self, customer_id, resource):
+        if customer_id is not None:
+            directories = [self._get_customer_directory(customer_id)]
+        else:
+            directories = [os.path.join(self.directory, name)
+                           for name in _list_directory(self.directory)]
+
+        for directory in directories:
+            if resource is None:
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+            for path in _list_disk_entries(directory):
+                header = self._load_disk_entry_header(path)
+                if header is not None and header.get('resource') == resource:
+                    _remove_file(path)
+
+    def purge_expired(self):
+        """Drops every expired result, in memory and on disk.
+
+        Expired results are otherwise only dropped when they're looked up.
+
+        Returns:
+            The int number of results dropped from memory.
+        """
+        now = time.time()
+        with self._lock:
+            keys = [key for key, entry in self._entries.items()
+                    if entry.expires_at <= now]
+            for key in keys:
+                self._remove(key)
+            self._expirations += len(keys)
+
+        if self.directory:
+            for name in _list_directory(self.directory):
+                for path in _list_disk_entries(
+                        os.path.join(self.directory, name)):
+                    header = self._load_disk_entry_header(path)
+                    if header is not None and header['expires_at'] <= now:
+                        _remove_file(path)
+
+        return len(keys)
+
+
+def _list_directory(directory):
+    try:
+        return os.listdir(directory)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _list_disk_entries(directory):
+    return [os.path.join(directory, name)
+            for name in _list_directory(directory)
+            if name.endswith(_DISK_ENTRY_SUFFIX)]
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _touch_file(path):
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,154 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The iterator returned by GoogleAdsServiceClient.search_stream.
+
+api_core wraps the responses of server streaming methods in an iterator whose
+__next__ is called, and sets up an exception handler, once per response, and
+which can only be consumed one response at a time. install makes the
+search_stream method of a service client return a SearchStreamIterator
+instead: iterating it sets up a single exception handler for the whole
+stream, and iter_rows chains the rows of every response at the C level. The
+call keeps api_core's retry, timeout and error mapping.
+"""
+
+from itertools import chain
+from operator import attrgetter
+
+from google.api_core import exceptions
+from google.api_core.gapic_v1 import method as gapic_method
+import grpc
+
+_METHOD_NAME = 'search_stream'
+_METHOD_CONFIG_NAME = 'SearchStream'
+
+_get_results = attrgetter('results')
+
+
+class SearchStreamIterator(grpc.Call):
+    """An iterator of the SearchGoogleAdsStreamResponse of a stream.
+
+    Like api_core's iterator, the first response is fetched when the
+    iterator is created, so an error of the first response is raised by the
+    search_stream call and can be retried. gRPC errors are raised as
+    google.api_core.exceptions.GoogleAPICallError instances.
+    """
+
+    def __init__(self, wrapped):
+        """Initializer for the SearchStreamIterator.
+
+        Args:
+            wrapped: the iterable grpc.Call of the stream.
+        """
+        self._wrapped = wrapped
+        self._prefetched = []
+        try:
+            self._prefetched.append(next(wrapped))
+        except StopIteration:
+            pass
+
+    def _iterate(self):
+        """Yields every response with a single exception handler."""
+        try:
+            if self._prefetched:
+                yield self._prefetched.pop()
+            yield from self._wrapped
+        except grpc.RpcError as ex:
+            raise exceptions.from_grpc_error(ex) from ex
+
+    def __iter__(self):
+        return self._iterate()
+
+    def __next__(self):
+        if self._prefetched:
+            return self._prefetched.pop()
+        try:
+            return next(self._wrapped)
+        except grpc.RpcError as ex:
+            raise exceptions.from_grpc_error(ex) from ex
+
+    def iter_rows(self):
+        """Returns an iterator over the rows of every response in the stream.
+
+        Rows are chained across responses at the C level, so no Python frame
+        is resumed per row.
+
+        Returns:
+            An iterator of GoogleAdsRow instances.
+        """
+        return chain.from_iterable(map(_get_results, self._iterate()))
+
+    def add_callback(self, callback):
+        return self._wrapped.add_callback(callback)
+
+    def cancel(self):
+        return self._wrapped.cancel()
+
+    def code(self):
+        return self._wrapped.code()
+
+    def details(self):
+        return self._wrapped.details()
+
+    def initial_metadata(self):
+        return self._wrapped.initial_metadata()
+
+    def is_active(self):
+        return self._wrapped.is_active()
+
+    def time_remaining(self):
+        return self._wrapped.time_remaining()
+
+    def trailing_metadata(self):
+        return self._wrapped.trailing_metadata()
+
+
+def wrap_stream_method(service_client, stream):
+    """Wraps a SearchStream multicallable like the client's search_stream.
+
+    The returned method takes a SearchGoogleAdsStreamRequest and optional
+    retry, timeout and metadata arguments, applies the client's retry and
+    timeout defaults and client info metadata, and returns a
+    SearchStreamIterator. Routing metadata isn't added.
+
+    Args:
+        service_client: a GoogleAdsServiceClient instance.
+        stream: a grpc.UnaryStreamMultiCallable of the SearchStream method,
+            e.g. one with its own response deserializer.
+
+    Returns:
+        The wrapped method.
+    """
+    def search_stream(request, **kwargs):
+        return SearchStreamIterator(stream(request, **kwargs))
+
+    method_config = service_client._method_configs[_METHOD_CONFIG_NAME]
+    return gapic_method.wrap_method(
+        search_stream, default_retry=method_config.retry,
+        default_timeout=method_config.timeout,
+        client_info=service_client._client_info)
+
+
+def install(service_client):
+    """Makes the search_stream method of a client return SearchStreamIterators.
+
+    The generated search_stream method wraps the transport's method on its
+    first call unless a wrapped method is already in place, so the wrapped
+    method installed here is used instead, with the same retry and timeout
+    defaults.
+
+    Args:
+        service_client: a GoogleAdsServiceClient instance.
+    """
+    service_client._inner_api_calls[_METHOD_NAME] = wrap_stream_method(
+        service_client, getattr(service_client.transport, _METHOD_NAME))
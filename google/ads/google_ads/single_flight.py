@@ -0,0 +1,175 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Coalesces identical calls that are in flight at the same time.
+
+The first caller of a key runs the call; callers of the same key that arrive
+while it is running wait for it and share its result or exception instead of
+making the call again. Once the call completes the key is released, so a later
+call runs again. Calls can be made from threads with SingleFlight.call or from
+asyncio coroutines with SingleFlight.call_async.
+"""
+
+import asyncio
+from collections import namedtuple
+import threading
+
+
+class SingleFlightStats(namedtuple('SingleFlightStats', (
+        'calls', 'executions', 'coalesced', 'in_flight'))):
+    """A snapshot of the metrics of a SingleFlight.
+
+    Attributes:
+        calls: the number of calls made.
+        executions: the number of calls that were run.
+        coalesced: the number of calls that shared the result of a call that
+            was already running, i.e. the number of calls saved.
+        in_flight: the number of keys whose calls are running.
+    """
+    __slots__ = ()
+
+    @property
+    def coalesced_rate(self):
+        """The fraction of calls that were coalesced."""
+        return self.coalesced / self.calls if self.calls else 0.0
+
+
+class _Flight(object):
+    """A call that is running in a thread."""
+    __slots__ = ('done', 'result', 'exception')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight(object):
+    """Runs at most one call per key at a time.
+
+    Waiters receive the same result object as the caller that ran the call,
+    so results should be immutable or copied by the caller. Instances are safe
+    to share between threads and between clients.
+    """
+
+    def __init__(self):
+        """Initializer for the SingleFlight."""
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._async_flights = {}
+        self._calls = 0
+        self._executions = 0
+        self._coalesced = 0
+
+    @property
+    def stats(self):
+        """A SingleFlightStats snapshot of the metrics."""
+        with self._lock:
+            return SingleFlightStats(
+                self._calls, self._executions, self._coalesced,
+                len(self._flights) + len(self._async_flights))
+
+    def _join(self, flights, key, create_flight):
+        """Returns the flight of a key and whether this caller runs it."""
+        with self._lock:
+            self._calls += 1
+            flight = flights.get(key)
+            if flight is not None:
+                self._coalesced += 1
+                return flight, False
+            flight = flights[key] = create_flight()
+            self._executions += 1
+            return flight, True
+
+    def _leave(self, flights, key):
+        with self._lock:
+            del flights[key]
+
+    def call(self, key, function, timeout=None):
+        """Calls a function unless a call of the same key is running.
+
+        Args:
+            key: a hashable key that identifies the call.
+            function: a function that takes no arguments.
+            timeout: an optional float maximum number of seconds to wait for
+                a running call. It doesn't limit a call made by this caller.
+
+        Returns:
+            The result of the function, from this call or the running one.
+
+        Raises:
+            TimeoutError: If the running call didn't complete within the
+                timeout.
+            Exception: the exception raised by the function, from this call or
+                the running one.
+        """
+        flight, is_leader = self._join(self._flights, key, _Flight)
+        if not is_leader:
+            if not flight.done.wait(timeout):
+                raise TimeoutError(
+                    f'The running call didn\'t complete within {timeout}s.')
+            if flight.exception is not None:
+                raise flight.exception
+            return flight.result
+
+        try:
+            flight.result = function()
+            return flight.result
+        except BaseException as exception:
+            flight.exception = exception
+            raise
+        finally:
+            self._leave(self._flights, key)
+            flight.done.set()
+
+    async def call_async(self, key, coroutine_function):
+        """Awaits a coroutine unless one of the same key is running.
+
+        Calls are only coalesced with calls made in the same event loop.
+        Cancelling a waiter doesn't cancel the running call.
+
+        Args:
+            key: a hashable key that identifies the call.
+            coroutine_function: a function that takes no arguments and returns
+                an awaitable.
+
+        Returns:
+            The result of the awaitable, from this call or the running one.
+
+        Raises:
+            Exception: the exception raised by the awaitable, from this call or
+                the running one.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (loop, key)
+        future, is_leader = self._join(self._async_flights, loop_key,
+                                       loop.create_future)
+        if not is_leader:
+            return await asyncio.shield(future)
+
+        try:
+            result = await coroutine_function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exception:
+            future.set_exception(exception)
+            # The exception is raised here, so an unawaited future doesn't
+            # need to report it.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._leave(self._async_flights, loop_key)
@@ -14,6 +14,7 @@
 """Common utilities for the Google Ads API client library."""
 
 import functools
+from importlib import import_module
 import re
 
 # This regex matches characters preceded by start of line or an underscore.
@@ -99,3 +100,21 @@ def convert_snake_case_to_upper_case(string):
         return match.group().replace('_', '').upper()
 
     return _RE_FIND_CHARS_TO_UPPERCASE.sub(converter, string)
+
+
+def import_optional(name):
+    """Imports an optional dependency of the library.
+
+    Args:
+        name: a str name of the module to import, e.g. "numpy".
+
+    Returns:
+        The imported module.
+
+    Raises:
+        ImportError: If the module isn't installed.
+    """
+    try:
+        return import_module(name)
+    except ImportError:
+        raise ImportError(f'{name} is required but is not installed.')
@@ -0,0 +1,167 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the account hierarchy."""
+
+from importlib import import_module
+import mock
+import tempfile
+from unittest import TestCase
+
+from google.ads.google_ads import account_hierarchy
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'google_ads_service_pb2')
+customer_service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'customer_service_pb2')
+
+# Maps each account to its currency, time zone and direct clients. Account 3
+# is linked to both 1 and 2.
+_ACCOUNTS = {
+    '1': ('USD', 'America/New_York', ['2', '3']),
+    '2': ('EUR', 'Europe/Paris', ['3', '4', '5']),
+    '3': ('USD', 'America/New_York', None),
+    '4': ('EUR', 'Europe/Paris', None),
+    '5': ('EUR', 'America/New_York', []),
+    '6': ('GBP', 'Europe/London', None),
+}
+
+
+def _row(customer_id, level):
+    currency_code, time_zone, client_ids = _ACCOUNTS[customer_id]
+    row = service_protos.GoogleAdsRow()
+    customer_client = row.customer_client
+    customer_client.id.value = int(customer_id)
+    customer_client.level.value = level
+    customer_client.manager.value = client_ids is not None
+    customer_client.descriptive_name.value = f'Account {customer_id}'
+    customer_client.currency_code.value = currency_code
+    customer_client.time_zone.value = time_zone
+    return row
+
+
+def _search(customer_id, query, metadata=None):
+    client_ids = _ACCOUNTS[customer_id][2] or []
+    return [_row(customer_id, 0)] + [_row(client_id, 1)
+                                     for client_id in client_ids]
+
+
+def _mock_client(login_customer_id=None):
+    client = mock.Mock(login_customer_id=login_customer_id)
+    service = mock.Mock()
+    service.search.side_effect = _search
+    customer_service = mock.Mock()
+    customer_service.list_accessible_customers.return_value = (
+        customer_service_protos.ListAccessibleCustomersResponse(
+            resource_names=['customers/1', 'customers/3', 'customers/6']))
+    client.get_service.side_effect = lambda name, version: (
+        customer_service if name == 'CustomerService' else service)
+    return client, service
+
+
+class AccountHierarchyTest(TestCase):
+    def setUp(self):
+        self.client, self.service = _mock_client()
+        self.hierarchy = account_hierarchy.AccountHierarchy.from_service(
+            self.client, max_concurrency=3)
+
+    def test_from_service(self):
+        self.assertEqual(self.hierarchy.root_ids, ['1', '6'])
+        self.assertEqual(len(self.hierarchy), 6)
+        # Every manager and root is queried once.
+        self.assertEqual(sorted(call[0][0] for call
+                                in self.service.search.call_args_list),
+                         ['1', '2', '3', '5', '6'])
+        self.assertEqual(self.hierarchy.get('1').child_ids, ('2', '3'))
+        self.assertEqual(self.hierarchy.get('2').child_ids, ('4', '5'))
+        self.assertEqual(self.hierarchy.get('3').parent_id, '1')
+        self.assertEqual(self.hierarchy.get('4').descriptive_name,
+                         'Account 4')
+
+    def test_from_service_logs_in_as_root(self):
+        metadata = {call[0][0]: call[1]['metadata']
+                    for call in self.service.search.call_args_list}
+        self.assertEqual(metadata['5'], [('login-customer-id', '1')])
+        self.assertEqual(metadata['6'], [('login-customer-id', '6')])
+
+    def test_from_service_login_customer_id(self):
+        client, service = _mock_client(login_customer_id='2')
+        hierarchy = account_hierarchy.AccountHierarchy.from_service(client)
+        self.assertEqual(hierarchy.root_ids, ['2'])
+        self.assertEqual(len(hierarchy), 4)
+        self.assertIsNone(service.search.call_args[1]['metadata'])
+
+    def test_from_service_failure(self):
+        self.service.search.side_effect = ValueError()
+        with self.assertRaises(ValueError):
+            account_hierarchy.AccountHierarchy.from_service(
+                self.client, root_ids=['1'])
+
+    def test_get_leaves(self):
+        self.assertEqual(sorted(node.customer_id
+                                for node in self.hierarchy.get_leaves()),
+                         ['3', '4', '6'])
+        self.assertEqual([node.customer_id
+                          for node in self.hierarchy.get_leaves('2')], ['4'])
+        self.assertEqual([node.customer_id
+                          for node in self.hierarchy.get_leaves('5')], [])
+
+    def test_get_path_to_root(self):
+        self.assertEqual([node.customer_id for node
+                          in self.hierarchy.get_path_to_root('5')],
+                         ['5', '2', '1'])
+        with self.assertRaises(KeyError):
+            self.hierarchy.get_path_to_root('7')
+
+    def test_filter(self):
+        def filter_ids(**kwargs):
+            return [node.customer_id
+                    for node in self.hierarchy.filter(**kwargs)]
+
+        self.assertEqual(filter_ids(currency_code='USD'), ['1', '3'])
+        self.assertEqual(filter_ids(currency_code='EUR',
+                                    time_zone='America/New_York'), ['5'])
+        self.assertEqual(filter_ids(time_zone='Europe/Paris', manager=False),
+                         ['4'])
+        self.assertEqual(filter_ids(currency_code='JPY'), [])
+        self.assertEqual(len(filter_ids()), 6)
+
+    def test_save_and_load(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as hierarchy_file:
+            self.hierarchy.save(hierarchy_file.name)
+            loaded = account_hierarchy.AccountHierarchy.load(
+                hierarchy_file.name)
+        self.assertEqual(loaded.nodes, self.hierarchy.nodes)
+        self.assertEqual(loaded.root_ids, self.hierarchy.root_ids)
+        self.assertEqual(loaded.version, self.hierarchy.version)
+
+    def test_load_account_hierarchy(self):
+        client, service = _mock_client()
+        with tempfile.TemporaryDirectory() as directory:
+            hierarchy = account_hierarchy.load_account_hierarchy(
+                client, directory=directory)
+            call_count = service.search.call_count
+            reloaded = account_hierarchy.load_account_hierarchy(
+                client, directory=directory)
+            self.assertEqual(service.search.call_count, call_count)
+            account_hierarchy.load_account_hierarchy(
+                client, root_ids=['2'], directory=directory)
+            self.assertGreater(service.search.call_count, call_count)
+            call_count = service.search.call_count
+            account_hierarchy.load_account_hierarchy(
+                client, directory=directory, max_age=-1)
+            self.assertGreater(service.search.call_count, call_count)
+        self.assertEqual(reloaded.nodes, hierarchy.nodes)
@@ -0,0 +1,170 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the change_status sync engine."""
+
+import datetime
+from importlib import import_module
+import mock
+import re
+from unittest import TestCase
+
+from google.ads.google_ads import change_sync
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'google_ads_service_pb2')
+resource_type_enum = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.enums.'
+    'change_status_resource_type_pb2').ChangeStatusResourceTypeEnum
+
+_NOW = datetime.datetime(2020, 3, 1, 12)
+_CUSTOMER_ID = '123'
+_RE_CHANGE_WINDOW = re.compile(r">= '([^']+)' .* <= '([^']+)'")
+_RE_RESOURCE_NAMES = re.compile(r'IN \(([^)]*)\)')
+
+
+def _campaign_row(campaign_id, name='Campaign'):
+    row = service_protos.GoogleAdsRow()
+    row.campaign.resource_name = f'customers/123/campaigns/{campaign_id}'
+    row.campaign.name.value = name
+    return row
+
+
+def _change_row(campaign_id, date_time):
+    row = service_protos.GoogleAdsRow()
+    row.change_status.resource_type = resource_type_enum.CAMPAIGN
+    row.change_status.campaign.value = f'customers/123/campaigns/{campaign_id}'
+    row.change_status.last_change_date_time.value = date_time
+    return row
+
+
+class _FakeAccount(object):
+    """Answers change_status and campaign queries from dicts."""
+
+    def __init__(self):
+        self.campaigns = {}
+        self.changes = []
+        self.queries = []
+
+    def search_stream(self, customer_id, query):
+        self.queries.append(query)
+        if 'FROM change_status' in query:
+            start, end = _RE_CHANGE_WINDOW.search(query).groups()
+            rows = [_change_row(campaign_id, date_time)
+                    for campaign_id, date_time in self.changes
+                    if start <= date_time <= end]
+            rows = rows[:change_sync._CHANGE_STATUS_LIMIT]
+        else:
+            names = _RE_RESOURCE_NAMES.search(query)
+            rows = [_campaign_row(campaign_id, name)
+                    for campaign_id, name in sorted(self.campaigns.items())
+                    if names is None or f'"customers/123/campaigns/'
+                    f'{campaign_id}"' in names.group(1)]
+        response = service_protos.SearchGoogleAdsStreamResponse()
+        response.results.extend(rows)
+        return [response]
+
+
+class ChangeSyncTest(TestCase):
+    def setUp(self):
+        self.account = _FakeAccount()
+        client = mock.Mock()
+        client.get_service.return_value = self.account
+        self.snapshot = change_sync.InMemorySnapshot()
+        self.change_sync = change_sync.ChangeSync(
+            client, self.snapshot, {'campaign': ['campaign.name']},
+            batch_size=2)
+
+    def _names(self):
+        return {resource_name: row.campaign.name.value
+                for resource_name, row in self.snapshot.get_entities(
+                    _CUSTOMER_ID, 'campaign').items()}
+
+    def test_unknown_resource(self):
+        with self.assertRaises(ValueError):
+            change_sync.ChangeSync(mock.Mock(), self.snapshot,
+                                   {'customer': []})
+
+    def test_first_sync_is_full(self):
+        self.account.campaigns = {1: 'A', 2: 'B'}
+        result = self.change_sync.sync(_CUSTOMER_ID, now=_NOW)
+        self.assertTrue(result.full)
+        self.assertEqual(result.updated, 2)
+        self.assertEqual(result.watermark, '2020-02-29 22:00:00')
+        self.assertEqual(self._names(), {'customers/123/campaigns/1': 'A',
+                                         'customers/123/campaigns/2': 'B'})
+        self.assertIn('SELECT campaign.resource_name, campaign.name FROM '
+                      'campaign', self.account.queries)
+
+    def test_incremental_sync(self):
+        self.account.campaigns = {1: 'A', 2: 'B', 3: 'C'}
+        self.change_sync.sync(_CUSTOMER_ID, now=_NOW)
+        self.account.queries = []
+        self.account.campaigns = {1: 'A2', 2: 'B', 4: 'D', 5: 'E'}
+        self.account.changes = [(1, '2020-03-01 01:00:00'),
+                                (3, '2020-03-01 02:00:00'),
+                                (4, '2020-03-01 03:00:00'),
+                                (5, '2020-03-01 03:00:00'),
+                                (1, '2020-03-01 04:00:00')]
+
+        result = self.change_sync.sync(_CUSTOMER_ID, now=_NOW)
+        self.assertFalse(result.full)
+        self.assertEqual((result.updated, result.removed), (3, 1))
+        self.assertEqual(result.watermark, '2020-03-01 04:00:00')
+        self.assertEqual(self._names(), {'customers/123/campaigns/1': 'A2',
+                                         'customers/123/campaigns/2': 'B',
+                                         'customers/123/campaigns/4': 'D',
+                                         'customers/123/campaigns/5': 'E'})
+        # One change query and two batches of changed campaigns.
+        self.assertEqual(len(self.account.queries), 3)
+        self.assertEqual(self.snapshot.get_watermark(_CUSTOMER_ID),
+                         '2020-03-01 04:00:00')
+
+    def test_window_split_when_limit_reached(self):
+        self.change_sync.sync(_CUSTOMER_ID, now=_NOW)
+        with mock.patch.object(change_sync, '_CHANGE_STATUS_LIMIT', 2):
+            self.account.campaigns = {1: 'A', 2: 'B', 3: 'C'}
+            self.account.changes = [(1, '2020-03-01 01:00:00'),
+                                    (2, '2020-03-01 05:00:00'),
+                                    (3, '2020-03-01 09:00:00')]
+            result = self.change_sync.sync(_CUSTOMER_ID, now=_NOW)
+        self.assertFalse(result.full)
+        self.assertGreater(result.change_queries, 1)
+        self.assertEqual(result.updated, 3)
+
+    def test_full_sync_when_second_has_too_many_changes(self):
+        self.change_sync.sync(_CUSTOMER_ID, now=_NOW)
+        with mock.patch.object(change_sync, '_CHANGE_STATUS_LIMIT', 2):
+            self.account.campaigns = {1: 'A', 2: 'B'}
+            self.account.changes = [(1, '2020-03-01 01:00:00'),
+                                    (2, '2020-03-01 01:00:00')]
+            result = self.change_sync.sync(_CUSTOMER_ID, now=_NOW)
+        self.assertTrue(result.full)
+        self.assertEqual(len(self._names()), 2)
+
+    def test_full_sync_when_watermark_too_old(self):
+        self.snapshot.set_watermark(_CUSTOMER_ID, '2019-01-01 00:00:00')
+        result = self.change_sync.sync(_CUSTOMER_ID, now=_NOW)
+        self.assertTrue(result.full)
+
+
+class EntitySnapshotTest(TestCase):
+
+    def test_incomplete_subclass_not_instantiable(self):
+        class IncompleteSnapshot(change_sync.EntitySnapshot):
+            def get_watermark(self, customer_id):
+                return None
+
+        self.assertRaises(TypeError, IncompleteSnapshot)
@@ -17,6 +17,7 @@ import os
 import mock
 import yaml
 from importlib import import_module
+from unittest import TestCase
 from pyfakefs.fake_filesystem_unittest import TestCase as FileTestCase
 
 from google.ads.google_ads import client as Client
@@ -399,6 +400,32 @@ class GoogleAdsClientTest(FileTestCase):
         except Exception:
             self.fail('get_service with a valid version raised an error')
 
+    def test_get_service_installs_search_stream(self):
+        client = self._create_test_client()
+        service = client.get_service('GoogleAdsService', version='v3')
+        self.assertIn('search_stream', service._inner_api_calls)
+
+    def test_get_service_installs_pagination(self):
+        client = self._create_test_client()
+        service = client.get_service('GoogleAdsService', version='v3')
+        self.assertTrue(hasattr(service.search, '__wrapped__'))
+
+    def test_get_service_pool(self):
+        client = self._create_test_client()
+        with mock.patch.object(client, '_create_service') as mock_create:
+            pool = client.get_service_pool('GoogleAdsService', 2)
+            self.assertEqual(len(pool), 2)
+            mock_create.assert_called_with(
+                'GoogleAdsService', latest_version, None,
+                Client._POOLED_GRPC_CHANNEL_OPTIONS)
+            self.assertIn(('grpc.use_local_subchannel_pool', 1),
+                          Client._POOLED_GRPC_CHANNEL_OPTIONS)
+
+    def test_get_service_pool_invalid_size(self):
+        client = self._create_test_client()
+        self.assertRaises(ValueError, client.get_service_pool,
+                          'GoogleAdsService', 0)
+
 # XXX: deferred test for fixing lazy loading
 #    def test_get_service_with_interceptor(self):
 #        client = self._create_test_client()
@@ -472,3 +499,24 @@ class GoogleAdsClientTest(FileTestCase):
             Client.GoogleAdsClient(mock_credentials_instance,
                                    self.developer_token, logging_config=config)
             mock_dictConfig.assert_called_once_with(config)
+
+
+class ServicePoolTest(TestCase):
+
+    def test_get_round_robin(self):
+        pool = Client.ServicePool(['a', 'b'])
+        self.assertEqual([pool.get() for _ in range(4)], ['a', 'b', 'a', 'b'])
+        self.assertEqual(list(pool), ['a', 'b'])
+
+    def test_close(self):
+        services = [mock.Mock(), mock.Mock()]
+        Client.ServicePool(services).close()
+        for service in services:
+            service.transport.channel.close.assert_called_once_with()
+
+    def test_context_manager(self):
+        service = mock.Mock()
+        with Client.ServicePool([service]) as pool:
+            self.assertIs(pool.get(), service)
+            service.transport.channel.close.assert_not_called()
+        service.transport.channel.close.assert_called_once_with()
@@ -0,0 +1,197 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the SQLite entity mirror."""
+
+from importlib import import_module
+import mock
+import os
+import tempfile
+from unittest import TestCase
+
+from google.protobuf import field_mask_pb2
+
+from google.ads.google_ads import entity_mirror
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'google_ads_service_pb2')
+campaign_service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'campaign_service_pb2')
+status_enum = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.enums.'
+    'campaign_status_pb2').CampaignStatusEnum
+
+_CUSTOMER_ID = '123'
+_FIELDS = {'campaign': ['campaign.id', 'campaign.name'],
+           'ad_group': ['ad_group.name']}
+
+
+def _campaign_row(campaign_id, name, status=status_enum.ENABLED):
+    row = service_protos.GoogleAdsRow()
+    row.campaign.resource_name = f'customers/123/campaigns/{campaign_id}'
+    row.campaign.id.value = campaign_id
+    row.campaign.name.value = name
+    row.campaign.status = status
+    return row
+
+
+def _ad_group_row(ad_group_id, campaign_id, name):
+    row = service_protos.GoogleAdsRow()
+    row.ad_group.resource_name = f'customers/123/adGroups/{ad_group_id}'
+    row.ad_group.campaign.value = f'customers/123/campaigns/{campaign_id}'
+    row.ad_group.name.value = name
+    return row
+
+
+def _campaign_name(campaign_id):
+    return f'customers/123/campaigns/{campaign_id}'
+
+
+class EntityMirrorTest(TestCase):
+    def setUp(self):
+        self.mirror = entity_mirror.EntityMirror(_FIELDS)
+        self.addCleanup(self.mirror.close)
+        self.mirror.upsert(_CUSTOMER_ID, 'campaign', [
+            _campaign_row(1, 'A'), _campaign_row(2, 'B', status_enum.PAUSED)])
+        self.mirror.upsert(_CUSTOMER_ID, 'ad_group', [
+            _ad_group_row(10, 1, 'X'), _ad_group_row(11, 2, 'Y')])
+
+    def test_get_column_name(self):
+        self.assertEqual(entity_mirror.get_column_name(
+            'ad_group_criterion', 'ad_group_criterion.keyword.text'),
+            'keyword_text')
+        with self.assertRaises(ValueError):
+            entity_mirror.get_column_name('campaign', 'ad_group.name')
+
+    def test_typed_columns_and_indexes(self):
+        columns = {row['name']: row['type'] for row
+                   in self.mirror.execute('PRAGMA table_info(campaign)')}
+        self.assertEqual(columns['id'], 'INTEGER')
+        self.assertEqual(columns['status'], 'TEXT')
+        indexes = {row['name'] for row
+                   in self.mirror.execute('PRAGMA index_list(ad_group)')}
+        self.assertTrue({'ad_group_campaign', 'ad_group_status'} <= indexes)
+
+    def test_get_and_find(self):
+        self.assertEqual(self.mirror.get('campaign', _campaign_name(1)),
+                         _campaign_row(1, 'A'))
+        self.assertIsNone(self.mirror.get('campaign', _campaign_name(3)))
+        self.assertEqual(self.mirror.find('campaign', status='PAUSED'),
+                         [_campaign_row(2, 'B', status_enum.PAUSED)])
+        with self.assertRaises(ValueError):
+            self.mirror.find('campaign', budget='x')
+        with self.assertRaises(ValueError):
+            self.mirror.find('keyword_view')
+
+    def test_join(self):
+        rows = self.mirror.execute(
+            'SELECT ad_group.name, campaign.name AS campaign_name '
+            'FROM ad_group JOIN campaign '
+            'ON ad_group.campaign = campaign.resource_name '
+            'WHERE campaign.status = ? ', ('ENABLED',))
+        self.assertEqual([tuple(row) for row in rows], [('X', 'A')])
+
+    def test_remove_and_replace(self):
+        self.mirror.remove(_CUSTOMER_ID, 'campaign', [_campaign_name(1)])
+        self.assertEqual(len(self.mirror.find('campaign')), 1)
+        self.mirror.replace(_CUSTOMER_ID, 'campaign', [_campaign_row(3, 'C')])
+        self.assertEqual(self.mirror.find('campaign'), [_campaign_row(3, 'C')])
+
+    def test_watermark(self):
+        self.assertIsNone(self.mirror.get_watermark(_CUSTOMER_ID))
+        self.mirror.set_watermark(_CUSTOMER_ID, '2020-01-01 00:00:00')
+        self.assertEqual(self.mirror.get_watermark(_CUSTOMER_ID),
+                         '2020-01-01 00:00:00')
+
+    def test_schema_change_resets_watermarks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mirror.db')
+            with entity_mirror.EntityMirror(_FIELDS, path) as mirror:
+                mirror.upsert(_CUSTOMER_ID, 'campaign',
+                              [_campaign_row(1, 'A')])
+                mirror.set_watermark(_CUSTOMER_ID, '2020-01-01 00:00:00')
+            with entity_mirror.EntityMirror(_FIELDS, path) as mirror:
+                self.assertEqual(len(mirror.find('campaign')), 1)
+                self.assertIsNotNone(mirror.get_watermark(_CUSTOMER_ID))
+            with entity_mirror.EntityMirror(
+                    {'campaign': ['campaign.name']}, path) as mirror:
+                self.assertEqual(mirror.find('campaign'), [])
+                self.assertIsNone(mirror.get_watermark(_CUSTOMER_ID))
+
+    def test_load(self):
+        service = mock.Mock()
+        response = service_protos.SearchGoogleAdsStreamResponse()
+        response.results.add().CopyFrom(_campaign_row(5, 'E'))
+        service.search_stream.side_effect = lambda customer_id, query: (
+            [response] if 'FROM campaign' in query else [])
+        client = mock.Mock()
+        client.get_service.return_value = service
+
+        result = self.mirror.load(client, _CUSTOMER_ID)
+        self.assertTrue(result.full)
+        self.assertEqual(self.mirror.find('campaign'), [_campaign_row(5, 'E')])
+        self.assertEqual(self.mirror.find('ad_group'), [])
+        self.assertIsNotNone(self.mirror.get_watermark(_CUSTOMER_ID))
+
+    def test_apply_mutate(self):
+        create = campaign_service_protos.CampaignOperation()
+        create.create.name.value = 'C'
+        update = campaign_service_protos.CampaignOperation()
+        update.update.resource_name = _campaign_name(1)
+        update.update.name.value = 'A2'
+        update.update.status = status_enum.PAUSED
+        update.update_mask.CopyFrom(field_mask_pb2.FieldMask(paths=['name']))
+        remove = campaign_service_protos.CampaignOperation(
+            remove=_campaign_name(2))
+        failed = campaign_service_protos.CampaignOperation()
+        failed.create.name.value = 'D'
+        results = [campaign_service_protos.MutateCampaignResult(
+            resource_name=resource_name) for resource_name
+            in (_campaign_name(3), _campaign_name(1), _campaign_name(2), '')]
+
+        self.mirror.apply_mutate(
+            _CUSTOMER_ID, [create, update, remove, failed], results)
+        names = {row.campaign.resource_name: row.campaign.name.value
+                 for row in self.mirror.find('campaign')}
+        self.assertEqual(names, {_campaign_name(1): 'A2',
+                                 _campaign_name(3): 'C'})
+        # Only fields in the update mask are changed.
+        self.assertEqual(self.mirror.find('campaign', name='A2')[0]
+                         .campaign.status, status_enum.ENABLED)
+
+    def test_apply_mutate_replaces_repeated_and_message_fields(self):
+        row = _campaign_row(1, 'A')
+        row.campaign.url_custom_parameters.add().key.value = 'old'
+        row.campaign.network_settings.target_search_network.value = True
+        self.mirror.upsert(_CUSTOMER_ID, 'campaign', [row])
+        update = campaign_service_protos.CampaignOperation()
+        update.update.resource_name = _campaign_name(1)
+        update.update.url_custom_parameters.add().key.value = 'new'
+        update.update.network_settings.target_content_network.value = True
+        update.update_mask.CopyFrom(field_mask_pb2.FieldMask(
+            paths=['url_custom_parameters', 'network_settings']))
+
+        self.mirror.apply_mutate(
+            _CUSTOMER_ID, [update], [campaign_service_protos
+                                     .MutateCampaignResult(
+                                         resource_name=_campaign_name(1))])
+        campaign = self.mirror.get('campaign', _campaign_name(1)).campaign
+        self.assertEqual([parameter.key.value for parameter
+                          in campaign.url_custom_parameters], ['new'])
+        self.assertFalse(campaign.network_settings.HasField(
+            'target_search_network'))
+        self.assertTrue(
+            campaign.network_settings.target_content_network.value)
@@ -0,0 +1,140 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the Google Ads API library errors."""
+
+from importlib import import_module
+import mock
+from unittest import TestCase
+
+from google.api_core import exceptions as api_core_exceptions
+import grpc
+
+from google.ads.google_ads import errors
+from google.ads.google_ads.client import _DEFAULT_VERSION as default_version
+
+errors_path = f'google.ads.google_ads.{default_version}.proto.errors.errors_pb2'
+error_protos = import_module(errors_path)
+
+_MOCK_FAILURE_VALUE = b"\n \n\x02\x08\x10\x12\x1aInvalid customer ID '123'."
+
+
+class ErrorCodeIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = errors.ErrorCodeIndex(error_protos.ErrorCode.DESCRIPTOR)
+
+    def test_get_name(self):
+        self.assertEqual(self.index.get_name('request_error', 16),
+                         'INVALID_CUSTOMER_ID')
+
+    def test_get_name_unknown_value(self):
+        self.assertEqual(self.index.get_name('request_error', 99999), None)
+
+    def test_categories_cover_every_error_enum(self):
+        oneof = error_protos.ErrorCode.DESCRIPTOR.oneofs_by_name['error_code']
+        self.assertEqual(set(self.index.categories),
+                         {field.name for field in oneof.fields})
+
+    def test_get_category_by_field_number(self):
+        self.assertEqual(self.index.get_category_by_field_number(1),
+                         'request_error')
+
+    def test_decode(self):
+        error_code = error_protos.ErrorCode(request_error=16)
+        self.assertEqual(self.index.decode(error_code),
+                         ('request_error', 'INVALID_CUSTOMER_ID'))
+
+    def test_decode_empty_error_code(self):
+        self.assertEqual(self.index.decode(error_protos.ErrorCode()),
+                         (None, None))
+
+    def test_get_error_code_index_is_shared(self):
+        descriptor = error_protos.ErrorCode.DESCRIPTOR
+        self.assertIs(errors.get_error_code_index(descriptor),
+                      errors.get_error_code_index(descriptor))
+
+
+class GoogleAdsExceptionTest(TestCase):
+
+    def _create_exception(self, failure=_MOCK_FAILURE_VALUE):
+        return errors.GoogleAdsException(
+            mock.Mock(), mock.Mock(), failure, '123',
+            failure_type=error_protos.GoogleAdsFailure)
+
+    def test_serialized_failure_is_not_parsed_on_init(self):
+        with mock.patch.object(error_protos.GoogleAdsFailure,
+                               'ParseFromString') as mock_parse:
+            exception = self._create_exception()
+            mock_parse.assert_not_called()
+        self.assertEqual(exception.serialized_failure, _MOCK_FAILURE_VALUE)
+
+    def test_failure_parsed_on_access(self):
+        exception = self._create_exception()
+        failure = exception.failure
+        self.assertIsInstance(failure, error_protos.GoogleAdsFailure)
+        self.assertEqual(failure.errors[0].message,
+                         "Invalid customer ID '123'.")
+        self.assertIs(exception.failure, failure)
+        self.assertEqual(exception.serialized_failure, None)
+
+    def test_failure_decode_error(self):
+        exception = self._create_exception(_MOCK_FAILURE_VALUE + b'1234')
+        self.assertEqual(exception.failure, None)
+        self.assertEqual(exception.get_error_codes(), [])
+
+    def test_failure_instance(self):
+        failure = error_protos.GoogleAdsFailure()
+        exception = errors.GoogleAdsException(None, None, failure, '123')
+        self.assertIs(exception.failure, failure)
+
+    def test_serialized_failure_requires_failure_type(self):
+        self.assertRaises(ValueError, errors.GoogleAdsException,
+                          None, None, _MOCK_FAILURE_VALUE, '123')
+
+    def test_get_error_codes(self):
+        exception = self._create_exception()
+        self.assertEqual(exception.get_error_codes(),
+                         [('request_error', 'INVALID_CUSTOMER_ID')])
+
+
+class RetryableErrorTest(TestCase):
+
+    def _create_rpc_error(self, status_code):
+        class MockRpcError(grpc.RpcError):
+            def code(self):
+                return status_code
+
+        return MockRpcError()
+
+    def test_rpc_error(self):
+        self.assertTrue(errors.is_retryable_error(
+            self._create_rpc_error(grpc.StatusCode.UNAVAILABLE)))
+        self.assertFalse(errors.is_retryable_error(
+            self._create_rpc_error(grpc.StatusCode.INVALID_ARGUMENT)))
+
+    def test_google_ads_exception(self):
+        exception = errors.GoogleAdsException(
+            self._create_rpc_error(grpc.StatusCode.INTERNAL), None,
+            error_protos.GoogleAdsFailure(), '123')
+        self.assertTrue(errors.is_retryable_error(exception))
+
+    def test_api_core_exception(self):
+        self.assertTrue(errors.is_retryable_error(
+            api_core_exceptions.DeadlineExceeded('timeout')))
+        self.assertFalse(errors.is_retryable_error(
+            api_core_exceptions.PermissionDenied('denied')))
+
+    def test_other_exception(self):
+        self.assertEqual(errors.get_status_code(ValueError()), None)
+        self.assertFalse(errors.is_retryable_error(ValueError()))
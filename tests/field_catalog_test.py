@@ -0,0 +1,204 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the local GAQL validator."""
+
+from importlib import import_module
+import mock
+import os
+import tempfile
+from unittest import TestCase
+
+from google.ads.google_ads import field_catalog
+from google.ads.google_ads.client import _DEFAULT_VERSION
+
+google_ads_field_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.resources.'
+    'google_ads_field_pb2')
+
+
+def _enum_number(field_name, value_name):
+    return (google_ads_field_protos.GoogleAdsField.DESCRIPTOR
+            .fields_by_name[field_name].enum_type.values_by_name[value_name]
+            .number)
+
+
+def _field(name, category, data_type='', selectable=True, filterable=True,
+           sortable=True, is_repeated=False, selectable_with=(),
+           attribute_resources=(), metrics=(), segments=(), enum_values=()):
+    return field_catalog.FieldInfo(
+        name=name, category=category, data_type=data_type,
+        selectable=selectable, filterable=filterable, sortable=sortable,
+        is_repeated=is_repeated, selectable_with=frozenset(selectable_with),
+        attribute_resources=frozenset(attribute_resources),
+        metrics=frozenset(metrics), segments=frozenset(segments),
+        enum_values=tuple(enum_values), type_url='')
+
+
+def _create_catalog():
+    return field_catalog.FieldCatalog([
+        _field('campaign', 'RESOURCE', selectable=False,
+               attribute_resources=['customer'],
+               metrics=['metrics.clicks'],
+               segments=['segments.date', 'segments.ad_network_type']),
+        _field('ad_group', 'RESOURCE', selectable=False),
+        _field('campaign.id', 'ATTRIBUTE', 'INT64'),
+        _field('campaign.name', 'ATTRIBUTE', 'STRING'),
+        _field('campaign.status', 'ATTRIBUTE', 'ENUM',
+               enum_values=['ENABLED', 'PAUSED', 'REMOVED']),
+        _field('campaign.labels', 'ATTRIBUTE', 'RESOURCE_NAME',
+               is_repeated=True),
+        _field('campaign.url_custom_parameters', 'ATTRIBUTE', 'MESSAGE',
+               filterable=False, sortable=False, is_repeated=True),
+        _field('customer.id', 'ATTRIBUTE', 'INT64'),
+        _field('ad_group.id', 'ATTRIBUTE', 'INT64'),
+        _field('metrics.clicks', 'METRIC', 'INT64',
+               selectable_with=['segments.date']),
+        _field('segments.date', 'SEGMENT', 'DATE'),
+        _field('segments.ad_network_type', 'SEGMENT', 'ENUM'),
+    ])
+
+
+class FieldCatalogTest(TestCase):
+
+    def setUp(self):
+        self.catalog = _create_catalog()
+
+    def test_validate_returns_schema(self):
+        schema = self.catalog.validate(
+            'SELECT campaign.id, customer.id, metrics.clicks, segments.date '
+            "FROM campaign WHERE campaign.status IN ('ENABLED', 'PAUSED') "
+            "AND segments.date DURING LAST_7_DAYS AND campaign.name LIKE "
+            "'%a%' ORDER BY metrics.clicks DESC LIMIT 10")
+        self.assertEqual([field.name for field in schema],
+                         ['campaign.id', 'customer.id', 'metrics.clicks',
+                          'segments.date'])
+
+    def test_unknown_fields(self):
+        errors = self.catalog.find_errors(
+            'SELECT campaign.idd FROM campaign WHERE campaign.nam = "a" '
+            'ORDER BY campaign.ids')
+        self.assertEqual(errors, [
+            'SELECT field "campaign.idd" does not exist.',
+            'WHERE field "campaign.nam" does not exist.',
+            'ORDER BY field "campaign.ids" does not exist.'])
+
+    def test_unknown_resource(self):
+        self.assertEqual(
+            self.catalog.find_errors('SELECT campaign.id FROM campaigns'),
+            ['Resource "campaigns" does not exist.'])
+
+    def test_incompatible_fields(self):
+        errors = self.catalog.find_errors(
+            'SELECT ad_group.id, segments.ad_network_type, metrics.clicks '
+            'FROM campaign')
+        self.assertEqual(errors, [
+            'SELECT field "ad_group.id" can not be used with resource '
+            '"campaign".',
+            'Segment "segments.ad_network_type" can not be selected with '
+            'metric "metrics.clicks".'])
+
+    def test_operator_type_checks(self):
+        errors = self.catalog.find_errors(
+            'SELECT campaign.id FROM campaign WHERE campaign.id DURING '
+            "LAST_7_DAYS AND campaign.id LIKE '1%' AND campaign.status > 1 "
+            "AND campaign.status = 'RUNNING' AND campaign.labels = 'x' AND "
+            "campaign.name CONTAINS ANY ('a') AND "
+            'campaign.url_custom_parameters CONTAINS ANY ("a")')
+        self.assertEqual(errors, [
+            'Operator DURING can only be used with date fields, not '
+            '"campaign.id".',
+            'Operator LIKE can not be used with INT64 field "campaign.id".',
+            'Operator > can not be used with ENUM field "campaign.status".',
+            '"RUNNING" is not a value of enum field "campaign.status".',
+            'Operator = can not be used with repeated field '
+            '"campaign.labels".',
+            'Operator CONTAINS ANY can not be used with singular field '
+            '"campaign.name".',
+            'Field "campaign.url_custom_parameters" can not be filtered.'])
+
+    def test_clause_errors(self):
+        errors = self.catalog.find_errors(
+            'SELECT campaign.id, campaign.id FROM campaign ORDER BY '
+            'campaign.url_custom_parameters LIMIT 0')
+        self.assertEqual(errors, [
+            'Field "campaign.id" is selected more than once.',
+            'Field "campaign.url_custom_parameters" can not be sorted.',
+            'LIMIT must be a positive integer, not "0".'])
+
+    def test_validate_raises(self):
+        with self.assertRaises(field_catalog.QueryValidationError) as context:
+            self.catalog.validate('SELECT campaign.idd FROM campaign')
+        self.assertEqual(context.exception.errors,
+                         ['SELECT field "campaign.idd" does not exist.'])
+        self.assertRaises(ValueError, self.catalog.validate, 'SELECT')
+
+    def test_validation_results_cached(self):
+        with mock.patch.object(
+                field_catalog.FieldCatalog, '_check_field', autospec=True,
+                side_effect=field_catalog.FieldCatalog._check_field) as check:
+            self.catalog.validate('SELECT campaign.id FROM campaign')
+            self.catalog.validate('SELECT  campaign.id\nFROM campaign')
+        self.assertEqual(check.call_count, 1)
+
+    def test_to_arrow_schema(self):
+        schema = self.catalog.to_arrow_schema(
+            'SELECT campaign.id, campaign.status, campaign.labels '
+            'FROM campaign', enum_names=True)
+        self.assertEqual([str(field.type) for field in schema],
+                         ['int64', 'string', 'list<item: string>'])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalog.json')
+            self.catalog.save(path)
+            loaded = field_catalog.FieldCatalog.load(path)
+        self.assertEqual(loaded.fields, self.catalog.fields)
+        self.assertEqual(loaded.version, self.catalog.version)
+
+    def test_from_message(self):
+        message = google_ads_field_protos.GoogleAdsField()
+        message.name.value = 'metrics.clicks'
+        message.category = _enum_number('category', 'METRIC')
+        message.data_type = _enum_number('data_type', 'INT64')
+        message.selectable.value = True
+        message.selectable_with.add().value = 'segments.date'
+        field = field_catalog.FieldInfo.from_message(message)
+        self.assertEqual(field.category, 'METRIC')
+        self.assertEqual(field.data_type, 'INT64')
+        self.assertTrue(field.selectable)
+        self.assertEqual(field.selectable_with, frozenset(['segments.date']))
+
+
+class LoadFieldCatalogTest(TestCase):
+
+    def test_snapshot_reused(self):
+        client = mock.Mock()
+        message = google_ads_field_protos.GoogleAdsField()
+        message.name.value = 'campaign'
+        message.category = _enum_number('category', 'RESOURCE')
+        service = client.get_service.return_value
+        service.search_google_ads_fields.return_value = [message]
+
+        with tempfile.TemporaryDirectory() as directory:
+            catalog = field_catalog.load_field_catalog(
+                client, directory=directory)
+            reloaded = field_catalog.load_field_catalog(
+                client, directory=directory)
+            self.assertTrue(os.path.exists(os.path.join(
+                directory, f'google_ads_fields_{_DEFAULT_VERSION}.json')))
+            field_catalog.load_field_catalog(client, directory=directory,
+                                             max_age=-1)
+
+        self.assertEqual(reloaded.fields, catalog.fields)
+        self.assertEqual(service.search_google_ads_fields.call_count, 2)
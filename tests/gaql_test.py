@@ -0,0 +1,213 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the Google Ads Query Language utilities."""
+
+from datetime import date
+from unittest import TestCase
+
+from google.ads.google_ads import gaql
+
+# A Wednesday.
+_TODAY = date(2020, 3, 18)
+
+
+class DateRangeLiteralTest(TestCase):
+
+    def _assert_resolves(self, literal, start, end):
+        self.assertEqual(gaql.resolve_date_literal(literal, today=_TODAY),
+                         gaql.DateRange(start, end))
+
+    def test_today(self):
+        self._assert_resolves('TODAY', _TODAY, _TODAY)
+
+    def test_yesterday(self):
+        self._assert_resolves('YESTERDAY', date(2020, 3, 17),
+                              date(2020, 3, 17))
+
+    def test_last_30_days(self):
+        self._assert_resolves('LAST_30_DAYS', date(2020, 2, 17),
+                              date(2020, 3, 17))
+
+    def test_this_month(self):
+        self._assert_resolves('THIS_MONTH', date(2020, 3, 1), _TODAY)
+
+    def test_last_month(self):
+        self._assert_resolves('LAST_MONTH', date(2020, 2, 1),
+                              date(2020, 2, 29))
+
+    def test_last_business_week(self):
+        self._assert_resolves('LAST_BUSINESS_WEEK', date(2020, 3, 9),
+                              date(2020, 3, 13))
+
+    def test_this_week_sun_today(self):
+        self._assert_resolves('THIS_WEEK_SUN_TODAY', date(2020, 3, 15),
+                              _TODAY)
+
+    def test_last_week_sun_sat(self):
+        self._assert_resolves('LAST_WEEK_SUN_SAT', date(2020, 3, 8),
+                              date(2020, 3, 14))
+
+    def test_last_week_mon_sun(self):
+        self._assert_resolves('LAST_WEEK_MON_SUN', date(2020, 3, 9),
+                              date(2020, 3, 15))
+
+    def test_lower_case(self):
+        self._assert_resolves('last_7_days', date(2020, 3, 11),
+                              date(2020, 3, 17))
+
+    def test_unknown_literal(self):
+        self.assertRaises(ValueError, gaql.resolve_date_literal, 'NEVER')
+
+
+class DatePredicateTest(TestCase):
+
+    def test_find_between(self):
+        query = ("SELECT campaign.id FROM campaign WHERE segments.date "
+                 "BETWEEN '2020-01-01' AND '2020-12-31'")
+        predicate = gaql.find_date_predicate(query)
+        self.assertEqual(predicate.date_range,
+                         gaql.DateRange(date(2020, 1, 1), date(2020, 12, 31)))
+        self.assertEqual(query[predicate.span[0]:predicate.span[1]],
+                         "segments.date BETWEEN '2020-01-01' AND '2020-12-31'")
+
+    def test_find_during(self):
+        query = ('SELECT campaign.id FROM campaign '
+                 'WHERE segments.date during LAST_MONTH')
+        predicate = gaql.find_date_predicate(query, today=_TODAY)
+        self.assertEqual(predicate.date_range,
+                         gaql.DateRange(date(2020, 2, 1), date(2020, 2, 29)))
+
+    def test_find_none(self):
+        self.assertEqual(
+            gaql.find_date_predicate('SELECT campaign.id FROM campaign'), None)
+
+    def test_find_invalid_date(self):
+        query = ("SELECT campaign.id FROM campaign WHERE segments.date "
+                 "BETWEEN '2020-02-30' AND '2020-12-31'")
+        self.assertRaises(ValueError, gaql.find_date_predicate, query)
+
+    def test_replace_date_predicate(self):
+        query = ('SELECT campaign.id FROM campaign WHERE segments.date '
+                 'DURING LAST_MONTH AND campaign.status = ENABLED')
+        predicate = gaql.find_date_predicate(query, today=_TODAY)
+        result = gaql.replace_date_predicate(
+            query, predicate,
+            gaql.DateRange(date(2020, 2, 3), date(2020, 2, 9)))
+        self.assertEqual(result, (
+            "SELECT campaign.id FROM campaign WHERE segments.date BETWEEN "
+            "'2020-02-03' AND '2020-02-09' AND campaign.status = ENABLED"))
+
+
+class SplitDateRangeTest(TestCase):
+
+    def test_split_by_day(self):
+        shards = gaql.split_date_range(
+            gaql.DateRange(date(2020, 2, 28), date(2020, 3, 1)), gaql.DAY)
+        self.assertEqual([shard.start for shard in shards],
+                         [date(2020, 2, 28), date(2020, 2, 29),
+                          date(2020, 3, 1)])
+        self.assertTrue(all(shard.start == shard.end for shard in shards))
+
+    def test_split_by_week(self):
+        # The range starts on a Wednesday and ends on a Tuesday.
+        shards = gaql.split_date_range(
+            gaql.DateRange(date(2020, 3, 4), date(2020, 3, 17)), gaql.WEEK)
+        self.assertEqual(shards, [
+            gaql.DateRange(date(2020, 3, 4), date(2020, 3, 8)),
+            gaql.DateRange(date(2020, 3, 9), date(2020, 3, 15)),
+            gaql.DateRange(date(2020, 3, 16), date(2020, 3, 17))])
+
+    def test_split_by_month(self):
+        shards = gaql.split_date_range(
+            gaql.DateRange(date(2019, 12, 15), date(2020, 2, 10)), gaql.MONTH)
+        self.assertEqual(shards, [
+            gaql.DateRange(date(2019, 12, 15), date(2019, 12, 31)),
+            gaql.DateRange(date(2020, 1, 1), date(2020, 1, 31)),
+            gaql.DateRange(date(2020, 2, 1), date(2020, 2, 10))])
+
+    def test_split_empty_range(self):
+        self.assertEqual(gaql.split_date_range(
+            gaql.DateRange(date(2020, 2, 1), date(2020, 1, 1)), gaql.DAY), [])
+
+    def test_split_invalid_granularity(self):
+        self.assertRaises(ValueError, gaql.split_date_range,
+                          gaql.DateRange(_TODAY, _TODAY), 'year')
+
+
+class SelectClauseTest(TestCase):
+
+    def test_parse_select_fields(self):
+        query = ('select campaign.id,metrics.clicks ,\n  segments.date '
+                 'FROM campaign WHERE campaign.id > 1')
+        self.assertEqual(gaql.parse_select_fields(query),
+                         ['campaign.id', 'metrics.clicks', 'segments.date'])
+
+    def test_get_resource_name(self):
+        self.assertEqual(gaql.get_resource_name(
+            'SELECT ad_group.id FROM ad_group ORDER BY ad_group.id'),
+            'ad_group')
+
+    def test_missing_from_clause(self):
+        self.assertRaises(ValueError, gaql.parse_select_fields,
+                          'SELECT campaign.id')
+
+
+class NormalizeQueryTest(TestCase):
+
+    def test_normalize_whitespace(self):
+        self.assertEqual(
+            gaql.normalize_query('  SELECT campaign.id\n\tFROM  campaign '),
+            'SELECT campaign.id FROM campaign')
+
+    def test_string_literals_preserved(self):
+        query = "SELECT campaign.id FROM campaign WHERE campaign.name = 'a  b'"
+        formatted = query.replace(' FROM', '\n  FROM')
+        self.assertEqual(gaql.normalize_query(formatted), query)
+
+
+class ClauseTest(TestCase):
+
+    def test_find_clause_ignores_literals_and_field_names(self):
+        query = ("SELECT campaign_budget.limit FROM campaign_budget "
+                 "WHERE campaign_budget.name = 'LIMIT' LIMIT 10")
+        self.assertEqual(gaql.find_clause(query, gaql.LIMIT),
+                         query.rindex('LIMIT'))
+        self.assertIsNone(gaql.find_clause(query, gaql.ORDER_BY))
+
+    def test_add_predicate(self):
+        self.assertEqual(
+            gaql.add_predicate('SELECT campaign.id FROM campaign LIMIT 5',
+                               'campaign.id > 1'),
+            'SELECT campaign.id FROM campaign WHERE campaign.id > 1 LIMIT 5')
+        self.assertEqual(
+            gaql.add_predicate('SELECT campaign.id FROM campaign WHERE '
+                               'campaign.id < 9 ORDER BY campaign.id',
+                               'campaign.id > 1'),
+            'SELECT campaign.id FROM campaign WHERE campaign.id < 9 AND '
+            'campaign.id > 1 ORDER BY campaign.id')
+
+    def test_add_order_by(self):
+        self.assertEqual(
+            gaql.add_order_by('SELECT campaign.id FROM campaign '
+                              'PARAMETERS include_drafts=true',
+                              ['campaign.id', 'segments.date']),
+            'SELECT campaign.id FROM campaign ORDER BY campaign.id, '
+            'segments.date PARAMETERS include_drafts=true')
+        self.assertRaises(ValueError, gaql.add_order_by,
+                          'SELECT campaign.id FROM campaign ORDER BY '
+                          'campaign.id', ['campaign.id'])
+
+    def test_format_literal(self):
+        self.assertEqual(gaql.format_literal(5), '5')
+        self.assertEqual(gaql.format_literal('a "b"'), r'"a \"b\""')
@@ -0,0 +1,167 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the Caching gRPC Interceptor."""
+
+from importlib import import_module
+import mock
+from unittest import TestCase
+
+from google.ads.google_ads import client as Client
+from google.ads.google_ads.interceptors import CachingInterceptor
+from google.ads.google_ads.result_cache import ResultCache
+
+latest_version = Client._DEFAULT_VERSION
+
+service_protos = import_module(
+    f'google.ads.google_ads.{latest_version}.proto.services.'
+    'google_ads_service_pb2')
+campaign_service_protos = import_module(
+    f'google.ads.google_ads.{latest_version}.proto.services.'
+    'campaign_service_pb2')
+
+_SERVICE = f'/google.ads.googleads.{latest_version}.services.'
+_SEARCH_METHOD = f'{_SERVICE}GoogleAdsService/Search'
+_SEARCH_STREAM_METHOD = f'{_SERVICE}GoogleAdsService/SearchStream'
+_MUTATE_METHOD = f'{_SERVICE}CampaignService/MutateCampaigns'
+_QUERY = 'SELECT campaign.id FROM campaign'
+
+
+def _call_details(method, metadata=None):
+    return mock.Mock(method=method, metadata=metadata)
+
+
+def _search_response(campaign_id):
+    response = service_protos.SearchGoogleAdsResponse()
+    response.results.add().campaign.id.value = campaign_id
+    return response
+
+
+def _stream_responses(*campaign_ids):
+    responses = []
+    for campaign_id in campaign_ids:
+        response = service_protos.SearchGoogleAdsStreamResponse()
+        response.results.add().campaign.id.value = campaign_id
+        responses.append(response)
+    return responses
+
+
+class CachingInterceptorTest(TestCase):
+
+    def setUp(self):
+        self.cache = ResultCache()
+        self.interceptor = CachingInterceptor(self.cache, latest_version)
+
+    def _search(self, customer_id='123', metadata=None):
+        continuation = mock.Mock()
+        continuation.return_value.exception.return_value = None
+        continuation.return_value.result.return_value = _search_response(1)
+        request = service_protos.SearchGoogleAdsRequest(
+            customer_id=customer_id, query=_QUERY)
+        response = self.interceptor.intercept_unary_unary(
+            continuation, _call_details(_SEARCH_METHOD, metadata), request)
+        return response, continuation
+
+    def _search_stream(self, customer_id='123', responses=None):
+        continuation = mock.Mock(
+            return_value=iter(responses or _stream_responses(1, 2)))
+        request = service_protos.SearchGoogleAdsStreamRequest(
+            customer_id=customer_id, query=_QUERY)
+        response = self.interceptor.intercept_unary_stream(
+            continuation, _call_details(_SEARCH_STREAM_METHOD), request)
+        return response, continuation
+
+    def test_search_cached(self):
+        self._search()
+        response, continuation = self._search()
+        continuation.assert_not_called()
+        self.assertEqual(response.result(), _search_response(1))
+
+    def test_search_failure_not_cached(self):
+        continuation = mock.Mock()
+        continuation.return_value.exception.return_value = ValueError()
+        request = service_protos.SearchGoogleAdsRequest(customer_id='123',
+                                                        query=_QUERY)
+        self.interceptor.intercept_unary_unary(
+            continuation, _call_details(_SEARCH_METHOD), request)
+        self.assertEqual(self.cache.stats.entries, 0)
+
+    def test_login_customer_id_in_key(self):
+        self._search(metadata=(('login-customer-id', '1'),))
+        _, continuation = self._search(metadata=(('login-customer-id', '2'),))
+        continuation.assert_called_once()
+
+    def test_search_stream_cached_once_complete(self):
+        stream, _ = self._search_stream()
+        iterator = iter(stream)
+        next(iterator)
+        self.assertEqual(self.cache.stats.entries, 0)
+        list(iterator)
+        self.assertEqual(self.cache.stats.entries, 1)
+
+        cached_stream, continuation = self._search_stream()
+        continuation.assert_not_called()
+        self.assertEqual([row.campaign.id.value for batch in cached_stream
+                          for row in batch.results], [1, 2])
+
+    def test_search_stream_larger_than_cache(self):
+        self.cache.max_bytes = 1
+        stream, _ = self._search_stream()
+        list(stream)
+        self.assertEqual(self.cache.stats.entries, 0)
+
+    def test_mutate_invalidates_customer(self):
+        self._search('123')
+        self._search('456')
+        request = campaign_service_protos.MutateCampaignsRequest(
+            customer_id='123')
+        self.interceptor.intercept_unary_unary(
+            mock.Mock(), _call_details(_MUTATE_METHOD), request)
+
+        _, continuation = self._search('123')
+        continuation.assert_called_once()
+        _, continuation = self._search('456')
+        continuation.assert_not_called()
+
+    def test_search_in_flight_during_invalidation_not_cached(self):
+        continuation = mock.Mock()
+        continuation.return_value.exception.return_value = None
+        continuation.return_value.result.return_value = _search_response(1)
+
+        def invalidating_continuation(*args):
+            self.cache.invalidate('123')
+            return continuation.return_value
+
+        request = service_protos.SearchGoogleAdsRequest(
+            customer_id='123', query=_QUERY)
+        self.interceptor.intercept_unary_unary(
+            invalidating_continuation, _call_details(_SEARCH_METHOD),
+            request)
+        self.assertEqual(self.cache.stats.entries, 0)
+
+    def test_search_stream_in_flight_during_invalidation_not_cached(self):
+        stream, _ = self._search_stream()
+        iterator = iter(stream)
+        next(iterator)
+        self.cache.invalidate('123')
+        list(iterator)
+        self.assertEqual(self.cache.stats.entries, 0)
+
+    def test_read_methods_do_not_invalidate(self):
+        self._search()
+        request = campaign_service_protos.GetCampaignRequest(
+            resource_name='customers/123/campaigns/1')
+        method = f'{_SERVICE}CampaignService/GetCampaign'
+        self.interceptor.intercept_unary_unary(
+            mock.Mock(), _call_details(method), request)
+        self.assertEqual(self.cache.stats.entries, 1)
@@ -0,0 +1,140 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the Coalescing gRPC Interceptor."""
+
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+import threading
+import mock
+from unittest import TestCase
+
+import grpc
+
+from google.ads.google_ads import client as Client
+from google.ads.google_ads.interceptors import CoalescingInterceptor
+from google.ads.google_ads.single_flight import SingleFlight
+
+latest_version = Client._DEFAULT_VERSION
+
+service_protos = import_module(
+    f'google.ads.google_ads.{latest_version}.proto.services.'
+    'google_ads_service_pb2')
+
+_SERVICE = f'/google.ads.googleads.{latest_version}.services.'
+_SEARCH_METHOD = f'{_SERVICE}GoogleAdsService/Search'
+_QUERY = 'SELECT campaign.id FROM campaign'
+_TIMEOUT_SECONDS = 5
+
+
+def _call_details(method=_SEARCH_METHOD, metadata=None, timeout=None):
+    return mock.Mock(method=method, metadata=metadata, timeout=timeout)
+
+
+def _search_response(campaign_id):
+    response = service_protos.SearchGoogleAdsResponse()
+    response.results.add().campaign.id.value = campaign_id
+    return response
+
+
+class CoalescingInterceptorTest(TestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+        self.interceptor = CoalescingInterceptor(self.single_flight,
+                                                 latest_version)
+
+    def _search_concurrently(self, continuation, queries):
+        """Makes searches whose continuation blocks until all have joined."""
+        release = threading.Event()
+
+        def blocking_continuation(*args):
+            release.wait(_TIMEOUT_SECONDS)
+            return continuation(*args)
+
+        def search(query):
+            request = service_protos.SearchGoogleAdsRequest(
+                customer_id='123', query=query)
+            return self.interceptor.intercept_unary_unary(
+                blocking_continuation, _call_details(), request)
+
+        with ThreadPoolExecutor(len(queries)) as executor:
+            futures = [executor.submit(search, query) for query in queries]
+            while self.single_flight.stats.calls < len(queries):
+                threading.Event().wait(0.001)
+            release.set()
+        return [future.result() for future in futures]
+
+    def test_identical_searches_coalesced(self):
+        continuation = mock.Mock()
+        continuation.return_value.exception.return_value = None
+        continuation.return_value.result.return_value = _search_response(1)
+
+        responses = self._search_concurrently(
+            continuation, [_QUERY, f'  {_QUERY} ', _QUERY])
+        continuation.assert_called_once()
+        self.assertEqual(self.single_flight.stats.coalesced, 2)
+        results = [response.result() for response in responses]
+        self.assertTrue(all(result == _search_response(1)
+                            for result in results))
+        # Every caller receives its own copy of the response.
+        self.assertEqual(len({id(result) for result in results}), 3)
+
+    def test_different_searches_not_coalesced(self):
+        continuation = mock.Mock()
+        continuation.return_value.exception.return_value = None
+        continuation.return_value.result.return_value = _search_response(1)
+
+        self._search_concurrently(
+            continuation, [_QUERY, 'SELECT campaign.name FROM campaign'])
+        self.assertEqual(continuation.call_count, 2)
+
+    def test_exception_shared(self):
+        continuation = mock.Mock(side_effect=ValueError('failed'))
+        with self.assertRaises(ValueError):
+            self._search_concurrently(continuation, [_QUERY, _QUERY])
+        continuation.assert_called_once()
+
+    def test_waiter_deadline_exceeded(self):
+        release = threading.Event()
+
+        def continuation(*args):
+            release.wait(_TIMEOUT_SECONDS)
+            response = mock.Mock()
+            response.exception.return_value = None
+            response.result.return_value = _search_response(1)
+            return response
+
+        request = service_protos.SearchGoogleAdsRequest(customer_id='123',
+                                                        query=_QUERY)
+        with ThreadPoolExecutor(1) as executor:
+            leader = executor.submit(
+                self.interceptor.intercept_unary_unary, continuation,
+                _call_details(), request)
+            while self.single_flight.stats.calls < 1:
+                threading.Event().wait(0.001)
+            response = self.interceptor.intercept_unary_unary(
+                continuation, _call_details(timeout=0.01), request)
+            release.set()
+
+        self.assertEqual(response.code(), grpc.StatusCode.DEADLINE_EXCEEDED)
+        self.assertIsInstance(response.exception(), grpc.RpcError)
+        self.assertRaises(grpc.RpcError, response.result)
+        self.assertEqual(leader.result().result(), _search_response(1))
+
+    def test_other_methods_not_coalesced(self):
+        continuation = mock.Mock()
+        method = f'{_SERVICE}CampaignService/GetCampaign'
+        response = self.interceptor.intercept_unary_unary(
+            continuation, _call_details(method), mock.Mock())
+        self.assertIs(response, continuation.return_value)
+        self.assertEqual(self.single_flight.stats.calls, 0)
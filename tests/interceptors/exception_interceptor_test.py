@@ -117,6 +117,33 @@ class ExceptionInterceptorTest(TestCase):
             interceptor._handle_grpc_failure.assert_called_once_with(
                 mock_response)
 
+    def test_intercept_unary_unary_failure_not_parsed(self):
+        """A failed call raises without parsing its GoogleAdsFailure."""
+        interceptor = self._create_test_interceptor()
+
+        class MockRpcErrorResponse(grpc.RpcError):
+            def code(self):
+                return grpc.StatusCode.INVALID_ARGUMENT
+
+            def trailing_metadata(self):
+                return ((interceptor._failure_key, _MOCK_FAILURE_VALUE),)
+
+            def exception(self):
+                return self
+
+        failure_type = interceptor._get_error_protos().GoogleAdsFailure
+        with mock.patch.object(failure_type, 'ParseFromString') as mock_parse:
+            with self.assertRaises(GoogleAdsException) as context:
+                interceptor.intercept_unary_unary(
+                    lambda *args: MockRpcErrorResponse(), mock.Mock(),
+                    mock.Mock())
+            mock_parse.assert_not_called()
+
+        self.assertEqual(context.exception.serialized_failure,
+                         _MOCK_FAILURE_VALUE)
+        self.assertEqual(context.exception.failure.errors[0].message,
+                         "Invalid customer ID '123'.")
+
     def test_intercept_unary_stream_response_is_exception(self):
         """Ensure errors raised from response iteration are handled/wrapped."""
         mock_exception = grpc.RpcError()
@@ -198,3 +225,41 @@ class ExceptionInterceptorTest(TestCase):
 
         # Ensure the returned value is a wrapped response object.
         self.assertIsInstance(result, _UnaryStreamWrapper)
+
+
+class UnaryStreamWrapperTest(TestCase):
+
+    def test_trailing_metadata(self):
+        """Trailing metadata is read from the underlying call."""
+        mock_call = mock.Mock()
+        wrapper = _UnaryStreamWrapper(mock_call, mock.Mock())
+        self.assertEqual(wrapper.trailing_metadata(),
+                         mock_call.trailing_metadata.return_value)
+        mock_call.initial_metadata.assert_not_called()
+
+    def test_iter(self):
+        """Iterating the wrapper yields every underlying response."""
+        wrapper = _UnaryStreamWrapper(iter(['a', 'b']), mock.Mock())
+        self.assertEqual(list(wrapper), ['a', 'b'])
+
+    def test_iter_failure(self):
+        """Errors raised while iterating are passed to the failure handler."""
+        mock_exception = grpc.RpcError()
+        translated_exception = ValueError()
+
+        def mock_stream():
+            yield 'a'
+            raise mock_exception
+
+        mock_call = mock_stream()
+        mock_failure_handler = mock.Mock(side_effect=translated_exception)
+        wrapper = _UnaryStreamWrapper(mock_call, mock_failure_handler)
+        results = []
+
+        with self.assertRaises(ValueError):
+            for response in wrapper:
+                results.append(response)
+
+        self.assertEqual(results, ['a'])
+        mock_failure_handler.assert_called_once_with(mock_call)
+        self.assertIs(wrapper.exception(), translated_exception)
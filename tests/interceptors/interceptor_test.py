@@ -21,6 +21,7 @@ from unittest import TestCase
 import grpc
 
 from google.ads.google_ads.client import _DEFAULT_VERSION as default_version
+from google.ads.google_ads.errors import GoogleAdsException
 from google.ads.google_ads.interceptors.interceptor import Interceptor
 
 errors_path = f'google.ads.google_ads.{default_version}.proto.errors.errors_pb2'
@@ -79,6 +80,59 @@ class InterceptorTest(TestCase):
         result = interceptor._get_google_ads_failure(mock_metadata)
         self.assertEqual(result, None)
 
+    def test_get_serialized_google_ads_failure(self):
+        """Returns the raw failure bytes without parsing them."""
+        interceptor = Interceptor(default_version)
+        mock_metadata = ((interceptor._failure_key, _MOCK_FAILURE_VALUE),)
+        result = interceptor._get_serialized_google_ads_failure(mock_metadata)
+        self.assertEqual(result, _MOCK_FAILURE_VALUE)
+
+    def _get_mock_rpc_error_response(self, interceptor, failure_value):
+        class MockRpcErrorResponse(grpc.RpcError):
+            def code(self):
+                return grpc.StatusCode.INVALID_ARGUMENT
+
+            def trailing_metadata(self):
+                return ((interceptor._failure_key, failure_value),
+                        ('request-id', '123456'))
+
+            def exception(self):
+                return self
+
+        return MockRpcErrorResponse()
+
+    def test_get_error_from_response_google_ads_failure(self):
+        """Wraps a response with a failure in a GoogleAdsException."""
+        interceptor = Interceptor(default_version)
+        result = interceptor._get_error_from_response(
+            self._get_mock_rpc_error_response(interceptor,
+                                              _MOCK_FAILURE_VALUE))
+        self.assertIsInstance(result, GoogleAdsException)
+        self.assertEqual(result.request_id, '123456')
+        self.assertIsInstance(result.failure, error_protos.GoogleAdsFailure)
+
+    def test_get_error_from_response_does_not_parse_failure(self):
+        """The failure is kept serialized until it is first read."""
+        interceptor = Interceptor(default_version)
+        response = self._get_mock_rpc_error_response(interceptor,
+                                                     _MOCK_FAILURE_VALUE)
+        with mock.patch.object(error_protos.GoogleAdsFailure,
+                               'ParseFromString') as mock_parse:
+            result = interceptor._get_error_from_response(response)
+            mock_parse.assert_not_called()
+        self.assertEqual(result.serialized_failure, _MOCK_FAILURE_VALUE)
+        self.assertIs(result.error, response)
+
+    def test_get_error_from_response_undecodable_failure(self):
+        """The failure is None if it can't be decoded."""
+        interceptor = Interceptor(default_version)
+        response = self._get_mock_rpc_error_response(
+            interceptor, _MOCK_FAILURE_VALUE + b'1234')
+        result = interceptor._get_error_from_response(response)
+        self.assertIsInstance(result, GoogleAdsException)
+        self.assertIsNone(result.failure)
+        self.assertEqual(result.get_error_codes(), [])
+
     def test_get_google_ads_failure_no_failure_key(self):
         """Returns None if an error cannot be found in metadata."""
         mock_metadata = (('another-key', 'another-val'),)
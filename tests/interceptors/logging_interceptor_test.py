@@ -14,10 +14,12 @@
 """Tests for the Logging gRPC Interceptor."""
 
 
+from importlib import import_module
 import json
 import logging
 from unittest import TestCase
 
+import grpc
 import mock
 
 from google.ads.google_ads import client as Client
@@ -524,6 +526,42 @@ class LoggingInterceptorTest(TestCase):
             result = interceptor._get_fault_message(mock_exception)
             self.assertEqual(result, self._MOCK_ERROR_MESSAGE)
 
+    def test_failed_request_parses_failure_once(self):
+        """The failure is parsed once for both log lines."""
+        error_protos = import_module(
+            f'google.ads.google_ads.{default_version}.proto.errors.'
+            'errors_pb2')
+        failure = error_protos.GoogleAdsFailure()
+        failure.errors.add().message = self._MOCK_ERROR_MESSAGE
+        mock_logger = mock.Mock()
+        mock_logger.isEnabledFor.return_value = True
+        interceptor = self._create_test_interceptor(logger=mock_logger)
+
+        class MockRpcErrorResponse(grpc.RpcError):
+            def code(self):
+                return grpc.StatusCode.INVALID_ARGUMENT
+
+            def trailing_metadata(self):
+                return ((interceptor._failure_key,
+                         failure.SerializeToString()),)
+
+            def exception(self):
+                return self
+
+        parse = error_protos.GoogleAdsFailure.ParseFromString
+        with mock.patch.object(error_protos.GoogleAdsFailure,
+                               'ParseFromString', autospec=True,
+                               side_effect=parse) as mock_parse:
+            interceptor.intercept_unary_unary(
+                lambda *args: MockRpcErrorResponse(),
+                self._get_mock_client_call_details(),
+                self._get_mock_request())
+
+        mock_parse.assert_called_once()
+        mock_logger.info.assert_called_once()
+        self.assertIn(self._MOCK_ERROR_MESSAGE,
+                      mock_logger.warning.call_args[0][0])
+
     def test_get_fault_message_transport_failure(self):
         """Retrieves an error message from a transport error object."""
         with mock.patch('logging.config.dictConfig'):
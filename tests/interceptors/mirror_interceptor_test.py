@@ -0,0 +1,81 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the Mirror gRPC Interceptor."""
+
+from importlib import import_module
+import mock
+from unittest import TestCase
+
+from google.ads.google_ads import client as Client
+from google.ads.google_ads.interceptors import MirrorInterceptor
+
+latest_version = Client._DEFAULT_VERSION
+
+campaign_service_protos = import_module(
+    f'google.ads.google_ads.{latest_version}.proto.services.'
+    'campaign_service_pb2')
+
+_SERVICE = f'/google.ads.googleads.{latest_version}.services.CampaignService'
+
+
+def _call_details(method):
+    return mock.Mock(method=f'{_SERVICE}/{method}', metadata=None)
+
+
+class MirrorInterceptorTest(TestCase):
+    def setUp(self):
+        self.mirror = mock.Mock()
+        self.interceptor = MirrorInterceptor(self.mirror, latest_version)
+        self.request = campaign_service_protos.MutateCampaignsRequest(
+            customer_id='123', operations=[
+                campaign_service_protos.CampaignOperation(
+                    remove='customers/123/campaigns/1')])
+        self.response = campaign_service_protos.MutateCampaignsResponse(
+            results=[campaign_service_protos.MutateCampaignResult(
+                resource_name='customers/123/campaigns/1')])
+
+    def _intercept(self, request, method='MutateCampaigns', exception=None):
+        continuation = mock.Mock()
+        continuation.return_value.exception.return_value = exception
+        continuation.return_value.result.return_value = self.response
+        return self.interceptor.intercept_unary_unary(
+            continuation, _call_details(method), request)
+
+    def test_mutate_written_through(self):
+        response = self._intercept(self.request)
+        self.mirror.apply_mutate.assert_called_once_with(
+            '123', self.request.operations, self.response.results)
+        self.assertEqual(response.result(), self.response)
+
+    def test_mirror_error_logged(self):
+        self.mirror.apply_mutate.side_effect = ValueError()
+        with mock.patch('google.ads.google_ads.interceptors.'
+                        'mirror_interceptor._logger') as mock_logger:
+            response = self._intercept(self.request)
+        self.assertEqual(response.result(), self.response)
+        mock_logger.exception.assert_called_once()
+
+    def test_failed_mutate_ignored(self):
+        self._intercept(self.request, exception=ValueError())
+        self.mirror.apply_mutate.assert_not_called()
+
+    def test_validate_only_ignored(self):
+        self.request.validate_only = True
+        self._intercept(self.request)
+        self.mirror.apply_mutate.assert_not_called()
+
+    def test_other_methods_ignored(self):
+        self._intercept(campaign_service_protos.GetCampaignRequest(
+            resource_name='customers/123/campaigns/1'), method='GetCampaign')
+        self.mirror.apply_mutate.assert_not_called()
@@ -0,0 +1,61 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the Validation gRPC Interceptor."""
+
+import mock
+from unittest import TestCase
+
+from google.ads.google_ads import client as Client
+from google.ads.google_ads.field_catalog import QueryValidationError
+from google.ads.google_ads.interceptors import ValidationInterceptor
+
+latest_version = Client._DEFAULT_VERSION
+
+_SERVICE = f'/google.ads.googleads.{latest_version}.services.'
+
+
+class ValidationInterceptorTest(TestCase):
+
+    def setUp(self):
+        self.catalog = mock.Mock()
+        self.catalog.validate.side_effect = QueryValidationError(
+            'SELECT', ['invalid'])
+        self.interceptor = ValidationInterceptor(self.catalog, latest_version)
+
+    def test_search_validated(self):
+        continuation = mock.Mock()
+        request = mock.Mock(query='SELECT')
+        for method, intercept in (
+                ('Search', self.interceptor.intercept_unary_unary),
+                ('SearchStream', self.interceptor.intercept_unary_stream)):
+            details = mock.Mock(method=f'{_SERVICE}GoogleAdsService/{method}')
+            self.assertRaises(QueryValidationError, intercept, continuation,
+                              details, request)
+        continuation.assert_not_called()
+
+    def test_valid_search_sent(self):
+        self.catalog.validate.side_effect = None
+        continuation = mock.Mock()
+        details = mock.Mock(method=f'{_SERVICE}GoogleAdsService/Search')
+        response = self.interceptor.intercept_unary_unary(
+            continuation, details, mock.Mock(query='SELECT'))
+        self.assertEqual(response, continuation.return_value)
+
+    def test_other_methods_not_validated(self):
+        continuation = mock.Mock()
+        details = mock.Mock(method=f'{_SERVICE}CampaignService/GetCampaign')
+        self.interceptor.intercept_unary_unary(continuation, details,
+                                               mock.Mock())
+        self.catalog.validate.assert_not_called()
+        continuation.assert_called_once()
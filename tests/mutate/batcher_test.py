@@ -0,0 +1,188 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the mutate operation batcher."""
+
+from importlib import import_module
+import mock
+import threading
+from unittest import TestCase
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.mutate import _limits, batcher
+
+campaign_service_client = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.services.'
+    'campaign_service_client')
+campaign_service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'campaign_service_pb2')
+
+_TIMEOUT_SECONDS = 5
+
+
+def _operation(index):
+    return campaign_service_protos.CampaignOperation(
+        remove=f'customers/123/campaigns/{index}')
+
+
+class _FakeMutate(object):
+    """Answers each operation with its resource name and records requests."""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def __call__(self, customer_id, operations, **kwargs):
+        with self.lock:
+            self.requests.append((customer_id, len(operations), kwargs))
+        return campaign_service_protos.MutateCampaignsResponse(results=[
+            campaign_service_protos.MutateCampaignResult(
+                resource_name=operation.remove) for operation in operations])
+
+
+class MutateBatcherTest(TestCase):
+    def setUp(self):
+        self.mutate = _FakeMutate()
+
+    def test_flush_on_operation_count(self):
+        with batcher.MutateBatcher(self.mutate, max_operations=3,
+                                   partial_failure=True) as mutate_batcher:
+            futures = mutate_batcher.add_all('123', map(_operation, range(7)))
+        self.assertEqual(sorted(size for _, size, _ in self.mutate.requests),
+                         [1, 3, 3])
+        self.assertEqual(self.mutate.requests[0][2],
+                         {'partial_failure': True})
+        for index, future in enumerate(futures):
+            self.assertEqual(future.position, index)
+            self.assertEqual(future.result().resource_name,
+                             f'customers/123/campaigns/{index}')
+        self.assertEqual(mutate_batcher.stats.requests, 3)
+        self.assertEqual(mutate_batcher.stats.operations, 7)
+
+    def test_flush_on_size(self):
+        size = _limits.get_encoded_size(_operation(1))
+        self.assertEqual(size, _operation(1).ByteSize() + 2)
+        with batcher.MutateBatcher(self.mutate,
+                                   max_bytes=2 * size) as mutate_batcher:
+            mutate_batcher.add_all('123', map(_operation, range(1, 6)))
+        self.assertEqual(sorted(size for _, size, _ in self.mutate.requests),
+                         [1, 2, 2])
+
+    def test_customers_batched_separately(self):
+        with batcher.MutateBatcher(self.mutate) as mutate_batcher:
+            first = mutate_batcher.add('1', _operation(1))
+            second = mutate_batcher.add('2', _operation(2))
+            third = mutate_batcher.add('1', _operation(3))
+        self.assertEqual(sorted(self.mutate.requests),
+                         [('1', 2, {}), ('2', 1, {})])
+        self.assertEqual((first.position, second.position, third.position),
+                         (0, 0, 1))
+
+    def test_flush_on_delay(self):
+        mutate_batcher = batcher.MutateBatcher(self.mutate, max_delay=0.01)
+        future = mutate_batcher.add('123', _operation(1))
+        self.assertEqual(future.result(_TIMEOUT_SECONDS).resource_name,
+                         'customers/123/campaigns/1')
+        mutate_batcher.close()
+
+    def test_concurrency_limit(self):
+        release = threading.Event()
+        in_flight = []
+        peak = []
+
+        def mutate(customer_id, operations):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            release.wait(_TIMEOUT_SECONDS)
+            in_flight.pop()
+            return self.mutate(customer_id, operations)
+
+        mutate_batcher = batcher.MutateBatcher(mutate, max_operations=1,
+                                               max_concurrency=2)
+        adder = threading.Thread(target=mutate_batcher.add_all,
+                                 args=('123', map(_operation, range(4))))
+        adder.start()
+        adder.join(0.1)
+        # The third request waits for one of the first two.
+        self.assertTrue(adder.is_alive())
+        release.set()
+        adder.join(_TIMEOUT_SECONDS)
+        mutate_batcher.close()
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(len(self.mutate.requests), 4)
+
+    def test_failed_request(self):
+        mutate = mock.Mock(side_effect=ValueError('failed'))
+        with batcher.MutateBatcher(mutate) as mutate_batcher:
+            futures = mutate_batcher.add_all('123', map(_operation, range(2)))
+        for future in futures:
+            self.assertIsInstance(future.exception(), ValueError)
+        self.assertEqual(mutate_batcher.stats.failed_requests, 1)
+
+    def test_add_after_close(self):
+        mutate_batcher = batcher.MutateBatcher(self.mutate)
+        mutate_batcher.close()
+        with self.assertRaises(RuntimeError):
+            mutate_batcher.add('123', _operation(1))
+
+    def test_close_waits_for_add_being_sent(self):
+        release = threading.Event()
+
+        def mutate(customer_id, operations):
+            release.wait(_TIMEOUT_SECONDS)
+            return self.mutate(customer_id, operations)
+
+        mutate_batcher = batcher.MutateBatcher(mutate, max_operations=1,
+                                               max_concurrency=1)
+        first = mutate_batcher.add('123', _operation(1))
+        futures = []
+        # The second request waits for the first, after the operation was
+        # added.
+        adder = threading.Thread(target=lambda: futures.append(
+            mutate_batcher.add('123', _operation(2))))
+        adder.start()
+        adder.join(0.1)
+        closer = threading.Thread(target=mutate_batcher.close)
+        closer.start()
+        closer.join(0.1)
+        self.assertTrue(closer.is_alive())
+        release.set()
+        adder.join(_TIMEOUT_SECONDS)
+        closer.join(_TIMEOUT_SECONDS)
+
+        self.assertEqual(first.result(0).resource_name,
+                         'customers/123/campaigns/1')
+        self.assertEqual(futures[0].result(0).resource_name,
+                         'customers/123/campaigns/2')
+
+    def test_close_sends_every_pending_operation(self):
+        mutate_batcher = batcher.MutateBatcher(self.mutate)
+        future = mutate_batcher.add('123', _operation(1))
+        mutate_batcher.close()
+        self.assertEqual(future.result(0).resource_name,
+                         'customers/123/campaigns/1')
+
+    def test_create_batcher(self):
+        client = mock.Mock()
+        service = mock.Mock(
+            spec=campaign_service_client.CampaignServiceClient)
+        client.get_service.return_value = service
+        mutate_batcher = batcher.create_batcher(client, 'CampaignService')
+        self.assertIs(mutate_batcher._mutate_method, service.mutate_campaigns)
+        mutate_batcher.close()
+
+        client.get_service.return_value = mock.Mock(spec=['mutate_a',
+                                                          'mutate_b'])
+        with self.assertRaises(ValueError):
+            batcher.create_batcher(client, 'Service')
@@ -0,0 +1,140 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the coalescing of update operations."""
+
+from importlib import import_module
+from unittest import TestCase
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.mutate import coalescing
+
+campaign_service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'campaign_service_pb2')
+service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'google_ads_service_pb2')
+campaign_status_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.enums.'
+    'campaign_status_pb2')
+
+_PAUSED = campaign_status_protos.CampaignStatusEnum.PAUSED
+_CAMPAIGN = 'customers/1/campaigns/1'
+
+
+def _update(resource_name=_CAMPAIGN, **fields):
+    """Returns a CampaignOperation that updates the given fields."""
+    operation = campaign_service_protos.CampaignOperation()
+    operation.update.resource_name = resource_name
+    for path, value in fields.items():
+        if path == 'status':
+            operation.update.status = value
+        elif path == 'campaign_budget':
+            operation.update.campaign_budget.value = value
+        else:
+            getattr(operation.update, path).value = value
+        operation.update_mask.paths.append(path)
+    return operation
+
+
+def _remove(resource_name=_CAMPAIGN):
+    return campaign_service_protos.CampaignOperation(remove=resource_name)
+
+
+class UpdateCoalescerTest(TestCase):
+    def setUp(self):
+        self.coalescer = coalescing.UpdateCoalescer()
+
+    def test_merges_updates_of_the_same_resource(self):
+        first = _update(status=_PAUSED, name='Old')
+        second = _update(name='New', tracking_url_template='{lpurl}')
+        self.coalescer.add_all([first, second])
+
+        self.assertEqual(len(self.coalescer), 1)
+        (merged,) = self.coalescer.flush()
+        self.assertEqual(merged.update.status, _PAUSED)
+        self.assertEqual(merged.update.name.value, 'New')
+        self.assertEqual(merged.update.tracking_url_template.value,
+                         '{lpurl}')
+        self.assertEqual(sorted(merged.update_mask.paths),
+                         ['name', 'status', 'tracking_url_template'])
+        # The added operations are unchanged.
+        self.assertEqual(first.update.name.value, 'Old')
+        self.assertEqual(list(first.update_mask.paths), ['status', 'name'])
+        self.assertEqual(self.coalescer.stats, (2, 1, 0))
+        self.assertEqual(self.coalescer.stats.saved, 1)
+        self.assertEqual(len(self.coalescer), 0)
+
+    def test_merged_mask_clears_fields(self):
+        cleared = _update(name='Name')
+        cleared.update.ClearField('name')
+        self.coalescer.add_all([_update(name='Name', status=_PAUSED),
+                                cleared])
+        (merged,) = self.coalescer.flush()
+        self.assertFalse(merged.update.HasField('name'))
+        self.assertIn('name', merged.update_mask.paths)
+
+    def test_remove_drops_pending_update(self):
+        remove = _remove()
+        self.coalescer.add_all([_update(status=_PAUSED), _update(name='A'),
+                                remove])
+        self.assertEqual(self.coalescer.flush(), [remove])
+        self.assertEqual(self.coalescer.stats, (3, 1, 1))
+
+    def test_keeps_updates_separated_by_a_reference(self):
+        ad_group = service_protos.MutateOperation()
+        ad_group.ad_group_operation.create.campaign.value = _CAMPAIGN
+        first = service_protos.MutateOperation()
+        first.campaign_operation.CopyFrom(_update(status=_PAUSED))
+        second = service_protos.MutateOperation()
+        second.campaign_operation.CopyFrom(_update(name='A'))
+        remove = service_protos.MutateOperation()
+        remove.campaign_operation.CopyFrom(_remove())
+
+        self.coalescer.add_all([first, ad_group, second, remove])
+
+        self.assertEqual(self.coalescer.flush(), [first, ad_group, remove])
+        self.assertEqual(self.coalescer.stats, (4, 0, 1))
+
+    def test_merges_mutate_operations_across_resource_types(self):
+        operations = []
+        for campaign_id in (1, 2, 1, 2):
+            mutate_operation = service_protos.MutateOperation()
+            mutate_operation.campaign_operation.CopyFrom(_update(
+                f'customers/1/campaigns/{campaign_id}',
+                name=f'{campaign_id}'))
+            operations.append(mutate_operation)
+        self.coalescer.add_all(operations)
+        self.assertEqual(
+            [operation.campaign_operation.update.resource_name
+             for operation in self.coalescer.flush()],
+            ['customers/1/campaigns/1', 'customers/1/campaigns/2'])
+
+    def test_keeps_updates_separated_by_a_change_they_refer_to(self):
+        budget = 'customers/1/campaignBudgets/1'
+        budget_update = service_protos.MutateOperation()
+        budget_update.campaign_budget_operation.update.resource_name = budget
+        first = service_protos.MutateOperation()
+        first.campaign_operation.CopyFrom(_update(status=_PAUSED))
+        second = service_protos.MutateOperation()
+        second.campaign_operation.CopyFrom(_update(campaign_budget=budget))
+
+        self.coalescer.add_all([first, budget_update, second])
+
+        self.assertEqual(len(self.coalescer), 3)
+        self.assertEqual(self.coalescer.stats.saved, 0)
+
+    def test_rejects_empty_operations(self):
+        self.assertRaises(ValueError, self.coalescer.add,
+                          campaign_service_protos.CampaignOperation())
@@ -0,0 +1,124 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the resource type grouping of mutate operations."""
+
+from importlib import import_module
+from unittest import TestCase
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.mutate import grouping, operations
+
+service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'google_ads_service_pb2')
+
+
+def _campaign(campaign_id, budget_id=None):
+    mutate_operation = service_protos.MutateOperation()
+    campaign = mutate_operation.campaign_operation.create
+    campaign.resource_name = f'customers/1/campaigns/{campaign_id}'
+    if budget_id is not None:
+        campaign.campaign_budget.value = (
+            f'customers/1/campaignBudgets/{budget_id}')
+    return mutate_operation
+
+
+def _budget(budget_id):
+    mutate_operation = service_protos.MutateOperation()
+    mutate_operation.campaign_budget_operation.create.resource_name = (
+        f'customers/1/campaignBudgets/{budget_id}')
+    return mutate_operation
+
+
+def _ad_group(ad_group_id, campaign_id):
+    mutate_operation = service_protos.MutateOperation()
+    ad_group = mutate_operation.ad_group_operation.create
+    ad_group.resource_name = f'customers/1/adGroups/{ad_group_id}'
+    ad_group.campaign.value = f'customers/1/campaigns/{campaign_id}'
+    return mutate_operation
+
+
+def _remove_campaign(campaign_id):
+    mutate_operation = service_protos.MutateOperation()
+    mutate_operation.campaign_operation.remove = (
+        f'customers/1/campaigns/{campaign_id}')
+    return mutate_operation
+
+
+class OperationsTest(TestCase):
+    def test_is_temporary_resource_name(self):
+        self.assertTrue(operations.is_temporary_resource_name(
+            'customers/1/campaigns/-2'))
+        self.assertTrue(operations.is_temporary_resource_name(
+            'customers/1/adGroupAds/-2~3'))
+        self.assertFalse(operations.is_temporary_resource_name(
+            'customers/1/campaigns/2'))
+
+    def test_list_temporary_resource_names(self):
+        self.assertEqual(
+            operations.list_temporary_resource_names(
+                _ad_group(-3, -1).ad_group_operation),
+            {'customers/1/adGroups/-3', 'customers/1/campaigns/-1'})
+
+    def test_get_target_resource_name(self):
+        self.assertEqual(operations.get_target_resource_name(
+            _remove_campaign(5).campaign_operation), 'customers/1/campaigns/5')
+
+
+class GroupByResourceTypeTest(TestCase):
+    def _field_names(self, order):
+        return [mutate_operation.WhichOneof('operation')
+                for mutate_operation in order.operations]
+
+    def test_per_entity_order_grouped(self):
+        original = [_budget(-1), _campaign(-2, -1), _ad_group(-3, -2),
+                    _budget(-4), _campaign(-5, -4), _ad_group(-6, -5)]
+        order = grouping.group_by_resource_type(original)
+        self.assertEqual((order.original_runs, order.runs), (6, 3))
+        self.assertEqual(order.indices, [0, 3, 1, 4, 2, 5])
+        self.assertEqual(self._field_names(order), [
+            'campaign_budget_operation', 'campaign_budget_operation',
+            'campaign_operation', 'campaign_operation',
+            'ad_group_operation', 'ad_group_operation'])
+
+    def test_dependencies_respected(self):
+        # The ad group refers to a campaign that is created later.
+        original = [_campaign(-1), _ad_group(-3, -2), _campaign(-2),
+                    _ad_group(-4, -1)]
+        order = grouping.group_by_resource_type(original)
+        position = {index: new for new, index in enumerate(order.indices)}
+        self.assertLess(position[2], position[1])
+        self.assertEqual(order.runs, 2)
+
+    def test_same_resource_keeps_order(self):
+        original = [_campaign(-1), _ad_group(-2, -1), _remove_campaign(-1)]
+        order = grouping.group_by_resource_type(original)
+        self.assertEqual(order.indices, [0, 1, 2])
+
+    def test_restore(self):
+        original = [_campaign(-1), _ad_group(-2, -1), _campaign(-3)]
+        order = grouping.group_by_resource_type(original)
+        self.assertEqual(order.indices, [0, 2, 1])
+        self.assertEqual(order.restore(['a', 'b', 'c']), ['a', 'c', 'b'])
+        self.assertEqual(order.to_original_index(1), 2)
+
+    def test_circular_dependencies(self):
+        first = _campaign(-1)
+        first.campaign_operation.create.campaign_budget.value = (
+            'customers/1/campaignBudgets/-2')
+        second = _budget(-2)
+        second.campaign_budget_operation.create.name.value = (
+            'customers/1/campaigns/-1')
+        with self.assertRaises(ValueError):
+            grouping.group_by_resource_type([first, second])
@@ -0,0 +1,187 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the partial failure mapping of mutate responses."""
+
+from importlib import import_module
+import mock
+from unittest import TestCase
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.mutate import partial_failure
+
+ad_group_service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'ad_group_service_pb2')
+errors_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.errors.errors_pb2')
+internal_error_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.errors.'
+    'internal_error_pb2')
+range_error_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.errors.'
+    'range_error_pb2')
+
+_TRANSIENT = ('internal_error', internal_error_protos.InternalErrorEnum
+              .TRANSIENT_ERROR)
+_TOO_LOW = ('range_error', range_error_protos.RangeErrorEnum.TOO_LOW)
+
+
+def _operation(index):
+    return ad_group_service_protos.AdGroupOperation(
+        remove=f'customers/1/adGroups/{index}')
+
+
+def _response(operations, errors):
+    """Returns a response with partial failure errors.
+
+    Args:
+        operations: the operations sent.
+        errors: a list of (index, (category, value)) tuples; an index of None
+            adds an error without a location.
+    """
+    response = ad_group_service_protos.MutateAdGroupsResponse()
+    failed = {index for index, _ in errors}
+    for index, operation in enumerate(operations):
+        result = response.results.add()
+        if index not in failed:
+            result.resource_name = operation.remove
+    if errors:
+        failure = errors_protos.GoogleAdsFailure()
+        for index, (category, value) in errors:
+            error = failure.errors.add()
+            setattr(error.error_code, category, value)
+            if index is not None:
+                element = error.location.field_path_elements.add()
+                element.field_name = 'operations'
+                element.index.value = index
+        response.partial_failure_error.code = 3
+        response.partial_failure_error.details.add().Pack(failure)
+    return response
+
+
+class PartialFailureMapTest(TestCase):
+    def test_from_response(self):
+        operations = [_operation(index) for index in range(5)]
+        response = _response(operations, [(1, _TRANSIENT), (2, _TOO_LOW),
+                                          (3, _TRANSIENT), (3, _TOO_LOW)])
+
+        failure_map = partial_failure.PartialFailureMap.from_response(
+            response)
+
+        self.assertTrue(failure_map.failed)
+        self.assertEqual(failure_map.operation_count, 5)
+        self.assertEqual(failure_map.succeeded_indices, [0, 4])
+        self.assertEqual(failure_map.retryable_indices, [1])
+        self.assertEqual(failure_map.permanent_indices, [2, 3])
+        self.assertEqual(len(failure_map.get_errors(3)), 2)
+        self.assertEqual(failure_map.get_errors(0), [])
+        self.assertEqual(failure_map.request_errors, [])
+        self.assertEqual(failure_map.error_code_counts, {
+            ('internal_error', 'TRANSIENT_ERROR'): 2,
+            ('range_error', 'TOO_LOW'): 2})
+        self.assertEqual(failure_map.split(operations),
+                         ([operations[0], operations[4]], [operations[1]],
+                          [operations[2], operations[3]]))
+
+    def test_request_errors(self):
+        operations = [_operation(index) for index in range(3)]
+        failure_map = partial_failure.PartialFailureMap.from_response(
+            _response(operations, [(1, _TOO_LOW), (None, _TOO_LOW)]))
+
+        self.assertTrue(failure_map.failed)
+        self.assertEqual(len(failure_map.request_errors), 1)
+        self.assertEqual(failure_map.succeeded_indices, [])
+        self.assertEqual(failure_map.permanent_indices, [1])
+        self.assertEqual(failure_map.split(operations),
+                         ([], [], [operations[1]]))
+
+    def test_from_response_without_failures(self):
+        operations = [_operation(index) for index in range(2)]
+        failure_map = partial_failure.PartialFailureMap.from_response(
+            _response(operations, []))
+        self.assertFalse(failure_map.failed)
+        self.assertEqual(failure_map.succeeded_indices, [0, 1])
+        self.assertEqual(failure_map.error_code_counts, {})
+
+    def test_retryable_error_codes(self):
+        operations = [_operation(0)]
+        failure_map = partial_failure.PartialFailureMap.from_response(
+            _response(operations, [(0, _TOO_LOW)]),
+            retryable_error_codes={('range_error', 'TOO_LOW')})
+        self.assertEqual(failure_map.retryable_indices, [0])
+
+
+class MutateWithRetriesTest(TestCase):
+    def _mutate(self, failures):
+        """Fails the operations at the given indices of each request."""
+        mutate = mock.Mock()
+        mutate.side_effect = (
+            lambda customer_id, operations, **kwargs: _response(
+                operations, failures.pop(0)))
+        return mutate
+
+    @mock.patch('time.sleep')
+    def test_retries_transient_failures(self, sleep):
+        operations = [_operation(index) for index in range(4)]
+        mutate = self._mutate([[(1, _TRANSIENT), (2, _TOO_LOW),
+                                (3, _TRANSIENT)],
+                               [(1, _TRANSIENT)],
+                               []])
+
+        result = partial_failure.mutate_with_retries(
+            mutate, '1', operations, retry_delay=0.5, validate_only=False)
+
+        self.assertEqual(result.requests, 3)
+        self.assertEqual(result.retried, 3)
+        self.assertEqual([call[0][1] for call in mutate.call_args_list],
+                         [operations, [operations[1], operations[3]],
+                          [operations[3]]])
+        self.assertEqual(mutate.call_args_list[0][1],
+                         {'partial_failure': True, 'validate_only': False})
+        self.assertEqual(sleep.call_args_list, [mock.call(0.5),
+                                                mock.call(1.0)])
+        self.assertEqual(
+            [result and result.resource_name for result in result.results],
+            ['customers/1/adGroups/0', 'customers/1/adGroups/1', None,
+             'customers/1/adGroups/3'])
+        self.assertEqual(sorted(result.errors_by_index), [2])
+        self.assertEqual(result.error_code_counts[
+            ('internal_error', 'TRANSIENT_ERROR')], 3)
+
+    @mock.patch('time.sleep')
+    def test_stops_after_max_retries(self, sleep):
+        operations = [_operation(0)]
+        mutate = self._mutate([[(0, _TRANSIENT)]] * 3)
+
+        result = partial_failure.mutate_with_retries(
+            mutate, '1', operations, max_retries=2)
+
+        self.assertEqual(result.requests, 3)
+        self.assertEqual(result.results, [None])
+        self.assertEqual(sorted(result.errors_by_index), [0])
+
+    @mock.patch('time.sleep')
+    def test_request_errors_not_retried(self, sleep):
+        operations = [_operation(index) for index in range(3)]
+        mutate = self._mutate([[(0, _TRANSIENT)],
+                               [(None, _TRANSIENT)]])
+
+        result = partial_failure.mutate_with_retries(mutate, '1', operations)
+
+        self.assertEqual(result.requests, 2)
+        self.assertEqual(len(result.request_errors), 1)
+        self.assertEqual(
+            [result and result.resource_name for result in result.results],
+            [None, 'customers/1/adGroups/1', 'customers/1/adGroups/2'])
+        self.assertEqual(sorted(result.errors_by_index), [0])
@@ -0,0 +1,173 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the validate_only preflight pipeline."""
+
+from importlib import import_module
+import mock
+import threading
+from unittest import TestCase
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.mutate import preflight
+
+campaign_service_client = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.services.'
+    'campaign_service_client')
+campaign_service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'campaign_service_pb2')
+errors_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.errors.errors_pb2')
+range_error_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.errors.'
+    'range_error_pb2')
+
+_TIMEOUT_SECONDS = 5
+
+
+def _operation(customer_id, name):
+    return campaign_service_protos.CampaignOperation(
+        remove=f'customers/{customer_id}/campaigns/{name}')
+
+
+class _FakeMutate(object):
+    """Fails the validation of operations whose name starts with "bad"."""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.on_call = None
+
+    def __call__(self, customer_id, operations, validate_only=False,
+                 **kwargs):
+        names = [operation.remove.rpartition('/')[2]
+                 for operation in operations]
+        with self.lock:
+            self.calls.append((customer_id, names, validate_only, kwargs))
+        if self.on_call is not None:
+            self.on_call(customer_id, names, validate_only)
+
+        response = campaign_service_protos.MutateCampaignsResponse()
+        failure = errors_protos.GoogleAdsFailure()
+        for index, (operation, name) in enumerate(zip(operations, names)):
+            result = response.results.add()
+            if not validate_only:
+                result.resource_name = operation.remove
+            elif name.startswith('bad'):
+                error = failure.errors.add()
+                error.error_code.range_error = (
+                    range_error_protos.RangeErrorEnum.TOO_LOW)
+                error.location.field_path_elements.add().index.value = index
+        if failure.errors:
+            response.partial_failure_error.code = 3
+            response.partial_failure_error.details.add().Pack(failure)
+        return response
+
+    def sent(self, customer_id=None):
+        """Returns the names sent without validate_only."""
+        return [names for call_customer_id, names, validate_only, _
+                in self.calls if not validate_only
+                and customer_id in (None, call_customer_id)]
+
+
+class PreflightPipelineTest(TestCase):
+    def setUp(self):
+        self.mutate = _FakeMutate()
+
+    def test_releases_only_valid_batches_in_order(self):
+        with preflight.PreflightPipeline(
+                self.mutate, max_concurrency=3,
+                partial_failure=True) as pipeline:
+            futures = pipeline.submit_all([
+                ('1', [_operation('1', 'a'), _operation('1', 'b')]),
+                ('2', [_operation('2', 'a')]),
+                ('1', [_operation('1', 'bad'), _operation('1', 'c')]),
+                ('1', [_operation('1', 'd')])])
+
+        self.assertEqual(self.mutate.sent('1'), [['a', 'b'], ['d']])
+        self.assertEqual(self.mutate.sent('2'), [['a']])
+        validations = [call for call in self.mutate.calls if call[2]]
+        self.assertEqual(len(validations), 4)
+        self.assertEqual(validations[0][3], {'partial_failure': True})
+
+        result = futures[0].result()
+        self.assertTrue(result.valid)
+        self.assertTrue(result.released)
+        self.assertEqual(result.responses[0].results[0].resource_name,
+                         'customers/1/campaigns/a')
+        held = futures[2].result()
+        self.assertFalse(held.valid)
+        self.assertFalse(held.released)
+        self.assertEqual(held.validations[0].permanent_indices, [0])
+        self.assertEqual(pipeline.get_lane_stats('1').completed, 2)
+
+    def test_drop_invalid_releases_valid_operations(self):
+        with preflight.PreflightPipeline(self.mutate,
+                                         drop_invalid=True) as pipeline:
+            future = pipeline.submit(
+                '1', [_operation('1', 'bad'), _operation('1', 'a')])
+        self.assertEqual(self.mutate.sent(), [['a']])
+        self.assertFalse(future.result().valid)
+        self.assertEqual(future.result().operations, [_operation('1', 'a')])
+
+    def test_validation_overlaps_execution(self):
+        validated = threading.Event()
+
+        def on_call(customer_id, names, validate_only):
+            if validate_only and names == ['b']:
+                validated.set()
+            elif not validate_only and names == ['a']:
+                # The first batch is sent while the second is validated.
+                self.assertTrue(validated.wait(_TIMEOUT_SECONDS))
+
+        self.mutate.on_call = on_call
+        validation_started = threading.Event()
+        original_validate = preflight.PreflightPipeline._validate
+
+        def validate(pipeline, lane, batch):
+            if batch.operations[0].remove.endswith('/b'):
+                validation_started.wait(_TIMEOUT_SECONDS)
+            original_validate(pipeline, lane, batch)
+            validation_started.set()
+
+        with mock.patch.object(preflight.PreflightPipeline, '_validate',
+                               validate):
+            with preflight.PreflightPipeline(self.mutate) as pipeline:
+                futures = pipeline.submit_all([('1', [_operation('1', 'a')]),
+                                               ('1', [_operation('1', 'b')])])
+        self.assertTrue(validated.is_set())
+        self.assertEqual(self.mutate.sent(), [['a'], ['b']])
+        for future in futures:
+            self.assertTrue(future.result().released)
+
+    def test_validation_exception(self):
+        self.mutate.on_call = mock.Mock(side_effect=ValueError('Failed'))
+        with preflight.PreflightPipeline(self.mutate) as pipeline:
+            future = pipeline.submit('1', [_operation('1', 'a')])
+        self.assertRaises(ValueError, future.result)
+        self.assertEqual(self.mutate.sent(), [])
+
+    def test_submit_after_close(self):
+        pipeline = preflight.PreflightPipeline(self.mutate)
+        pipeline.close()
+        self.assertRaises(RuntimeError, pipeline.submit, '1', [])
+
+    def test_create_preflight_pipeline(self):
+        client = mock.Mock()
+        service = mock.Mock(
+            spec=campaign_service_client.CampaignServiceClient)
+        client.get_service.return_value = service
+        with preflight.create_preflight_pipeline(
+                client, 'CampaignService') as pipeline:
+            self.assertIs(pipeline._mutate_method, service.mutate_campaigns)
@@ -0,0 +1,161 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the per-customer mutate scheduler."""
+
+from importlib import import_module
+import mock
+import threading
+from unittest import TestCase
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.mutate import scheduler
+
+campaign_service_client = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.services.'
+    'campaign_service_client')
+campaign_service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'campaign_service_pb2')
+
+_TIMEOUT_SECONDS = 5
+
+
+def _operation(customer_id, index):
+    return campaign_service_protos.CampaignOperation(
+        remove=f'customers/{customer_id}/campaigns/{index}')
+
+
+class _FakeMutate(object):
+    """Records requests and tracks the concurrency per customer."""
+
+    def __init__(self, fail_on=None, release=None):
+        self.requests = []
+        self.lock = threading.Lock()
+        self.running = {}
+        self.max_running_per_customer = 0
+        self.max_running = 0
+        self.fail_on = fail_on
+        self.release = release
+
+    def __call__(self, customer_id, operations, **kwargs):
+        with self.lock:
+            self.requests.append(
+                (customer_id, [operation.remove for operation in operations],
+                 kwargs))
+            self.running[customer_id] = self.running.get(customer_id, 0) + 1
+            self.max_running_per_customer = max(
+                self.max_running_per_customer, self.running[customer_id])
+            self.max_running = max(self.max_running,
+                                   sum(self.running.values()))
+        try:
+            if self.release is not None:
+                self.release.wait(_TIMEOUT_SECONDS)
+            if any(operation.remove == self.fail_on
+                   for operation in operations):
+                raise ValueError('Failed')
+            return campaign_service_protos.MutateCampaignsResponse(results=[
+                campaign_service_protos.MutateCampaignResult(
+                    resource_name=operation.remove)
+                for operation in operations])
+        finally:
+            with self.lock:
+                self.running[customer_id] -= 1
+
+
+class MutateSchedulerTest(TestCase):
+    def test_orders_work_per_customer(self):
+        mutate = _FakeMutate()
+        mutate_scheduler = scheduler.MutateScheduler(
+            mutate, max_concurrency=3, partial_failure=True)
+        with mutate_scheduler:
+            futures = mutate_scheduler.submit_all(
+                (customer_id, [_operation(customer_id, index)])
+                for index in range(20) for customer_id in ('1', '2', '3'))
+
+        self.assertEqual(mutate.max_running_per_customer, 1)
+        for customer_id in ('1', '2', '3'):
+            self.assertEqual(
+                [names[0] for request_customer_id, names, _
+                 in mutate.requests if request_customer_id == customer_id],
+                [f'customers/{customer_id}/campaigns/{index}'
+                 for index in range(20)])
+        self.assertEqual(mutate.requests[0][2], {'partial_failure': True})
+        self.assertEqual(futures[0].result()[0].results[0].resource_name,
+                         'customers/1/campaigns/0')
+
+    def test_runs_customers_in_parallel_under_the_cap(self):
+        release = threading.Event()
+        mutate = _FakeMutate(release=release)
+        mutate_scheduler = scheduler.MutateScheduler(mutate,
+                                                     max_concurrency=2)
+        for customer_id in ('1', '2'):
+            mutate_scheduler.submit(customer_id, [_operation(customer_id, 1)])
+        self.assertFalse(mutate_scheduler.join(timeout=0.2))
+        # Both workers are busy, so the lane of customer 3 waits.
+        mutate_scheduler.submit_all([('3', [_operation('3', 1)]),
+                                     ('3', [_operation('3', 2)])])
+
+        stats = mutate_scheduler.get_lane_stats('3')
+        self.assertEqual(stats.queue_depth, 2)
+        self.assertEqual(stats.max_queue_depth, 2)
+        self.assertTrue(mutate_scheduler.get_lane_stats('1').running)
+        release.set()
+        mutate_scheduler.close()
+
+        self.assertEqual(mutate.max_running, 2)
+        stats = mutate_scheduler.get_lane_stats()
+        self.assertEqual(sorted(stats), ['1', '2', '3'])
+        self.assertEqual(stats['3'].completed, 2)
+        self.assertEqual(stats['3'].queue_depth, 0)
+        self.assertFalse(stats['3'].running)
+        self.assertGreater(stats['1'].max_latency, 0)
+        self.assertGreater(stats['1'].mean_latency, 0)
+        self.assertGreater(stats['3'].mean_wait, 0)
+
+    def test_splits_work_items_into_requests(self):
+        mutate = _FakeMutate()
+        with scheduler.MutateScheduler(mutate,
+                                       max_operations=2) as mutate_scheduler:
+            future = mutate_scheduler.submit(
+                '1', [_operation('1', index) for index in range(5)])
+        self.assertEqual([len(names) for _, names, _ in mutate.requests],
+                         [2, 2, 1])
+        self.assertEqual(len(future.result()), 3)
+        self.assertEqual(mutate_scheduler.get_lane_stats('1').requests, 3)
+
+    def test_failure_doesnt_stop_the_lane(self):
+        mutate = _FakeMutate(fail_on='customers/1/campaigns/1')
+        with scheduler.MutateScheduler(mutate) as mutate_scheduler:
+            failed = mutate_scheduler.submit('1', [_operation('1', 1)])
+            succeeded = mutate_scheduler.submit('1', [_operation('1', 2)])
+        self.assertRaises(ValueError, failed.result)
+        self.assertEqual(len(succeeded.result()), 1)
+        stats = mutate_scheduler.get_lane_stats('1')
+        self.assertEqual((stats.completed, stats.failed), (1, 1))
+
+    def test_submit_after_close(self):
+        mutate_scheduler = scheduler.MutateScheduler(_FakeMutate())
+        mutate_scheduler.close()
+        self.assertRaises(RuntimeError, mutate_scheduler.submit, '1', [])
+        self.assertIsNone(mutate_scheduler.get_lane_stats('1'))
+
+    def test_create_scheduler(self):
+        client = mock.Mock()
+        service = mock.Mock(
+            spec=campaign_service_client.CampaignServiceClient)
+        client.get_service.return_value = service
+        with scheduler.create_scheduler(client, 'CampaignService',
+                                        max_concurrency=2) as mutate_scheduler:
+            self.assertIs(mutate_scheduler._mutate_method,
+                          service.mutate_campaigns)
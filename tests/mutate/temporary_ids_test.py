@@ -0,0 +1,162 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the partitioning of mutate operations with temporary IDs."""
+
+from importlib import import_module
+from unittest import mock, TestCase
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.mutate import _limits, operations, \
+    temporary_ids
+
+service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'google_ads_service_pb2')
+
+
+def _budget(budget_id):
+    mutate_operation = service_protos.MutateOperation()
+    mutate_operation.campaign_budget_operation.create.resource_name = (
+        f'customers/1/campaignBudgets/{budget_id}')
+    return mutate_operation
+
+
+def _campaign(campaign_id, budget_id):
+    mutate_operation = service_protos.MutateOperation()
+    campaign = mutate_operation.campaign_operation.create
+    campaign.resource_name = f'customers/1/campaigns/{campaign_id}'
+    campaign.campaign_budget.value = (
+        f'customers/1/campaignBudgets/{budget_id}')
+    return mutate_operation
+
+
+def _ad_group(ad_group_id, campaign_id):
+    mutate_operation = service_protos.MutateOperation()
+    ad_group = mutate_operation.ad_group_operation.create
+    ad_group.resource_name = f'customers/1/adGroups/{ad_group_id}'
+    ad_group.campaign.value = f'customers/1/campaigns/{campaign_id}'
+    return mutate_operation
+
+
+def _fake_mutate(customer_id, mutate_operations, **kwargs):
+    """Returns a response with real IDs of the negated temporary IDs."""
+    response = service_protos.MutateGoogleAdsResponse()
+    for mutate_operation in mutate_operations:
+        field_name, operation = operations.unwrap(mutate_operation)
+        resource_name = operations.get_target_resource_name(operation)
+        result = getattr(response.mutate_operation_responses.add(),
+                         field_name.replace('_operation', '_result'))
+        result.resource_name = resource_name.replace('/-', '/')
+    return response
+
+
+class TemporaryIdAllocatorTest(TestCase):
+    def test_next_resource_name(self):
+        allocator = temporary_ids.TemporaryIdAllocator()
+        self.assertEqual(allocator.next_resource_name('1', 'campaigns'),
+                         'customers/1/campaigns/-1')
+        self.assertEqual(allocator.next_id(), -2)
+
+
+class ReplaceResourceNamesTest(TestCase):
+    def test_replace_resource_names(self):
+        mutate_operation = _ad_group(-3, -1)
+        replaced = operations.replace_resource_names(
+            mutate_operation, {'customers/1/campaigns/-1':
+                               'customers/1/campaigns/9'})
+        self.assertEqual(replaced, 1)
+        ad_group = mutate_operation.ad_group_operation.create
+        self.assertEqual(ad_group.campaign.value, 'customers/1/campaigns/9')
+        self.assertEqual(ad_group.resource_name, 'customers/1/adGroups/-3')
+
+
+class MutatePlanTest(TestCase):
+    def _create_plan(self):
+        plan = temporary_ids.MutatePlan('1')
+        # Two independent trees of a budget, a campaign and an ad group.
+        plan.add_all([_budget(-1), _budget(-2), _campaign(-3, -1),
+                      _campaign(-4, -2), _ad_group(-5, -3),
+                      _ad_group(-6, -4)])
+        return plan
+
+    def test_add_tracks_temporary_names(self):
+        plan = self._create_plan()
+        self.assertEqual(plan.creators['customers/1/campaigns/-3'], 2)
+        self.assertEqual(plan.references['customers/1/campaigns/-3'], {4})
+
+    def test_add_rejects_duplicate_creators(self):
+        plan = temporary_ids.MutatePlan('1')
+        plan.add(_budget(-1))
+        self.assertRaises(ValueError, plan.add, _budget(-1))
+
+    def test_partition_keeps_connected_operations_together(self):
+        batches = self._create_plan().partition(max_operations=4)
+        self.assertEqual(batches, [[0, 2, 4], [1, 3, 5]])
+
+    def test_partition_packs_groups(self):
+        batches = self._create_plan().partition(max_operations=6)
+        self.assertEqual(batches, [[0, 1, 2, 3, 4, 5]])
+
+    def test_partition_splits_large_groups_in_dependency_order(self):
+        batches = self._create_plan().partition(max_operations=2)
+        self.assertEqual(batches, [[0, 2], [4], [1, 3], [5]])
+
+    def test_partition_limits_bytes(self):
+        plan = self._create_plan()
+        size = max(_limits.get_encoded_size(mutate_operation)
+                   for mutate_operation in plan.operations)
+        for batch in plan.partition(max_bytes=size):
+            self.assertEqual(len(batch), 1)
+
+    def test_execute_replaces_names_created_in_earlier_requests(self):
+        plan = self._create_plan()
+        service = mock.Mock()
+        service.mutate.side_effect = _fake_mutate
+
+        result = plan.execute(service, max_operations=2,
+                              partial_failure=True)
+
+        self.assertEqual(service.mutate.call_count, 4)
+        sent = service.mutate.call_args_list[1][0][1]
+        self.assertEqual(sent[0].ad_group_operation.create.campaign.value,
+                         'customers/1/campaigns/3')
+        self.assertEqual(
+            service.mutate.call_args_list[1][1], {'partial_failure': True})
+        # The added operations are unchanged.
+        self.assertEqual(
+            plan.operations[4].ad_group_operation.create.campaign.value,
+            'customers/1/campaigns/-3')
+        self.assertEqual(result.resource_names['customers/1/adGroups/-6'],
+                         'customers/1/adGroups/6')
+        self.assertEqual(
+            [temporary_ids.get_result_resource_name(response)
+             for response in result.responses],
+            ['customers/1/campaignBudgets/1', 'customers/1/campaignBudgets/2',
+             'customers/1/campaigns/3', 'customers/1/campaigns/4',
+             'customers/1/adGroups/5', 'customers/1/adGroups/6'])
+        self.assertEqual(len(result.batch_responses), 4)
+
+    def test_execute_skips_failed_operations(self):
+        plan = temporary_ids.MutatePlan('1')
+        plan.add(_budget(-1))
+        service = mock.Mock()
+        response = service_protos.MutateGoogleAdsResponse()
+        response.mutate_operation_responses.add()
+        service.mutate.return_value = response
+
+        result = plan.execute(service)
+
+        self.assertEqual(result.resource_names, {})
+        self.assertEqual(
+            temporary_ids.get_result_resource_name(result.responses[0]), '')
@@ -0,0 +1,106 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the compiled field mask computation."""
+
+from importlib import import_module
+from unittest import TestCase
+
+from google.api_core import protobuf_helpers
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.mutate import update_masks
+
+campaign_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.resources.'
+    'campaign_pb2')
+ad_group_criterion_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.resources.'
+    'ad_group_criterion_pb2')
+
+
+def _campaigns():
+    """Returns Campaign messages that differ in every kind of field."""
+    empty = campaign_protos.Campaign()
+    original = campaign_protos.Campaign()
+    original.resource_name = 'customers/1/campaigns/1'
+    original.name.value = 'Campaign'
+    original.status = 2
+    original.network_settings.target_search_network.value = True
+    original.manual_cpc.enhanced_cpc_enabled.value = True
+
+    modified = campaign_protos.Campaign()
+    modified.CopyFrom(original)
+    modified.name.value = 'Renamed'
+    modified.network_settings.target_search_network.value = False
+    modified.network_settings.target_content_network.value = True
+    modified.url_custom_parameters.add().key.value = 'key'
+    # Switches the bidding strategy oneof.
+    modified.target_spend.cpc_bid_ceiling_micros.value = 1000000
+
+    unchanged_wrappers = campaign_protos.Campaign()
+    unchanged_wrappers.name.value = ''
+    unchanged_wrappers.network_settings.SetInParent()
+    return [empty, original, modified, unchanged_wrappers]
+
+
+class UpdateMasksTest(TestCase):
+    def _assert_same_as_api_core(self, original, modified):
+        self.assertEqual(
+            list(update_masks.field_mask(original, modified).paths),
+            list(protobuf_helpers.field_mask(original, modified).paths))
+
+    def test_matches_api_core_for_campaigns(self):
+        campaigns = _campaigns()
+        for original in campaigns + [None]:
+            for modified in campaigns:
+                self._assert_same_as_api_core(original, modified)
+            self._assert_same_as_api_core(original, None)
+
+    def test_matches_api_core_for_ad_group_criteria(self):
+        original = ad_group_criterion_protos.AdGroupCriterion()
+        original.resource_name = 'customers/1/adGroupCriteria/1~2'
+        original.keyword.text.value = 'shoes'
+        original.cpc_bid_micros.value = 1000000
+        modified = ad_group_criterion_protos.AdGroupCriterion()
+        modified.CopyFrom(original)
+        modified.cpc_bid_micros.value = 2000000
+        modified.final_urls.add().value = 'https://example.com'
+        modified.keyword.match_type = 2
+
+        mask = update_masks.field_mask(original, modified)
+
+        self.assertEqual(list(mask.paths),
+                         ['cpc_bid_micros', 'final_urls',
+                          'keyword.match_type'])
+        self._assert_same_as_api_core(original, modified)
+        self._assert_same_as_api_core(modified, original)
+
+    def test_field_masks(self):
+        original, modified = _campaigns()[1:3]
+        compiled = update_masks.compile_field_mask(campaign_protos.Campaign)
+        self.assertIs(compiled, update_masks.compile_field_mask(
+            campaign_protos.Campaign))
+
+        pairs = [(original, modified), (modified, modified), (None, original)]
+        expected = [protobuf_helpers.field_mask(*pair) for pair in pairs]
+        self.assertEqual(compiled.field_masks(pairs), expected)
+        self.assertEqual(update_masks.field_masks(pairs), expected)
+
+    def test_field_mask_of_no_messages(self):
+        self.assertEqual(list(update_masks.field_mask(None, None).paths), [])
+
+    def test_field_mask_rejects_different_types(self):
+        self.assertRaises(ValueError, update_masks.field_mask,
+                          campaign_protos.Campaign(),
+                          ad_group_criterion_protos.AdGroupCriterion())
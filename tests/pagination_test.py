@@ -0,0 +1,193 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the prefetching page iterator."""
+
+from importlib import import_module
+import threading
+from unittest import TestCase
+
+from google.api_core import page_iterator
+import mock
+
+from google.ads.google_ads import pagination
+from google.ads.google_ads.client import _DEFAULT_VERSION as default_version
+
+service_protos = import_module(
+    f'google.ads.google_ads.{default_version}.proto.services.'
+    'google_ads_service_pb2')
+
+
+class MockSearchMethod(object):
+    """Returns pages of rows for a SearchGoogleAdsRequest.
+
+    Args:
+        page_count: the number of pages to return.
+        rows_per_page: the number of rows on each page.
+        fail_on_page: an optional page number on which to raise an error.
+    """
+
+    def __init__(self, page_count, rows_per_page=2, fail_on_page=None):
+        self.page_count = page_count
+        self.rows_per_page = rows_per_page
+        self.fail_on_page = fail_on_page
+        self.requested_tokens = []
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        with self.lock:
+            self.requested_tokens.append(request.page_token)
+        page = int(request.page_token or 0)
+
+        if page == self.fail_on_page:
+            raise ValueError(page)
+
+        response = service_protos.SearchGoogleAdsResponse()
+        for index in range(self.rows_per_page):
+            response.results.add().campaign.id.value = (
+                page * self.rows_per_page + index)
+        if page + 1 < self.page_count:
+            response.next_page_token = str(page + 1)
+        return response
+
+
+def _create_iterator(method, **kwargs):
+    return pagination.PrefetchingGRPCIterator(
+        client=None, method=method,
+        request=service_protos.SearchGoogleAdsRequest(), items_field='results',
+        **kwargs)
+
+
+def _campaign_ids(rows):
+    return [row.campaign.id.value for row in rows]
+
+
+class PrefetchingGRPCIteratorTest(TestCase):
+
+    def test_iterate_items(self):
+        method = MockSearchMethod(3)
+        iterator = _create_iterator(method, prefetch_pages=2)
+        self.assertEqual(_campaign_ids(iterator), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(method.requested_tokens, ['', '1', '2'])
+        self.assertEqual(iterator.next_page_token, '')
+
+    def test_iterate_pages(self):
+        iterator = _create_iterator(MockSearchMethod(2), prefetch_pages=1)
+        pages = list(iterator.pages)
+        self.assertEqual([_campaign_ids(page) for page in pages],
+                         [[0, 1], [2, 3]])
+        self.assertEqual(iterator.page_number, 2)
+        self.assertEqual(pages[0].raw_page.next_page_token, '1')
+
+    def test_prefetch_disabled(self):
+        method = MockSearchMethod(2)
+        iterator = _create_iterator(method, prefetch_pages=0)
+        self.assertEqual(_campaign_ids(iterator), [0, 1, 2, 3])
+        self.assertIsNone(iterator._fetcher)
+
+    def test_error_raised_after_earlier_pages(self):
+        iterator = _create_iterator(MockSearchMethod(5, fail_on_page=2),
+                                    prefetch_pages=3)
+        pages = iterator.pages
+        self.assertEqual(_campaign_ids(next(pages)), [0, 1])
+        self.assertEqual(_campaign_ids(next(pages)), [2, 3])
+        self.assertRaises(ValueError, next, pages)
+
+    def test_lookahead_depth(self):
+        method = MockSearchMethod(10)
+        iterator = _create_iterator(method, prefetch_pages=2)
+        pages = iterator.pages
+        next(pages)
+        fetcher = iterator._fetcher
+        with fetcher._condition:
+            fetcher._condition.wait_for(
+                lambda: len(fetcher._responses) == 2, timeout=5)
+        # The consumed page and the two prefetched pages.
+        self.assertEqual(len(method.requested_tokens), 3)
+        iterator.close()
+
+    def test_memory_cap(self):
+        """Only one page is prefetched when a page exceeds the memory cap."""
+        method = MockSearchMethod(10)
+        iterator = _create_iterator(method, prefetch_pages=5,
+                                    max_prefetch_bytes=1)
+        pages = iterator.pages
+        next(pages)
+        fetcher = iterator._fetcher
+        with fetcher._condition:
+            fetcher._condition.wait_for(lambda: fetcher._responses, timeout=5)
+            self.assertEqual(len(fetcher._responses), 1)
+        iterator.close()
+
+    def test_max_results(self):
+        iterator = _create_iterator(MockSearchMethod(10), max_results=3,
+                                    prefetch_pages=1)
+        self.assertEqual(len(list(iterator.pages)), 2)
+
+    def test_resume_from_page_token(self):
+        method = MockSearchMethod(3)
+        iterator = _create_iterator(method, prefetch_pages=1)
+        iterator.next_page_token = '1'
+        self.assertEqual(_campaign_ids(iterator), [2, 3, 4, 5])
+
+    def test_set_prefetch_defaults(self):
+        pagination.set_prefetch_defaults(prefetch_pages=4)
+        try:
+            iterator = _create_iterator(MockSearchMethod(1))
+            self.assertEqual(iterator._prefetch_pages, 4)
+        finally:
+            pagination.set_prefetch_defaults(prefetch_pages=0)
+
+    def test_prefetch_disabled_by_default(self):
+        iterator = _create_iterator(MockSearchMethod(2))
+        self.assertEqual(_campaign_ids(iterator), [0, 1, 2, 3])
+        self.assertIsNone(iterator._fetcher)
+
+    def test_set_prefetch_defaults_invalid(self):
+        self.assertRaises(ValueError, pagination.set_prefetch_defaults,
+                          prefetch_pages=-1)
+
+
+class InstallTest(TestCase):
+
+    def _create_grpc_iterator(self, method):
+        return page_iterator.GRPCIterator(
+            client=None, method=method,
+            request=service_protos.SearchGoogleAdsRequest(),
+            items_field='results', request_token_field='page_token',
+            response_token_field='next_page_token', max_results=3)
+
+    def test_paged_method_returns_prefetching_iterator(self):
+        method = MockSearchMethod(3)
+        service = mock.Mock(spec=['search'])
+        service.search.return_value = self._create_grpc_iterator(method)
+        pagination.install(service)
+
+        iterator = service.search('123', 'query', page_size=2)
+
+        service.search.__wrapped__.assert_called_once_with(
+            '123', 'query', page_size=2)
+        self.assertIsInstance(iterator, pagination.PrefetchingGRPCIterator)
+        self.assertEqual(iterator.max_results, 3)
+        self.assertEqual(_campaign_ids(iterator), [0, 1, 2, 3])
+
+    def test_other_methods_unchanged(self):
+        service = mock.Mock(spec=['mutate'])
+        mutate = service.mutate
+        pagination.install(service)
+        self.assertIs(service.mutate, mutate)
+
+    def test_other_return_values_unchanged(self):
+        service = mock.Mock(spec=['search'])
+        pagination.install(service)
+        self.assertIs(service.search(), service.search.__wrapped__())
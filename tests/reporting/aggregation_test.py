@@ -0,0 +1,139 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for streaming aggregation of search_stream results."""
+
+from importlib import import_module
+import mock
+from unittest import TestCase, skipIf
+
+from google.ads.google_ads.client import _DEFAULT_VERSION as default_version
+from google.ads.google_ads.reporting import aggregation
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+service_protos = import_module(
+    f'google.ads.google_ads.{default_version}.proto.services.'
+    'google_ads_service_pb2')
+
+_QUERY = ('SELECT campaign.id, campaign.status, segments.date, '
+          'metrics.clicks, metrics.impressions, metrics.average_cpc '
+          'FROM campaign')
+
+
+def _create_response(rows):
+    """Creates a response of (id, status, clicks, impressions, cpc) rows."""
+    response = service_protos.SearchGoogleAdsStreamResponse()
+    for campaign_id, status, clicks, impressions, cpc in rows:
+        row = response.results.add()
+        row.campaign.id.value = campaign_id
+        row.campaign.status = status
+        if clicks is not None:
+            row.metrics.clicks.value = clicks
+        row.metrics.impressions.value = impressions
+        if cpc is not None:
+            row.metrics.average_cpc.value = cpc
+    return response
+
+
+@skipIf(numpy is None, 'NumPy is not installed.')
+class StreamingAggregatorTest(TestCase):
+
+    def setUp(self):
+        self.aggregator = aggregation.StreamingAggregator(
+            ['campaign.id', 'campaign.status'], {
+                'clicks': aggregation.Sum('metrics.clicks'),
+                'min_clicks': aggregation.Min('metrics.clicks'),
+                'max_clicks': aggregation.Max('metrics.clicks'),
+                'rows': aggregation.Count(),
+                'rows_with_clicks': aggregation.Count('metrics.clicks'),
+                'mean_clicks': aggregation.Mean('metrics.clicks'),
+                'ctr': aggregation.Ratio('metrics.clicks',
+                                         'metrics.impressions'),
+                'cpc': aggregation.WeightedAverage('metrics.average_cpc',
+                                                   'metrics.clicks'),
+            }, query=_QUERY, version=default_version)
+
+    def test_aggregates_across_batches(self):
+        self.aggregator.consume([
+            _create_response([(1, 2, 10, 100, 1.0), (2, 2, None, 0, None)]),
+            _create_response([(1, 2, 30, 100, 3.0)]),
+        ])
+
+        self.assertEqual(self.aggregator.num_rows, 3)
+        self.assertEqual(self.aggregator.results(), [
+            {'campaign.id': 1, 'campaign.status': 'ENABLED', 'clicks': 40,
+             'min_clicks': 10, 'max_clicks': 30, 'rows': 2,
+             'rows_with_clicks': 2, 'mean_clicks': 20.0, 'ctr': 0.2,
+             'cpc': 2.5},
+            {'campaign.id': 2, 'campaign.status': 'ENABLED', 'clicks': 0,
+             'min_clicks': None, 'max_clicks': None, 'rows': 1,
+             'rows_with_clicks': 0, 'mean_clicks': None, 'ctr': None,
+             'cpc': None},
+        ])
+
+    def test_many_groups(self):
+        rows = [(campaign_id % 50, 2, 1, 1, 1.0)
+                for campaign_id in range(1000)]
+        self.aggregator.append(_create_response(rows))
+        results = self.aggregator.results()
+        self.assertEqual(self.aggregator.num_groups, 50)
+        self.assertEqual({result['clicks'] for result in results}, {20})
+
+    def test_shared_accumulators(self):
+        # The sums, minimum, maximum and count of clicks, the row count, the
+        # sum of impressions and the CPC weighted by clicks.
+        self.assertEqual(len(self.aggregator._accumulators), 7)
+
+    def test_without_group_by(self):
+        aggregator = aggregation.StreamingAggregator(
+            [], {'clicks': aggregation.Sum('metrics.clicks')},
+            version=default_version)
+        aggregator.append(_create_response([(1, 2, 1, 1, None),
+                                            (2, 2, 2, 1, None)]))
+        self.assertEqual(aggregator.results(), [{'clicks': 3}])
+
+    def test_no_rows(self):
+        self.assertEqual(self.aggregator.results(), [])
+
+    def test_field_not_selected(self):
+        self.assertRaises(ValueError, aggregation.StreamingAggregator,
+                          ['campaign.name'], {}, query=_QUERY,
+                          version=default_version)
+
+    def test_non_numeric_field(self):
+        self.assertRaises(ValueError, aggregation.StreamingAggregator,
+                          [], {'x': aggregation.Sum('campaign.status')},
+                          version=default_version)
+
+    def test_non_scalar_group_by_field(self):
+        for name in ('campaign.network_settings',
+                     'campaign.url_custom_parameters'):
+            self.assertRaises(ValueError, aggregation.StreamingAggregator,
+                              [name], {}, version=default_version)
+
+    def test_unknown_group_by_field(self):
+        self.assertRaises(ValueError, aggregation.StreamingAggregator,
+                          ['campaign.unknown'], {}, version=default_version)
+
+    def test_aggregate_search_stream(self):
+        client = mock.Mock()
+        client.get_service.return_value.search_stream.return_value = [
+            _create_response([(1, 2, 5, 10, None)])]
+        results = aggregation.aggregate_search_stream(
+            client, '123', _QUERY, ['campaign.id'],
+            {'clicks': aggregation.Sum('metrics.clicks')})
+        self.assertEqual(results, [{'campaign.id': 1, 'clicks': 5}])
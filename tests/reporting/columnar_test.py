@@ -0,0 +1,149 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for decoding search_stream results into columns."""
+
+from importlib import import_module
+import math
+import mock
+from unittest import TestCase, skipIf
+
+from google.ads.google_ads.client import _DEFAULT_VERSION as default_version
+from google.ads.google_ads.reporting import columnar
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+service_protos = import_module(
+    f'google.ads.google_ads.{default_version}.proto.services.'
+    'google_ads_service_pb2')
+
+_QUERY = ('SELECT campaign.id, campaign.name, campaign.status, metrics.ctr, '
+          'campaign.labels FROM campaign')
+
+
+def _create_response():
+    response = service_protos.SearchGoogleAdsStreamResponse()
+    row = response.results.add()
+    row.campaign.id.value = 1
+    row.campaign.name.value = 'Campaign 1'
+    row.campaign.status = 2
+    row.metrics.ctr.value = 0.25
+    row.campaign.labels.add().value = 'customers/1/labels/1'
+    # A row whose campaign fields are unset and whose metrics are missing.
+    response.results.add().campaign.status = 3
+    return response
+
+
+class ColumnTest(TestCase):
+
+    def setUp(self):
+        self.sink = columnar.ColumnarSink(_QUERY, version=default_version)
+        self.sink.append(_create_response())
+        self.columns = {column.name: column for column in self.sink.columns}
+
+    def test_kinds(self):
+        self.assertEqual(
+            [(column.kind, column.repeated) for column in self.sink.columns],
+            [(columnar.INT64, False), (columnar.STRING, False),
+             (columnar.ENUM, False), (columnar.DOUBLE, False),
+             (columnar.STRING, True)])
+
+    def test_wrappers_unboxed_and_nulls_masked(self):
+        self.assertEqual(list(self.columns['campaign.id']._values), [1, 0])
+        self.assertEqual(self.columns['campaign.name']._values,
+                         ['Campaign 1', None])
+        self.assertEqual(list(self.columns['campaign.status']._values),
+                         [2, 3])
+        ctr = self.columns['metrics.ctr']._values
+        self.assertEqual(ctr[0], 0.25)
+        self.assertTrue(math.isnan(ctr[1]))
+        self.assertEqual(self.columns['campaign.labels']._values,
+                         [['customers/1/labels/1'], []])
+        self.assertEqual(self.columns['campaign.id'].null_count, 1)
+        self.assertEqual(self.columns['campaign.status'].null_count, 0)
+
+    def test_num_rows(self):
+        self.sink.append_rows(_create_response().results)
+        self.assertEqual(self.sink.num_rows, 4)
+
+    def test_to_list(self):
+        self.assertEqual(self.columns['campaign.id'].to_list(), [1, None])
+        self.assertEqual(
+            self.columns['campaign.status'].to_list(enum_names=True),
+            ['ENABLED', 'PAUSED'])
+
+    def test_clear(self):
+        self.sink.clear()
+        self.assertEqual(self.sink.num_rows, 0)
+        self.assertEqual(self.columns['campaign.id'].null_count, 0)
+
+    def test_unknown_field(self):
+        self.assertRaises(ValueError, columnar.ColumnarSink,
+                          'SELECT campaign.unknown FROM campaign',
+                          version=default_version)
+
+    def test_field_of_scalar(self):
+        self.assertRaises(ValueError, columnar.ColumnarSink,
+                          'SELECT campaign.status.value FROM campaign',
+                          version=default_version)
+
+    @skipIf(numpy is None, 'NumPy is not installed.')
+    def test_to_numpy(self):
+        arrays = self.sink.to_numpy()
+        self.assertEqual(list(arrays), ['campaign.id', 'campaign.name',
+                                        'campaign.status', 'metrics.ctr',
+                                        'campaign.labels'])
+        self.assertEqual(arrays['campaign.id'].dtype, numpy.int64)
+        self.assertEqual(arrays['campaign.id'].mask.tolist(), [False, True])
+        self.assertNotIsInstance(arrays['campaign.status'],
+                                 numpy.ma.MaskedArray)
+        self.assertEqual(arrays['campaign.name'].tolist(),
+                         ['Campaign 1', None])
+
+    @skipIf(pyarrow is None, 'pyarrow is not installed.')
+    def test_to_arrow(self):
+        batch = self.sink.to_arrow()
+        self.assertEqual(batch.num_rows, 2)
+        self.assertEqual(batch.schema.field('metrics.ctr').type,
+                         pyarrow.float64())
+        self.assertEqual(batch.to_pydict(), {
+            'campaign.id': [1, None],
+            'campaign.name': ['Campaign 1', None],
+            'campaign.status': [2, 3],
+            'metrics.ctr': [0.25, None],
+            'campaign.labels': [['customers/1/labels/1'], []],
+        })
+
+
+class SearchStreamColumnarTest(TestCase):
+
+    def test_search_stream_columnar(self):
+        client = mock.Mock()
+        service = client.get_service.return_value
+        service.search_stream.return_value = iter([_create_response(),
+                                                   _create_response()])
+
+        sink = columnar.search_stream_columnar(client, '123', _QUERY)
+
+        self.assertEqual(sink.num_rows, 4)
+        client.get_service.assert_called_once_with(
+            'GoogleAdsService', version=default_version)
+        service.search_stream.assert_called_once_with('123', _QUERY)
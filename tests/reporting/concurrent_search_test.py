@@ -0,0 +1,143 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for concurrent multi-customer search streams."""
+
+import mock
+import threading
+from unittest import TestCase
+
+from google.ads.google_ads.client import ServicePool
+from google.ads.google_ads.reporting import concurrent_search
+
+
+class MockStream(object):
+    """A search_stream response that yields batches of the given rows."""
+
+    def __init__(self, batches, exception=None):
+        self._batches = iter(batches)
+        self._exception = exception
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return mock.Mock(results=next(self._batches))
+        except StopIteration:
+            if self._exception:
+                raise self._exception
+            raise
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class SearchStreamManyTest(TestCase):
+
+    def _create_client(self, streams):
+        """Creates a mock client whose searches return the given streams.
+
+        Args:
+            streams: a dict of customer IDs to MockStream instances.
+        """
+        service = mock.Mock()
+        service.search_stream.side_effect = (
+            lambda customer_id, query: streams[customer_id])
+        client = mock.Mock()
+        client.get_service_pool.return_value = ServicePool([service])
+        return client
+
+    def test_search_stream_many(self):
+        client = self._create_client({
+            '1': MockStream([['a', 'b'], ['c']]),
+            '2': MockStream([['d']])})
+
+        results = concurrent_search.search_stream_many(
+            client, ['1', '2'], 'query', max_concurrency=2)
+        rows = list(results)
+
+        self.assertEqual(sorted(rows), [('1', 'a'), ('1', 'b'), ('1', 'c'),
+                                        ('2', 'd')])
+        # Rows of a single customer keep their order.
+        self.assertEqual([row for customer_id, row in rows
+                          if customer_id == '1'], ['a', 'b', 'c'])
+        self.assertEqual(results.errors, {})
+        client.get_service_pool.assert_called_once_with('GoogleAdsService', 1)
+        service = client.get_service_pool.return_value.get()
+        service.transport.channel.close.assert_called_once_with()
+
+    def test_search_stream_many_customer_failure(self):
+        error = ValueError()
+        mock_error_callback = mock.Mock()
+        client = self._create_client({
+            '1': MockStream([['a']], exception=error),
+            '2': MockStream([['b']])})
+
+        results = concurrent_search.search_stream_many(
+            client, ['1', '2'], 'query', error_callback=mock_error_callback)
+        rows = list(results)
+
+        self.assertIn(('2', 'b'), rows)
+        self.assertEqual(results.errors, {'1': error})
+        mock_error_callback.assert_called_once_with('1', error)
+        self.assertEqual(results.progress.customers_failed, 1)
+        self.assertEqual(results.progress.customers_completed, 1)
+
+    def test_search_stream_many_progress(self):
+        progress = []
+        client = self._create_client({'1': MockStream([['a', 'b']])})
+
+        list(concurrent_search.search_stream_many(
+            client, ['1'], 'query', progress_callback=progress.append))
+
+        self.assertEqual(progress[-1].customers_total, 1)
+        self.assertEqual(progress[-1].customers_completed, 1)
+        self.assertEqual(progress[-1].customers_pending, 0)
+        self.assertEqual(progress[-1].rows, 2)
+
+    def test_search_stream_many_abandoned(self):
+        """Workers stop streaming once the consumer stops iterating."""
+        stream = MockStream([['a']] * 100)
+        client = self._create_client({'1': stream})
+
+        results = concurrent_search.search_stream_many(
+            client, ['1'], 'query', max_buffered_batches=1)
+        iterator = iter(results)
+        next(iterator)
+        iterator.close()
+        service = client.get_service_pool.return_value.get()
+        service.transport.channel.close.assert_called_once_with()
+
+        for thread in threading.enumerate():
+            if thread.name.startswith('search_stream_many'):
+                thread.join(timeout=5)
+
+        self.assertTrue(stream.cancelled)
+
+    def test_search_stream_many_iterated_once(self):
+        client = self._create_client({'1': MockStream([])})
+        results = concurrent_search.search_stream_many(client, ['1'], 'query')
+        list(results)
+        self.assertRaises(RuntimeError, list, results)
+
+    def test_search_stream_many_invalid_concurrency(self):
+        self.assertRaises(ValueError, concurrent_search.search_stream_many,
+                          mock.Mock(), ['1'], 'query', max_concurrency=0)
+
+    def test_search_progress_rows_per_second(self):
+        progress = concurrent_search.SearchProgress(1, 0, 0, 10, 2.0)
+        self.assertEqual(progress.rows_per_second, 5.0)
+        progress = concurrent_search.SearchProgress(1, 0, 0, 10, 0.0)
+        self.assertEqual(progress.rows_per_second, 0.0)
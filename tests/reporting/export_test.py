@@ -0,0 +1,190 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for exporting search results to files."""
+
+from importlib import import_module
+import gzip
+import json
+import mock
+import os
+import tempfile
+from unittest import TestCase, skipIf
+
+from google.ads.google_ads.client import _DEFAULT_VERSION as default_version
+from google.ads.google_ads.reporting import export
+
+try:
+    import pyarrow.parquet as parquet
+except ImportError:
+    parquet = None
+
+service_protos = import_module(
+    f'google.ads.google_ads.{default_version}.proto.services.'
+    'google_ads_service_pb2')
+
+_QUERY = ('SELECT campaign.id, campaign.status, campaign.labels '
+          'FROM campaign')
+
+
+def _create_response(*campaign_ids):
+    response = service_protos.SearchGoogleAdsStreamResponse()
+    for campaign_id in campaign_ids:
+        row = response.results.add()
+        row.campaign.id.value = campaign_id
+        row.campaign.status = 2
+        row.campaign.labels.add().value = f'customers/1/labels/{campaign_id}'
+    return response
+
+
+class RecordingWriter(export.ReportWriter):
+    """Records the rows of each batch it's asked to write."""
+
+    def __init__(self, fail_on_batch=None):
+        self.batches = []
+        self.fail_on_batch = fail_on_batch
+
+    def write(self, sink):
+        if len(self.batches) == self.fail_on_batch:
+            raise ValueError('write failed')
+        self.batches.append(sink.columns[0].to_list())
+
+    def close(self):
+        pass
+
+
+class ReportWriterTest(TestCase):
+
+    def test_incomplete_subclass_not_instantiable(self):
+        class IncompleteWriter(export.ReportWriter):
+            def write(self, sink):
+                pass
+
+        self.assertRaises(TypeError, IncompleteWriter)
+
+
+class ExportBatchesTest(TestCase):
+
+    def test_batches_written_in_order(self):
+        writer = RecordingWriter()
+        row_count = export.export_batches(
+            [_create_response(1, 2), _create_response(3)], _QUERY, writer,
+            version=default_version)
+        self.assertEqual(row_count, 3)
+        self.assertEqual(writer.batches, [[1, 2], [3]])
+
+    def test_empty_report(self):
+        writer = RecordingWriter()
+        self.assertEqual(export.export_batches([], _QUERY, writer), 0)
+        self.assertEqual(writer.batches, [[]])
+
+    def test_write_error_stops_reading(self):
+        read = []
+
+        def responses():
+            for campaign_id in range(100):
+                read.append(campaign_id)
+                yield _create_response(campaign_id)
+
+        self.assertRaises(ValueError, export.export_batches, responses(),
+                          _QUERY, RecordingWriter(fail_on_batch=1),
+                          max_buffered_batches=1)
+        self.assertLess(len(read), 100)
+
+    def test_read_error(self):
+        def responses():
+            yield _create_response(1)
+            raise IOError('stream failed')
+
+        writer = RecordingWriter()
+        self.assertRaises(IOError, export.export_batches, responses(), _QUERY,
+                          writer)
+        self.assertEqual(writer.batches, [[1]])
+
+
+class ExportSearchStreamTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.client = mock.Mock()
+        self.service = self.client.get_service.return_value
+        self.service.search_stream.return_value = iter(
+            [_create_response(1, 2), _create_response(3)])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _export(self, output_format, compression=None):
+        path = os.path.join(self.directory.name, f'report.{output_format}')
+        row_count = export.export_search_stream(
+            self.client, '123', _QUERY, path, output_format,
+            compression=compression)
+        self.assertEqual(row_count, 3)
+        return path
+
+    def test_csv(self):
+        with open(self._export(export.CSV), encoding='utf-8') as csv_file:
+            lines = csv_file.read().splitlines()
+        self.assertEqual(lines, [
+            'campaign.id,campaign.status,campaign.labels',
+            '1,ENABLED,"[""customers/1/labels/1""]"',
+            '2,ENABLED,"[""customers/1/labels/2""]"',
+            '3,ENABLED,"[""customers/1/labels/3""]"',
+        ])
+
+    def test_jsonl_compressed(self):
+        with gzip.open(self._export(export.JSONL, 'gzip'), 'rt') as jsonl:
+            rows = [json.loads(line) for line in jsonl]
+        self.assertEqual(rows[2], {
+            'campaign.id': 3,
+            'campaign.status': 'ENABLED',
+            'campaign.labels': ['customers/1/labels/3'],
+        })
+
+    @skipIf(parquet is None, 'pyarrow is not installed.')
+    def test_parquet(self):
+        path = self._export(export.PARQUET, 'snappy')
+        self.assertEqual(parquet.ParquetFile(path).num_row_groups, 2)
+        self.assertEqual(parquet.read_table(path).column(
+            'campaign.status').to_pylist(), ['ENABLED'] * 3)
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, export.export_search_stream,
+                          self.client, '123', _QUERY, 'report.xml', 'xml')
+
+    def test_unknown_compression(self):
+        self.assertRaises(ValueError, export.create_writer,
+                          os.path.join(self.directory.name, 'report.csv'),
+                          export.CSV, compression='rar')
+
+
+class ExportSearchTest(TestCase):
+
+    def test_pages_written_as_batches(self):
+        client = mock.Mock()
+        client.get_service.return_value.search.return_value.pages = iter(
+            [mock.Mock(raw_page=_create_response(1)),
+             mock.Mock(raw_page=_create_response(2, 3))])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.jsonl')
+            row_count = export.export_search(client, '123', _QUERY, path,
+                                             export.JSONL, page_size=2)
+            with open(path, encoding='utf-8') as jsonl:
+                campaign_ids = [json.loads(line)['campaign.id']
+                                for line in jsonl]
+
+        self.assertEqual(row_count, 3)
+        self.assertEqual(campaign_ids, [1, 2, 3])
+        client.get_service.return_value.search.assert_called_once_with(
+            '123', _QUERY, page_size=2)
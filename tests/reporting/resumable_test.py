@@ -0,0 +1,163 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for resumable search streams."""
+
+from importlib import import_module
+import mock
+import re
+from unittest import TestCase
+
+from google.ads.google_ads.client import _DEFAULT_VERSION
+from google.ads.google_ads.reporting import resumable
+
+service_protos = import_module(
+    f'google.ads.google_ads.{_DEFAULT_VERSION}.proto.services.'
+    'google_ads_service_pb2')
+
+_QUERY = ('SELECT campaign.id, segments.date FROM campaign '
+          "WHERE segments.date DURING LAST_7_DAYS")
+_RE_PREDICATE = re.compile(r'campaign\.id (>=?) (\d+)')
+
+
+def _create_row(campaign_id, date):
+    row = service_protos.GoogleAdsRow()
+    row.campaign.id.value = campaign_id
+    row.segments.date.value = date
+    return row
+
+
+def _get_key(row):
+    return row.campaign.id.value, row.segments.date.value
+
+
+class RetryableError(Exception):
+    pass
+
+
+class MockService(object):
+    """A GoogleAdsService that filters its rows by a campaign.id predicate.
+
+    Streams return one row per batch and fail after failures[i] rows on the
+    i-th call.
+    """
+
+    def __init__(self, rows, failures=()):
+        self.rows = sorted(rows, key=_get_key)
+        self.failures = list(failures)
+        self.queries = []
+
+    def search_stream(self, customer_id, query):
+        self.queries.append(query)
+        rows = self.rows
+        if match := _RE_PREDICATE.search(query):
+            operator, value = match.group(1), int(match.group(2))
+            rows = [row for row in rows if row.campaign.id.value > value
+                    or operator == '>=' and row.campaign.id.value == value]
+        fail_after = self.failures.pop(0) if self.failures else None
+        return self._stream(rows, fail_after)
+
+    def _stream(self, rows, fail_after):
+        for index, row in enumerate(rows):
+            if index == fail_after:
+                raise RetryableError()
+            yield mock.Mock(results=[row])
+
+
+class ResumableSearchStreamTest(TestCase):
+
+    def setUp(self):
+        self.rows = [_create_row(campaign_id, date)
+                     for campaign_id in (1, 2, 3)
+                     for date in ('2020-01-01', '2020-01-02')]
+
+    def _search(self, service, **kwargs):
+        return resumable.ResumableSearchStream(
+            service, '123', _QUERY, retry_delay=0,
+            retry_predicate=lambda ex: isinstance(ex, RetryableError),
+            **kwargs)
+
+    def test_query_ordered_by_key(self):
+        service = MockService(self.rows)
+        rows = list(self._search(service))
+        self.assertEqual(rows, self.rows)
+        self.assertEqual(service.queries, [
+            f'{_QUERY} ORDER BY campaign.id, segments.date'])
+
+    def test_resumed_without_duplicates(self):
+        service = MockService(self.rows, failures=[3, 1])
+        results = self._search(service)
+        rows = list(results)
+
+        self.assertEqual(rows, self.rows)
+        self.assertEqual(results.retry_count, 2)
+        self.assertIn('WHERE segments.date DURING LAST_7_DAYS AND '
+                      'campaign.id >= 2 ORDER BY', service.queries[1])
+        self.assertEqual(results.checkpoint.row_count, 6)
+
+    def test_single_key_field_uses_strict_predicate(self):
+        rows = [_create_row(campaign_id, '') for campaign_id in (1, 2, 3)]
+        service = MockService(rows, failures=[2])
+        results = resumable.ResumableSearchStream(
+            service, '123', 'SELECT campaign.id FROM campaign',
+            retry_delay=0,
+            retry_predicate=lambda ex: isinstance(ex, RetryableError))
+        self.assertEqual(list(results), rows)
+        self.assertEqual(service.queries[1], 'SELECT campaign.id FROM '
+                         'campaign WHERE campaign.id > 2 ORDER BY campaign.id')
+
+    def test_resume_from_serialized_checkpoint(self):
+        results = self._search(MockService(self.rows))
+        iterator = iter(results)
+        for _ in range(3):
+            next(iterator)
+        checkpoint = resumable.Checkpoint.from_json(
+            results.checkpoint.to_json())
+
+        rows = list(self._search(MockService(self.rows),
+                                 checkpoint=checkpoint))
+        self.assertEqual(rows, self.rows[3:])
+
+    def test_checkpoint_for_other_query(self):
+        checkpoint = resumable.Checkpoint(
+            'SELECT campaign.id FROM campaign', ('campaign.id',), (1,), 1)
+        self.assertRaises(ValueError, self._search, MockService([]),
+                          checkpoint=checkpoint)
+
+    def test_retries_exhausted(self):
+        service = MockService(self.rows, failures=[0, 0, 0, 0])
+        self.assertRaises(RetryableError, list,
+                          self._search(service, max_retries=3))
+
+    def test_non_unique_key(self):
+        service = MockService(self.rows)
+        results = self._search(service, key_fields=['campaign.id'])
+        self.assertRaises(ValueError, list, results)
+
+    def test_invalid_queries(self):
+        self.assertRaises(ValueError, resumable.ResumableSearchStream,
+                          mock.Mock(), '123', f'{_QUERY} LIMIT 10')
+        self.assertRaises(ValueError, resumable.ResumableSearchStream,
+                          mock.Mock(), '123', _QUERY,
+                          key_fields=['campaign.status'])
+
+    def test_resource_without_id_requires_key_fields(self):
+        query = 'SELECT keyword_view.resource_name FROM keyword_view'
+        with self.assertRaisesRegex(ValueError, 'key_fields'):
+            resumable.ResumableSearchStream(mock.Mock(), '123', query)
+
+        results = resumable.ResumableSearchStream(
+            mock.Mock(), '123', query,
+            key_fields=['keyword_view.resource_name'])
+        self.assertEqual(results.checkpoint.key_fields,
+                         ('keyword_view.resource_name',))
@@ -0,0 +1,102 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for flattening rows with compiled queries."""
+
+from importlib import import_module
+from unittest import TestCase
+
+from google.ads.google_ads.client import _DEFAULT_VERSION as default_version
+from google.ads.google_ads.reporting import rows
+
+service_protos = import_module(
+    f'google.ads.google_ads.{default_version}.proto.services.'
+    'google_ads_service_pb2')
+
+# Fields of different kinds, interleaved across messages.
+_QUERY = ('SELECT campaign.id, metrics.clicks, campaign.status, '
+          'ad_group_ad.ad.final_urls, campaign.name, '
+          'ad_group_ad.ad.type, campaign.network_settings FROM ad_group_ad')
+
+
+def _create_row():
+    row = service_protos.GoogleAdsRow()
+    row.campaign.id.value = 1
+    row.campaign.name.value = 'Campaign 1'
+    row.campaign.status = 2
+    row.metrics.clicks.value = 10
+    row.ad_group_ad.ad.final_urls.add().value = 'https://example.com'
+    return row
+
+
+def _compile(row_type=rows.TUPLE, query=_QUERY, **kwargs):
+    return rows.CompiledQuery(query, row_type=row_type,
+                              version=default_version, **kwargs)
+
+
+class CompiledQueryTest(TestCase):
+
+    def test_tuple(self):
+        self.assertEqual(_compile().flatten(_create_row()), (
+            1, 10, 'ENABLED', ['https://example.com'], 'Campaign 1',
+            'UNSPECIFIED', None))
+
+    def test_record(self):
+        record = _compile(rows.RECORD).flatten(_create_row())
+        self.assertEqual(record.campaign_id, 1)
+        self.assertEqual(record.ad_group_ad_ad_final_urls,
+                         ['https://example.com'])
+        self.assertEqual(record._asdict()['campaign.status'], 'ENABLED')
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_dict(self):
+        row = _compile(rows.DICT).flatten(_create_row())
+        self.assertEqual(list(row), list(_compile().names))
+        self.assertEqual(row['metrics.clicks'], 10)
+
+    def test_enum_numbers(self):
+        flattened = _compile(enum_names=False).flatten(_create_row())
+        self.assertEqual(flattened[2], 2)
+
+    def test_unset_messages(self):
+        row = service_protos.GoogleAdsRow()
+        row.campaign.status = 3
+        self.assertEqual(_compile().flatten(row), (
+            None, None, 'PAUSED', None, None, None, None))
+
+    def test_set_message(self):
+        row = _create_row()
+        row.campaign.network_settings.target_search_network.value = True
+        self.assertEqual(_compile().flatten(row)[-1],
+                         row.campaign.network_settings)
+
+    def test_flatten_stream(self):
+        response = service_protos.SearchGoogleAdsStreamResponse()
+        response.results.extend([_create_row(), _create_row()])
+        compiled_query = _compile(
+            query='SELECT campaign.id FROM campaign')
+        self.assertEqual(
+            list(compiled_query.flatten_stream([response, response])),
+            [(1,)] * 4)
+
+    def test_unknown_row_type(self):
+        self.assertRaises(ValueError, _compile, 'list')
+
+    def test_record_attribute_collision(self):
+        self.assertRaises(
+            ValueError, _compile, rows.RECORD,
+            'SELECT campaign.id, campaign.id FROM campaign')
+
+    def test_compile_query_cached(self):
+        self.assertIs(rows.compile_query(_QUERY, version=default_version),
+                      rows.compile_query(_QUERY, version=default_version))
@@ -0,0 +1,129 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for date-sharded search streams."""
+
+from datetime import date
+import mock
+import threading
+import time
+from unittest import TestCase
+
+from google.ads.google_ads.client import ServicePool
+from google.ads.google_ads.reporting import sharding
+
+_QUERY = ("SELECT campaign.id FROM campaign WHERE segments.date "
+          "BETWEEN '2020-01-01' AND '2020-03-31'")
+
+
+class MockService(object):
+    """A GoogleAdsService whose streams return one row per shard query.
+
+    Each row is the start date of the shard that produced it.
+    """
+
+    def __init__(self, failures=None, delays=None):
+        self.failures = failures or {}
+        self.delays = delays or {}
+        self.calls = []
+        self.transport = mock.Mock()
+        self._lock = threading.Lock()
+
+    def search_stream(self, customer_id, query):
+        start = query.split("'")[1]
+        with self._lock:
+            self.calls.append(start)
+            failures = self.failures.get(start)
+            if failures:
+                exception = failures.pop(0)
+                return self._fail(start, exception)
+        return iter([mock.Mock(results=[start])] if start not in self.delays
+                    else self._delayed(start))
+
+    def _fail(self, start, exception):
+        # Yields a partial result before failing, which must not be emitted.
+        yield mock.Mock(results=[f'partial {start}'])
+        raise exception
+
+    def _delayed(self, start):
+        time.sleep(self.delays[start])
+        yield mock.Mock(results=[start])
+
+
+class RetryableError(Exception):
+    pass
+
+
+class ShardQueryTest(TestCase):
+
+    def test_shard_query(self):
+        shards = sharding.shard_query(_QUERY, shard_by='month')
+        self.assertEqual([shard.date_range.start for shard in shards],
+                         [date(2020, 1, 1), date(2020, 2, 1),
+                          date(2020, 3, 1)])
+        self.assertEqual(shards[1].query, (
+            "SELECT campaign.id FROM campaign WHERE segments.date "
+            "BETWEEN '2020-02-01' AND '2020-02-29'"))
+
+    def test_shard_query_without_date_predicate(self):
+        self.assertRaises(ValueError, sharding.shard_query,
+                          'SELECT campaign.id FROM campaign')
+
+
+class SearchStreamShardedTest(TestCase):
+
+    def _search(self, service, **kwargs):
+        client = mock.Mock()
+        client.get_service_pool.return_value = ServicePool([service])
+        return sharding.search_stream_sharded(
+            client, '123', _QUERY, retry_delay=0,
+            retry_predicate=lambda ex: isinstance(ex, RetryableError),
+            **kwargs)
+
+    def test_ordered(self):
+        # The first shard is the slowest but is still yielded first.
+        service = MockService(delays={'2020-01-01': 0.1})
+        rows = list(self._search(service, max_concurrency=3))
+        self.assertEqual(rows, ['2020-01-01', '2020-02-01', '2020-03-01'])
+        service.transport.channel.close.assert_called_once_with()
+
+    def test_unordered(self):
+        service = MockService(delays={'2020-01-01': 0.2})
+        rows = list(self._search(service, max_concurrency=3, ordered=False))
+        self.assertEqual(sorted(rows),
+                         ['2020-01-01', '2020-02-01', '2020-03-01'])
+        self.assertEqual(rows[-1], '2020-01-01')
+
+    def test_failed_shard_retried_independently(self):
+        service = MockService(
+            failures={'2020-02-01': [RetryableError(), RetryableError()]})
+        results = self._search(service)
+        rows = list(results)
+
+        self.assertEqual(rows, ['2020-01-01', '2020-02-01', '2020-03-01'])
+        self.assertEqual(results.retry_count, 2)
+        self.assertEqual(service.calls.count('2020-01-01'), 1)
+        self.assertEqual(service.calls.count('2020-02-01'), 3)
+
+    def test_non_retryable_failure(self):
+        service = MockService(failures={'2020-02-01': [ValueError()]})
+        self.assertRaises(ValueError, list, self._search(service))
+
+    def test_retries_exhausted(self):
+        service = MockService(failures={'2020-02-01': [RetryableError()] * 3})
+        self.assertRaises(RetryableError, list,
+                          self._search(service, max_retries=2))
+
+    def test_invalid_concurrency(self):
+        self.assertRaises(ValueError, sharding.search_stream_sharded,
+                          mock.Mock(), '123', _QUERY, max_concurrency=0)
@@ -0,0 +1,175 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for memory-bounded row streams."""
+
+import gc
+from importlib import import_module
+import mock
+from unittest import TestCase
+import weakref
+
+from google.api_core import exceptions
+import grpc
+
+from google.ads.google_ads.client import _DEFAULT_VERSION as default_version
+from google.ads.google_ads.reporting import streaming
+
+service_protos = import_module(
+    f'google.ads.google_ads.{default_version}.proto.services.'
+    'google_ads_service_pb2')
+api_module = import_module(f'google.ads.google_ads.{default_version}')
+
+
+def _serialize_batch(*campaign_ids):
+    response = service_protos.SearchGoogleAdsStreamResponse()
+    for campaign_id in campaign_ids:
+        response.results.add().campaign.id.value = campaign_id
+    return response.SerializeToString()
+
+
+class BatchDecoderTest(TestCase):
+
+    def test_records_sizes(self):
+        decoder = streaming._BatchDecoder(
+            service_protos.SearchGoogleAdsStreamResponse)
+        small, large = _serialize_batch(1), _serialize_batch(1, 2, 3)
+        first, second = decoder(small), decoder(large)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(decoder.batch_count, 2)
+        self.assertEqual(decoder.byte_count, len(small) + len(large))
+        self.assertEqual(decoder.peak_batch_bytes, len(large))
+
+    def test_reuse_messages(self):
+        decoder = streaming._BatchDecoder(
+            service_protos.SearchGoogleAdsStreamResponse, reuse_messages=True)
+        first = decoder(_serialize_batch(1, 2))
+        second = decoder(_serialize_batch(3))
+
+        self.assertIs(first, second)
+        self.assertEqual([row.campaign.id.value for row in second.results],
+                         [3])
+
+
+class RowStreamTest(TestCase):
+
+    def test_rows_of_every_batch(self):
+        decoder = streaming._BatchDecoder(
+            service_protos.SearchGoogleAdsStreamResponse)
+        stream = streaming.RowStream(
+            map(decoder, [_serialize_batch(1, 2), _serialize_batch(3)]),
+            decoder=decoder)
+
+        self.assertEqual([row.campaign.id.value for row in stream],
+                         [1, 2, 3])
+        self.assertEqual(stream.row_count, 3)
+        self.assertEqual(stream.batch_count, 2)
+        self.assertEqual(stream.peak_batch_bytes,
+                         len(_serialize_batch(1, 2)))
+        self.assertRaises(RuntimeError, iter(stream).__next__)
+
+    def test_batches_released(self):
+        batches = []
+
+        def responses():
+            for campaign_id in (1, 2):
+                response = service_protos.SearchGoogleAdsStreamResponse()
+                response.results.add().campaign.id.value = campaign_id
+                batches.append(weakref.ref(response))
+                yield response
+                response = None
+
+        iterator = iter(streaming.RowStream(responses()))
+        next(iterator)
+        next(iterator)
+        gc.collect()
+        self.assertIsNone(batches[0]())
+
+    def test_peak_batch_bytes_without_decoder(self):
+        batches = [service_protos.SearchGoogleAdsStreamResponse.FromString(
+            _serialize_batch(*campaign_ids))
+            for campaign_ids in ((1,), (1, 2, 3), (4, 5))]
+        stream = streaming.RowStream(batches)
+
+        self.assertEqual(len(list(stream)), 6)
+        self.assertEqual(stream.batch_count, 3)
+        self.assertEqual(stream.peak_batch_bytes, batches[1].ByteSize())
+
+    def test_cancel(self):
+        responses = mock.Mock()
+        self.assertEqual(streaming.RowStream(responses).cancel(),
+                         responses.cancel.return_value)
+        self.assertFalse(streaming.RowStream([]).cancel())
+
+
+class StreamRowsTest(TestCase):
+
+    def _create_client(self, *batches, error=None):
+        channel = mock.Mock()
+        service = api_module.GoogleAdsServiceClient(
+            transport=lambda **kwargs: mock.Mock(channel=channel))
+        client = mock.Mock()
+        client.get_service.return_value = service
+
+        def search_stream(request, **kwargs):
+            deserializer = channel.unary_stream.call_args[1][
+                'response_deserializer']
+            for batch in batches:
+                yield deserializer(batch)
+            if error is not None:
+                raise error
+
+        channel.unary_stream.return_value.side_effect = search_stream
+        return client, channel
+
+    def test_decodes_with_channel(self):
+        client, channel = self._create_client(_serialize_batch(1))
+
+        stream = streaming.stream_rows(client, '123', 'SELECT campaign.id '
+                                       'FROM campaign', reuse_messages=True,
+                                       timeout=5, summary_row_setting=1)
+
+        self.assertEqual([row.campaign.id.value for row in stream], [1])
+        self.assertEqual(channel.unary_stream.call_args[0][0],
+                         f'/google.ads.googleads.{default_version}.services.'
+                         'GoogleAdsService/SearchStream')
+        search_stream = channel.unary_stream.return_value
+        request = search_stream.call_args[0][0]
+        self.assertEqual(request.customer_id, '123')
+        self.assertEqual(request.summary_row_setting, 1)
+        self.assertEqual(search_stream.call_args[1]['timeout'], 5)
+        self.assertEqual(stream.peak_batch_bytes, len(_serialize_batch(1)))
+
+    def test_routing_metadata(self):
+        client, channel = self._create_client(_serialize_batch(1))
+
+        streaming.stream_rows(client, '123', 'query',
+                              metadata=[('key', 'value')])
+
+        metadata = channel.unary_stream.return_value.call_args[1]['metadata']
+        self.assertIn(('key', 'value'), metadata)
+        self.assertIn(('x-goog-request-params', 'customer_id=123'), metadata)
+
+    def test_errors_mapped(self):
+        client, _ = self._create_client(_serialize_batch(1),
+                                        error=grpc.RpcError())
+        stream = iter(streaming.stream_rows(client, '123', 'query'))
+
+        next(stream)
+        self.assertRaises(exceptions.GoogleAPICallError, next, stream)
+
+    def test_get_peak_rss(self):
+        peak_rss = streaming.get_peak_rss()
+        if peak_rss is not None:
+            self.assertGreater(peak_rss, 0)
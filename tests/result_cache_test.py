@@ -0,0 +1,213 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the search result cache."""
+
+from importlib import import_module
+import mock
+import os
+import tempfile
+from unittest import TestCase
+
+from google.ads.google_ads import result_cache
+from google.ads.google_ads.client import _DEFAULT_VERSION as default_version
+
+service_protos = import_module(
+    f'google.ads.google_ads.{default_version}.proto.services.'
+    'google_ads_service_pb2')
+
+_METHOD = 'GoogleAdsService/Search'
+
+
+def _create_key(customer_id='123', query='SELECT campaign.id FROM campaign',
+                **kwargs):
+    request = service_protos.SearchGoogleAdsRequest(
+        customer_id=customer_id, query=query, **kwargs)
+    return result_cache.create_key(request, _METHOD, default_version)
+
+
+class CreateKeyTest(TestCase):
+
+    def test_query_normalized(self):
+        self.assertEqual(
+            _create_key(query='SELECT campaign.id\n   FROM campaign '),
+            _create_key(query='SELECT campaign.id FROM campaign'))
+
+    def test_pages_have_different_keys(self):
+        self.assertNotEqual(_create_key(page_token='1'), _create_key())
+
+    def test_login_customer_id(self):
+        request = service_protos.SearchGoogleAdsRequest(customer_id='123')
+        self.assertNotEqual(
+            result_cache.create_key(request, _METHOD, default_version, '1'),
+            result_cache.create_key(request, _METHOD, default_version, '2'))
+
+
+class ResultCacheTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('google.ads.google_ads.result_cache.time.time',
+                             return_value=1000.0)
+        self.time = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hit_and_miss(self):
+        cache = result_cache.ResultCache()
+        key = _create_key()
+        self.assertIsNone(cache.get(key))
+        cache.put(key, [b'batch'])
+        self.assertEqual(cache.get(key), [b'batch'])
+        stats = cache.stats
+        self.assertEqual((stats.hits, stats.misses), (1, 1))
+        self.assertEqual(stats.hit_rate, 0.5)
+
+    def test_expiration(self):
+        cache = result_cache.ResultCache(ttl=10)
+        key = _create_key()
+        cache.put(key, [b'batch'])
+        self.time.return_value = 1010.0
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.stats.expirations, 1)
+
+    def test_resource_ttls(self):
+        cache = result_cache.ResultCache(
+            ttl=10, resource_ttls={'change_status': 0})
+        key = _create_key(
+            query='SELECT change_status.resource_name FROM change_status')
+        cache.put(key, [b'batch'])
+        self.assertIsNone(cache.get(key))
+
+    def test_lru_eviction_by_size(self):
+        cache = result_cache.ResultCache(max_bytes=10)
+        first, second, third = (_create_key(customer_id)
+                                for customer_id in ('1', '2', '3'))
+        cache.put(first, [b'1234'])
+        cache.put(second, [b'1234'])
+        # Using the first entry makes the second the least recently used.
+        cache.get(first)
+        cache.put(third, [b'1234'])
+
+        self.assertIsNone(cache.get(second))
+        self.assertIsNotNone(cache.get(first))
+        self.assertEqual(cache.stats.evictions, 1)
+        self.assertEqual(cache.stats.size_bytes, 8)
+
+    def test_entry_larger_than_cache(self):
+        cache = result_cache.ResultCache(max_bytes=3)
+        cache.put(_create_key(), [b'1234'])
+        self.assertEqual(cache.stats.entries, 0)
+
+    def test_invalidate_customer(self):
+        cache = result_cache.ResultCache()
+        cache.put(_create_key('1'), [b'1'])
+        cache.put(_create_key('2'), [b'2'])
+        self.assertEqual(cache.invalidate('1'), 1)
+        self.assertIsNone(cache.get(_create_key('1')))
+        self.assertIsNotNone(cache.get(_create_key('2')))
+
+    def test_invalidate_resource(self):
+        cache = result_cache.ResultCache()
+        ad_group_key = _create_key(query='SELECT ad_group.id FROM ad_group')
+        cache.put(_create_key(), [b'1'])
+        cache.put(ad_group_key, [b'2'])
+        self.assertEqual(cache.invalidate(resource='campaign'), 1)
+        self.assertIsNotNone(cache.get(ad_group_key))
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            key = _create_key()
+            result_cache.ResultCache(directory=directory).put(
+                key, [b'first', b'second'])
+
+            # A new cache, e.g. in another process, reads the entry from disk.
+            cache = result_cache.ResultCache(directory=directory)
+            self.assertEqual(cache.get(key), [b'first', b'second'])
+            self.assertEqual(cache.stats.disk_hits, 1)
+
+            cache.invalidate('123')
+            self.assertIsNone(
+                result_cache.ResultCache(directory=directory).get(key))
+
+    def test_disk_tier_expiration(self):
+        with tempfile.TemporaryDirectory() as directory:
+            key = _create_key()
+            result_cache.ResultCache(ttl=10, directory=directory).put(
+                key, [b'batch'])
+            self.time.return_value = 1010.0
+            cache = result_cache.ResultCache(directory=directory)
+            self.assertIsNone(cache.get(key))
+            self.assertEqual(cache.stats.expirations, 1)
+
+    def test_put_after_invalidation_dropped(self):
+        cache = result_cache.ResultCache()
+        key = _create_key()
+        generation = cache.get_generation('123')
+        cache.invalidate('123')
+        cache.put(key, [b'stale'], generation)
+        self.assertIsNone(cache.get(key))
+
+        generation = cache.get_generation('123')
+        cache.invalidate()
+        cache.put(key, [b'stale'], generation)
+        self.assertIsNone(cache.get(key))
+
+    def test_put_after_other_customer_invalidated(self):
+        cache = result_cache.ResultCache()
+        key = _create_key()
+        generation = cache.get_generation('123')
+        cache.invalidate('456')
+        cache.put(key, [b'batch'], generation)
+        self.assertEqual(cache.get(key), [b'batch'])
+
+    def test_disk_tier_size_bound(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = result_cache.ResultCache(directory=directory)
+            keys = [_create_key(customer_id) for customer_id in '123']
+            cache.put(keys[0], [b'batch'])
+            paths = [cache._get_disk_entry_path(key) for key in keys]
+            cache.max_disk_bytes = 2 * os.path.getsize(paths[0])
+            os.utime(paths[0], (1, 1))
+            cache.put(keys[1], [b'batch'])
+            os.utime(paths[1], (2, 2))
+            # A disk hit makes the first entry the most recently used.
+            result_cache.ResultCache(directory=directory).get(keys[0])
+
+            cache.put(keys[2], [b'batch'])
+            self.assertEqual([os.path.exists(path) for path in paths],
+                             [True, False, True])
+
+    def test_entry_larger_than_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = result_cache.ResultCache(directory=directory,
+                                             max_disk_bytes=1)
+            key = _create_key()
+            cache.put(key, [b'batch'])
+            self.assertEqual(cache.get(key), [b'batch'])
+            self.assertFalse(os.path.exists(cache._get_disk_entry_path(key)))
+
+    def test_corrupt_disk_entry_is_miss(self):
+        with tempfile.TemporaryDirectory() as directory:
+            key = _create_key()
+            result_cache.ResultCache(directory=directory).put(
+                key, [b'first', b'second'])
+            cache = result_cache.ResultCache(directory=directory)
+            path = cache._get_disk_entry_path(key)
+            with open(path, 'rb') as disk_entry:
+                contents = disk_entry.read()
+
+            for corrupt_contents in (b'{"expires', b'[]\n', contents[:-3],
+                                     contents + b'\x00'):
+                with open(path, 'wb') as disk_entry:
+                    disk_entry.write(corrupt_contents)
+                self.assertIsNone(cache.get(key))
+                self.assertFalse(os.path.exists(path))
@@ -0,0 +1,133 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the search_stream iterator."""
+
+from unittest import TestCase
+
+from google.api_core import exceptions
+import grpc
+import mock
+
+from google.ads.google_ads import search_stream
+from google.ads.google_ads.v3 import GoogleAdsServiceClient
+
+
+class _Stream(object):
+    """An iterable stream of responses that may end with an error."""
+
+    def __init__(self, responses, error=None):
+        self._responses = iter(responses)
+        self._error = error
+        self.cancel = mock.Mock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._responses)
+        except StopIteration:
+            if self._error is not None:
+                raise self._error
+            raise
+
+
+def _batch(*rows):
+    return mock.Mock(results=list(rows))
+
+
+class SearchStreamIteratorTest(TestCase):
+
+    def test_iterate(self):
+        batches = [_batch(1), _batch(2), _batch(3)]
+        iterator = search_stream.SearchStreamIterator(_Stream(batches))
+        self.assertEqual(list(iterator), batches)
+
+    def test_next(self):
+        batches = [_batch(1), _batch(2)]
+        iterator = search_stream.SearchStreamIterator(_Stream(batches))
+        self.assertIs(next(iterator), batches[0])
+        self.assertIs(next(iterator), batches[1])
+        self.assertRaises(StopIteration, next, iterator)
+
+    def test_empty_stream(self):
+        iterator = search_stream.SearchStreamIterator(_Stream([]))
+        self.assertEqual(list(iterator), [])
+        self.assertEqual(list(iterator.iter_rows()), [])
+
+    def test_first_response_prefetched(self):
+        stream = _Stream([_batch(1), _batch(2)])
+        search_stream.SearchStreamIterator(stream)
+        self.assertEqual(len(list(stream)), 1)
+
+    def test_first_response_error_raised_on_creation(self):
+        self.assertRaises(grpc.RpcError, search_stream.SearchStreamIterator,
+                          _Stream([], grpc.RpcError()))
+
+    def test_iter_rows(self):
+        iterator = search_stream.SearchStreamIterator(
+            _Stream([_batch(1, 2), _batch(), _batch(3)]))
+        self.assertEqual(list(iterator.iter_rows()), [1, 2, 3])
+
+    def test_iteration_error_mapped(self):
+        iterator = search_stream.SearchStreamIterator(
+            _Stream([_batch(1)], grpc.RpcError()))
+        rows = iterator.iter_rows()
+        self.assertEqual(next(rows), 1)
+        self.assertRaises(exceptions.GoogleAPICallError, next, rows)
+
+    def test_next_error_mapped(self):
+        iterator = search_stream.SearchStreamIterator(
+            _Stream([_batch(1)], grpc.RpcError()))
+        next(iterator)
+        self.assertRaises(exceptions.GoogleAPICallError, next, iterator)
+
+    def test_other_errors_not_mapped(self):
+        iterator = search_stream.SearchStreamIterator(
+            _Stream([_batch(1)], ValueError()))
+        self.assertRaises(ValueError, list, iterator)
+
+    def test_call_methods_delegated(self):
+        stream = _Stream([])
+        search_stream.SearchStreamIterator(stream).cancel()
+        stream.cancel.assert_called_once_with()
+
+
+class InstallTest(TestCase):
+
+    def _create_service(self, stream):
+        transport = mock.Mock()
+        transport.search_stream.return_value = stream
+        service = GoogleAdsServiceClient(transport=lambda **kwargs: transport)
+        search_stream.install(service)
+        return service, transport
+
+    def test_search_stream_returns_iterator(self):
+        service, transport = self._create_service(
+            _Stream([_batch(1, 2), _batch(3)]))
+        response = service.search_stream('123', 'query', timeout=5)
+
+        self.assertIsInstance(response, search_stream.SearchStreamIterator)
+        self.assertEqual(list(response.iter_rows()), [1, 2, 3])
+        request = transport.search_stream.call_args[0][0]
+        self.assertEqual(request.customer_id, '123')
+        kwargs = transport.search_stream.call_args[1]
+        self.assertEqual(kwargs['timeout'], 5)
+        self.assertIn(('x-goog-request-params', 'customer_id=123'),
+                      kwargs['metadata'])
+
+    def test_first_response_error_mapped(self):
+        service, _ = self._create_service(_Stream([], grpc.RpcError()))
+        self.assertRaises(exceptions.GoogleAPICallError,
+                          service.search_stream, '123', 'query', retry=None)
@@ -0,0 +1,142 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the single_flight module."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from unittest import TestCase
+
+from google.ads.google_ads.single_flight import SingleFlight
+
+_TIMEOUT_SECONDS = 5
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+
+    def _call_concurrently(self, function, count=4, key='key'):
+        """Calls a function that blocks until every call has joined."""
+        release = threading.Event()
+
+        def blocking_function():
+            release.wait(_TIMEOUT_SECONDS)
+            return function()
+
+        with ThreadPoolExecutor(count) as executor:
+            futures = [executor.submit(self.single_flight.call, key,
+                                       blocking_function)
+                       for _ in range(count)]
+            while self.single_flight.stats.calls < count:
+                threading.Event().wait(0.001)
+            release.set()
+        return futures
+
+    def test_call(self):
+        self.assertEqual(self.single_flight.call('key', lambda: 1), 1)
+        self.assertEqual(self.single_flight.call('key', lambda: 2), 2)
+        stats = self.single_flight.stats
+        self.assertEqual((stats.calls, stats.executions, stats.coalesced,
+                          stats.in_flight), (2, 2, 0, 0))
+
+    def test_call_coalesces_concurrent_calls(self):
+        executions = []
+
+        def function():
+            executions.append(1)
+            return object()
+
+        futures = self._call_concurrently(function)
+        results = [future.result() for future in futures]
+        self.assertEqual(len(executions), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        stats = self.single_flight.stats
+        self.assertEqual((stats.calls, stats.executions, stats.coalesced),
+                         (4, 1, 3))
+        self.assertEqual(stats.coalesced_rate, 0.75)
+
+    def test_call_shares_exception(self):
+        def function():
+            raise ValueError('failed')
+
+        futures = self._call_concurrently(function)
+        for future in futures:
+            self.assertIsInstance(future.exception(), ValueError)
+        self.assertEqual(self.single_flight.stats.in_flight, 0)
+
+    def test_call_waiter_timeout(self):
+        release = threading.Event()
+
+        with ThreadPoolExecutor(1) as executor:
+            leader = executor.submit(self.single_flight.call, 'key',
+                                     lambda: release.wait(_TIMEOUT_SECONDS))
+            while self.single_flight.stats.calls < 1:
+                threading.Event().wait(0.001)
+            self.assertRaises(TimeoutError, self.single_flight.call, 'key',
+                              lambda: None, timeout=0.01)
+            release.set()
+        self.assertTrue(leader.result())
+
+    def test_call_different_keys(self):
+        self.single_flight.call('a', lambda: self.single_flight.call(
+            'b', lambda: None))
+        self.assertEqual(self.single_flight.stats.coalesced, 0)
+
+    def test_call_async_coalesces_concurrent_calls(self):
+        executions = []
+
+        async def coroutine_function():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            return len(executions)
+
+        async def main():
+            return await asyncio.gather(*(
+                self.single_flight.call_async('key', coroutine_function)
+                for _ in range(3)))
+
+        self.assertEqual(asyncio.run(main()), [1, 1, 1])
+        self.assertEqual(self.single_flight.stats.coalesced, 2)
+        self.assertEqual(self.single_flight.stats.in_flight, 0)
+
+    def test_call_async_shares_exception(self):
+        async def coroutine_function():
+            await asyncio.sleep(0.01)
+            raise ValueError('failed')
+
+        async def main():
+            return await asyncio.gather(*(
+                self.single_flight.call_async('key', coroutine_function)
+                for _ in range(2)), return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, ValueError)
+                            for result in results))
+
+    def test_call_async_cancelled_waiter(self):
+        async def coroutine_function():
+            await asyncio.sleep(0.01)
+            return 1
+
+        async def main():
+            leader = asyncio.ensure_future(
+                self.single_flight.call_async('key', coroutine_function))
+            waiter = asyncio.ensure_future(
+                self.single_flight.call_async('key', coroutine_function))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            return await leader
+
+        self.assertEqual(asyncio.run(main()), 1)
@@ -13,7 +13,7 @@
 # limitations under the License.
 """Tests for the Google Ads API client library utilities."""
 
-
+import json
 from unittest import TestCase
 
 from google.ads.google_ads import util
@@ -36,3 +36,12 @@ class ConvertStringTest(TestCase):
         expected = 'GoogleAdsServiceClientTransport'
         result = util.convert_snake_case_to_upper_case(string)
         self.assertEqual(result, expected)
+
+
+class ImportOptionalTest(TestCase):
+    def test_import_optional(self):
+        self.assertIs(util.import_optional('json'), json)
+
+    def test_import_optional_not_installed(self):
+        self.assertRaisesRegex(ImportError, 'missing_module is required',
+                               util.import_optional, 'missing_module')